@@ -0,0 +1,267 @@
+"""
+Admission control for the analysis endpoints
+
+Every analysis request buffers up to 50 MB of audio and holds a Hume job for
+minutes, so a burst from one client can exhaust memory and the provider quota
+for everyone. AdmissionController bounds that in two layers, keyed per client
+(the JWT `sub`, or the client IP for anonymous uploads):
+
+- a token bucket per client limits how often analyses may start, with a
+  burst allowance;
+- in-flight slots, with a global budget and a per-client cap.
+
+A request that cannot start right away waits in a FIFO queue for up to
+`queue_timeout` seconds; past that, or when the queue is full, it is rejected
+with AdmissionRejected, which the API turns into 429 with Retry-After.
+Admission happens before the upload is read, so rejected requests never
+buffer their audio.
+
+Configuration (ADMISSION_*):
+    MAX_IN_FLIGHT         analyses running at once across all clients (32)
+    USER_MAX_IN_FLIGHT    analyses running at once per client (3)
+    USER_RATE             analyses a client may start per minute, sustained (12)
+    USER_BURST            analyses a client may start back to back (5)
+    MAX_QUEUE             requests waiting for a slot (64)
+    QUEUE_TIMEOUT         seconds a request may wait before it is rejected (2)
+"""
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+from metrics import metrics
+
+admission_decisions = metrics.counter("admission_requests_total", "Analysis requests by admission outcome and reason")
+admission_in_flight = metrics.gauge("admission_in_flight", "Analyses holding an admission slot")
+admission_queue_depth = metrics.gauge("admission_queue_depth", "Analysis requests waiting for an admission slot")
+admission_wait = metrics.histogram(
+    "admission_wait_seconds", "Time admitted requests waited for their slot",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10)
+)
+
+# Buckets idle this long are full again and can be forgotten
+BUCKET_IDLE_SECONDS = 3600
+
+
+class AdmissionRejected(Exception):
+    """The request may not start now; retry after `retry_after` seconds"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"Too many analysis requests ({reason})")
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class TokenBucket:
+    """`rate` tokens per second, holding at most `burst`"""
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def reserve(self, now: float, max_wait: float) -> float:
+        """
+        Take a token, possibly one not yet refilled
+
+        Returns:
+            Seconds until the token is available (0 when it is now). A wait
+            longer than `max_wait` takes nothing and is returned negated.
+        """
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        wait = max(0.0, (1 - self.tokens) / self.rate)
+        if wait > max_wait:
+            return -wait
+        self.tokens -= 1
+        return wait
+
+
+class AdmissionLease:
+    """An admitted request's slot; released once, by whoever holds it last"""
+
+    def __init__(self, controller: "AdmissionController", key: str):
+        self._controller = controller
+        self.key = key
+        self.started = time.monotonic()
+        self._released = False
+
+    def transfer(self) -> "AdmissionLease":
+        """Hand the slot to a new lease (e.g. a streaming body outliving the endpoint)"""
+        self._released = True
+        lease = AdmissionLease(self._controller, self.key)
+        lease.started = self.started
+        return lease
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._controller._release(self)
+
+
+class AdmissionController:
+    """Global and per-client admission of analysis requests"""
+
+    def __init__(
+        self,
+        max_in_flight: int = 32,
+        user_max_in_flight: int = 3,
+        user_rate_per_minute: float = 12,
+        user_burst: float = 5,
+        max_queue: int = 64,
+        queue_timeout: float = 2.0
+    ):
+        self.max_in_flight = max_in_flight
+        self.user_max_in_flight = user_max_in_flight
+        self.user_rate = user_rate_per_minute / 60
+        self.user_burst = user_burst
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+        self._in_flight = 0
+        self._in_flight_by_key: Dict[str, int] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._waiters: Deque[Tuple[str, asyncio.Future]] = deque()
+        # Smoothed time an analysis holds its slot, for Retry-After estimates
+        self._hold_seconds = 10.0
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        return cls(
+            max_in_flight=int(os.environ.get("ADMISSION_MAX_IN_FLIGHT", "32")),
+            user_max_in_flight=int(os.environ.get("ADMISSION_USER_MAX_IN_FLIGHT", "3")),
+            user_rate_per_minute=float(os.environ.get("ADMISSION_USER_RATE", "12")),
+            user_burst=float(os.environ.get("ADMISSION_USER_BURST", "5")),
+            max_queue=int(os.environ.get("ADMISSION_MAX_QUEUE", "64")),
+            queue_timeout=float(os.environ.get("ADMISSION_QUEUE_TIMEOUT", "2")),
+        )
+
+    async def acquire(self, key: str) -> AdmissionLease:
+        """
+        Admit a request from `key`, waiting up to queue_timeout for a slot
+
+        Raises:
+            AdmissionRejected: the client is over its rate or concurrency
+                limit, or the global budget stays full
+        """
+        started = time.monotonic()
+        deadline = started + self.queue_timeout
+        self._forget_idle_buckets(started)
+
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.user_rate, self.user_burst, started)
+        wait = bucket.reserve(started, self.queue_timeout)
+        if wait < 0:
+            self._reject("user_rate", -wait)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+        queued = wait > 0
+        if not self._waiters and self._can_start(key):
+            self._start(key)
+        else:
+            queued = True
+            if len(self._waiters) >= self.max_queue:
+                self._reject("queue_full", self._retry_estimate())
+            granted = asyncio.get_running_loop().create_future()
+            self._waiters.append((key, granted))
+            # Waiters ahead may only be held by their own per-client cap; that must not hold this one
+            self._dispatch()
+            try:
+                if not granted.done():
+                    await asyncio.wait_for(asyncio.shield(granted), max(0.0, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                if not granted.done():
+                    granted.cancel()
+                    self._remove_waiter(granted)
+                    reason = "user_concurrency" if self._in_flight_by_key.get(key, 0) >= self.user_max_in_flight else "global"
+                    self._reject(reason, self._retry_estimate())
+            except asyncio.CancelledError:
+                # The client went away; hand back a slot granted in the meantime
+                if granted.done():
+                    AdmissionLease(self, key).release()
+                else:
+                    granted.cancel()
+                    self._remove_waiter(granted)
+                raise
+
+        admission_decisions.inc(outcome="admitted", reason="queued" if queued else "immediate")
+        admission_wait.observe(time.monotonic() - started)
+        return AdmissionLease(self, key)
+
+    def _can_start(self, key: str) -> bool:
+        return (
+            self._in_flight < self.max_in_flight
+            and self._in_flight_by_key.get(key, 0) < self.user_max_in_flight
+        )
+
+    def _start(self, key: str) -> None:
+        self._in_flight += 1
+        self._in_flight_by_key[key] = self._in_flight_by_key.get(key, 0) + 1
+        admission_in_flight.set(self._in_flight)
+
+    def _release(self, lease: AdmissionLease) -> None:
+        self._in_flight -= 1
+        remaining = self._in_flight_by_key.get(lease.key, 1) - 1
+        if remaining:
+            self._in_flight_by_key[lease.key] = remaining
+        else:
+            self._in_flight_by_key.pop(lease.key, None)
+        admission_in_flight.set(self._in_flight)
+        self._hold_seconds = 0.8 * self._hold_seconds + 0.2 * (time.monotonic() - lease.started)
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Grant freed slots to waiters in arrival order, skipping clients at their own cap"""
+        for key, granted in list(self._waiters):
+            if self._in_flight >= self.max_in_flight:
+                break
+            if granted.done():
+                continue
+            if self._can_start(key):
+                self._start(key)
+                granted.set_result(None)
+                self._waiters.remove((key, granted))
+        admission_queue_depth.set(len(self._waiters))
+
+    def _remove_waiter(self, granted: asyncio.Future) -> None:
+        self._waiters = deque(waiter for waiter in self._waiters if waiter[1] is not granted)
+        admission_queue_depth.set(len(self._waiters))
+
+    def _retry_estimate(self) -> float:
+        """Seconds until a slot is likely free for a request joining the queue now"""
+        return min(60.0, self._hold_seconds * (len(self._waiters) + 1) / self.max_in_flight)
+
+    def _reject(self, reason: str, retry_after: float) -> None:
+        admission_decisions.inc(outcome="rejected", reason=reason)
+        raise AdmissionRejected(reason, retry_after)
+
+    def _forget_idle_buckets(self, now: float) -> None:
+        if len(self._buckets) < 10000:
+            return
+        self._buckets = {
+            key: bucket for key, bucket in self._buckets.items()
+            if now - bucket.updated < BUCKET_IDLE_SECONDS
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self._in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queue_depth": len(self._waiters),
+            "clients_in_flight": len(self._in_flight_by_key),
+            "tracked_clients": len(self._buckets),
+        }
+
+
+def client_key(user: Optional[Dict[str, Any]], client_host: Optional[str]) -> str:
+    """Admission key: the JWT subject when signed in, the client address otherwise"""
+    if user and user.get("sub"):
+        return f"user:{user['sub']}"
+    return f"ip:{client_host or 'unknown'}"
+
+
+admission = AdmissionController.from_env()
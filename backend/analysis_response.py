@@ -0,0 +1,163 @@
+"""
+Shaping, serializing and compressing analysis responses
+
+The /analyze-pitch body carries the whole processed Hume analysis under
+`raw_analysis`, whose `timestamps` repeat ~48 `{"name", "score"}` dicts per
+segment in `all_emotions`. Clients pick what they need with query parameters:
+
+    detail    full (default, the whole body), standard (segments keep only
+              their top emotions) or summary (no raw_analysis)
+    fields    comma-separated dotted paths to keep, e.g.
+              `pitch_scores,raw_analysis.analysis.overall_sentiment`
+    emotions  records (default) or columnar: `timestamps` is replaced by a
+              `timeline` with the emotion names listed once and scores as
+              per-segment arrays
+
+Bodies are serialized with orjson when it is installed and compressed with
+brotli or gzip, whichever the client accepts (brotli needs the `brotli`
+package).
+"""
+import gzip
+import json
+from typing import Any, Dict, List, Optional
+from fastapi import Query, Request
+from fastapi.responses import Response
+from emotion_matrix import EmotionMatrix
+from metrics import metrics
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+response_bytes = metrics.counter("analysis_response_bytes_total", "Analysis response bytes sent, by content encoding")
+
+# Smaller bodies are not worth a compression round trip
+MIN_COMPRESS_BYTES = 1024
+
+
+class ResponseShape:
+    """Projection requested through the detail, fields and emotions query parameters"""
+
+    def __init__(self, detail: str = "full", fields: Optional[List[str]] = None, columnar: bool = False):
+        self.detail = detail
+        self.fields = fields
+        self.columnar = columnar
+
+    def apply(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Shaped copy of an /analyze-pitch style body; the body itself is left alone"""
+        shaped = dict(body)
+        raw = shaped.get("raw_analysis")
+        if self.detail == "summary":
+            shaped.pop("raw_analysis", None)
+        elif isinstance(raw, dict) and isinstance(raw.get("analysis"), dict):
+            if self.detail == "standard" or self.columnar:
+                analysis = dict(raw["analysis"])
+                shaped["raw_analysis"] = {**raw, "analysis": analysis}
+                timestamps = analysis.get("timestamps") or []
+                if self.columnar:
+                    analysis.pop("timestamps", None)
+                    timeline = EmotionMatrix.from_timestamps(timestamps).to_columns()
+                    if self.detail == "standard":
+                        timeline.pop("scores")
+                    analysis["timeline"] = timeline
+                else:
+                    analysis["timestamps"] = [
+                        {key: value for key, value in segment.items() if key != "all_emotions"}
+                        for segment in timestamps
+                    ]
+        if self.fields:
+            shaped = project(shaped, ["success"] + self.fields)
+        return shaped
+
+
+def response_shape(
+    detail: str = Query("full", pattern="^(full|standard|summary)$"),
+    fields: Optional[str] = Query(None, description="Comma-separated dotted paths to keep"),
+    emotions: str = Query("records", pattern="^(records|columnar)$")
+) -> ResponseShape:
+    """FastAPI dependency reading the projection query parameters"""
+    paths = [path.strip() for path in fields.split(",") if path.strip()] if fields else None
+    return ResponseShape(detail, paths, emotions == "columnar")
+
+
+def project(body: Dict[str, Any], paths: List[str]) -> Dict[str, Any]:
+    """Only the listed dotted paths of a nested dict; missing paths are skipped"""
+    projected: Dict[str, Any] = {}
+    for path in paths:
+        *parents, leaf = path.split(".")
+        source = body
+        for key in parents:
+            source = source.get(key) if isinstance(source, dict) else None
+        if not isinstance(source, dict) or leaf not in source:
+            continue
+        target = projected
+        for key in parents:
+            target = target.setdefault(key, {})
+        target[leaf] = source[leaf]
+    return projected
+
+
+def _default(value: Any) -> Any:
+    # orjson hands over subclasses of the builtins untouched
+    if isinstance(value, list):
+        return list(value)
+    if isinstance(value, dict):
+        return dict(value)
+    if isinstance(value, str):
+        return str(value)
+    if isinstance(value, int):
+        return int(value)
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(body: Any) -> bytes:
+    """JSON bytes of a response body"""
+    if orjson is not None:
+        return orjson.dumps(body, default=_default, option=orjson.OPT_PASSTHROUGH_SUBCLASS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(body, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """br or gzip, whichever the Accept-Encoding header allows (brotli preferred)"""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    wildcard = accepted.get("*", 0.0)
+    for encoding in ("br", "gzip"):
+        if encoding == "br" and brotli is None:
+            continue
+        if accepted.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+
+def encoded_response(request: Request, body: Any, status_code: int = 200) -> Response:
+    """JSON response, compressed when the client accepts it and the body is large enough"""
+    content = dumps(body)
+    headers = {"Vary": "Accept-Encoding"}
+    encoding = None
+    if len(content) >= MIN_COMPRESS_BYTES:
+        encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+    if encoding == "br":
+        content = brotli.compress(content, quality=5)
+    elif encoding == "gzip":
+        content = gzip.compress(content, compresslevel=6)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    response_bytes.inc(len(content), encoding=encoding or "identity")
+    return Response(content=content, status_code=status_code, media_type="application/json", headers=headers)
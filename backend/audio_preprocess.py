@@ -0,0 +1,401 @@
+"""
+Audio preprocessing ahead of the Hume upload
+
+Browsers record pitches as stereo webm/opus (or 44.1 kHz WAV) with silence
+before the speaker starts and after they stop, and all of it is uploaded and
+analyzed. preprocess_audio decodes a recording, downmixes it to mono,
+resamples it to a speech rate, drops leading and trailing silence (and
+shortens long pauses) with an energy-based voice activity detector, then
+re-encodes what is left compactly.
+
+Cutting audio shifts Hume's segment times, so every result comes with an
+OffsetMap from processed time back to the original recording; remap_timestamps
+applies it to processed results, so `timestamps` keep referring to the
+recording the user made.
+
+Decoding anything but WAV, and encoding to Ogg/Opus, needs `ffmpeg` on PATH.
+Without it WAV recordings are written back as 16-bit mono WAV and other
+formats are uploaded unchanged. The work is CPU-bound and runs in a process
+pool so it never blocks the event loop.
+
+Configuration (AUDIO_PREPROCESS_*):
+    AUDIO_PREPROCESS           1 to preprocess uploads before analysis (off)
+    AUDIO_PREPROCESS_WORKERS   processes in the pool (2)
+    AUDIO_PREPROCESS_MAX_GAP   longest pause kept, in seconds (0.6)
+"""
+import asyncio
+import bisect
+import io
+import logging
+import os
+import shutil
+import subprocess
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, BinaryIO, Dict, List, NamedTuple, Optional, Tuple
+import numpy as np
+from emotion_matrix import EmotionMatrix
+from metrics import metrics, stage_seconds
+from sentiment_stats import compute_sentiment_statistics
+
+logger = logging.getLogger(__name__)
+
+preprocess_outcomes = metrics.counter("audio_preprocess_total", "Recordings seen by the preprocessor, by outcome")
+preprocess_bytes_saved = metrics.counter("audio_preprocess_bytes_saved_total", "Upload bytes removed by preprocessing")
+preprocess_seconds_trimmed = metrics.counter("audio_preprocess_audio_seconds_trimmed_total", "Seconds of silence cut from recordings")
+
+# Prosody and transcription need nothing above 8 kHz
+SPEECH_SAMPLE_RATE = 16000
+FRAME_SECONDS = 0.03
+
+
+class UnsupportedAudio(ValueError):
+    """The recording cannot be decoded here"""
+
+
+class OffsetMap:
+    """Maps times in the processed audio back to the original recording"""
+
+    def __init__(self, spans: List[Tuple[float, float, float]]):
+        """
+        Args:
+            spans: (processed_start, original_start, length) of each kept stretch, in order
+        """
+        self.spans = spans
+        self._starts = [processed_start for processed_start, _, _ in spans]
+
+    @classmethod
+    def identity(cls, duration: float) -> "OffsetMap":
+        return cls([(0.0, 0.0, duration)])
+
+    def to_original(self, seconds: float) -> float:
+        if not self.spans:
+            return seconds
+        index = max(0, bisect.bisect_right(self._starts, seconds) - 1)
+        processed_start, original_start, _ = self.spans[index]
+        return original_start + seconds - processed_start
+
+    def to_dict(self) -> List[Dict[str, float]]:
+        return [
+            {"processed_start": round(p, 3), "original_start": round(o, 3), "length": round(n, 3)}
+            for p, o, n in self.spans
+        ]
+
+
+class PreprocessedAudio(NamedTuple):
+    data: bytes
+    content_type: str
+    offsets: OffsetMap
+    original_bytes: int
+    original_seconds: float
+    processed_seconds: float
+
+    def summary(self) -> Dict[str, Any]:
+        """Metadata attached to the analysis of a preprocessed recording"""
+        return {
+            "original_bytes": self.original_bytes,
+            "processed_bytes": len(self.data),
+            "original_seconds": round(self.original_seconds, 3),
+            "processed_seconds": round(self.processed_seconds, 3),
+            "content_type": self.content_type,
+            "offsets": self.offsets.to_dict(),
+        }
+
+
+def _ffmpeg() -> Optional[str]:
+    return shutil.which("ffmpeg")
+
+
+def decode_audio(data: bytes, sample_rate: int = SPEECH_SAMPLE_RATE) -> np.ndarray:
+    """Decode a recording to mono float32 samples in [-1, 1] at `sample_rate`"""
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        samples, rate = _decode_wav(data)
+        return resample(downmix(samples), rate, sample_rate)
+    ffmpeg = _ffmpeg()
+    if ffmpeg is None:
+        raise UnsupportedAudio("decoding compressed audio needs ffmpeg")
+    completed = subprocess.run(
+        [ffmpeg, "-v", "error", "-i", "pipe:0", "-ac", "1", "-ar", str(sample_rate), "-f", "f32le", "pipe:1"],
+        input=data, capture_output=True
+    )
+    if completed.returncode != 0:
+        raise UnsupportedAudio(completed.stderr.decode(errors="replace").strip() or "ffmpeg could not decode audio")
+    return np.frombuffer(completed.stdout, dtype="<f4").copy()
+
+
+def audio_duration(data: bytes) -> float:
+    """Length of a recording in seconds; WAV is measured from its header, anything else is decoded"""
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        try:
+            with wave.open(io.BytesIO(data)) as reader:
+                return reader.getnframes() / reader.getframerate()
+        except (wave.Error, EOFError) as e:
+            raise UnsupportedAudio(str(e))
+    return len(decode_audio(data)) / SPEECH_SAMPLE_RATE
+
+
+def _decode_wav(data: bytes) -> Tuple[np.ndarray, int]:
+    """(frames x channels float32 samples, sample rate) of a PCM WAV file"""
+    try:
+        with wave.open(io.BytesIO(data)) as reader:
+            channels, width, rate = reader.getnchannels(), reader.getsampwidth(), reader.getframerate()
+            raw = reader.readframes(reader.getnframes())
+    except (wave.Error, EOFError) as e:
+        raise UnsupportedAudio(str(e))
+    if width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768
+    elif width == 3:
+        bytes_ = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        values = bytes_[:, 0] | (bytes_[:, 1] << 8) | (bytes_[:, 2] << 16)
+        samples = (np.where(values >= 1 << 23, values - (1 << 24), values) / float(1 << 23)).astype(np.float32)
+    elif width == 4:
+        samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / float(1 << 31)
+    else:
+        raise UnsupportedAudio(f"unsupported WAV sample width {width}")
+    return samples.reshape(-1, channels), rate
+
+
+def downmix(samples: np.ndarray) -> np.ndarray:
+    """Average the channels of a frames x channels array"""
+    return samples.mean(axis=1) if samples.ndim == 2 else samples
+
+
+def resample(samples: np.ndarray, rate: int, target_rate: int) -> np.ndarray:
+    """Linear-interpolation resampling, box-filtered first when downsampling"""
+    if rate == target_rate or not len(samples):
+        return samples.astype(np.float32)
+    if rate > target_rate:
+        width = int(round(rate / target_rate))
+        if width > 1:
+            samples = np.convolve(samples, np.ones(width, dtype=np.float32) / width, mode="same")
+    duration = len(samples) / rate
+    target_times = np.arange(int(duration * target_rate)) / target_rate
+    return np.interp(target_times, np.arange(len(samples)) / rate, samples).astype(np.float32)
+
+
+def speech_spans(
+    samples: np.ndarray,
+    sample_rate: int,
+    max_gap_seconds: float = 0.6,
+    pad_seconds: float = 0.15,
+    margin_db: float = 10.0
+) -> List[Tuple[int, int]]:
+    """
+    (start, end) sample ranges holding speech, by frame energy
+
+    A frame is speech when its energy is `margin_db` above the noise floor
+    (the quietest tenth of frames), capped well below the loudest frame so
+    a recording that is speech throughout is kept whole. Speech runs closer
+    than `max_gap_seconds` are merged and every range is padded so word
+    onsets and tails survive.
+    """
+    frame = max(1, int(sample_rate * FRAME_SECONDS))
+    count = len(samples) // frame
+    if count == 0:
+        return [(0, len(samples))] if len(samples) else []
+    frames = samples[:count * frame].reshape(count, frame)
+    energy_db = 10 * np.log10(np.mean(frames.astype(np.float64) ** 2, axis=1) + 1e-10)
+    threshold = min(max(np.percentile(energy_db, 10) + margin_db, -60.0), energy_db.max() - 20)
+    voiced = np.flatnonzero(energy_db > threshold)
+    if not len(voiced):
+        return [(0, len(samples))]
+
+    max_gap = int(max_gap_seconds / FRAME_SECONDS)
+    pad = int(pad_seconds * sample_rate)
+    runs = []
+    start = previous = voiced[0]
+    for index in voiced[1:]:
+        if index - previous > max_gap:
+            runs.append((start, previous))
+            start = index
+        previous = index
+    runs.append((start, previous))
+
+    spans = []
+    for first, last in runs:
+        begin = max(0, first * frame - pad)
+        end = min(len(samples), (last + 1) * frame + pad)
+        if spans and begin <= spans[-1][1]:
+            spans[-1] = (spans[-1][0], end)
+        else:
+            spans.append((begin, end))
+    return spans
+
+
+def encode_audio(samples: np.ndarray, sample_rate: int, bitrate: str = "24k") -> Tuple[bytes, str]:
+    """(encoded bytes, content type): Ogg/Opus with ffmpeg, 16-bit WAV otherwise"""
+    pcm = (np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes()
+    ffmpeg = _ffmpeg()
+    if ffmpeg is not None:
+        completed = subprocess.run(
+            [ffmpeg, "-v", "error", "-f", "s16le", "-ar", str(sample_rate), "-ac", "1", "-i", "pipe:0",
+             "-c:a", "libopus", "-b:a", bitrate, "-application", "voip", "-f", "ogg", "pipe:1"],
+            input=pcm, capture_output=True
+        )
+        if completed.returncode == 0:
+            return completed.stdout, "audio/ogg"
+        logger.warning(f"Opus encoding failed, falling back to WAV: {completed.stderr.decode(errors='replace')}")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(sample_rate)
+        writer.writeframes(pcm)
+    return buffer.getvalue(), "audio/wav"
+
+
+def preprocess_audio(
+    data: bytes,
+    sample_rate: int = SPEECH_SAMPLE_RATE,
+    max_gap_seconds: float = 0.6,
+    pad_seconds: float = 0.15,
+    bitrate: str = "24k"
+) -> PreprocessedAudio:
+    """
+    Decode, downmix, resample, trim silence and re-encode one recording
+
+    Raises:
+        UnsupportedAudio: when the recording cannot be decoded here
+    """
+    samples = decode_audio(data, sample_rate)
+    spans = speech_spans(samples, sample_rate, max_gap_seconds, pad_seconds) or [(0, len(samples))]
+
+    offsets = []
+    processed_start = 0
+    for begin, end in spans:
+        offsets.append((processed_start / sample_rate, begin / sample_rate, (end - begin) / sample_rate))
+        processed_start += end - begin
+    kept = np.concatenate([samples[begin:end] for begin, end in spans]) if spans else samples
+
+    encoded, content_type = encode_audio(kept, sample_rate, bitrate)
+    return PreprocessedAudio(
+        data=encoded,
+        content_type=content_type,
+        offsets=OffsetMap(offsets),
+        original_bytes=len(data),
+        original_seconds=len(samples) / sample_rate,
+        processed_seconds=len(kept) / sample_rate,
+    )
+
+
+def remap_timestamps(processed_results: Dict[str, Any], offsets: OffsetMap) -> Dict[str, Any]:
+    """
+    Shift the segment times of processed Hume results back onto the original recording
+
+    The time-based statistics (windows, trends) were computed on the trimmed
+    audio, so they are recomputed from the shifted segments.
+    """
+    analysis = processed_results.get("analysis", {})
+    timestamps = analysis.get("timestamps", [])
+    for segment in timestamps:
+        timestamp = segment["timestamp"]
+        timestamp["begin"] = round(offsets.to_original(timestamp["begin"]), 3)
+        timestamp["end"] = round(offsets.to_original(timestamp["end"]), 3)
+    if "statistics" in analysis:
+        analysis["statistics"] = compute_sentiment_statistics(EmotionMatrix.from_timestamps(timestamps))
+    return processed_results
+
+
+def read_rewound(audio_file: BinaryIO) -> bytes:
+    """Whole contents of a (possibly disk-spooled) upload, leaving it rewound"""
+    data = audio_file.read()
+    audio_file.seek(0)
+    return data
+
+
+class AudioPreprocessor:
+    """Runs preprocess_audio for uploads in a process pool"""
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        sample_rate: int = SPEECH_SAMPLE_RATE,
+        max_gap_seconds: float = 0.6,
+        pad_seconds: float = 0.15,
+        bitrate: str = "24k"
+    ):
+        self.max_workers = max_workers
+        self.settings = {
+            "sample_rate": sample_rate,
+            "max_gap_seconds": max_gap_seconds,
+            "pad_seconds": pad_seconds,
+            "bitrate": bitrate,
+        }
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @classmethod
+    def from_env(cls) -> Optional["AudioPreprocessor"]:
+        """The configured preprocessor, or None when AUDIO_PREPROCESS is off"""
+        if os.environ.get("AUDIO_PREPROCESS", "0").lower() not in ("1", "true", "yes"):
+            return None
+        return cls(
+            max_workers=int(os.environ.get("AUDIO_PREPROCESS_WORKERS", "2")),
+            max_gap_seconds=float(os.environ.get("AUDIO_PREPROCESS_MAX_GAP", "0.6")),
+        )
+
+    def config(self) -> Dict[str, Any]:
+        """Settings that change what Hume is sent, for result cache keys"""
+        return {**self.settings, "opus": _ffmpeg() is not None}
+
+    async def run(self, audio_file: BinaryIO) -> Optional[PreprocessedAudio]:
+        """
+        Preprocess an upload; None means it should be sent as it is
+
+        The file is left rewound either way.
+        """
+        data = await asyncio.to_thread(read_rewound, audio_file)
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        pool = self._pool
+        try:
+            with stage_seconds.time(stage="preprocess"):
+                prepared = await asyncio.get_running_loop().run_in_executor(
+                    pool, _preprocess_worker, data, self.settings
+                )
+        except BrokenProcessPool as e:
+            # A worker died (e.g. killed for memory); the next upload gets a fresh pool
+            preprocess_outcomes.inc(outcome="failed")
+            logger.warning(f"Audio preprocessing pool broke, uploading unprocessed: {str(e)}")
+            if self._pool is pool:
+                self._pool = None
+                pool.shutdown(wait=False, cancel_futures=True)
+            return None
+        except UnsupportedAudio as e:
+            preprocess_outcomes.inc(outcome="unsupported")
+            logger.info(f"Uploading audio unprocessed: {str(e)}")
+            return None
+        except Exception as e:
+            preprocess_outcomes.inc(outcome="failed")
+            logger.warning(f"Audio preprocessing failed, uploading unprocessed: {str(e)}")
+            return None
+        if len(prepared.data) >= prepared.original_bytes and prepared.processed_seconds >= prepared.original_seconds:
+            # Nothing to trim and already compact: the original is the better upload
+            preprocess_outcomes.inc(outcome="unchanged")
+            return None
+        preprocess_outcomes.inc(outcome="processed")
+        preprocess_bytes_saved.inc(max(0, prepared.original_bytes - len(prepared.data)))
+        preprocess_seconds_trimmed.inc(prepared.original_seconds - prepared.processed_seconds)
+        return prepared
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.max_workers,
+            "pool_started": self._pool is not None,
+            "ffmpeg": _ffmpeg() is not None,
+            **self.settings,
+        }
+
+
+def _preprocess_worker(data: bytes, settings: Dict[str, Any]) -> PreprocessedAudio:
+    return preprocess_audio(data, **settings)
+
+
+audio_preprocessor = AudioPreprocessor.from_env()
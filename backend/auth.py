@@ -1,23 +1,248 @@
-from fastapi import Depends, HTTPException, status
+"""
+Supabase JWT verification
+
+Tokens signed with the project's legacy HS256 secret are checked against
+SUPABASE_JWT_SECRET. Tokens signed with asymmetric signing keys (RS256/ES256)
+are checked against the project's JWKS, which JWKSCache fetches once and keeps
+until its TTL runs out. A token naming an unknown `kid` triggers an early
+refetch, rate limited so bogus kids can't hammer the endpoint, which picks up
+rotated keys. SUPABASE_JWKS_URL may also be a local file path, which tests
+and offline setups use instead of the network.
+
+Verification costs far more than the request it guards when clients poll
+(e.g. `/audio-analysis/{job_id}` with the same token every second), so
+TokenVerifier keeps a bounded LRU of verified tokens and their claims. Each
+entry expires at the token's own `exp`.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Callable
+from fastapi import Depends, HTTPException, WebSocket, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
-import requests
-import os
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
 
 # Get your Supabase project settings
 SUPABASE_JWT_SECRET = os.environ.get("SUPABASE_JWT_SECRET", "your_supabase_jwt_secret")
 SUPABASE_PROJECT_ID = os.environ.get("SUPABASE_PROJECT_ID", "your_project_id")
 
+ASYMMETRIC_ALGORITHMS = ("RS256", "ES256")
+
+token_cache_lookups = metrics.counter("auth_token_cache_lookups_total", "Verified-token cache lookups by outcome")
+jwks_fetches = metrics.counter("auth_jwks_fetches_total", "JWKS fetches by reason and outcome")
+
 bearer_scheme = HTTPBearer()
+optional_bearer_scheme = HTTPBearer(auto_error=False)
+
+
+class JWKSCache:
+    """Signing keys by `kid`, fetched from a JWKS URL or file and refreshed on rotation"""
+
+    def __init__(
+        self,
+        source: str,
+        ttl_seconds: float = 600,
+        min_refresh_interval: float = 30,
+        timeout_seconds: float = 5,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            source: JWKS URL, or path of a local JWKS file
+            ttl_seconds: How long fetched keys are used before refetching
+            min_refresh_interval: Minimum time between refetches for unknown kids
+            timeout_seconds: HTTP timeout for fetching the JWKS
+            clock: Monotonic time source
+        """
+        self.source = source
+        self.ttl_seconds = ttl_seconds
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout_seconds = timeout_seconds
+        self.clock = clock
+        self._keys: Dict[str, Dict[str, Any]] = {}
+        self._fetched_at: Optional[float] = None
+        self._attempted_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def get_key(self, kid: Optional[str]) -> Optional[Dict[str, Any]]:
+        """The JWK for `kid`, refreshing the set when it is stale or lacks the kid"""
+        now = self.clock()
+        if self._fetched_at is None or now - self._fetched_at >= self.ttl_seconds:
+            self._refresh("expired" if self._fetched_at is not None else "initial")
+        elif kid not in self._keys:
+            self._refresh("unknown_kid")
+        return self._keys.get(kid)
+
+    def _refresh(self, reason: str) -> None:
+        with self._lock:
+            now = self.clock()
+            # Another thread may have refreshed while this one waited; failures also back off
+            if self._attempted_at is not None and now - self._attempted_at < self.min_refresh_interval:
+                return
+            self._attempted_at = now
+            try:
+                jwks = self._load()
+                self._keys = {key["kid"]: key for key in jwks.get("keys", []) if key.get("kid")}
+                self._fetched_at = now
+                jwks_fetches.inc(reason=reason, outcome="success")
+            except (OSError, ValueError, KeyError) as e:
+                # Keep serving the keys we have; a provider outage shouldn't log everyone out
+                jwks_fetches.inc(reason=reason, outcome="error")
+                logger.warning(f"Could not fetch JWKS from {self.source}: {str(e)}")
+
+    def _load(self) -> Dict[str, Any]:
+        if self.source.startswith(("http://", "https://")):
+            # Imported here so workers that never fetch a JWKS don't pay for httpx at startup
+            import httpx
+            from outbound_http import outbound_http
+            try:
+                response = outbound_http.sync_client.get(self.source, timeout=self.timeout_seconds)
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                raise OSError(f"JWKS request failed: {str(e)}") from e
+            return response.json()
+        with open(self.source, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+
+class TokenVerifier:
+    """Verifies Supabase access tokens, remembering verified ones until they expire"""
+
+    def __init__(
+        self,
+        secret: Optional[str],
+        jwks: Optional[JWKSCache] = None,
+        audience: Optional[str] = "authenticated",
+        cache_entries: int = 4096,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Args:
+            secret: HS256 secret for legacy tokens (None rejects HS256)
+            jwks: Signing keys for asymmetric tokens (None rejects RS256/ES256)
+            audience: Required `aud` claim when the token has one
+            cache_entries: Verified tokens kept in the LRU (0 disables it)
+            clock: Wall-clock time source, compared with `exp`
+        """
+        self.secret = secret
+        self.jwks = jwks
+        self.audience = audience
+        self.cache_entries = cache_entries
+        self.clock = clock
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "TokenVerifier":
+        """Configure from SUPABASE_* and AUTH_* environment variables"""
+        jwks_source = os.environ.get("SUPABASE_JWKS_URL")
+        if jwks_source is None and SUPABASE_PROJECT_ID != "your_project_id":
+            jwks_source = f"https://{SUPABASE_PROJECT_ID}.supabase.co/auth/v1/.well-known/jwks.json"
+        jwks = JWKSCache(
+            jwks_source,
+            ttl_seconds=float(os.environ.get("SUPABASE_JWKS_TTL_SECONDS", "600")),
+        ) if jwks_source else None
+        return cls(
+            SUPABASE_JWT_SECRET,
+            jwks=jwks,
+            audience=os.environ.get("SUPABASE_JWT_AUDIENCE", "authenticated") or None,
+            cache_entries=int(os.environ.get("AUTH_TOKEN_CACHE_ENTRIES", "4096")),
+        )
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """
+        Claims of a valid token
+
+        Raises:
+            JWTError: The token is malformed, expired or not signed by a known key
+        """
+        now = self.clock()
+        with self._lock:
+            entry = self._cache.get(token)
+            if entry is not None:
+                expires_at, claims = entry
+                if expires_at > now:
+                    self._cache.move_to_end(token)
+                    token_cache_lookups.inc(outcome="hit")
+                    return claims
+                del self._cache[token]
+        token_cache_lookups.inc(outcome="miss")
+
+        claims = self._decode(token)
+        exp = claims.get("exp")
+        # Tokens without an expiry would stay valid in the cache forever
+        if self.cache_entries and isinstance(exp, (int, float)):
+            with self._lock:
+                self._cache[token] = (exp, claims)
+                self._cache.move_to_end(token)
+                while len(self._cache) > self.cache_entries:
+                    self._cache.popitem(last=False)
+        return claims
+
+    def _decode(self, token: str) -> Dict[str, Any]:
+        header = jwt.get_unverified_header(token)
+        algorithm = header.get("alg")
+        if algorithm == "HS256" and self.secret:
+            key = self.secret
+        elif algorithm in ASYMMETRIC_ALGORITHMS and self.jwks is not None:
+            key = self.jwks.get_key(header.get("kid"))
+            if key is None:
+                raise JWTError(f"Unknown signing key: {header.get('kid')}")
+        else:
+            raise JWTError(f"Unsupported signing algorithm: {algorithm}")
+        return jwt.decode(token, key, algorithms=[algorithm], audience=self.audience)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"cached_tokens": len(self._cache)}
+
+
+# Singleton instance
+token_verifier = TokenVerifier.from_env()
+
 
 def verify_supabase_jwt(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)):
     token = credentials.credentials
     try:
-        # Optionally, fetch JWKS from Supabase and verify signature
-        payload = jwt.decode(token, SUPABASE_JWT_SECRET, algorithms=["HS256"])
-        return payload
+        return token_verifier.verify(token)
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
         )
+
+
+def optional_supabase_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_bearer_scheme)
+) -> Optional[Dict[str, Any]]:
+    """Claims of the caller for endpoints that also serve anonymous users; None without a valid token"""
+    if credentials is None:
+        return None
+    try:
+        return token_verifier.verify(credentials.credentials)
+    except JWTError:
+        return None
+
+
+def optional_websocket_user(websocket: WebSocket) -> Optional[Dict[str, Any]]:
+    """
+    optional_supabase_user for WebSockets
+
+    Browsers cannot set headers on a WebSocket, so the token may also come as
+    the `token` query parameter.
+    """
+    token = websocket.query_params.get("token")
+    if not token:
+        scheme, _, credentials = websocket.headers.get("authorization", "").partition(" ")
+        token = credentials if scheme.lower() == "bearer" else None
+    if not token:
+        return None
+    try:
+        return token_verifier.verify(token)
+    except JWTError:
+        return None
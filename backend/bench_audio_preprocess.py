@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Bytes saved and end-to-end latency of audio preprocessing
+
+Preprocesses every recording of a local corpus (a directory of audio files,
+or a synthetic set of stereo 44.1 kHz WAV pitches with silence around and
+between the speech) through the AudioPreprocessor process pool, and reports
+per recording the upload size and audio length before and after.
+
+End-to-end latency is modelled as preprocessing time (measured) + upload
+time at `--upload-mbps` + Hume processing at `--hume-rtf` seconds per second
+of audio, for the original and the processed upload.
+
+Usage: python bench_audio_preprocess.py [--corpus DIR] [--upload-mbps 10] [--hume-rtf 0.3]
+"""
+import argparse
+import asyncio
+import io
+import os
+import statistics
+import time
+import wave
+import numpy as np
+from audio_preprocess import AudioPreprocessor, decode_audio
+
+
+def synthetic_corpus(count: int, seed: int = 7) -> dict:
+    """Pitches of 30-180 s: speech bursts between pauses, silence at both ends"""
+    rng = np.random.default_rng(seed)
+    rate = 44100
+    corpus = {}
+    for index in range(count):
+        parts = [rng.normal(0, 0.002, int(rng.uniform(1, 5) * rate))]
+        target = rng.uniform(30, 180)
+        while sum(len(p) for p in parts) / rate < target:
+            parts.append(rng.normal(0, 0.25, int(rng.uniform(1, 6) * rate)))
+            parts.append(rng.normal(0, 0.002, int(rng.uniform(0.2, 2.5) * rate)))
+        parts.append(rng.normal(0, 0.002, int(rng.uniform(1, 6) * rate)))
+        mono = np.clip(np.concatenate(parts), -1, 1)
+        stereo = np.repeat(mono[:, None], 2, axis=1)
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as writer:
+            writer.setnchannels(2)
+            writer.setsampwidth(2)
+            writer.setframerate(rate)
+            writer.writeframes((stereo * 32767).astype("<i2").tobytes())
+        corpus[f"synthetic-{index:02d}.wav"] = buffer.getvalue()
+    return corpus
+
+
+def load_corpus(directory: str) -> dict:
+    corpus = {}
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path):
+            with open(path, "rb") as f:
+                corpus[name] = f.read()
+    return corpus
+
+
+async def run(corpus: dict, workers: int) -> list:
+    preprocessor = AudioPreprocessor(max_workers=workers)
+    # Warm the pool so the first recording does not pay for process start-up
+    await preprocessor.run(io.BytesIO(next(iter(corpus.values()))))
+    rows = []
+    try:
+        for name, data in corpus.items():
+            start = time.perf_counter()
+            prepared = await preprocessor.run(io.BytesIO(data))
+            elapsed = time.perf_counter() - start
+            original_seconds = prepared.original_seconds if prepared else len(decode_audio(data)) / 16000
+            rows.append({
+                "name": name,
+                "original_bytes": len(data),
+                "processed_bytes": len(prepared.data) if prepared else len(data),
+                "original_seconds": original_seconds,
+                "processed_seconds": prepared.processed_seconds if prepared else original_seconds,
+                "preprocess_seconds": elapsed,
+            })
+    finally:
+        preprocessor.shutdown()
+    return rows
+
+
+def main(corpus: dict, workers: int, upload_mbps: float, hume_rtf: float) -> None:
+    rows = asyncio.run(run(corpus, workers))
+    bytes_per_second = upload_mbps * 1e6 / 8
+    latency = lambda size, seconds, extra=0.0: extra + size / bytes_per_second + seconds * hume_rtf
+
+    print(f"{len(rows)} recordings; upload {upload_mbps:g} Mbit/s, Hume {hume_rtf:g} s per audio second")
+    print(f"{'recording':>16} {'MB in':>7} {'MB out':>7} {'audio s':>8} {'kept s':>7} "
+          f"{'prep s':>7} {'e2e before':>11} {'e2e after':>10}")
+    before, after = [], []
+    for row in rows:
+        before.append(latency(row["original_bytes"], row["original_seconds"]))
+        after.append(latency(row["processed_bytes"], row["processed_seconds"], row["preprocess_seconds"]))
+        print(f"{row['name'][:16]:>16} {row['original_bytes'] / 1e6:>7.2f} {row['processed_bytes'] / 1e6:>7.2f} "
+              f"{row['original_seconds']:>8.1f} {row['processed_seconds']:>7.1f} {row['preprocess_seconds']:>7.2f} "
+              f"{before[-1]:>11.2f} {after[-1]:>10.2f}")
+
+    total_in = sum(row["original_bytes"] for row in rows)
+    total_out = sum(row["processed_bytes"] for row in rows)
+    print(f"bytes saved: {(total_in - total_out) / 1e6:.1f} MB of {total_in / 1e6:.1f} MB "
+          f"({(1 - total_out / total_in) * 100:.0f}%)")
+    print(f"median end-to-end: {statistics.median(before):.2f} s -> {statistics.median(after):.2f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--corpus", help="Directory of recordings (default: synthetic WAV pitches)")
+    parser.add_argument("--count", type=int, default=8, help="Synthetic recordings to generate")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--upload-mbps", type=float, default=10)
+    parser.add_argument("--hume-rtf", type=float, default=0.3)
+    args = parser.parse_args()
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus(args.count)
+    main(corpus, args.workers, args.upload_mbps, args.hume_rtf)
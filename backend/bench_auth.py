@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Auth overhead per request when clients poll with the same token
+
+Times TokenVerifier.verify for HS256 and ES256 tokens with the verified-token
+cache disabled (full signature check on every request, the previous
+behaviour) and enabled. Each case runs sequentially and from a thread pool
+the size of FastAPI's default, which is where the sync dependency executes.
+A pool of distinct tokens (one per simulated user) replays in a loop, like
+clients polling `/audio-analysis/{job_id}`.
+
+Usage: python bench_auth.py [--requests 5000] [--users 50] [--threads 40]
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+import ecdsa
+from jose import jwk, jwt
+from auth import JWKSCache, TokenVerifier
+
+SECRET = "bench-secret"
+
+
+def make_tokens(users: int):
+    """HS256 tokens, ES256 tokens and the JWKS file path for the ES256 key"""
+    exp = int(time.time()) + 3600
+    pem = ecdsa.SigningKey.generate(curve=ecdsa.NIST256p).to_pem().decode()
+    public = {**jwk.construct(pem, "ES256").public_key().to_dict(), "kid": "bench"}
+    jwks_file = tempfile.NamedTemporaryFile("w", suffix=".json", delete=False)
+    json.dump({"keys": [public]}, jwks_file)
+    jwks_file.close()
+
+    claims = [{"sub": f"user-{i}", "aud": "authenticated", "exp": exp, "role": "authenticated"} for i in range(users)]
+    hs256 = [jwt.encode(c, SECRET, algorithm="HS256") for c in claims]
+    es256 = [jwt.encode(c, pem, algorithm="ES256", headers={"kid": "bench"}) for c in claims]
+    return hs256, es256, jwks_file.name
+
+
+def sequential(verifier: TokenVerifier, tokens: list, requests: int) -> list:
+    durations = []
+    for i in range(requests):
+        start = time.perf_counter()
+        verifier.verify(tokens[i % len(tokens)])
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def threaded(verifier: TokenVerifier, tokens: list, requests: int, threads: int) -> float:
+    """Requests per second with `threads` workers verifying concurrently"""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(lambda i: verifier.verify(tokens[i % len(tokens)]), range(requests)))
+    return requests / (time.perf_counter() - start)
+
+
+def main(requests: int, users: int, threads: int) -> None:
+    hs256, es256, jwks_path = make_tokens(users)
+    print(f"{requests} requests over {users} tokens, {threads} threads for the concurrent run")
+    print(f"{'case':<22} {'mean us':>9} {'p50 us':>9} {'p99 us':>9} {'req/s':>10}")
+    for algorithm, tokens in (("HS256", hs256), ("ES256", es256)):
+        for label, cache_entries in (("no cache", 0), ("token cache", 4096)):
+            verifier = TokenVerifier(SECRET, jwks=JWKSCache(jwks_path), cache_entries=cache_entries)
+            # ES256 without the cache is slow; fewer requests keep the run short without changing the mean
+            count = requests if cache_entries or algorithm == "HS256" else max(users, requests // 10)
+            sequential(verifier, tokens, len(tokens))
+            durations = sorted(sequential(verifier, tokens, count))
+            p99 = durations[min(len(durations) - 1, int(len(durations) * 0.99))]
+            rps = threaded(verifier, tokens, count, threads)
+            print(f"{algorithm + ', ' + label:<22} {statistics.mean(durations) * 1e6:>9.1f} "
+                  f"{statistics.median(durations) * 1e6:>9.1f} {p99 * 1e6:>9.1f} {rps:>10.0f}")
+    os.remove(jwks_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=40)
+    args = parser.parse_args()
+    main(args.requests, args.users, args.threads)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+/dashboard cost for users with long practice histories
+
+Fills a SQLite session store with one user's history at several sizes and
+times building the dashboard two ways: scanning every session and
+recomputing the stats on each request (what a straightforward query-based
+dashboard does), and reading the incrementally maintained UserStats row plus
+one page of recent sessions. Also times recording a session, which carries
+the O(1) aggregate update.
+
+Usage: python bench_dashboard.py [--sizes 100,1000,5000] [--requests 200]
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from practice_sessions import (
+    PracticeSession,
+    SQLiteSessionStore,
+    UserStats,
+    dashboard_view,
+)
+
+USER = {"sub": "bench-user", "email": "bench@example.com"}
+DAY = 86400
+
+
+def fill(store: SQLiteSessionStore, sessions: int) -> float:
+    """Record a history of sessions a few hours apart; returns mean seconds per record"""
+    rng = random.Random(sessions)
+    start = time.time() - sessions * DAY / 3
+    durations = []
+    for i in range(sessions):
+        session = PracticeSession(
+            user_id=USER["sub"],
+            created_at=start + i * DAY / 3,
+            score=rng.uniform(40, 95),
+            duration=rng.uniform(60, 600),
+            persona="Sarah Chen",
+            persona_type="VC Investor",
+        )
+        began = time.perf_counter()
+        store.record(session)
+        durations.append(time.perf_counter() - began)
+    return statistics.mean(durations)
+
+
+def scan_dashboard(store: SQLiteSessionStore, limit: int) -> dict:
+    """Dashboard rebuilt from every stored session"""
+    with store._lock:
+        rows = store._conn.execute(
+            "SELECT data FROM practice_sessions WHERE user_id = ? ORDER BY created_at, session_id",
+            (USER["sub"],),
+        ).fetchall()
+    sessions = [PracticeSession.model_validate_json(row[0]) for row in rows]
+    stats = UserStats()
+    for session in sessions:
+        stats.add(session)
+    return {
+        "quickStats": stats.quick_stats(),
+        "recentSessions": [s.public_view() for s in sessions[::-1][:limit]],
+    }
+
+
+def timed(fn, requests: int) -> list:
+    durations = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    return sorted(durations)
+
+
+def main(sizes: list, requests: int, limit: int) -> None:
+    print(f"{requests} dashboard requests per case, {limit} sessions per page")
+    print(f"{'sessions':>9} {'record us':>10} {'scan p50 ms':>12} {'scan p99 ms':>12} "
+          f"{'agg p50 ms':>11} {'agg p99 ms':>11} {'speedup':>8}")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = SQLiteSessionStore(os.path.join(tmp, "sessions.db"))
+            record_seconds = fill(store, size)
+            assert scan_dashboard(store, limit)["quickStats"] == dashboard_view(store, USER, limit)["quickStats"]
+
+            scan = timed(lambda: scan_dashboard(store, limit), requests)
+            aggregate = timed(lambda: dashboard_view(store, USER, limit), requests)
+            p99 = lambda d: d[min(len(d) - 1, int(len(d) * 0.99))]
+            print(f"{size:>9} {record_seconds * 1e6:>10.0f} {statistics.median(scan) * 1e3:>12.2f} "
+                  f"{p99(scan) * 1e3:>12.2f} {statistics.median(aggregate) * 1e3:>11.3f} "
+                  f"{p99(aggregate) * 1e3:>11.3f} {statistics.median(scan) / statistics.median(aggregate):>7.0f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="100,1000,5000")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=5)
+    args = parser.parse_args()
+    main([int(size) for size in args.sizes.split(",")], args.requests, args.limit)
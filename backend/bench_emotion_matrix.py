@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for emotion aggregation in HumeAudioService._process_results
+
+Builds synthetic Hume predictions with N prosody segments (48 emotions each)
+and times the previous dict-per-score processing (full sort per segment for
+the top 5, Python-loop averages) against the EmotionMatrix path. Both outputs
+are compared so the speedup is not bought with a behaviour change.
+
+Usage: python bench_emotion_matrix.py [--segments 5000] [--repeat 5]
+"""
+import argparse
+import gc
+import json
+import math
+import os
+import statistics
+import time
+from typing import List
+from hume.core.pydantic_utilities import parse_obj_as
+from hume.expression_measurement.batch.types import UnionPredictResult
+from fake_hume import FakeHumeBackend
+
+os.environ.setdefault("HUME_API_KEY", "bench-key")
+from hume_service import HumeAudioService  # noqa: E402
+
+
+def synthetic_results(segments: int):
+    backend = FakeHumeBackend(segments_per_file=segments)
+    source = {"filename": "pitch.webm", "content_type": "audio/webm", "md5sum": "bench"}
+    return parse_obj_as(List[UnionPredictResult], [backend._source_result(source)])
+
+
+def legacy_process(results) -> dict:
+    """The prosody part of _process_results before the emotion matrix"""
+    timestamps = []
+    for result in results:
+        for prediction in result.results.predictions:
+            for group in prediction.models.prosody.grouped_predictions:
+                for pred in group.predictions:
+                    emotions = [{"name": e.name, "score": e.score} for e in pred.emotions]
+                    timestamps.append({
+                        "text": pred.text,
+                        "confidence": pred.confidence,
+                        "timestamp": {"begin": pred.time.begin, "end": pred.time.end},
+                        "emotions": sorted(emotions, key=lambda x: x["score"], reverse=True)[:5],
+                        "all_emotions": emotions,
+                    })
+
+    emotion_totals = {}
+    for segment in timestamps:
+        for emotion in segment["emotions"]:
+            emotion_totals[emotion["name"]] = emotion_totals.get(emotion["name"], 0) + emotion["score"]
+    avg_emotions = {name: total / len(timestamps) for name, total in emotion_totals.items()}
+    dominant = max(avg_emotions.items(), key=lambda x: x[1])
+    return {
+        "timestamps": timestamps,
+        "overall_sentiment": {
+            "dominant_emotion": {"name": dominant[0], "score": dominant[1]},
+            "average_emotions": avg_emotions,
+            "total_segments_analyzed": len(timestamps),
+        },
+    }
+
+
+def timed(fn, repeat: int) -> List[float]:
+    """Wall time per run in ms, with the collector paused like timeit does"""
+    runs = []
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            fn()
+            runs.append((time.perf_counter() - start) * 1000)
+        finally:
+            gc.enable()
+    return runs
+
+
+def main(segments: int, repeat: int) -> None:
+    service = HumeAudioService(cache=None)
+    results = synthetic_results(segments)
+
+    legacy = legacy_process(results)
+    current = service._process_results(results)["analysis"]
+    assert [s["emotions"] for s in current["timestamps"]] == [s["emotions"] for s in legacy["timestamps"]]
+    assert json.dumps(current["timestamps"]) == json.dumps(legacy["timestamps"])
+    assert current["overall_sentiment"]["dominant_emotion"] == legacy["overall_sentiment"]["dominant_emotion"]
+    for name, value in legacy["overall_sentiment"]["average_emotions"].items():
+        assert math.isclose(current["overall_sentiment"]["average_emotions"][name], value)
+
+    matrix = None
+
+    def build_matrix():
+        nonlocal matrix
+        from emotion_matrix import EmotionMatrix
+        matrix = EmotionMatrix.from_timestamps(legacy["timestamps"])
+
+    build_matrix()
+    rows = [
+        ("legacy _process_results", timed(lambda: legacy_process(results), repeat)),
+        ("matrix _process_results", timed(lambda: service._process_results(results), repeat)),
+        ("legacy process + json.dumps", timed(lambda: json.dumps(legacy_process(results)), repeat)),
+        ("matrix process + json.dumps", timed(lambda: json.dumps(service._process_results(results)), repeat)),
+        ("legacy overall sentiment", timed(
+            lambda: legacy_overall(legacy["timestamps"]), repeat)),
+        ("matrix overall sentiment", timed(lambda: service._overall_sentiment(matrix), repeat)),
+        ("matrix mean/var/weighted", timed(
+            lambda: (matrix.mean(), matrix.variance(), matrix.weighted_mean()), repeat)),
+    ]
+    print(f"{segments} segments x 48 emotions, best/median of {repeat}")
+    print(f"{'stage':<30} {'best ms':>9} {'median ms':>10}")
+    for name, runs in rows:
+        print(f"{name:<30} {min(runs):>9.2f} {statistics.median(runs):>10.2f}")
+
+
+def legacy_overall(timestamps) -> dict:
+    emotion_totals = {}
+    for segment in timestamps:
+        for emotion in segment["emotions"]:
+            emotion_totals[emotion["name"]] = emotion_totals.get(emotion["name"], 0) + emotion["score"]
+    return {name: total / len(timestamps) for name, total in emotion_totals.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--segments", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.segments, args.repeat)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Load benchmark for HumeAudioService against a local fake Hume server
+
+Runs N concurrent uploads through the async transport and through the old
+blocking SDK path, reporting p50/p99 request latency and the worst event-loop
+stall observed by a probe coroutine (a proxy for how long `/protected` or the
+Farcaster webhook would be stuck behind an upload).
+
+Usage: python bench_hume_async.py [--concurrency 1 10 50] [--upload-kb 256] [--poll-interval 0.5]
+"""
+import argparse
+import asyncio
+import io
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import httpx
+from hume import AsyncHumeClient, HumeClient
+from hume.expression_measurement.batch import Prosody, Models, Language
+from hume.expression_measurement.batch.types import InferenceBaseRequest
+
+os.environ.setdefault("HUME_API_KEY", "bench-key")
+from hume_service import HumeAudioService  # noqa: E402
+
+def start_fake_server(processing_seconds: float):
+    """Run fake_hume.py in a child process and return (process, base URL)"""
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+
+    process = subprocess.Popen([
+        sys.executable, "fake_hume.py",
+        "--port", str(port),
+        "--processing-seconds", str(processing_seconds),
+    ])
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            httpx.get(f"{base_url}/docs")
+            return process, base_url
+        except httpx.TransportError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("Fake Hume server did not start")
+
+
+async def legacy_analyze(client: HumeClient, audio: io.BytesIO, poll_interval: float) -> None:
+    """The pre-async code path: synchronous SDK calls made on the event loop"""
+    request = InferenceBaseRequest(models=Models(prosody=Prosody(), language=Language()))
+    job_id = client.expression_measurement.batch.start_inference_job_from_local_file(
+        json=request, file=[audio]
+    )
+    while True:
+        details = client.expression_measurement.batch.get_job_details(job_id)
+        if details.state.status == "COMPLETED":
+            client.expression_measurement.batch.get_job_predictions(job_id)
+            return
+        await asyncio.sleep(poll_interval)
+
+
+async def probe_loop(stop: asyncio.Event, stalls: list) -> None:
+    """Record how late a 10 ms timer fires while uploads are running"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        stalls.append(time.perf_counter() - start - 0.01)
+
+
+async def run_round(analyze, concurrency: int, payload: bytes) -> dict:
+    latencies = []
+    stalls = []
+    stop = asyncio.Event()
+
+    async def one():
+        start = time.perf_counter()
+        await analyze(io.BytesIO(payload))
+        latencies.append(time.perf_counter() - start)
+
+    probe = asyncio.create_task(probe_loop(stop, stalls))
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(concurrency)))
+    wall = time.perf_counter() - wall_start
+    stop.set()
+    await probe
+
+    latencies.sort()
+    return {
+        "p50": statistics.median(latencies),
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        "wall": wall,
+        "max_stall": max(stalls) if stalls else 0.0,
+    }
+
+
+async def main(concurrency_levels, upload_kb: int, processing_seconds: float, poll_interval: float):
+    server, base_url = start_fake_server(processing_seconds)
+    payload = os.urandom(upload_kb * 1024)
+
+    async_service = HumeAudioService(
+        client=AsyncHumeClient(api_key="bench-key", base_url=base_url),
+        poll_interval_seconds=poll_interval,
+    )
+    sync_client = HumeClient(api_key="bench-key", base_url=base_url)
+
+    print(
+        f"Fake Hume at {base_url}, job time {processing_seconds}s, "
+        f"upload {upload_kb} KB, poll every {poll_interval}s"
+    )
+    try:
+        await run_matrix(async_service, sync_client, concurrency_levels, payload, poll_interval)
+    finally:
+        server.terminate()
+
+
+async def run_matrix(async_service, sync_client, concurrency_levels, payload: bytes, poll_interval: float):
+    print(f"{'path':<8} {'conc':>5} {'p50 (s)':>9} {'p99 (s)':>9} {'wall (s)':>9} {'max stall (ms)':>15}")
+    for concurrency in concurrency_levels:
+        for name, analyze in (
+            ("async", async_service.analyze_audio_expression),
+            ("legacy", lambda audio: legacy_analyze(sync_client, audio, poll_interval)),
+        ):
+            stats = await run_round(analyze, concurrency, payload)
+            print(
+                f"{name:<8} {concurrency:>5} {stats['p50']:>9.3f} {stats['p99']:>9.3f} "
+                f"{stats['wall']:>9.3f} {stats['max_stall'] * 1000:>15.1f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--upload-kb", type=int, default=256)
+    parser.add_argument("--processing-seconds", type=float, default=1.0)
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency, args.upload_kb, args.processing_seconds, args.poll_interval))
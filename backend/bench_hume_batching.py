@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Hume job packing: recordings per minute against a concurrency-capped account
+
+Drives a stream of recordings through HumeAudioService against the in-process
+fake Hume API, once submitting every recording as its own job and once with
+the job packer coalescing arrivals into shared jobs. The fake account runs a
+limited number of jobs at once and charges a fixed cost per job plus a
+smaller cost per file, which is where packing pays off.
+
+Usage: python bench_hume_batching.py [--recordings 120] [--arrival-ms 10] [--max-jobs 5]
+"""
+import argparse
+import asyncio
+import io
+import os
+import statistics
+import time
+import httpx
+from hume import AsyncHumeClient
+
+os.environ.setdefault("HUME_API_KEY", "bench-key")
+from fake_hume import FakeHumeBackend, create_fake_hume_app  # noqa: E402
+from hume_service import HumeAudioService  # noqa: E402
+
+
+def make_service(backend: FakeHumeBackend, window_seconds: float, max_files: int) -> HumeAudioService:
+    client = AsyncHumeClient(
+        api_key="bench-key",
+        base_url="http://fake-hume",
+        httpx_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=create_fake_hume_app(backend))),
+    )
+    return HumeAudioService(
+        client=client,
+        poll_interval_seconds=0.05,
+        cache=None,
+        batch_window_seconds=window_seconds,
+        batch_max_files=max_files,
+    )
+
+
+async def run(service: HumeAudioService, recordings: int, arrival_seconds: float) -> dict:
+    latencies = []
+
+    async def one(index: int) -> None:
+        start = time.perf_counter()
+        result = await service.analyze_audio_expression(io.BytesIO(f"recording {index}".encode()))
+        assert result["success"]
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    tasks = []
+    for index in range(recordings):
+        tasks.append(asyncio.create_task(one(index)))
+        await asyncio.sleep(arrival_seconds)
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "per_minute": recordings / elapsed * 60,
+        "p50": statistics.median(latencies),
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+    }
+
+
+def main(recordings: int, arrival_ms: float, max_jobs: int, job_seconds: float, file_seconds: float,
+         window_ms: float, max_files: int) -> None:
+    print(f"{recordings} recordings arriving every {arrival_ms:g} ms; account runs {max_jobs} jobs at once, "
+          f"{job_seconds:g} s per job + {file_seconds:g} s per file")
+    print(f"{'mode':>14} {'jobs':>6} {'recordings/min':>15} {'p50 s':>7} {'p99 s':>7}")
+    for mode, window in (("one per job", 0.0), (f"packed {window_ms:g}ms", window_ms / 1000)):
+        backend = FakeHumeBackend(
+            processing_seconds=job_seconds,
+            segments_per_file=4,
+            seconds_per_file=file_seconds,
+            max_concurrent_jobs=max_jobs,
+        )
+        service = make_service(backend, window, max_files)
+        report = asyncio.run(run(service, recordings, arrival_ms / 1000))
+        print(f"{mode:>14} {backend.request_counts['submit']:>6} {report['per_minute']:>15.0f} "
+              f"{report['p50']:>7.2f} {report['p99']:>7.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--recordings", type=int, default=120)
+    parser.add_argument("--arrival-ms", type=float, default=10)
+    parser.add_argument("--max-jobs", type=int, default=5)
+    parser.add_argument("--job-seconds", type=float, default=0.5)
+    parser.add_argument("--file-seconds", type=float, default=0.02)
+    parser.add_argument("--window-ms", type=float, default=250)
+    parser.add_argument("--max-files", type=int, default=20)
+    args = parser.parse_args()
+    main(args.recordings, args.arrival_ms, args.max_jobs, args.job_seconds, args.file_seconds,
+         args.window_ms, args.max_files)
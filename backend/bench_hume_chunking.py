@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Wall-clock time of chunked against whole-recording Hume analysis
+
+Analyzes synthetic recordings of increasing length (16 kHz mono WAV, speech
+with pauses) against the in-process fake Hume API, whose job time grows with
+the audio in the job (`--rtf` seconds per audio second on top of a fixed
+`--job-seconds`). Each recording runs once as a single job and once split
+into `--chunk-seconds` chunks analyzed as parallel jobs.
+
+Usage: python bench_hume_chunking.py [--lengths 60,180,300,600] [--chunk-seconds 60] [--parallel 4]
+"""
+import argparse
+import asyncio
+import io
+import os
+import time
+import wave
+import httpx
+import numpy as np
+from hume import AsyncHumeClient
+
+os.environ.setdefault("HUME_API_KEY", "bench-key")
+from fake_hume import FakeHumeBackend, create_fake_hume_app  # noqa: E402
+from hume_service import HumeAudioService  # noqa: E402
+
+RATE = 16000
+
+
+def synthetic_pitch(seconds: float, seed: int = 3) -> bytes:
+    rng = np.random.default_rng(seed)
+    parts = []
+    while sum(len(p) for p in parts) < seconds * RATE:
+        parts.append(rng.normal(0, 0.25, int(rng.uniform(3, 12) * RATE)))
+        parts.append(rng.normal(0, 0.002, int(rng.uniform(0.4, 1.5) * RATE)))
+    samples = np.clip(np.concatenate(parts)[:int(seconds * RATE)], -1, 1)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(RATE)
+        writer.writeframes((samples * 32767).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+def make_service(backend: FakeHumeBackend, rtf: float, chunk_seconds: float, parallel: int) -> HumeAudioService:
+    client = AsyncHumeClient(
+        api_key="bench-key",
+        base_url="http://fake-hume",
+        httpx_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=create_fake_hume_app(backend))),
+    )
+    service = HumeAudioService(
+        client=client,
+        poll_interval_seconds=0.05,
+        cache=None,
+        preprocessor=None,
+        chunk_seconds=chunk_seconds,
+        max_parallel_chunks=parallel,
+    )
+    # First status check when the job is expected to be done, as in production
+    service.poll_scheduler.seconds_per_audio_second = rtf
+    return service
+
+
+async def timed(service: HumeAudioService, audio: bytes, seconds: float) -> tuple:
+    start = time.perf_counter()
+    result = await service.analyze_audio_expression(io.BytesIO(audio), audio_duration=seconds)
+    assert result["success"], result.get("error")
+    return time.perf_counter() - start, len(result["metadata"].get("chunks", [])) or 1
+
+
+def main(lengths: list, chunk_seconds: float, parallel: int, rtf: float, job_seconds: float) -> None:
+    print(f"fake Hume: {job_seconds:g} s per job + {rtf:g} s per audio second; "
+          f"chunks of ~{chunk_seconds:g} s, {parallel} in parallel")
+    print(f"{'length s':>9} {'whole s':>8} {'chunked s':>10} {'chunks':>7} {'speedup':>8}")
+    for length in lengths:
+        audio = synthetic_pitch(length)
+        backend = FakeHumeBackend(processing_seconds=job_seconds, segments_per_file=12, seconds_per_audio_second=rtf)
+        whole, _ = asyncio.run(timed(make_service(backend, rtf, 0, parallel), audio, length))
+        chunked, chunks = asyncio.run(timed(make_service(backend, rtf, chunk_seconds, parallel), audio, length))
+        print(f"{length:>9.0f} {whole:>8.2f} {chunked:>10.2f} {chunks:>7} {whole / chunked:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lengths", default="60,180,300,600")
+    parser.add_argument("--chunk-seconds", type=float, default=60)
+    parser.add_argument("--parallel", type=int, default=4)
+    parser.add_argument("--rtf", type=float, default=0.02, help="Fake Hume seconds per audio second")
+    parser.add_argument("--job-seconds", type=float, default=0.5)
+    args = parser.parse_args()
+    main([float(length) for length in args.lengths.split(",")], args.chunk_seconds, args.parallel,
+         args.rtf, args.job_seconds)
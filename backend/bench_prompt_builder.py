@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Prompt size and scoring latency against transcript length
+
+For synthetic pitches of increasing length, renders the scoring prompt with
+the full transcription (the previous behaviour) and through PromptBuilder,
+reporting estimated prompt tokens, prompt build time and scoring latency. The
+LLM is a fake whose delay grows with prompt length (--ms-per-1k-tokens), a
+stand-in for Groq's prompt processing time.
+
+Usage: python bench_prompt_builder.py [--segments 10 50 200 1000 3000] [--budget 2000] [--ms-per-1k-tokens 150]
+"""
+import argparse
+import asyncio
+import os
+import time
+from fake_hume import build_segments
+from fake_llm import FakePitchChatModel
+from prompt_builder import PromptBuilder, estimate_tokens
+
+os.environ.setdefault("HUME_API_KEY", "bench-key")
+os.environ.setdefault("GROQ_API_KEY", "bench-key")
+from hume_service import hume_service  # noqa: E402
+from scoring_service import PitchScoringService  # noqa: E402
+
+
+def synthetic_pitch(segment_count: int) -> dict:
+    return hume_service.summarize_segments([
+        hume_service.segment_record(s["text"], s["confidence"], s["time"]["begin"], s["time"]["end"], s["emotions"])
+        for s in build_segments(f"bench-{segment_count}", segment_count)
+    ])
+
+
+def timed_score(scorer: PitchScoringService, hume_results: dict) -> float:
+    start = time.perf_counter()
+    asyncio.run(scorer.score_pitch_performance(hume_results))
+    return time.perf_counter() - start
+
+
+def main(segment_counts, budget: int, ms_per_1k_tokens: float) -> None:
+    llm = FakePitchChatModel(seconds_per_prompt_token=ms_per_1k_tokens / 1000 / 1000)
+    compact = PitchScoringService(cache=None, memo=None, llm=llm, default_mode="llm", prompt_builder=PromptBuilder(token_budget=budget))
+    # A budget nothing reaches reproduces the unbounded prompt
+    unbounded = PitchScoringService(cache=None, memo=None, llm=llm, default_mode="llm", prompt_builder=PromptBuilder(token_budget=10 ** 9))
+
+    print(f"budget {budget} tokens, fake LLM {ms_per_1k_tokens:.0f} ms per 1k prompt tokens")
+    print(f"{'segments':>8} {'full tok':>9} {'budget tok':>10} {'kept segs':>9} {'build ms':>9} {'full s':>7} {'budget s':>8}")
+    for count in segment_counts:
+        hume_results = synthetic_pitch(count)
+        start = time.perf_counter()
+        _, stats = compact._prepare_prompt(hume_results)
+        build_ms = (time.perf_counter() - start) * 1000
+        _, full_stats = unbounded._prepare_prompt(hume_results)
+        kept = stats["transcript_segments_used"] if stats["transcript_compacted"] else count
+        print(f"{count:>8} {full_stats['prompt_tokens']:>9} {stats['prompt_tokens']:>10} {kept:>9} {build_ms:>9.2f} "
+              f"{timed_score(unbounded, hume_results):>7.2f} {timed_score(compact, hume_results):>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--segments", type=int, nargs="+", default=[10, 50, 200, 1000, 3000])
+    parser.add_argument("--budget", type=int, default=2000)
+    parser.add_argument("--ms-per-1k-tokens", type=float, default=150)
+    args = parser.parse_args()
+    main(args.segments, args.budget, args.ms_per_1k_tokens)
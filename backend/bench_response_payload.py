@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+/analyze-pitch payload size and serialization time by response shape
+
+Builds /analyze-pitch bodies for synthetic pitches of increasing length and
+serializes them the way the endpoint used to (FastAPI's jsonable_encoder +
+json.dumps of the full body) and through analysis_response for each shape,
+reporting body bytes, gzip/br bytes and encode time.
+
+Usage: python bench_response_payload.py [--segments 50,200,1000] [--repeat 20]
+"""
+import argparse
+import gzip
+import json
+import os
+import time
+from fastapi.encoders import jsonable_encoder
+from analysis_response import ResponseShape, brotli, dumps
+from fake_hume import build_segments
+
+os.environ.setdefault("HUME_API_KEY", "bench-key")
+from hume_service import hume_service  # noqa: E402
+from jobs import summarize_pitch_analysis  # noqa: E402
+
+SCORES = {"tone": 80, "fluency": 70, "clarity": 90, "confidence": 60, "explanation": "synthetic"}
+
+
+def pitch_body(segment_count: int) -> dict:
+    hume_results = hume_service.summarize_segments([
+        hume_service.segment_record(s["text"], s["confidence"], s["time"]["begin"], s["time"]["end"], s["emotions"])
+        for s in build_segments(f"bench-{segment_count}", segment_count)
+    ])
+    return {"success": True, "filename": "pitch.webm", **summarize_pitch_analysis(hume_results, SCORES)}
+
+
+def timed(encode, repeat: int) -> tuple:
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        content = encode()
+        durations.append(time.perf_counter() - start)
+    return content, min(durations)
+
+
+def main(segment_counts: list, repeat: int) -> None:
+    shapes = {
+        "full": ResponseShape("full"),
+        "full columnar": ResponseShape("full", columnar=True),
+        "standard": ResponseShape("standard"),
+        "standard colum.": ResponseShape("standard", columnar=True),
+        "summary": ResponseShape("summary"),
+    }
+    print(f"{'segments':>8} {'shape':>16} {'KB':>9} {'gzip KB':>8} {'br KB':>7} {'encode ms':>10}")
+    for count in segment_counts:
+        body = pitch_body(count)
+        baseline, seconds = timed(lambda: json.dumps(jsonable_encoder(body)).encode(), repeat)
+        rows = [("before (full)", baseline, seconds)]
+        for name, shape in shapes.items():
+            content, seconds = timed(lambda: dumps(shape.apply(body)), repeat)
+            rows.append((name, content, seconds))
+        for name, content, seconds in rows:
+            br = f"{len(brotli.compress(content, quality=5)) / 1024:>7.1f}" if brotli is not None else f"{'-':>7}"
+            print(f"{count:>8} {name:>16} {len(content) / 1024:>9.1f} "
+                  f"{len(gzip.compress(content, compresslevel=6)) / 1024:>8.1f} {br} {seconds * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--segments", default="50,200,1000")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    main([int(count) for count in args.segments.split(",")], args.repeat)
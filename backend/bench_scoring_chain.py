@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Per-request overhead of PitchScoringService with the LLM replaced by a fake
+
+Times scoring N analyses one at a time with the chain rebuilt per request (the
+previous behaviour), with the prebuilt chain, and through score_pitch_batch,
+then re-scores the batch through a cold and a warm ScoringMemo.
+The fake chat model answers instantly unless --latency is given, so the
+numbers are LangChain and service overhead rather than provider time.
+
+Usage: python bench_scoring_chain.py [--requests 200] [--latency 0] [--concurrency 8]
+"""
+import argparse
+import asyncio
+import copy
+import statistics
+import os
+import tempfile
+import time
+from fake_llm import FakePitchChatModel
+
+os.environ.setdefault("GROQ_API_KEY", "bench-key")
+from scoring_service import PitchScoringService, PitchScores  # noqa: E402
+from scoring_memo import ScoringMemo  # noqa: E402
+from test_scoring import mock_hume_results  # noqa: E402
+
+
+def sample_inputs(count: int) -> list:
+    inputs = []
+    for i in range(count):
+        results = copy.deepcopy(mock_hume_results)
+        results["analysis"]["transcription"]["full_text"] += f" Take {i}."
+        inputs.append(results)
+    return inputs
+
+
+async def rebuild_per_request(scorer: PitchScoringService, inputs: list) -> list:
+    """The pre-compiled-chain code path: compose the runnable for every request"""
+    durations = []
+    for hume_results in inputs:
+        start = time.perf_counter()
+        chain = scorer.prompt_template | scorer.llm.with_structured_output(PitchScores)
+        llm_input, prompt_stats = scorer._prepare_prompt(hume_results)
+        result = await chain.ainvoke(llm_input)
+        scorer._format_scores(result, hume_results, prompt_stats=prompt_stats)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+async def prebuilt_chain(scorer: PitchScoringService, inputs: list) -> list:
+    durations = []
+    for hume_results in inputs:
+        start = time.perf_counter()
+        await scorer.score_pitch_performance(hume_results)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+async def batched(scorer: PitchScoringService, inputs: list, concurrency: int) -> float:
+    start = time.perf_counter()
+    await scorer.score_pitch_batch(inputs, max_concurrency=concurrency)
+    return time.perf_counter() - start
+
+
+def report(name: str, durations: list) -> None:
+    ordered = sorted(durations)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(f"{name:<28} {statistics.mean(durations) * 1000:>9.3f} {statistics.median(durations) * 1000:>9.3f} {p99 * 1000:>9.3f}")
+
+
+def main(requests: int, latency: float, concurrency: int) -> None:
+    scorer = PitchScoringService(cache=None, memo=None, llm=FakePitchChatModel(latency_seconds=latency))
+    inputs = sample_inputs(requests)
+
+    # Warm up imports and pydantic schema caches before timing
+    asyncio.run(prebuilt_chain(scorer, inputs[:5]))
+    asyncio.run(rebuild_per_request(scorer, inputs[:5]))
+
+    print(f"{requests} sequential requests, fake LLM latency {latency * 1000:.0f} ms")
+    print(f"{'path':<28} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    report("rebuild chain per request", asyncio.run(rebuild_per_request(scorer, inputs)))
+    report("prebuilt chain", asyncio.run(prebuilt_chain(scorer, inputs)))
+
+    elapsed = asyncio.run(batched(scorer, inputs, concurrency))
+    print(f"score_pitch_batch (max_concurrency={concurrency}): {elapsed * 1000:.1f} ms total, "
+          f"{elapsed * 1000 / requests:.3f} ms per analysis")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        memo = ScoringMemo(os.path.join(tmp, "memo.db"))
+        memoized = PitchScoringService(cache=None, memo=memo, llm=FakePitchChatModel(latency_seconds=latency))
+        for run in ("cold", "warm"):
+            elapsed = asyncio.run(batched(memoized, inputs, concurrency))
+            print(f"score_pitch_batch, {run} memo: {elapsed * 1000:.1f} ms total, "
+                  f"{elapsed * 1000 / requests:.3f} ms per analysis, {memoized.llm.calls} LLM calls so far")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.0, help="Fake LLM latency in seconds")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    main(args.requests, args.latency, args.concurrency)
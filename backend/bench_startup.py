@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Worker startup cost: import time of main and time to first response
+
+Runs `python -X importtime -c "import main"` and reports the cumulative
+import time of main plus its heaviest direct imports. Then it starts uvicorn
+once per SERVICE_WARMUP mode and times from process start to the first 200
+from /dashboard. With lazy services the Hume SDK and LangChain stay off that
+path; `startup` shows the cost they add when built before serving.
+
+Dummy API keys are set for the child processes so `startup` can build the
+services; nothing calls the real APIs.
+
+Usage: python bench_startup.py [--runs 3] [--top 10]
+"""
+import argparse
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)")
+
+
+def child_env(**extra) -> dict:
+    env = dict(os.environ)
+    env.setdefault("HUME_API_KEY", "bench-key")
+    env.setdefault("GROQ_API_KEY", "bench-key")
+    env.update(extra)
+    return env
+
+
+def import_times(top: int) -> None:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=HERE, env=child_env(), capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((len(indent), name, int(self_us), int(cumulative_us)))
+    # Children are printed before their parent, one level deeper
+    main_index = next(i for i, row in enumerate(rows) if row[1] == "main")
+    main_row = rows[main_index]
+    direct = []
+    for row in reversed(rows[:main_index]):
+        if row[0] <= main_row[0]:
+            break
+        if row[0] == main_row[0] + 2:
+            direct.append(row)
+    print(f"import main: {main_row[3] / 1000:.0f} ms cumulative")
+    print(f"{'direct import':<28} {'cumulative ms':>14}")
+    for _, name, _, cumulative_us in sorted(direct, key=lambda row: -row[3])[:top]:
+        print(f"{name:<28} {cumulative_us / 1000:>14.1f}")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_to_first_response(warmup: str, timeout: float = 60) -> float:
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=HERE, env=child_env(SERVICE_WARMUP=warmup, ANALYSIS_WORKERS="0"),
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/dashboard", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError(f"Server did not answer within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main(runs: int, top: int) -> None:
+    import_times(top)
+    print()
+    print(f"{'SERVICE_WARMUP':<16} {'first response ms (median of ' + str(runs) + ')':>36}")
+    for warmup in ("lazy", "startup"):
+        durations = [time_to_first_response(warmup) for _ in range(runs)]
+        print(f"{warmup:<16} {statistics.median(durations) * 1000:>36.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+    main(args.runs, args.top)
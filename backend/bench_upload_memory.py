@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Peak-memory benchmark for audio upload ingestion
+
+Starts a server process per ingestion strategy, fires N concurrent uploads of
+an M MB file at it, and reports the server's peak RSS (VmHWM). `legacy` is the
+previous `await audio.read()` + `seek(0)` handling; `streaming` is
+uploads.receive_audio_upload. Both then read the file back in chunks the way
+the Hume client does when it sends the audio on. Linux only (reads /proc).
+
+Usage: python bench_upload_memory.py [--uploads 20] [--size-mb 50]
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+
+
+def build_app(mode: str):
+    from fastapi import FastAPI, File, HTTPException, Request, UploadFile
+    from uploads import receive_audio_upload, MAX_AUDIO_BYTES
+
+    app = FastAPI()
+
+    def drain(file) -> None:
+        for _ in iter(lambda: file.read(64 * 1024), b""):
+            pass
+
+    if mode == "legacy":
+        @app.post("/upload")
+        async def upload(audio: UploadFile = File(...)):
+            content = await audio.read()
+            if len(content) > MAX_AUDIO_BYTES:
+                raise HTTPException(status_code=413, detail="File too large")
+            await audio.seek(0)
+            content_hash = hashlib.sha256(content).hexdigest()
+            # Hold the request open like a real analysis would
+            await asyncio.sleep(1)
+            drain(audio.file)
+            return {"size": len(content), "sha256": content_hash}
+    else:
+        @app.post("/upload")
+        async def upload(request: Request):
+            audio = await receive_audio_upload(request)
+            try:
+                await asyncio.sleep(1)
+                drain(audio.file)
+                return {"size": audio.size, "sha256": audio.sha256}
+            finally:
+                audio.close()
+
+    @app.get("/ready")
+    async def ready():
+        return {"ok": True}
+
+    return app
+
+
+def serve(mode: str, port: int) -> None:
+    import uvicorn
+    uvicorn.run(build_app(mode), host="127.0.0.1", port=port, log_level="warning")
+
+
+def peak_rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def free_port() -> int:
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+async def upload_all(base_url: str, path: str, uploads: int) -> float:
+    async with httpx.AsyncClient(timeout=300) as client:
+        async def one():
+            with open(path, "rb") as f:
+                response = await client.post(
+                    f"{base_url}/upload",
+                    files={"audio": ("pitch.webm", f, "audio/webm")},
+                )
+            response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(uploads)))
+        return time.perf_counter() - start
+
+
+def run_mode(mode: str, path: str, uploads: int) -> None:
+    port = free_port()
+    server = subprocess.Popen([sys.executable, __file__, "--serve", mode, "--port", str(port)])
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(200):
+            try:
+                httpx.get(f"{base_url}/ready")
+                break
+            except httpx.TransportError:
+                time.sleep(0.05)
+        idle = peak_rss_mb(server.pid)
+        elapsed = asyncio.run(upload_all(base_url, path, uploads))
+        peak = peak_rss_mb(server.pid)
+        print(f"{mode:<10} {idle:>12.1f} {peak:>13.1f} {peak - idle:>12.1f} {elapsed:>9.2f}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main(uploads: int, size_mb: int) -> None:
+    with tempfile.NamedTemporaryFile(suffix=".webm", delete=False) as f:
+        chunk = os.urandom(1024 * 1024)
+        for _ in range(size_mb):
+            f.write(chunk)
+        path = f.name
+    try:
+        print(f"{uploads} concurrent uploads of {size_mb} MB")
+        print(f"{'mode':<10} {'idle RSS MB':>12} {'peak RSS MB':>13} {'growth MB':>12} {'wall (s)':>9}")
+        for mode in ("legacy", "streaming"):
+            run_mode(mode, path, uploads)
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--uploads", type=int, default=20)
+    parser.add_argument("--size-mb", type=int, default=50)
+    parser.add_argument("--serve", choices=["legacy", "streaming"], help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.serve, args.port)
+    else:
+        main(args.uploads, args.size_mb)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Compare LocalPitchScorer with LLM scores on stored analyses
+
+Each sample is a JSON file holding an /analyze-pitch response or a completed
+job result: `raw_analysis` (the processed Hume results) plus `pitch_scores`
+from the LLM. Samples without LLM scores can be scored with --rescore, which
+calls the configured LLM through PitchScoringService.score_pitch_batch.
+
+For every dimension the harness reports mean absolute error, bias and Pearson
+correlation of the uncalibrated local scores, then fits `llm ~ slope * local +
+intercept` and reports the error after the fit. --write saves the fit for
+LOCAL_SCORING_CALIBRATION.
+
+Usage: python calibrate_local_scoring.py samples/*.json [--rescore] [--write calibration.json]
+       python calibrate_local_scoring.py --synthetic 50   (fake Hume + fake LLM, smoke test only)
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import Dict, Any, List, Tuple
+import numpy as np
+from local_scoring import LocalPitchScorer, extract_features, SCORE_DIMENSIONS
+
+os.environ.setdefault("HUME_API_KEY", "calibration-key")
+
+
+def load_samples(paths: List[str]) -> List[Dict[str, Any]]:
+    samples = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        # Job views nest the response under `result`
+        data = data.get("result") or data
+        if "raw_analysis" not in data:
+            print(f"skipping {path}: no raw_analysis")
+            continue
+        samples.append({"path": path, "hume_results": data["raw_analysis"], "llm_scores": data.get("pitch_scores")})
+    return samples
+
+
+def synthetic_samples(count: int) -> List[Dict[str, Any]]:
+    """Fake Hume analyses scored by the fake LLM; exercises the harness, not the calibration"""
+    from fake_hume import build_segments
+    from hume_service import hume_service
+
+    samples = []
+    for i in range(count):
+        results = hume_service.summarize_segments([
+            hume_service.segment_record(s["text"], s["confidence"], s["time"]["begin"], s["time"]["end"], s["emotions"])
+            for s in build_segments(f"sample-{i}", 5 + i % 30)
+        ])
+        samples.append({"path": f"synthetic-{i}", "hume_results": results, "llm_scores": None})
+    return samples
+
+
+async def rescore(samples: List[Dict[str, Any]], synthetic: bool) -> None:
+    if synthetic:
+        # The fake model stands in for Groq; the key only satisfies the module singleton
+        os.environ.setdefault("GROQ_API_KEY", "calibration-key")
+    from scoring_service import PitchScoringService
+
+    missing = [sample for sample in samples if not sample["llm_scores"]]
+    if not missing:
+        return
+    if synthetic:
+        from fake_llm import FakePitchChatModel
+        scorer = PitchScoringService(cache=None, memo=None, llm=FakePitchChatModel())
+    else:
+        from scoring_service import pitch_scoring_service as scorer
+    results = await scorer.score_pitch_batch([s["hume_results"] for s in missing], return_exceptions=True)
+    for sample, scores in zip(missing, results):
+        if isinstance(scores, Exception):
+            print(f"LLM scoring failed for {sample['path']}: {scores}")
+        else:
+            sample["llm_scores"] = scores
+
+
+def fit(local: np.ndarray, llm: np.ndarray) -> Tuple[float, float]:
+    """Least-squares slope and intercept mapping local scores onto LLM scores"""
+    if len(local) < 2 or np.ptp(local) == 0:
+        return 1.0, float(np.mean(llm - local)) if len(local) else 0.0
+    slope, intercept = np.polyfit(local, llm, 1)
+    return float(slope), float(intercept)
+
+
+def main(paths: List[str], synthetic: int, do_rescore: bool, write: str) -> None:
+    samples = synthetic_samples(synthetic) if synthetic else load_samples(paths)
+    if do_rescore or synthetic:
+        asyncio.run(rescore(samples, bool(synthetic)))
+    samples = [sample for sample in samples if sample["llm_scores"]]
+    if not samples:
+        raise SystemExit("No samples with LLM scores")
+
+    scorer = LocalPitchScorer()
+    start = time.perf_counter()
+    local_scores = [scorer.raw_scores(extract_features(s["hume_results"])) for s in samples]
+    per_sample_us = (time.perf_counter() - start) / len(samples) * 1e6
+
+    print(f"{len(samples)} samples, local scoring {per_sample_us:.0f} us per sample")
+    print(f"{'dimension':<11} {'MAE':>6} {'bias':>7} {'r':>6} {'slope':>7} {'intercept':>9} {'MAE fit':>8}")
+    calibration = {}
+    for name in SCORE_DIMENSIONS:
+        local = np.array([scores[name] for scores in local_scores])
+        llm = np.array([float(s["llm_scores"][name]) for s in samples])
+        error = local - llm
+        r = float(np.corrcoef(local, llm)[0, 1]) if np.ptp(local) and np.ptp(llm) else float("nan")
+        slope, intercept = fit(local, llm)
+        fitted = np.clip(slope * local + intercept, 0, 100)
+        calibration[name] = [round(slope, 4), round(intercept, 4)]
+        print(f"{name:<11} {np.mean(np.abs(error)):>6.1f} {np.mean(error):>+7.1f} {r:>6.2f} "
+              f"{slope:>7.3f} {intercept:>9.2f} {np.mean(np.abs(fitted - llm)):>8.1f}")
+
+    if write:
+        with open(write, "w", encoding="utf-8") as f:
+            json.dump(calibration, f, indent=2)
+        print(f"Wrote calibration to {write}; set LOCAL_SCORING_CALIBRATION={write} to use it")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("samples", nargs="*", help="/analyze-pitch responses or job results as JSON files")
+    parser.add_argument("--synthetic", type=int, default=0, help="Generate this many fake samples instead")
+    parser.add_argument("--rescore", action="store_true", help="Score samples lacking pitch_scores with the LLM")
+    parser.add_argument("--write", help="Save the fitted calibration to this JSON file")
+    args = parser.parse_args()
+    main(args.samples, args.synthetic, args.rescore, args.write)
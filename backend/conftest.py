@@ -0,0 +1,14 @@
+import os
+
+# Services are built lazily by services.py but still check for their keys; tests never reach the real APIs
+os.environ.setdefault("HUME_API_KEY", "test-hume-key")
+os.environ.setdefault("GROQ_API_KEY", "test-groq-key")
+# Keep the scoring memo out of tests unless a test builds its own
+os.environ.setdefault("SCORING_MEMO_DB", "")
+# Memory-only result cache, so runs don't share analyses through /tmp/pitch-coach-cache
+os.environ.setdefault("RESULT_CACHE_DIR", "")
+# Recorded practice sessions stay in memory instead of a practice_sessions.db shared between runs
+os.environ.setdefault("SESSION_STORE", "memory")
+# Every TestClient request comes from the same address; only test_admission.py exercises the limits
+os.environ.setdefault("ADMISSION_USER_BURST", "1000000")
+os.environ.setdefault("ADMISSION_USER_MAX_IN_FLIGHT", "1000")
@@ -0,0 +1,344 @@
+"""
+Segment x emotion score matrix
+
+Hume returns ~48 emotion scores for every prosody segment. Rather than carrying
+those around as one small dict per score, segments are collected into a dense
+NumPy matrix with a fixed emotion column order, so aggregates (means,
+variances, duration-weighted averages, per-segment top-k) are single
+vectorized operations. The JSON `timestamps` shape is produced by
+`to_timestamps()`.
+
+Hume normally reports every emotion for every segment, in the same order. A
+segment that reports fewer (or a different order) keeps its own column list:
+emotions it never reported are left out of its top-k, its `all_emotions` and
+the averages rather than counting as zero scores.
+"""
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+import numpy as np
+
+# Emotion dimensions returned by the Hume prosody model, in Hume's order
+HUME_EMOTIONS = [
+    "Admiration", "Adoration", "Aesthetic Appreciation", "Amusement", "Anger",
+    "Anxiety", "Awe", "Awkwardness", "Boredom", "Calmness", "Concentration",
+    "Confusion", "Contemplation", "Contempt", "Contentment", "Craving", "Desire",
+    "Determination", "Disappointment", "Disgust", "Distress", "Doubt", "Ecstasy",
+    "Embarrassment", "Empathic Pain", "Entrancement", "Envy", "Excitement", "Fear",
+    "Guilt", "Horror", "Interest", "Joy", "Love", "Nostalgia", "Pain", "Pride",
+    "Realization", "Relief", "Romance", "Sadness", "Satisfaction", "Shame",
+    "Surprise (negative)", "Surprise (positive)", "Sympathy", "Tiredness", "Triumph",
+]
+
+EMOTION_INDEX = {name: i for i, name in enumerate(HUME_EMOTIONS)}
+
+
+class EmotionMatrix:
+    """Emotion scores of a recording's segments, one row per segment"""
+
+    def __init__(
+        self,
+        scores: np.ndarray,
+        begins: np.ndarray,
+        ends: np.ndarray,
+        texts: Sequence[str],
+        confidences: Sequence[float],
+        emotion_names: Sequence[str] = HUME_EMOTIONS,
+        columns: Optional[List[Optional[np.ndarray]]] = None,
+    ):
+        """
+        Args:
+            scores: (segments, emotions) array of scores, zero where not reported
+            begins: Segment start times in seconds
+            ends: Segment end times in seconds
+            texts: Transcribed text of each segment
+            confidences: Transcription confidence of each segment
+            emotion_names: Emotion name of each column
+            columns: Columns each segment reported, in Hume's order; None for
+                segments (or a whole matrix) reporting every column in order
+        """
+        self.scores = scores
+        self.begins = begins
+        self.ends = ends
+        self.texts = list(texts)
+        self.confidences = list(confidences)
+        self.emotion_names = list(emotion_names)
+        self.columns = columns
+        # Rows with their own column list; empty in the common case of complete segments
+        self._irregular = [row for row, cols in enumerate(columns) if cols is not None] if columns else []
+        self._present: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_timestamps(cls, timestamps: List[Dict[str, Any]]) -> "EmotionMatrix":
+        """Matrix for segments already in the `timestamps` JSON shape"""
+        builder = EmotionMatrixBuilder()
+        for segment in timestamps:
+            emotions = segment.get("all_emotions") or segment.get("emotions", [])
+            builder.add(
+                segment.get("text", ""),
+                segment.get("confidence", 0),
+                segment.get("timestamp", {}).get("begin", 0),
+                segment.get("timestamp", {}).get("end", 0),
+                [emotion["name"] for emotion in emotions],
+                [emotion["score"] for emotion in emotions],
+            )
+        return builder.build()
+
+    def __len__(self) -> int:
+        return self.scores.shape[0]
+
+    @property
+    def durations(self) -> np.ndarray:
+        return np.clip(self.ends - self.begins, 0, None)
+
+    @property
+    def present(self) -> np.ndarray:
+        """(segments, emotions) mask of the scores each segment reported"""
+        if self._present is None:
+            present = np.ones(self.scores.shape, dtype=bool)
+            for row in self._irregular:
+                present[row] = False
+                present[row, self.columns[row]] = True
+            self._present = present
+        return self._present
+
+    def reported(self) -> np.ndarray:
+        """Mask of the emotions at least one segment reported"""
+        if not self._irregular:
+            return np.full(len(self.emotion_names), len(self) > 0)
+        return self.present.any(axis=0)
+
+    def mean(self) -> np.ndarray:
+        """Per-emotion mean over the segments that reported it"""
+        if not len(self):
+            return np.zeros(len(self.emotion_names))
+        if not self._irregular:
+            return self.scores.mean(axis=0)
+        counts = self.present.sum(axis=0)
+        return self.scores.sum(axis=0) / np.maximum(counts, 1)
+
+    def variance(self) -> np.ndarray:
+        """Per-emotion variance over the segments that reported it"""
+        if not len(self):
+            return np.zeros(len(self.emotion_names))
+        if not self._irregular:
+            return self.scores.var(axis=0)
+        present = self.present
+        deviations = np.where(present, self.scores - self.mean(), 0)
+        return (deviations ** 2).sum(axis=0) / np.maximum(present.sum(axis=0), 1)
+
+    def weighted_mean(self, weights: Optional[np.ndarray] = None) -> np.ndarray:
+        """Per-emotion average weighted by segment duration (or the given weights), over reporting segments"""
+        if weights is None:
+            weights = self.durations
+        total = weights.sum()
+        if not len(self) or total <= 0:
+            return self.mean()
+        if not self._irregular:
+            return weights @ self.scores / total
+        covered = weights @ self.present
+        return np.where(covered > 0, weights @ self.scores / np.where(covered > 0, covered, 1), 0)
+
+    def top_k(self, k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Highest-scoring emotions of every segment
+
+        Returns:
+            (column indices, scores), both (segments, k) and ordered by descending
+            score. Segments that reported fewer than k emotions are padded with
+            index -1 and score NaN.
+        """
+        k = min(k, self.scores.shape[1])
+        if not len(self) or k == 0:
+            empty = np.empty((len(self), 0))
+            return empty.astype(np.intp), empty
+        # Partition to the top k, then order only those k columns
+        if k < self.scores.shape[1]:
+            candidates = np.argpartition(-self.scores, k - 1, axis=1)[:, :k]
+            # argpartition breaks ties at the cut arbitrarily; keep the first columns like a stable sort
+            cutoff = np.take_along_axis(self.scores, candidates, axis=1).min(axis=1)
+            tied = np.flatnonzero((self.scores >= cutoff[:, None]).sum(axis=1) > k)
+            if len(tied):
+                candidates[tied] = np.argsort(-self.scores[tied], axis=1, kind="stable")[:, :k]
+        else:
+            candidates = np.broadcast_to(np.arange(k), self.scores.shape)
+        candidate_scores = np.take_along_axis(self.scores, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1, kind="stable")
+        indices = np.take_along_axis(candidates, order, axis=1)
+        top_scores = np.take_along_axis(candidate_scores, order, axis=1)
+        # Incomplete or reordered segments rank only what they reported, ties in reported order
+        for row in self._irregular:
+            columns = self.columns[row]
+            values = self.scores[row, columns]
+            ranked = np.argsort(-values, kind="stable")[:k]
+            indices[row] = -1
+            top_scores[row] = np.nan
+            indices[row, :len(ranked)] = columns[ranked]
+            top_scores[row, :len(ranked)] = values[ranked]
+        return indices, top_scores
+
+    def top_k_mean(self, k: int = 5) -> Dict[str, float]:
+        """
+        Average of each emotion's score over segments where it is in the top k
+
+        Segments where the emotion is not in the top k count as zero. Emotions
+        that never make a top k are left out.
+        """
+        if not len(self):
+            return {}
+        indices, top_scores = self.top_k(k)
+        width = len(self.emotion_names)
+        ranked = indices >= 0
+        totals = np.bincount(indices[ranked], weights=top_scores[ranked], minlength=width)
+        seen = np.bincount(indices[ranked], minlength=width) > 0
+        averages = totals / len(self)
+        return {self.emotion_names[i]: float(averages[i]) for i in np.flatnonzero(seen)}
+
+    def to_timestamps(self, top_n: int = 5) -> List[Dict[str, Any]]:
+        """Segments in the `timestamps` JSON shape of a processed analysis"""
+        if not len(self):
+            return []
+        names = self.emotion_names
+        indices, top_scores = self.top_k(top_n)
+        # tolist() converts to Python floats in one go instead of per element
+        top_indices = indices.tolist()
+        top_values = top_scores.tolist()
+        begins = self.begins.tolist()
+        ends = self.ends.tolist()
+        all_scores = self.scores.tolist()
+        irregular = set(self._irregular)
+
+        timestamps = []
+        for i in range(len(self)):
+            timestamps.append({
+                "text": self.texts[i],
+                "confidence": self.confidences[i],
+                "timestamp": {
+                    "begin": begins[i],
+                    "end": ends[i]
+                },
+                "emotions": [
+                    {"name": names[col], "score": score}
+                    for col, score in zip(top_indices[i], top_values[i])
+                    if col >= 0
+                ],
+                "all_emotions": self.row_emotions(i) if i in irregular else [
+                    {"name": name, "score": score} for name, score in zip(names, all_scores[i])
+                ]
+            })
+        return timestamps
+
+    def to_columns(self, top_n: int = 5) -> Dict[str, Any]:
+        """
+        Segments in columnar form: emotion names once, one array per field
+
+        `scores[i][j]` is segment i's score for `emotion_names[j]` (null when
+        the segment did not report it) and `top_emotions[i]` the column indices
+        of its top_n emotions.
+        """
+        indices, _ = self.top_k(top_n) if len(self) else (np.zeros((0, 0), dtype=int), None)
+        scores = self.scores.tolist()
+        top_emotions = indices.tolist()
+        for row in self._irregular:
+            scores[row] = [
+                score if reported else None
+                for score, reported in zip(scores[row], self.present[row].tolist())
+            ]
+            top_emotions[row] = [col for col in top_emotions[row] if col >= 0]
+        return {
+            "emotion_names": self.emotion_names,
+            "text": self.texts,
+            "confidence": self.confidences,
+            "begin": self.begins.tolist(),
+            "end": self.ends.tolist(),
+            "scores": scores,
+            "top_emotions": top_emotions,
+        }
+
+    def row_emotions(self, row: int) -> List[Dict[str, Any]]:
+        """All emotion scores one segment reported as `{"name", "score"}` dicts, in Hume's order"""
+        columns = self.columns[row] if self.columns else None
+        if columns is None:
+            return [
+                {"name": name, "score": score}
+                for name, score in zip(self.emotion_names, self.scores[row].tolist())
+            ]
+        names = self.emotion_names
+        return [
+            {"name": names[col], "score": score}
+            for col, score in zip(columns.tolist(), self.scores[row, columns].tolist())
+        ]
+
+
+class EmotionMatrixBuilder:
+    """Collects segments one at a time and packs them into an EmotionMatrix"""
+
+    def __init__(self):
+        self._names = list(HUME_EMOTIONS)
+        self._index = dict(EMOTION_INDEX)
+        self._rows: List[Sequence[float]] = []
+        self._columns: List[Optional[np.ndarray]] = []
+        self._begins: List[float] = []
+        self._ends: List[float] = []
+        self._texts: List[str] = []
+        self._confidences: List[float] = []
+        self._last_names: Optional[List[str]] = None
+        self._last_columns: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(
+        self,
+        text: str,
+        confidence: float,
+        begin: float,
+        end: float,
+        names: Sequence[str],
+        scores: Sequence[float],
+    ) -> None:
+        """Append one segment; emotions missing from it score zero"""
+        # Hume sends the same emotion order for every segment, so the column lookup is reused
+        if names != self._last_names:
+            columns = []
+            for name in names:
+                column = self._index.get(name)
+                if column is None:
+                    column = len(self._names)
+                    self._index[name] = column
+                    self._names.append(name)
+                columns.append(column)
+            self._last_names = list(names)
+            # None marks the common case of columns 0..n-1 in order
+            in_order = columns == list(range(len(columns)))
+            self._last_columns = None if in_order else np.array(columns, dtype=np.intp)
+        self._rows.append(scores)
+        self._columns.append(self._last_columns)
+        self._begins.append(begin)
+        self._ends.append(end)
+        self._texts.append(text)
+        self._confidences.append(confidence)
+
+    def build(self) -> EmotionMatrix:
+        width = len(self._names)
+        row_columns = None
+        if all(columns is None and len(row) == width for columns, row in zip(self._columns, self._rows)):
+            scores = np.array(self._rows, dtype=np.float64).reshape(len(self._rows), width)
+        else:
+            scores = np.zeros((len(self._rows), width))
+            row_columns = []
+            for i, (columns, row) in enumerate(zip(self._columns, self._rows)):
+                if columns is None:
+                    scores[i, :len(row)] = row
+                    # In order but short of an emotion (or of one a later segment added)
+                    columns = np.arange(len(row), dtype=np.intp) if len(row) != width else None
+                else:
+                    scores[i, columns] = row
+                row_columns.append(columns)
+        return EmotionMatrix(
+            scores,
+            np.array(self._begins, dtype=np.float64),
+            np.array(self._ends, dtype=np.float64),
+            self._texts,
+            self._confidences,
+            self._names,
+            row_columns,
+        )
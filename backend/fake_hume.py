@@ -0,0 +1,322 @@
+"""
+Local stand-in for the Hume batch expression-measurement API.
+
+Implements just enough of the `/v0/batch/jobs` surface for the async SDK client
+to submit jobs, poll them and fetch predictions, so tests and benchmarks can
+exercise HumeAudioService without network access or an API key.
+FakeHumeStreamBackend plays the same role for the streaming API.
+"""
+import asyncio
+import hashlib
+import io
+import random
+import time
+import uuid
+import wave
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List, Optional
+from fastapi import FastAPI, Request, HTTPException
+from emotion_matrix import HUME_EMOTIONS
+
+_WORDS = [
+    "our", "platform", "helps", "teams", "ship", "faster", "we", "have", "grown",
+    "revenue", "every", "quarter", "customers", "love", "the", "product", "and",
+    "this", "market", "is", "huge", "investors", "growth", "AI", "solution",
+]
+
+
+def build_segments(seed: str, segment_count: int) -> List[Dict[str, Any]]:
+    """Generate deterministic prosody segments for a source file"""
+    rng = random.Random(seed)
+    segments = []
+    cursor = 0.0
+    for _ in range(segment_count):
+        length = rng.uniform(0.5, 4.0)
+        text = " ".join(rng.choice(_WORDS) for _ in range(max(1, int(length * 2.5))))
+        segments.append({
+            "text": text,
+            "time": {"begin": round(cursor, 3), "end": round(cursor + length, 3)},
+            "confidence": round(rng.uniform(0.6, 1.0), 4),
+            "emotions": [
+                {"name": name, "score": round(rng.random() ** 3, 6)}
+                for name in HUME_EMOTIONS
+            ],
+        })
+        cursor += length + rng.uniform(0.0, 0.8)
+    return segments
+
+
+class FakeHumeBackend:
+    """In-memory job table behind the fake Hume API"""
+
+    def __init__(
+        self,
+        processing_seconds: float = 0.5,
+        segments_per_file: int = 12,
+        seconds_per_file: float = 0.0,
+        max_concurrent_jobs: Optional[int] = None,
+        seconds_per_audio_second: float = 0.0,
+        failing_jobs: int = 0,
+    ):
+        """
+        Args:
+            processing_seconds: Fixed cost of every job once it starts
+            segments_per_file: Prosody segments generated for each file
+            seconds_per_file: Additional processing per file in the job
+            max_concurrent_jobs: Jobs run at once per account; later ones queue (None is unlimited)
+            seconds_per_audio_second: Additional processing per second of WAV audio in the job
+            failing_jobs: The first this many jobs submitted end up FAILED
+        """
+        self.processing_seconds = processing_seconds
+        self.segments_per_file = segments_per_file
+        self.seconds_per_file = seconds_per_file
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self.seconds_per_audio_second = seconds_per_audio_second
+        self.failing_jobs = failing_jobs
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.request_counts: Dict[str, int] = {"submit": 0, "details": 0, "list": 0, "predictions": 0}
+
+    def submit(self, files: List[Dict[str, Any]], config: Optional[str] = None) -> str:
+        job_id = str(uuid.uuid4())
+        now_ms = int(time.time() * 1000)
+        started_ms = now_ms
+        if self.max_concurrent_jobs:
+            # Start when a slot frees up among the jobs still running or queued
+            busy = sorted(job["ready_ms"] for job in self.jobs.values() if job["ready_ms"] > now_ms)
+            if len(busy) >= self.max_concurrent_jobs:
+                started_ms = busy[len(busy) - self.max_concurrent_jobs]
+        audio_seconds = sum(f.get("duration") or 0 for f in files)
+        processing = (
+            self.processing_seconds
+            + self.seconds_per_file * len(files)
+            + self.seconds_per_audio_second * audio_seconds
+        )
+        failed = self.failing_jobs > 0
+        self.failing_jobs -= int(failed)
+        self.jobs[job_id] = {
+            "files": files,
+            "config": config,
+            "created_ms": now_ms,
+            "started_ms": started_ms,
+            "ready_ms": started_ms + int(processing * 1000),
+            "failed": failed,
+        }
+        self.request_counts["submit"] += 1
+        return job_id
+
+    def _state(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        now_ms = int(time.time() * 1000)
+        if now_ms < job["started_ms"]:
+            return {"status": "QUEUED", "created_timestamp_ms": job["created_ms"]}
+        if now_ms < job["ready_ms"]:
+            return {
+                "status": "IN_PROGRESS",
+                "created_timestamp_ms": job["created_ms"],
+                "started_timestamp_ms": job["started_ms"],
+            }
+        if job["failed"]:
+            return {
+                "status": "FAILED",
+                "created_timestamp_ms": job["created_ms"],
+                "started_timestamp_ms": job["started_ms"],
+                "ended_timestamp_ms": job["ready_ms"],
+                "message": "Injected failure",
+            }
+        return {
+            "status": "COMPLETED",
+            "created_timestamp_ms": job["created_ms"],
+            "started_timestamp_ms": job["started_ms"],
+            "ended_timestamp_ms": job["ready_ms"],
+            "num_predictions": len(job["files"]),
+            "num_errors": 0,
+        }
+
+    def details(self, job_id: str, count: bool = True) -> Dict[str, Any]:
+        job = self._get(job_id)
+        if count:
+            self.request_counts["details"] += 1
+        return {
+            "type": "INFERENCE",
+            "job_id": job_id,
+            "request": {
+                "files": [
+                    {"filename": f["filename"], "md5sum": f["md5sum"]} for f in job["files"]
+                ],
+            },
+            "state": self._state(job),
+        }
+
+    def list_jobs(
+        self,
+        statuses: List[str],
+        created_after_ms: Optional[int] = None,
+        limit: int = 50,
+        ascending: bool = False,
+    ) -> List[Dict[str, Any]]:
+        self.request_counts["list"] += 1
+        jobs = sorted(self.jobs.items(), key=lambda item: item[1]["created_ms"], reverse=not ascending)
+        listed = []
+        for job_id, job in jobs:
+            if created_after_ms is not None and job["created_ms"] <= created_after_ms:
+                continue
+            if statuses and self._state(job)["status"] not in statuses:
+                continue
+            listed.append(self.details(job_id, count=False))
+            if len(listed) >= limit:
+                break
+        return listed
+
+    def predictions(self, job_id: str) -> List[Dict[str, Any]]:
+        job = self._get(job_id)
+        self.request_counts["predictions"] += 1
+        if self._state(job)["status"] != "COMPLETED":
+            raise HTTPException(status_code=400, detail="Job is not completed")
+        return [self._source_result(f) for f in job["files"]]
+
+    def _source_result(self, source: Dict[str, Any]) -> Dict[str, Any]:
+        segments = build_segments(source["md5sum"], self.segments_per_file)
+        if source.get("duration"):
+            # Spread the generated timeline over the length of the recording
+            scale = source["duration"] / segments[-1]["time"]["end"]
+            for segment in segments:
+                segment["time"] = {
+                    "begin": round(segment["time"]["begin"] * scale, 3),
+                    "end": round(segment["time"]["end"] * scale, 3),
+                }
+        return {
+            "source": {
+                "type": "file",
+                "filename": source["filename"],
+                "content_type": source["content_type"],
+                "md5sum": source["md5sum"],
+            },
+            "results": {
+                "predictions": [{
+                    "file": source["filename"],
+                    "models": {
+                        "prosody": {
+                            "metadata": {"confidence": 0.9, "detected_language": "en"},
+                            "grouped_predictions": [
+                                {"id": "unknown", "predictions": segments}
+                            ],
+                        }
+                    },
+                }],
+                "errors": [],
+            },
+        }
+
+    def _get(self, job_id: str) -> Dict[str, Any]:
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return job
+
+
+class FakeHumeStreamBackend:
+    """Stream backend answering each audio window with deterministic segments"""
+
+    def __init__(self, latency_seconds: float = 0.0, segments_per_window: int = 2, window_seconds: float = 5.0):
+        self.latency_seconds = latency_seconds
+        self.segments_per_window = segments_per_window
+        self.window_seconds = window_seconds
+        self.connections = 0
+        self.windows = 0
+
+    @asynccontextmanager
+    async def connect(self):
+        self.connections += 1
+        yield self
+
+    async def analyze(self, audio: bytes) -> List[Dict[str, Any]]:
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        self.windows += 1
+        segments = build_segments(hashlib.md5(audio).hexdigest(), self.segments_per_window)
+        # Squeeze the generated timeline into one window
+        scale = min(1.0, self.window_seconds / segments[-1]["time"]["end"])
+        for segment in segments:
+            segment["time"] = {
+                "begin": round(segment["time"]["begin"] * scale, 3),
+                "end": round(segment["time"]["end"] * scale, 3),
+            }
+        return segments
+
+
+def wav_duration(content: bytes) -> Optional[float]:
+    """Length in seconds of a WAV file, None for anything else"""
+    if content[:4] != b"RIFF":
+        return None
+    try:
+        with wave.open(io.BytesIO(content)) as reader:
+            return reader.getnframes() / reader.getframerate()
+    except (wave.Error, EOFError):
+        return None
+
+
+def create_fake_hume_app(backend: Optional[FakeHumeBackend] = None) -> FastAPI:
+    """Build an ASGI app serving the fake Hume batch endpoints"""
+    backend = backend or FakeHumeBackend()
+    app = FastAPI()
+    app.state.backend = backend
+
+    @app.post("/v0/batch/jobs")
+    async def start_job(request: Request):
+        form = await request.form()
+        files = []
+        for upload in form.getlist("file"):
+            content = await upload.read()
+            files.append({
+                "filename": upload.filename or "file",
+                "content_type": upload.content_type,
+                "md5sum": hashlib.md5(content).hexdigest(),
+                "duration": wav_duration(content),
+            })
+        if not files:
+            raise HTTPException(status_code=400, detail="At least one file is required")
+        config = form.get("json")
+        return {"job_id": backend.submit(files, config if isinstance(config, str) else None)}
+
+    @app.get("/v0/batch/jobs")
+    async def list_jobs(request: Request):
+        params = request.query_params
+        timestamp_ms = params.get("timestamp_ms")
+        return backend.list_jobs(
+            statuses=params.getlist("status"),
+            created_after_ms=int(timestamp_ms) if timestamp_ms and params.get("when") == "created_after" else None,
+            limit=int(params.get("limit", 50)),
+            ascending=params.get("direction") == "asc",
+        )
+
+    @app.get("/v0/batch/jobs/{job_id}")
+    async def get_job(job_id: str):
+        return backend.details(job_id)
+
+    @app.get("/v0/batch/jobs/{job_id}/predictions")
+    async def get_predictions(job_id: str):
+        return backend.predictions(job_id)
+
+    return app
+
+
+if __name__ == "__main__":
+    import argparse
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the fake Hume batch API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--processing-seconds", type=float, default=0.5)
+    parser.add_argument("--segments-per-file", type=int, default=12)
+    parser.add_argument("--seconds-per-file", type=float, default=0.0)
+    parser.add_argument("--max-concurrent-jobs", type=int, default=None)
+    args = parser.parse_args()
+
+    uvicorn.run(
+        create_fake_hume_app(FakeHumeBackend(
+            args.processing_seconds, args.segments_per_file, args.seconds_per_file, args.max_concurrent_jobs
+        )),
+        host=args.host,
+        port=args.port,
+        log_level="warning",
+    )
@@ -0,0 +1,108 @@
+"""
+Local stand-in for the Groq chat model used by PitchScoringService
+
+FakePitchChatModel answers every prompt with a PitchScores tool call, so
+`with_structured_output(PitchScores)` chains run end to end without network
+access or an API key. Scores are derived from a hash of the prompt, so the
+same input always gets the same scores, and an optional delay simulates
+provider latency for benchmarks. Streaming splits the tool call arguments into
+small fragments the way Groq delivers them. Responses report token usage
+estimated at four characters per token.
+"""
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+def scores_for_prompt(prompt: str) -> Dict[str, Any]:
+    """Deterministic PitchScores arguments for a rendered prompt"""
+    digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+    return {
+        "tone": 50 + digest[0] % 50,
+        "fluency": 50 + digest[1] % 50,
+        "clarity": 50 + digest[2] % 50,
+        "confidence": 50 + digest[3] % 50,
+        "explanation": f"Fake scores for prompt {digest.hex()[:12]}",
+    }
+
+
+class FakePitchChatModel(BaseChatModel):
+    """Chat model that always calls the PitchScores tool"""
+
+    latency_seconds: float = 0.0
+    # Extra delay per ~4 prompt characters, simulating prompt processing time
+    seconds_per_prompt_token: float = 0.0
+    # Streaming only: delay between argument fragments and their length
+    chunk_delay_seconds: float = 0.0
+    chunk_chars: int = 8
+    scores: Optional[Dict[str, Any]] = None
+    # When set, every call fails with this message after the delay
+    error: Optional[str] = None
+    model_name: str = "fake-pitch-scorer"
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-pitch-scorer"
+
+    def bind_tools(self, tools, tool_choice=None, **kwargs):
+        # The tool schema is implied: every response is a PitchScores call
+        return self.bind(**kwargs)
+
+    def _delay(self, messages: List[BaseMessage]) -> float:
+        prompt_chars = sum(len(str(message.content)) for message in messages)
+        return self.latency_seconds + self.seconds_per_prompt_token * prompt_chars / 4
+
+    def _arguments(self, messages: List[BaseMessage]) -> Dict[str, Any]:
+        self.calls += 1
+        if self.error is not None:
+            raise RuntimeError(self.error)
+        prompt = "\n".join(str(message.content) for message in messages)
+        return dict(self.scores) if self.scores is not None else scores_for_prompt(prompt)
+
+    def _respond(self, messages: List[BaseMessage]) -> ChatResult:
+        args = self._arguments(messages)
+        input_tokens = sum(len(str(message.content)) for message in messages) // 4
+        output_tokens = len(json.dumps(args)) // 4
+        message = AIMessage(
+            content="",
+            tool_calls=[{"name": "PitchScores", "args": args, "id": f"call_{uuid.uuid4().hex[:8]}"}],
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+            },
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self._delay(messages):
+            time.sleep(self._delay(messages))
+        return self._respond(messages)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self._delay(messages):
+            await asyncio.sleep(self._delay(messages))
+        return self._respond(messages)
+
+    async def _astream(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        if self._delay(messages):
+            await asyncio.sleep(self._delay(messages))
+        arguments = json.dumps(self._arguments(messages))
+        call_id = f"call_{uuid.uuid4().hex[:8]}"
+        for start in range(0, len(arguments), self.chunk_chars):
+            if start and self.chunk_delay_seconds:
+                await asyncio.sleep(self.chunk_delay_seconds)
+            first = start == 0
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[{
+                "name": "PitchScores" if first else None,
+                "args": arguments[start:start + self.chunk_chars],
+                "id": call_id if first else None,
+                "index": 0,
+            }]))
@@ -0,0 +1,459 @@
+"""
+Farcaster webhook ingestion
+
+The webhook endpoint validates a delivery once, straight from the raw body,
+acknowledges it and hands it to WebhookIngestQueue. A single background writer
+drains the queue in batches into an event sink, so a burst of frame traffic
+costs the request path one validation and a queue put, and the sink one
+transaction per batch instead of one per event.
+
+Farcaster retries deliveries it did not see acknowledged, so every event
+carries an idempotency key (the `x-farcaster-delivery-id` header when sent,
+otherwise a hash of the raw body) and the sinks drop keys they already hold.
+A full queue is reported to the caller, which answers 503 so the delivery is
+retried later rather than lost. Acknowledged events are not given up on when
+the sink fails: the writer keeps the batch and retries it with backoff, and
+only drops an event that keeps failing on its own while others are stored.
+
+FARCASTER_EVENT_STORE selects the sink:
+    sqlite  farcaster_events table in FARCASTER_EVENT_DB (default)
+    jsonl   append-only log at FARCASTER_EVENT_LOG
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field, ValidationError
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+webhook_events = metrics.counter("farcaster_webhook_events_total", "Farcaster webhook events by outcome")
+webhook_queue_depth = metrics.gauge("farcaster_webhook_queue_depth", "Farcaster webhook events waiting to be written")
+webhook_flush_seconds = metrics.counter("farcaster_webhook_flush_seconds_total", "Time spent writing Farcaster event batches")
+
+
+class FarcasterUser(BaseModel):
+    fid: int
+    username: Optional[str] = None
+    display_name: Optional[str] = None
+    pfp_url: Optional[str] = None
+
+
+class FarcasterFrameAction(BaseModel):
+    type: str  # "frame_added", "frame_removed", "button_pressed", etc.
+    frame_url: str
+    button_index: Optional[int] = None
+    input_text: Optional[str] = None
+    user: FarcasterUser
+    timestamp: str
+
+
+class FarcasterWebhookPayload(BaseModel):
+    action: FarcasterFrameAction
+    signature: Optional[str] = None
+
+
+class WebhookEvent(BaseModel):
+    """One accepted delivery, as written to the event sink"""
+    idempotency_key: str
+    received_at: float = Field(default_factory=time.time)
+    action_type: str = "unknown"
+    fid: Optional[int] = None
+    timestamp: Optional[str] = None
+    button_index: Optional[int] = None
+    valid: bool = True
+    payload: str
+
+
+class InvalidWebhookBody(ValueError):
+    """The webhook body is not JSON at all"""
+
+
+def parse_webhook(body: bytes, delivery_id: Optional[str] = None) -> WebhookEvent:
+    """
+    Validate a raw webhook body into an event
+
+    A body that is JSON but doesn't match FarcasterWebhookPayload is still
+    accepted and stored with `valid=False`, so new Farcaster event shapes are
+    kept rather than bounced.
+
+    Args:
+        body: Raw request body
+        delivery_id: Delivery id sent by Farcaster, if any
+
+    Raises:
+        InvalidWebhookBody: The body is not valid JSON
+    """
+    key = delivery_id or hashlib.sha256(body).hexdigest()
+    text = body.decode("utf-8", errors="replace")
+    try:
+        action = FarcasterWebhookPayload.model_validate_json(body).action
+    except ValidationError as e:
+        if any(error["type"] == "json_invalid" for error in e.errors()):
+            raise InvalidWebhookBody("Invalid JSON payload") from e
+        logger.warning(f"Webhook payload validation failed: {e.error_count()} errors")
+        # Off the hot path: pick out what we can from a payload of unexpected shape
+        data = json.loads(body)
+        action = data.get("action") if isinstance(data, dict) else None
+        action = action if isinstance(action, dict) else {}
+        user = action.get("user") if isinstance(action.get("user"), dict) else {}
+        fid = user.get("fid")
+        return WebhookEvent(
+            idempotency_key=key,
+            action_type=str(action.get("type", "unknown")),
+            fid=fid if isinstance(fid, int) else None,
+            timestamp=action.get("timestamp") if isinstance(action.get("timestamp"), str) else None,
+            valid=False,
+            payload=text,
+        )
+    return WebhookEvent(
+        idempotency_key=key,
+        action_type=action.type,
+        fid=action.user.fid,
+        timestamp=action.timestamp,
+        button_index=action.button_index,
+        payload=text,
+    )
+
+
+class WebhookEventSink(ABC):
+    """Durable destination for webhook events"""
+
+    @abstractmethod
+    def write_batch(self, events: List[WebhookEvent]) -> int:
+        """Persist events, skipping already stored idempotency keys; returns how many were new"""
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteWebhookSink(WebhookEventSink):
+    """Events in a SQLite table keyed by idempotency key"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        # Opened on the first write so importing the app doesn't create the file
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS farcaster_events (
+                    idempotency_key TEXT PRIMARY KEY,
+                    received_at REAL NOT NULL,
+                    action_type TEXT NOT NULL,
+                    fid INTEGER,
+                    valid INTEGER NOT NULL,
+                    payload TEXT NOT NULL
+                )"""
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_farcaster_events_fid ON farcaster_events (fid, received_at)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def write_batch(self, events: List[WebhookEvent]) -> int:
+        with self._lock:
+            conn = self._connection()
+            before = conn.total_changes
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO farcaster_events "
+                    "(idempotency_key, received_at, action_type, fid, valid, payload) VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (e.idempotency_key, e.received_at, e.action_type, e.fid, int(e.valid), e.payload)
+                        for e in events
+                    ],
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return conn.total_changes - before
+
+    def count(self) -> int:
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM farcaster_events").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class JSONLWebhookSink(WebhookEventSink):
+    """
+    Events appended to a JSON Lines log
+
+    Duplicates are detected against the most recent `dedupe_window` keys,
+    loaded from the log on first write; Farcaster retries arrive within
+    minutes, so an unbounded key set isn't needed.
+    """
+
+    def __init__(self, path: str, dedupe_window: int = 100000):
+        self.path = path
+        self.dedupe_window = dedupe_window
+        self._lock = threading.Lock()
+        self._seen: Optional["OrderedDict[str, None]"] = None
+
+    def _remember(self, key: str) -> None:
+        self._seen[key] = None
+        while len(self._seen) > self.dedupe_window:
+            self._seen.popitem(last=False)
+
+    def _load_seen(self) -> None:
+        self._seen = OrderedDict()
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    self._remember(json.loads(line)["idempotency_key"])
+                except (ValueError, KeyError):
+                    # A torn last line from a crash mid-write
+                    continue
+
+    def write_batch(self, events: List[WebhookEvent]) -> int:
+        with self._lock:
+            if self._seen is None:
+                self._load_seen()
+            lines = []
+            for event in events:
+                if event.idempotency_key in self._seen:
+                    continue
+                self._remember(event.idempotency_key)
+                lines.append(event.model_dump_json() + "\n")
+            if lines:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write("".join(lines))
+                    f.flush()
+                    os.fsync(f.fileno())
+            return len(lines)
+
+
+def create_webhook_sink() -> WebhookEventSink:
+    """Build the event sink selected by FARCASTER_EVENT_STORE (sqlite or jsonl)"""
+    backend = os.environ.get("FARCASTER_EVENT_STORE", "sqlite").lower()
+    if backend == "sqlite":
+        return SQLiteWebhookSink(os.environ.get("FARCASTER_EVENT_DB", "farcaster_events.db"))
+    if backend == "jsonl":
+        return JSONLWebhookSink(os.environ.get("FARCASTER_EVENT_LOG", "farcaster_events.jsonl"))
+    raise ValueError(f"Unknown FARCASTER_EVENT_STORE backend: {backend}")
+
+
+class WebhookIngestQueue:
+    """Bounded queue of accepted events, written to the sink in batches by one background task"""
+
+    def __init__(
+        self,
+        sink: WebhookEventSink,
+        max_size: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 0.5,
+        retry_seconds: float = 0.5,
+        max_retry_seconds: float = 30.0,
+        max_write_attempts: int = 3,
+    ):
+        """
+        Args:
+            sink: Where events are persisted
+            max_size: Events held in memory before deliveries are refused
+            batch_size: Most events written per transaction
+            flush_interval: Longest time an event waits for its batch to fill
+            retry_seconds: First delay before a failed batch is written again
+            max_retry_seconds: Backoff ceiling between attempts
+            max_write_attempts: Failed attempts before the batch is written event
+                by event to find events the sink rejects
+        """
+        self.sink = sink
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_seconds = retry_seconds
+        self.max_retry_seconds = max_retry_seconds
+        self.max_write_attempts = max_write_attempts
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        # Batch the writer has taken off the queue but not yet written
+        self._pending: List[WebhookEvent] = []
+
+    @classmethod
+    def from_env(cls) -> "WebhookIngestQueue":
+        """Configure from FARCASTER_EVENT_* environment variables"""
+        return cls(
+            create_webhook_sink(),
+            max_size=int(os.environ.get("FARCASTER_EVENT_QUEUE_SIZE", "10000")),
+            batch_size=int(os.environ.get("FARCASTER_EVENT_BATCH_SIZE", "500")),
+            flush_interval=float(os.environ.get("FARCASTER_EVENT_FLUSH_SECONDS", "0.5")),
+        )
+
+    @property
+    def queue(self) -> asyncio.Queue:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_size)
+        return self._queue
+
+    async def start(self) -> None:
+        self._writer = asyncio.create_task(self._writer_loop())
+
+    async def stop(self) -> None:
+        """Stop the writer after flushing whatever is still queued"""
+        if self._writer is not None:
+            self._writer.cancel()
+            await asyncio.gather(self._writer, return_exceptions=True)
+            self._writer = None
+        if self._pending:
+            # Rewriting a batch the cancelled writer may have stored is harmless: keys dedupe
+            await self._write_or_drop(self._pending)
+            self._pending = []
+        await self.flush()
+        self.sink.close()
+
+    def offer(self, event: WebhookEvent) -> bool:
+        """Queue an event without waiting; False when the queue is full"""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            webhook_events.inc(outcome="rejected")
+            return False
+        webhook_events.inc(outcome="queued")
+        webhook_queue_depth.set(self.queue.qsize())
+        return True
+
+    async def flush(self) -> int:
+        """Write everything queued right now; returns how many new events were stored"""
+        stored = 0
+        while not self.queue.empty():
+            stored += await self._write_or_drop(self._take(self.batch_size))
+        return stored
+
+    def _take(self, limit: int) -> List[WebhookEvent]:
+        batch = []
+        while len(batch) < limit and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        return batch
+
+    async def _write(self, batch: List[WebhookEvent]) -> int:
+        """Write one batch; sink errors are counted and raised"""
+        start = time.perf_counter()
+        try:
+            stored = await asyncio.to_thread(self.sink.write_batch, batch)
+        except Exception:
+            webhook_events.inc(len(batch), outcome="write_error")
+            raise
+        finally:
+            webhook_flush_seconds.inc(time.perf_counter() - start)
+            webhook_queue_depth.set(self.queue.qsize())
+        webhook_events.inc(stored, outcome="stored")
+        if len(batch) > stored:
+            webhook_events.inc(len(batch) - stored, outcome="duplicate")
+        return stored
+
+    async def _write_or_drop(self, batch: List[WebhookEvent]) -> int:
+        """One attempt, for shutdown and explicit flushes where nothing is left to retry them"""
+        try:
+            return await self._write(batch)
+        except Exception as e:
+            webhook_events.inc(len(batch), outcome="dropped")
+            logger.error(f"Dropped {len(batch)} Farcaster events the sink would not take: {str(e)}")
+            return 0
+
+    async def _write_until_stored(self, batch: List[WebhookEvent]) -> None:
+        """
+        Write the writer's batch, retrying with backoff until the sink takes it
+
+        After max_write_attempts the events are written one by one: when some
+        are stored, the ones that fail are poison and dropped; when none are,
+        the sink itself is down and the whole batch is retried. Events queued
+        meanwhile join the batch, so a lone poison event still has company to
+        be told apart by.
+        """
+        delay = self.retry_seconds
+        attempts = 0
+        while batch:
+            try:
+                await self._write(batch)
+                return
+            except Exception as e:
+                attempts += 1
+                logger.warning(
+                    f"Failed to write {len(batch)} Farcaster events (attempt {attempts}), "
+                    f"retrying in {delay:.1f}s: {str(e)}"
+                )
+            if attempts >= self.max_write_attempts:
+                batch = await self._drop_poison(batch)
+                attempts = 0
+                if not batch:
+                    return
+            await asyncio.sleep(delay)
+            delay = min(self.max_retry_seconds, delay * 2)
+            batch.extend(self._take(self.batch_size - len(batch)))
+
+    async def _drop_poison(self, batch: List[WebhookEvent]) -> List[WebhookEvent]:
+        """Write events one at a time; returns the batch still to write (empty once done)"""
+        failed = await self._write_each(batch)
+        if len(failed) == len(batch):
+            # Nothing went through: the sink is down, not the events
+            return batch
+        # The sink works; give events that hit it while it was recovering a second chance
+        failed = await self._write_each(failed)
+        if failed:
+            webhook_events.inc(len(failed), outcome="dropped")
+            logger.error(
+                f"Dropped {len(failed)} Farcaster events the sink rejects: "
+                + ", ".join(event.idempotency_key for event in failed)
+            )
+        return []
+
+    async def _write_each(self, events: List[WebhookEvent]) -> List[WebhookEvent]:
+        """Events the sink refused when written one per batch"""
+        failed = []
+        for event in events:
+            try:
+                await self._write([event])
+            except Exception:
+                failed.append(event)
+        return failed
+
+    async def _writer_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = self._pending = [await self.queue.get()]
+            deadline = loop.time() + self.flush_interval
+            # Give a burst time to fill the batch, but never hold an event past the interval
+            while len(batch) < self.batch_size:
+                batch.extend(self._take(self.batch_size - len(batch)))
+                remaining = deadline - loop.time()
+                if len(batch) >= self.batch_size or remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            await self._write_until_stored(batch)
+            self._pending = []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self.queue.qsize(),
+            "max_size": self.max_size,
+            "writer_running": self._writer is not None and not self._writer.done(),
+            **{outcome: webhook_events.value(outcome=outcome)
+               for outcome in ("queued", "rejected", "stored", "duplicate", "write_error", "dropped")},
+        }
@@ -0,0 +1,124 @@
+"""
+Splitting long recordings into chunks analyzed as parallel Hume jobs
+
+One Hume job per recording means latency grows with the length of the pitch
+and a failed job loses all of it. split_recording cuts a long recording at
+pauses into chunks of roughly `chunk_seconds`, each extended by
+`overlap_seconds` on both sides so words at a cut are heard whole by at least
+one chunk. Every chunk owns the stretch between its cuts; stitch_timestamps
+shifts each chunk's segments onto the recording's timeline and keeps a segment
+only from the chunk that owns its midpoint, dropping the duplicates the
+overlap produces.
+"""
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import numpy as np
+from audio_preprocess import SPEECH_SAMPLE_RATE, decode_audio, encode_audio, speech_spans
+
+
+class AudioChunk(NamedTuple):
+    data: bytes
+    start: float
+    end: float
+    own_start: float
+    own_end: float
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+def plan_cuts(
+    samples: np.ndarray,
+    sample_rate: int,
+    chunk_seconds: float,
+    min_pause_seconds: float = 0.3
+) -> List[int]:
+    """
+    Sample offsets to cut at, nearest a pause to every `chunk_seconds`
+
+    A cut goes in the middle of the pause closest to where the chunk would
+    end, looking up to half a chunk either way; with no pause in reach the
+    chunk is cut at its nominal length. A remainder shorter than half a
+    chunk stays with the last chunk.
+    """
+    total = len(samples)
+    chunk = int(chunk_seconds * sample_rate)
+    if total <= chunk * 1.5:
+        return []
+    spans = speech_spans(samples, sample_rate, max_gap_seconds=min_pause_seconds, pad_seconds=0)
+    pauses = [(end + begin) // 2 for (_, end), (begin, _) in zip(spans, spans[1:])]
+
+    cuts = []
+    last = 0
+    while total - last > chunk * 1.5:
+        target = last + chunk
+        reachable = [pause for pause in pauses if last + chunk // 2 <= pause <= last + chunk * 3 // 2]
+        cut = min(reachable, key=lambda pause: abs(pause - target)) if reachable else target
+        cuts.append(cut)
+        last = cut
+    return cuts
+
+
+def split_recording(
+    data: bytes,
+    chunk_seconds: float,
+    overlap_seconds: float = 1.0,
+    sample_rate: int = SPEECH_SAMPLE_RATE
+) -> List[AudioChunk]:
+    """
+    Chunks of a recording, or a single chunk when it is not long enough to split
+
+    Raises:
+        UnsupportedAudio: when the recording cannot be decoded here
+    """
+    samples = decode_audio(data, sample_rate)
+    cuts = plan_cuts(samples, sample_rate, chunk_seconds)
+    if not cuts:
+        duration = len(samples) / sample_rate
+        return [AudioChunk(data, 0.0, duration, 0.0, duration)]
+
+    bounds = [0] + cuts + [len(samples)]
+    overlap = int(overlap_seconds * sample_rate)
+    chunks = []
+    for own_start, own_end in zip(bounds, bounds[1:]):
+        start, end = max(0, own_start - overlap), min(len(samples), own_end + overlap)
+        encoded, _ = encode_audio(samples[start:end], sample_rate)
+        chunks.append(AudioChunk(
+            encoded, start / sample_rate, end / sample_rate, own_start / sample_rate, own_end / sample_rate
+        ))
+    return chunks
+
+
+def stitch_timestamps(chunk_results: List[Tuple[AudioChunk, Dict[str, Any]]]) -> Tuple[List[Dict[str, Any]], str]:
+    """
+    One timeline from the processed results of every chunk
+
+    Returns:
+        (timestamps on the recording's timeline in time order, detected language)
+    """
+    timeline = []
+    detected_language = ""
+    last = len(chunk_results) - 1
+    for index, (chunk, processed) in enumerate(chunk_results):
+        analysis = processed["analysis"]
+        detected_language = detected_language or analysis["transcription"].get("detected_language", "")
+        for segment in analysis["timestamps"]:
+            begin = segment["timestamp"]["begin"] + chunk.start
+            end = segment["timestamp"]["end"] + chunk.start
+            middle = (begin + end) / 2
+            if chunk.own_start <= middle and (middle < chunk.own_end or index == last):
+                timeline.append({**segment, "timestamp": {"begin": round(begin, 3), "end": round(end, 3)}})
+    timeline.sort(key=lambda segment: segment["timestamp"]["begin"])
+    return timeline, detected_language
+
+
+def chunk_summary(chunk: AudioChunk, processed: Optional[Dict[str, Any]], attempts: int) -> Dict[str, Any]:
+    """Per-chunk entry of the stitched result's metadata"""
+    metadata = (processed or {}).get("metadata", {})
+    return {
+        "start": round(chunk.start, 3),
+        "end": round(chunk.end, 3),
+        "hume_job_id": metadata.get("hume_job_id"),
+        "attempts": attempts,
+        "success": bool(processed and processed.get("success")),
+    }
@@ -0,0 +1,105 @@
+"""
+Packing several recordings into one Hume batch job
+
+A Hume job accepts a list of files, and every job pays its own queue wait and
+status polling. HumeJobPacker collects recordings that arrive within a short
+window (or until it holds `max_files`), submits them as one job and hands each
+caller the result for its own file. A caller that goes away before its file is
+submitted is simply left out of the job.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, BinaryIO, Callable, Dict, List, Optional, Set
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+packed_jobs = metrics.counter("hume_packed_jobs_total", "Hume jobs submitted by the job packer")
+files_per_job = metrics.histogram(
+    "hume_files_per_job", "Recordings packed into each Hume job", buckets=(1, 2, 3, 5, 10, 20, 50, 100)
+)
+
+# Submits files as one job: (files, durations, timeout) -> one processed result per file
+SubmitFiles = Callable[[List[BinaryIO], List[Optional[float]], float], Awaitable[List[Dict[str, Any]]]]
+
+
+class _PackedFile:
+    def __init__(self, audio_file: BinaryIO, audio_duration: Optional[float], timeout_seconds: float,
+                 future: asyncio.Future):
+        self.audio_file = audio_file
+        self.audio_duration = audio_duration
+        self.timeout_seconds = timeout_seconds
+        self.future = future
+
+
+class HumeJobPacker:
+    """Coalesces concurrent analyses into shared Hume jobs"""
+
+    def __init__(self, submit: SubmitFiles, window_seconds: float = 0.25, max_files: int = 20):
+        """
+        Args:
+            submit: Submits a list of files as one job and returns their results in order
+            window_seconds: How long the first file of a job waits for company
+            max_files: Files per job; a full job is submitted without waiting out the window
+        """
+        self.submit = submit
+        self.window_seconds = window_seconds
+        self.max_files = max_files
+        self._pending: List[_PackedFile] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._jobs: Set[asyncio.Task] = set()
+
+    async def analyze(
+        self,
+        audio_file: BinaryIO,
+        timeout_seconds: float = 300,
+        audio_duration: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Processed results for one file, analyzed in a job shared with whatever else arrives"""
+        loop = asyncio.get_running_loop()
+        packed = _PackedFile(audio_file, audio_duration, timeout_seconds, loop.create_future())
+        self._pending.append(packed)
+        if len(self._pending) >= self.max_files:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_seconds, self.flush)
+        return await packed.future
+
+    def flush(self) -> None:
+        """Submit everything collected so far as one job"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch = [packed for packed in self._pending if not packed.future.done()]
+        self._pending = []
+        if not batch:
+            return
+        job = asyncio.ensure_future(self._run(batch))
+        self._jobs.add(job)
+        job.add_done_callback(self._jobs.discard)
+
+    async def _run(self, batch: List[_PackedFile]) -> None:
+        packed_jobs.inc()
+        files_per_job.observe(len(batch))
+        try:
+            results = await self.submit(
+                [packed.audio_file for packed in batch],
+                [packed.audio_duration for packed in batch],
+                max(packed.timeout_seconds for packed in batch),
+            )
+        except Exception as e:
+            for packed in batch:
+                if not packed.future.done():
+                    packed.future.set_exception(e)
+            return
+        for packed, result in zip(batch, results):
+            if not packed.future.done():
+                packed.future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "window_seconds": self.window_seconds,
+            "max_files": self.max_files,
+            "waiting": len(self._pending),
+            "jobs_in_flight": len(self._jobs),
+        }
@@ -1,31 +1,134 @@
 import asyncio
+import io
 import os
 import tempfile
 import time
-from typing import Dict, Any, Optional, BinaryIO
-from hume import HumeClient
+from typing import Dict, Any, Optional, BinaryIO, Tuple, List, Union, Callable, Awaitable
+from hume import AsyncHumeClient
 from hume.expression_measurement.batch import Prosody, Models, Language
 from hume.expression_measurement.batch.types import InferenceBaseRequest
+from poll_scheduler import HumePollScheduler
+from hume_job_packer import HumeJobPacker
+from audio_preprocess import AudioPreprocessor, UnsupportedAudio, audio_preprocessor, read_rewound, remap_timestamps
+from hume_chunking import AudioChunk, chunk_summary, split_recording, stitch_timestamps
+from emotion_matrix import EmotionMatrix, EmotionMatrixBuilder
+from sentiment_stats import compute_sentiment_statistics
+from result_cache import ResultCache, result_cache, make_cache_key
+from outbound_http import OutboundHTTP, outbound_http
+from metrics import stage_seconds
 import logging
 from dotenv import load_dotenv
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever _process_results changes shape so cached analyses are not reused
+RESULTS_FORMAT_VERSION = 2
+
+# How long an explicit batch waits for files still being looked up in the cache
+BATCH_SETTLE_SECONDS = 0.05
+
 class HumeAudioService:
     """Service for analyzing audio expression using Hume AI"""
     
-    def __init__(self):
-        self.api_key = os.environ.get("HUME_API_KEY")
-        if not self.api_key:
-            raise ValueError("HUME_API_KEY environment variable is required")
+    def __init__(
+        self,
+        client: Optional[AsyncHumeClient] = None,
+        max_concurrent_requests: Optional[int] = None,
+        poll_interval_seconds: float = 1,
+        cache: Optional[ResultCache] = result_cache,
+        http: Optional[OutboundHTTP] = outbound_http,
+        batch_window_seconds: Optional[float] = None,
+        batch_max_files: Optional[int] = None,
+        preprocessor: Optional[AudioPreprocessor] = audio_preprocessor,
+        chunk_seconds: Optional[float] = None,
+        max_parallel_chunks: Optional[int] = None,
+        chunk_retries: Optional[int] = None
+    ):
+        """
+        Args:
+            client: Pre-configured async Hume client (defaults to one built from HUME_API_KEY)
+            max_concurrent_requests: Upper bound on Hume API calls in flight at once
+            poll_interval_seconds: Shortest delay between status checks of a job
+            cache: Result cache for repeated uploads (None disables caching)
+            http: Shared connection pool for the default client (None lets the SDK build its own)
+            batch_window_seconds: Pack recordings arriving within this window into one
+                Hume job (0 submits each on its own; defaults to HUME_BATCH_WINDOW_SECONDS)
+            batch_max_files: Most recordings packed into one job
+            preprocessor: Trims and re-encodes recordings before upload (None sends them as they are)
+            chunk_seconds: Split recordings longer than this (by half again) into chunks analyzed
+                as parallel jobs (0 never splits; defaults to HUME_CHUNK_SECONDS)
+            max_parallel_chunks: Chunk jobs of one recording in flight at once
+            chunk_retries: Times a failed chunk is resubmitted before the analysis fails
+        """
+        if client is None:
+            self.api_key = os.environ.get("HUME_API_KEY")
+            if not self.api_key:
+                raise ValueError("HUME_API_KEY environment variable is required")
+            # Job polls reuse warm pooled connections instead of a handshake each
+            client = AsyncHumeClient(
+                api_key=self.api_key,
+                base_url=os.environ.get("HUME_BASE_URL"),
+                httpx_client=http.client if http is not None else None
+            )
+        
+        self.client = client
+        self.cache = cache
+        self.preprocessor = preprocessor
+        
+        # Hume POSTs predictions here on completion when set, see /hume/callback
+        self.callback_url = os.environ.get("HUME_CALLBACK_URL")
+        if self.callback_url and not os.environ.get("HUME_CALLBACK_TOKEN"):
+            # /hume/callback refuses unauthenticated deliveries, so don't ask Hume for any
+            logger.warning("HUME_CALLBACK_URL is set without HUME_CALLBACK_TOKEN; callbacks disabled")
+            self.callback_url = None
+        
+        # The async client never blocks the event loop, but every in-flight call
+        # still holds a connection and counts against the provider rate limit
+        if max_concurrent_requests is None:
+            max_concurrent_requests = int(os.environ.get("HUME_MAX_CONCURRENT_REQUESTS", "32"))
+        self._request_slots = asyncio.Semaphore(max_concurrent_requests)
+        
+        # Off by default: packing trades up to one window of latency for fewer Hume jobs
+        if batch_window_seconds is None:
+            batch_window_seconds = float(os.environ.get("HUME_BATCH_WINDOW_SECONDS", "0"))
+        if batch_max_files is None:
+            batch_max_files = int(os.environ.get("HUME_BATCH_MAX_FILES", "20"))
+        self.packer = HumeJobPacker(
+            self._analyze_files, window_seconds=batch_window_seconds, max_files=batch_max_files
+        ) if batch_window_seconds > 0 else None
+        
+        # Off by default: chunking needs decodable audio (WAV, or anything with ffmpeg)
+        if chunk_seconds is None:
+            chunk_seconds = float(os.environ.get("HUME_CHUNK_SECONDS", "0"))
+        if max_parallel_chunks is None:
+            max_parallel_chunks = int(os.environ.get("HUME_MAX_PARALLEL_CHUNKS", "4"))
+        if chunk_retries is None:
+            chunk_retries = int(os.environ.get("HUME_CHUNK_RETRIES", "2"))
+        self.chunk_seconds = chunk_seconds
+        self.chunk_overlap_seconds = float(os.environ.get("HUME_CHUNK_OVERLAP_SECONDS", "1.0"))
+        self.max_parallel_chunks = max_parallel_chunks
+        self.chunk_retries = chunk_retries
         
-        self.client = HumeClient(api_key=self.api_key)
+        self.poll_scheduler = HumePollScheduler(
+            self.client.expression_measurement.batch,
+            call=self._call,
+            min_interval=poll_interval_seconds,
+            max_interval=float(os.environ.get("HUME_MAX_POLL_INTERVAL", "30")),
+            callback_enabled=bool(self.callback_url),
+        )
+    
+    async def _call(self, method, *args, **kwargs):
+        """Await a Hume SDK call while holding one of the bounded request slots"""
+        async with self._request_slots:
+            return await method(*args, **kwargs)
     
     async def analyze_audio_expression(
         self, 
         audio_file: BinaryIO, 
-        timeout_seconds: int = 300
+        timeout_seconds: int = 300,
+        audio_duration: Optional[float] = None,
+        content_hash: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Analyze audio file for expression measurement
@@ -33,62 +136,286 @@ class HumeAudioService:
         Args:
             audio_file: Binary audio file data
             timeout_seconds: Maximum time to wait for results
+            audio_duration: Recording length in seconds, used to time the first status check
+            content_hash: SHA-256 of the audio bytes; enables the result cache
             
         Returns:
             Dict containing expression analysis results
         """
+        return await self._analyze_cached(
+            audio_file, timeout_seconds, audio_duration, content_hash, self._analyze
+        )
+    
+    async def _analyze_cached(
+        self,
+        audio_file: BinaryIO,
+        timeout_seconds: int,
+        audio_duration: Optional[float],
+        content_hash: Optional[str],
+        analyze: Callable[[BinaryIO, int, Optional[float]], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        if content_hash and self.cache is not None:
+            return await self.cache.get_or_compute(
+                make_cache_key("hume", content_hash, self.cache_config()),
+                lambda: self._analyze_preprocessed(audio_file, timeout_seconds, audio_duration, analyze),
+                namespace="hume",
+                cache_if=lambda result: result.get("success", False)
+            )
+        return await self._analyze_preprocessed(audio_file, timeout_seconds, audio_duration, analyze)
+    
+    async def _analyze_preprocessed(
+        self,
+        audio_file: BinaryIO,
+        timeout_seconds: int,
+        audio_duration: Optional[float],
+        analyze: Callable[[BinaryIO, int, Optional[float]], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """Analyze the trimmed, re-encoded recording and report times on the original one"""
+        prepared = await self.preprocessor.run(audio_file) if self.preprocessor is not None else None
+        if prepared is None:
+            return await analyze(audio_file, timeout_seconds, audio_duration)
+        processed = await analyze(io.BytesIO(prepared.data), timeout_seconds, prepared.processed_seconds)
+        remap_timestamps(processed, prepared.offsets)
+        processed["metadata"]["preprocessing"] = prepared.summary()
+        return processed
+    
+    def cache_config(self) -> Dict[str, Any]:
+        """Everything besides the audio bytes that determines the analysis output"""
+        config = {
+            "models": ["prosody", "language"],
+            "results_format": RESULTS_FORMAT_VERSION
+        }
+        if self.preprocessor is not None:
+            config["preprocess"] = self.preprocessor.config()
+        if self.chunk_seconds > 0:
+            config["chunks"] = {"seconds": self.chunk_seconds, "overlap": self.chunk_overlap_seconds}
+        return config
+    
+    async def _analyze(
+        self,
+        audio_file: BinaryIO,
+        timeout_seconds: int,
+        audio_duration: Optional[float]
+    ) -> Dict[str, Any]:
+        """Submit the audio to Hume and process the job results"""
+        if self.chunk_seconds > 0 and (audio_duration is None or audio_duration > self.chunk_seconds * 1.5):
+            chunks = await self._split(audio_file)
+            if len(chunks) > 1:
+                return await self._analyze_chunks(chunks, timeout_seconds)
+        return await self._analyze_whole(audio_file, timeout_seconds, audio_duration)
+    
+    async def _analyze_whole(
+        self,
+        audio_file: BinaryIO,
+        timeout_seconds: int,
+        audio_duration: Optional[float]
+    ) -> Dict[str, Any]:
+        """Analyze the recording as one file of a Hume job"""
+        if self.packer is not None:
+            return await self.packer.analyze(audio_file, timeout_seconds, audio_duration)
+        [processed] = await self._analyze_files([audio_file], [audio_duration], timeout_seconds)
+        return processed
+    
+    async def _split(self, audio_file: BinaryIO) -> List[AudioChunk]:
+        """Chunks of a long recording; empty when it cannot be decoded, leaving the file rewound"""
+        data = await asyncio.to_thread(read_rewound, audio_file)
+        try:
+            with stage_seconds.time(stage="chunk_split"):
+                return await asyncio.to_thread(
+                    split_recording, data, self.chunk_seconds, self.chunk_overlap_seconds
+                )
+        except UnsupportedAudio as e:
+            logger.info(f"Analyzing recording in one job, it cannot be split: {str(e)}")
+            return []
+    
+    async def _analyze_chunks(self, chunks: List[AudioChunk], timeout_seconds: int) -> Dict[str, Any]:
+        """
+        Analyze chunks as parallel jobs and stitch their segments into one result
+        
+        Only chunks whose job failed are resubmitted, up to chunk_retries times;
+        the analysis fails if any chunk still has no result after that.
+        """
+        started = time.perf_counter()
+        slots = asyncio.Semaphore(self.max_parallel_chunks)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(chunks)
+        attempts = [0] * len(chunks)
+        errors: Dict[int, str] = {}
+        
+        async def run(index: int) -> None:
+            chunk = chunks[index]
+            async with slots:
+                attempts[index] += 1
+                try:
+                    processed = await self._analyze_whole(io.BytesIO(chunk.data), timeout_seconds, chunk.duration)
+                except Exception as e:
+                    errors[index] = str(e)
+                    return
+            if processed.get("success"):
+                results[index] = processed
+                errors.pop(index, None)
+            else:
+                errors[index] = processed.get("error") or "analysis failed"
+        
+        pending = list(range(len(chunks)))
+        for attempt in range(self.chunk_retries + 1):
+            if attempt:
+                logger.warning(f"Retrying {len(pending)} of {len(chunks)} chunks: {errors}")
+            await asyncio.gather(*(run(index) for index in pending))
+            pending = [index for index in pending if results[index] is None]
+            if not pending:
+                break
+        
+        if pending:
+            processed = self._process_results([])
+            processed["success"] = False
+            processed["error"] = "; ".join(f"chunk {index}: {errors[index]}" for index in pending)
+        else:
+            timestamps, detected_language = stitch_timestamps(list(zip(chunks, results)))
+            processed = self.summarize_segments(timestamps, detected_language)
+        processed["metadata"]["processing_time"] = time.perf_counter() - started
+        processed["metadata"]["chunks"] = [
+            chunk_summary(chunk, result, tries) for chunk, result, tries in zip(chunks, results, attempts)
+        ]
+        return processed
+    
+    async def analyze_audio_batch(
+        self,
+        audio_files: List[BinaryIO],
+        timeout_seconds: int = 300,
+        audio_durations: Optional[List[Optional[float]]] = None,
+        content_hashes: Optional[List[Optional[str]]] = None
+    ) -> List[Union[Dict[str, Any], Exception]]:
+        """
+        Analyze several recordings submitted together, as a single Hume job
+        
+        Recordings found in the result cache are not resubmitted; the rest
+        share one job. Each entry of the result is what analyze_audio_expression
+        would have returned for that file, or the exception it raised.
+        
+        Args:
+            audio_files: Binary audio files
+            timeout_seconds: Maximum time to wait for the job
+            audio_durations: Recording length of each file in seconds, if known
+            content_hashes: SHA-256 of each file's bytes; enables the result cache
+        """
+        count = len(audio_files)
+        audio_durations = audio_durations or [None] * count
+        content_hashes = content_hashes or [None] * count
+        # Cache hits never reach the packer, so the window only bounds the wait for the misses
+        packer = HumeJobPacker(self._analyze_files, window_seconds=BATCH_SETTLE_SECONDS, max_files=count)
+        return await asyncio.gather(
+            *(
+                self._analyze_cached(audio_file, timeout_seconds, duration, content_hash, packer.analyze)
+                for audio_file, duration, content_hash in zip(audio_files, audio_durations, content_hashes)
+            ),
+            return_exceptions=True
+        )
+    
+    async def _analyze_files(
+        self,
+        audio_files: List[BinaryIO],
+        audio_durations: List[Optional[float]],
+        timeout_seconds: int
+    ) -> List[Dict[str, Any]]:
+        """Submit files as one Hume job; returns processed results per file, in order"""
+        started = time.perf_counter()
         try:
             # Create prosody configuration for audio analysis
             prosody_config = Prosody()
             models_chosen = Models(prosody=prosody_config, language=Language())
             
             # Create inference request configuration
-            inference_request = InferenceBaseRequest(models=models_chosen)
+            if self.callback_url:
+                inference_request = InferenceBaseRequest(models=models_chosen, callback_url=self.callback_url)
+            else:
+                inference_request = InferenceBaseRequest(models=models_chosen)
+            
+            # Unique names let the predictions be matched back to their file
+            filenames = [f"recording-{index}" for index in range(len(audio_files))]
             
             # Start inference job
-            job_id = self.client.expression_measurement.batch.start_inference_job_from_local_file(
-                json=inference_request,
-                file=[audio_file]
-            )
+            with stage_seconds.time(stage="hume_submit"):
+                job_id = await self._call(
+                    self.client.expression_measurement.batch.start_inference_job_from_local_file,
+                    json=inference_request,
+                    file=[(filename, audio_file) for filename, audio_file in zip(filenames, audio_files)]
+                )
+            submitted = time.perf_counter()
             
-            logger.info(f"Started Hume analysis job: {job_id}")
+            logger.info(f"Started Hume analysis job: {job_id} ({len(audio_files)} files)")
             
-            # Poll for results
-            results = await self._wait_for_results(job_id, timeout_seconds)
+            # Poll for results; Hume's work grows with the total audio length
+            known_durations = [duration for duration in audio_durations if duration]
+            results, poll_count, timings = await self._wait_for_results(
+                job_id, timeout_seconds, sum(known_durations) if known_durations else None
+            )
+            waited = time.perf_counter()
+            stage_seconds.observe(waited - submitted, stage="hume_wait")
             
             # Process and return the results
-            processed = self._process_results(results)
-            return processed
+            processed_files = [
+                self._process_source(source_results)
+                for source_results in self._split_by_source(results, filenames)
+            ]
+            finished = time.perf_counter()
+            stage_seconds.observe(finished - waited, stage="process_results")
+            for processed in processed_files:
+                processed["metadata"]["hume_job_id"] = job_id
+                processed["metadata"]["status_checks"] = poll_count
+                processed["metadata"]["job_files"] = len(audio_files)
+                processed["metadata"]["processing_time"] = finished - started
+                processed["metadata"]["stage_seconds"] = {
+                    "hume_submit": submitted - started,
+                    "hume_wait": waited - submitted,
+                    **timings,
+                    "process_results": finished - waited,
+                }
+            return processed_files
             
         except Exception as e:
             logger.error(f"Error analyzing audio with Hume: {str(e)}")
             raise
     
-    async def _wait_for_results(self, job_id: str, timeout_seconds: int) -> Dict[str, Any]:
-        """Wait for job completion and return results"""
-        start_time = time.time()
-        
-        while time.time() - start_time < timeout_seconds:
-            try:
-                # Get job details
-                job_details = self.client.expression_measurement.batch.get_job_details(job_id)
-                
-                if job_details.state.status == "COMPLETED":
-                    # Get job predictions/results
-                    predictions = self.client.expression_measurement.batch.get_job_predictions(job_id)
-                    return predictions
-                elif job_details.state.status == "FAILED":
-                    error_msg = getattr(job_details.state, 'message', 'Unknown error')
-                    raise Exception(f"Hume job failed: {error_msg}")
-                
-                # Wait before polling again
-                await asyncio.sleep(2)
-                
-            except Exception as e:
-                logger.error(f"Error polling job {job_id}: {str(e)}")
-                raise
-        
-        raise TimeoutError(f"Hume analysis timed out after {timeout_seconds} seconds")
+    @staticmethod
+    def _split_by_source(results: List[Any], filenames: List[str]) -> List[List[Any]]:
+        """Predictions of a job grouped per submitted file, by the source filename Hume echoes back"""
+        by_file: Dict[str, List[Any]] = {filename: [] for filename in filenames}
+        unmatched = []
+        for result in results or []:
+            filename = getattr(getattr(result, "source", None), "filename", None)
+            if filename in by_file:
+                by_file[filename].append(result)
+            else:
+                unmatched.append(result)
+        if unmatched and len(filenames) == 1:
+            # A single file owns every prediction, whatever name came back
+            by_file[filenames[0]].extend(unmatched)
+        elif unmatched:
+            logger.warning(f"Dropped {len(unmatched)} Hume predictions that match no submitted file")
+        return [by_file[filename] for filename in filenames]
+    
+    def _process_source(self, source_results: List[Any]) -> Dict[str, Any]:
+        """Processed results for one file, or a failure naming Hume's error for it"""
+        if not any(getattr(result, "results", None) for result in source_results):
+            errors = [result.error for result in source_results if getattr(result, "error", None)]
+            processed = self._process_results([])
+            processed["success"] = False
+            processed["error"] = "; ".join(errors) or "No predictions returned for this file"
+            return processed
+        return self._process_results(source_results)
+    
+    async def _wait_for_results(
+        self,
+        job_id: str,
+        timeout_seconds: int,
+        audio_duration: Optional[float] = None
+    ) -> Tuple[Any, int, Dict[str, float]]:
+        """Wait for job completion via the shared poll scheduler; returns (results, status checks, stage timings)"""
+        try:
+            return await self.poll_scheduler.wait_for(job_id, timeout_seconds, audio_duration)
+        except Exception as e:
+            logger.error(f"Error polling job {job_id}: {str(e)}")
+            raise
     
     def _process_results(self, results) -> Dict[str, Any]:
         """Process raw Hume results into a structured format"""
@@ -124,6 +451,9 @@ class HumeAudioService:
             transcription_segment_count = 0
             detected_language = ""
             
+            # Segment x emotion scores; the timestamps JSON is built from it once at the end
+            segments = EmotionMatrixBuilder()
+            
             # Process each result
             for result in results:
                 
@@ -174,12 +504,11 @@ class HumeAudioService:
                             for group in prosody_data.grouped_predictions:
                                 for pred in group.predictions:
                                     # Extract emotion scores
-                                    emotions = []
+                                    emotion_names = []
+                                    emotion_scores = []
                                     if hasattr(pred, 'emotions'):
-                                        emotions = [
-                                            {"name": emotion.name, "score": emotion.score}
-                                            for emotion in pred.emotions
-                                        ]
+                                        emotion_names = [emotion.name for emotion in pred.emotions]
+                                        emotion_scores = [emotion.score for emotion in pred.emotions]
                                     
                                     # Get timestamp info
                                     time_begin = pred.time.begin if hasattr(pred, 'time') else 0
@@ -195,18 +524,10 @@ class HumeAudioService:
                                         transcription_confidence_total += confidence
                                         transcription_segment_count += 1
                                     
-                                    segment_data = {
-                                        "text": text,
-                                        "confidence": confidence,
-                                        "timestamp": {
-                                            "begin": time_begin,
-                                            "end": time_end
-                                        },
-                                        "emotions": self._extract_top_emotions(emotions),
-                                        "all_emotions": emotions
-                                    }
-                                    
-                                    processed_results["analysis"]["timestamps"].append(segment_data)
+                                    segments.add(
+                                        text, confidence, time_begin, time_end,
+                                        emotion_names, emotion_scores
+                                    )
             
             # Combine transcript segments into full text
             if full_text_segments:
@@ -218,9 +539,10 @@ class HumeAudioService:
                 processed_results["analysis"]["transcription"]["detected_language"] = detected_language
 
             # Calculate overall sentiment
-            processed_results["analysis"]["overall_sentiment"] = self._calculate_overall_sentiment(
-                processed_results["analysis"]["timestamps"]
-            )
+            matrix = segments.build()
+            processed_results["analysis"]["timestamps"] = matrix.to_timestamps()
+            processed_results["analysis"]["overall_sentiment"] = self._overall_sentiment(matrix)
+            processed_results["analysis"]["statistics"] = compute_sentiment_statistics(matrix)
             
         except Exception as e:
             logger.error(f"Error processing Hume results: {str(e)}")
@@ -229,6 +551,54 @@ class HumeAudioService:
         
         return processed_results
     
+    def segment_record(
+        self,
+        text: str,
+        confidence: float,
+        time_begin: float,
+        time_end: float,
+        emotions: list
+    ) -> Dict[str, Any]:
+        """One `timestamps` entry of the processed analysis"""
+        return {
+            "text": text,
+            "confidence": confidence,
+            "timestamp": {
+                "begin": time_begin,
+                "end": time_end
+            },
+            "emotions": self._extract_top_emotions(emotions),
+            "all_emotions": emotions
+        }
+    
+    def summarize_segments(self, timestamps: list, detected_language: str = "") -> Dict[str, Any]:
+        """
+        Processed results for segments that were analyzed incrementally
+        
+        Produces the same structure as _process_results, with the transcription
+        assembled from the segment texts.
+        """
+        texts = [(segment["text"], segment["confidence"]) for segment in timestamps if segment["text"]]
+        matrix = EmotionMatrix.from_timestamps(timestamps)
+        return {
+            "success": True,
+            "analysis": {
+                "emotions": [],
+                "overall_sentiment": self._overall_sentiment(matrix),
+                "statistics": compute_sentiment_statistics(matrix),
+                "timestamps": timestamps,
+                "transcription": {
+                    "full_text": " ".join(text for text, _ in texts),
+                    "confidence": sum(confidence for _, confidence in texts) / len(texts) if texts else 0,
+                    "detected_language": detected_language
+                }
+            },
+            "metadata": {
+                "processing_time": None,
+                "confidence_scores": []
+            }
+        }
+    
     def _extract_top_emotions(self, emotions: list, top_n: int = 5) -> list:
         """Extract top N emotions by score"""
         if not emotions:
@@ -241,28 +611,14 @@ class HumeAudioService:
     
     def _calculate_overall_sentiment(self, timestamps: list) -> Dict[str, Any]:
         """Calculate overall sentiment from all timestamps"""
-        if not timestamps:
+        return self._overall_sentiment(EmotionMatrix.from_timestamps(timestamps))
+    
+    def _overall_sentiment(self, matrix: EmotionMatrix) -> Dict[str, Any]:
+        """Average of each segment's top 5 emotions, over all segments"""
+        if not len(matrix):
             return {}
         
-        emotion_totals = {}
-        total_segments = len(timestamps)
-        
-        # Aggregate emotion scores across all segments
-        for segment in timestamps:
-            for emotion in segment.get("emotions", []):
-                name = emotion["name"]
-                score = emotion["score"]
-                
-                if name in emotion_totals:
-                    emotion_totals[name] += score
-                else:
-                    emotion_totals[name] = score
-        
-        # Calculate averages
-        avg_emotions = {
-            name: total / total_segments 
-            for name, total in emotion_totals.items()
-        }
+        avg_emotions = matrix.top_k_mean(5)
         
         # Find dominant emotion
         dominant_emotion = max(avg_emotions.items(), key=lambda x: x[1]) if avg_emotions else ("neutral", 0)
@@ -273,7 +629,7 @@ class HumeAudioService:
                 "score": dominant_emotion[1]
             },
             "average_emotions": avg_emotions,
-            "total_segments_analyzed": total_segments
+            "total_segments_analyzed": len(matrix)
         }
 
 # Singleton instance
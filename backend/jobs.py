@@ -0,0 +1,519 @@
+"""
+Background analysis jobs
+
+Uploads are spooled to disk and recorded in a JobStore; a pool of worker
+tasks claims queued jobs and runs the Hume -> PitchScoringService pipeline,
+writing status, progress and results back to the store. The SQLite store lets
+several processes share one queue, so analysis workers can be scaled apart
+from the HTTP workers (see `python jobs.py`).
+
+Finished and failed jobs keep their full result for JOB_RETENTION_SECONDS
+(a day by default) after their last update, then the workers delete them.
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Dict, Any, Optional, List, AsyncIterator, Awaitable, Callable
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_PROCESSING = "processing"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+TERMINAL_STATUSES = (JOB_COMPLETED, JOB_FAILED)
+
+
+class AnalysisJob(BaseModel):
+    """State of a single background analysis job"""
+    job_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    user_id: Optional[str] = None
+    status: str = JOB_QUEUED
+    stage: str = "queued"
+    progress: int = 0
+    audio_path: Optional[str] = None
+    metadata: Dict[str, Any] = Field(default_factory=dict)
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: float = Field(default_factory=time.time)
+    updated_at: float = Field(default_factory=time.time)
+
+    def public_view(self) -> Dict[str, Any]:
+        """Job fields safe to return to the client"""
+        return self.model_dump(exclude={"audio_path"})
+
+
+class JobStore(ABC):
+    """Interface for job persistence backends"""
+
+    @abstractmethod
+    def create(self, job: AnalysisJob) -> AnalysisJob:
+        ...
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[AnalysisJob]:
+        ...
+
+    @abstractmethod
+    def update(self, job_id: str, **fields) -> Optional[AnalysisJob]:
+        ...
+
+    @abstractmethod
+    def claim_next(self) -> Optional[AnalysisJob]:
+        """Atomically move the oldest queued job to processing and return it"""
+
+    @abstractmethod
+    def requeue_stale(self, older_than: float) -> int:
+        """Return processing jobs abandoned by a dead worker to the queue"""
+
+    @abstractmethod
+    def delete_finished(self, older_than: float) -> int:
+        """Delete completed and failed jobs last updated before `older_than`"""
+
+
+class InMemoryJobStore(JobStore):
+    """Process-local job store"""
+
+    def __init__(self):
+        self._jobs: Dict[str, AnalysisJob] = {}
+        self._queue: deque = deque()
+        self._lock = threading.Lock()
+
+    def create(self, job: AnalysisJob) -> AnalysisJob:
+        with self._lock:
+            self._jobs[job.job_id] = job
+            if job.status == JOB_QUEUED:
+                self._queue.append(job.job_id)
+        return job
+
+    def get(self, job_id: str) -> Optional[AnalysisJob]:
+        return self._jobs.get(job_id)
+
+    def update(self, job_id: str, **fields) -> Optional[AnalysisJob]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job = job.model_copy(update={**fields, "updated_at": time.time()})
+            self._jobs[job_id] = job
+            if fields.get("status") == JOB_QUEUED:
+                self._queue.append(job_id)
+            return job
+
+    def claim_next(self) -> Optional[AnalysisJob]:
+        with self._lock:
+            while self._queue:
+                job_id = self._queue.popleft()
+                job = self._jobs.get(job_id)
+                if job is not None and job.status == JOB_QUEUED:
+                    job = job.model_copy(update={"status": JOB_PROCESSING, "updated_at": time.time()})
+                    self._jobs[job_id] = job
+                    return job
+        return None
+
+    def requeue_stale(self, older_than: float) -> int:
+        # Workers share this process, so a processing job can't outlive its worker
+        return 0
+
+    def delete_finished(self, older_than: float) -> int:
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job.status in TERMINAL_STATUSES and job.updated_at < older_than
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+        return len(expired)
+
+
+class SQLiteJobStore(JobStore):
+    """Job store persisted in SQLite, shareable between processes on one host"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS analysis_jobs (
+                job_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                data TEXT NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_analysis_jobs_status ON analysis_jobs (status, created_at)"
+        )
+
+    def _write(self, job: AnalysisJob) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO analysis_jobs (job_id, status, created_at, updated_at, data) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (job.job_id, job.status, job.created_at, job.updated_at, job.model_dump_json()),
+        )
+
+    def create(self, job: AnalysisJob) -> AnalysisJob:
+        with self._lock:
+            self._write(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[AnalysisJob]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM analysis_jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return AnalysisJob.model_validate_json(row[0]) if row else None
+
+    def update(self, job_id: str, **fields) -> Optional[AnalysisJob]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT data FROM analysis_jobs WHERE job_id = ?", (job_id,)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                job = AnalysisJob.model_validate_json(row[0]).model_copy(
+                    update={**fields, "updated_at": time.time()}
+                )
+                self._write(job)
+                self._conn.execute("COMMIT")
+                return job
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def claim_next(self) -> Optional[AnalysisJob]:
+        with self._lock:
+            # IMMEDIATE takes the write lock up front so two processes can't claim the same job
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT data FROM analysis_jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+                    (JOB_QUEUED,),
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                job = AnalysisJob.model_validate_json(row[0]).model_copy(
+                    update={"status": JOB_PROCESSING, "updated_at": time.time()}
+                )
+                self._write(job)
+                self._conn.execute("COMMIT")
+                return job
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def requeue_stale(self, older_than: float) -> int:
+        with self._lock:
+            # One transaction, so a job another process finishes meanwhile is not requeued
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT data FROM analysis_jobs WHERE status = ? AND updated_at < ?",
+                    (JOB_PROCESSING, older_than),
+                ).fetchall()
+                requeued = 0
+                for (data,) in rows:
+                    job = AnalysisJob.model_validate_json(data)
+                    if job.audio_path and os.path.exists(job.audio_path):
+                        update = {"status": JOB_QUEUED, "stage": "queued", "progress": 0}
+                        requeued += 1
+                    else:
+                        update = {"status": JOB_FAILED, "error": "Job was interrupted and its audio is gone"}
+                    self._write(job.model_copy(update={**update, "updated_at": time.time()}))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return requeued
+
+    def delete_finished(self, older_than: float) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                f"DELETE FROM analysis_jobs WHERE status IN ({', '.join('?' * len(TERMINAL_STATUSES))}) "
+                "AND updated_at < ?",
+                (*TERMINAL_STATUSES, older_than),
+            )
+        return cursor.rowcount
+
+
+# Pipeline signature: (job, report_progress) -> result dict
+ProgressReporter = Callable[[str, int], Awaitable[None]]
+JobPipeline = Callable[[AnalysisJob, ProgressReporter], Awaitable[Dict[str, Any]]]
+
+
+class AnalysisJobManager:
+    """Runs queued analysis jobs on a pool of background worker tasks"""
+
+    def __init__(
+        self,
+        store: JobStore,
+        pipeline: JobPipeline,
+        workers: int = 4,
+        spool_dir: Optional[str] = None,
+        idle_poll_seconds: float = 1.0,
+        stale_after_seconds: float = 900,
+        requeue_interval_seconds: float = 60,
+        retention_seconds: float = 86400,
+    ):
+        self.store = store
+        self.pipeline = pipeline
+        self.worker_count = workers
+        self.spool_dir = spool_dir or os.path.join(tempfile.gettempdir(), "pitch-analysis-jobs")
+        self.idle_poll_seconds = idle_poll_seconds
+        self.stale_after_seconds = stale_after_seconds
+        self.requeue_interval_seconds = requeue_interval_seconds
+        self.retention_seconds = retention_seconds
+        self._next_sweep_at = 0.0
+        os.makedirs(self.spool_dir, exist_ok=True)
+
+        self._workers: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._changed: Optional[asyncio.Condition] = None
+
+    async def start(self) -> None:
+        """Recover interrupted jobs and start the worker tasks"""
+        self._wakeup = asyncio.Event()
+        self._changed = asyncio.Condition()
+        await self._sweep()
+        self._workers = [
+            asyncio.create_task(self._worker_loop(i)) for i in range(self.worker_count)
+        ]
+        logger.info(f"Started {self.worker_count} analysis workers")
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def new_spool_path(self, suffix: str = "") -> str:
+        """Path inside the spool directory for an upload awaiting analysis"""
+        return os.path.join(self.spool_dir, f"{uuid.uuid4()}{suffix}")
+
+    async def submit(
+        self,
+        audio_path: str,
+        user_id: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> AnalysisJob:
+        """
+        Queue an already spooled audio file for analysis
+
+        Args:
+            audio_path: Spooled upload; the job owns it and deletes it when done,
+                and it is deleted here if the job cannot be stored
+            user_id: Owner of the job (JWT `sub`)
+            metadata: Client supplied upload details echoed back with the result
+
+        Returns:
+            The queued job
+        """
+        # Store calls can wait on SQLite locks held by other processes; keep them off the loop
+        try:
+            job = await asyncio.to_thread(self.store.create, AnalysisJob(
+                user_id=user_id,
+                audio_path=audio_path,
+                metadata=metadata or {},
+            ))
+        except Exception:
+            # No job will ever own the upload
+            if os.path.exists(audio_path):
+                os.remove(audio_path)
+            raise
+        if self._wakeup is not None:
+            self._wakeup.set()
+        await self._notify()
+        return job
+
+    async def get(self, job_id: str) -> Optional[AnalysisJob]:
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def watch(self, job_id: str) -> AsyncIterator[AnalysisJob]:
+        """Yield the job each time it changes, finishing once it reaches a terminal status"""
+        last_seen = None
+        while True:
+            job = await self.get(job_id)
+            if job is None:
+                return
+            if job.updated_at != last_seen:
+                last_seen = job.updated_at
+                yield job
+            if job.status in TERMINAL_STATUSES:
+                return
+            # Local updates wake us immediately; the timeout picks up other processes
+            async with self._changed:
+                try:
+                    await asyncio.wait_for(self._changed.wait(), self.idle_poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _notify(self) -> None:
+        if self._changed is not None:
+            async with self._changed:
+                self._changed.notify_all()
+
+    async def _update(self, job_id: str, **fields) -> None:
+        await asyncio.to_thread(self.store.update, job_id, **fields)
+        await self._notify()
+
+    async def _sweep(self) -> None:
+        """Requeue jobs whose worker died (here or in another process) and delete expired results"""
+        self._next_sweep_at = time.monotonic() + self.requeue_interval_seconds
+        requeued = await asyncio.to_thread(self.store.requeue_stale, time.time() - self.stale_after_seconds)
+        if requeued:
+            logger.info(f"Requeued {requeued} interrupted analysis jobs")
+            self._wakeup.set()
+        deleted = await asyncio.to_thread(self.store.delete_finished, time.time() - self.retention_seconds)
+        if deleted:
+            logger.info(f"Deleted {deleted} expired analysis jobs")
+
+    async def _worker_loop(self, worker_index: int) -> None:
+        while True:
+            if time.monotonic() >= self._next_sweep_at:
+                await self._sweep()
+            job = await asyncio.to_thread(self.store.claim_next)
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.idle_poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run_job(job, worker_index)
+
+    async def _run_job(self, job: AnalysisJob, worker_index: int) -> None:
+        logger.info(f"Worker {worker_index} processing analysis job {job.job_id}")
+
+        async def report_progress(stage: str, progress: int) -> None:
+            await self._update(job.job_id, stage=stage, progress=progress)
+
+        await self._update(job.job_id, status=JOB_PROCESSING, stage="starting", progress=5)
+        try:
+            result = await self.pipeline(job, report_progress)
+            await self._update(
+                job.job_id, status=JOB_COMPLETED, stage="completed", progress=100, result=result
+            )
+        except asyncio.CancelledError:
+            # Shutting down: leave the audio in place so the job can be requeued
+            raise
+        except Exception as e:
+            logger.error(f"Analysis job {job.job_id} failed: {str(e)}")
+            await self._update(job.job_id, status=JOB_FAILED, stage="failed", error=str(e))
+        if job.audio_path and os.path.exists(job.audio_path):
+            os.remove(job.audio_path)
+
+
+def create_job_store() -> JobStore:
+    """Build the job store selected by ANALYSIS_JOB_STORE (memory or sqlite)"""
+    backend = os.environ.get("ANALYSIS_JOB_STORE", "memory").lower()
+    if backend == "sqlite":
+        return SQLiteJobStore(os.environ.get("ANALYSIS_JOB_DB", "analysis_jobs.db"))
+    if backend == "memory":
+        return InMemoryJobStore()
+    raise ValueError(f"Unknown ANALYSIS_JOB_STORE backend: {backend}")
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Encode one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def summarize_pitch_analysis(hume_results: Dict[str, Any], pitch_scores: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape Hume results and pitch scores the way /analyze-pitch returns them"""
+    analysis = hume_results["analysis"]
+    return {
+        "transcription": analysis["transcription"]["full_text"],
+        "emotion_analysis": {
+            "dominant_emotion": analysis["overall_sentiment"]["dominant_emotion"],
+            "total_segments": analysis["overall_sentiment"]["total_segments_analyzed"],
+            "confidence": analysis["transcription"]["confidence"]
+        },
+        "pitch_scores": pitch_scores,
+        "raw_analysis": hume_results
+    }
+
+
+# Upload details /analyze-pitch echoes back in its response
+PITCH_UPLOAD_FIELDS = ("filename", "content_type", "file_size", "duration", "timestamp")
+
+
+async def pitch_analysis_pipeline(job: AnalysisJob, report_progress: ProgressReporter) -> Dict[str, Any]:
+    """Hume emotion analysis followed by LLM pitch scoring"""
+    from services import hume_service_provider, scoring_service_provider
+    from uploads import parse_audio_duration
+    from practice_sessions import record_analysis
+    from result_cache import sha256_file
+
+    await report_progress("analyzing_audio", 10)
+    # The first job in a process builds the services off the event loop
+    hume_service = await hume_service_provider()
+    pitch_scoring_service = await scoring_service_provider()
+    content_hash = job.metadata.get("content_hash") or await asyncio.to_thread(sha256_file, job.audio_path)
+    with open(job.audio_path, "rb") as audio_file:
+        hume_results = await hume_service.analyze_audio_expression(
+            audio_file,
+            audio_duration=parse_audio_duration(job.metadata.get("duration")),
+            content_hash=content_hash
+        )
+    if not hume_results.get("success"):
+        raise RuntimeError("Audio expression analysis failed")
+
+    await report_progress("scoring", 70)
+    pitch_scores = await pitch_scoring_service.score_pitch_performance(
+        hume_results,
+        content_hash=content_hash,
+        mode=job.metadata.get("scoring_mode")
+    )
+    await record_analysis(
+        job.user_id,
+        pitch_scores,
+        duration=parse_audio_duration(job.metadata.get("duration")),
+        persona=job.metadata.get("persona"),
+        persona_type=job.metadata.get("persona_type")
+    )
+
+    # The same fields /analyze-pitch returns; the rest of the metadata only steers the job
+    upload = {field: job.metadata.get(field) for field in PITCH_UPLOAD_FIELDS}
+    return {"success": True, **upload, **summarize_pitch_analysis(hume_results, pitch_scores)}
+
+
+async def _run_standalone_workers() -> None:
+    store = create_job_store()
+    if isinstance(store, InMemoryJobStore):
+        raise SystemExit("Standalone workers need a shared store: set ANALYSIS_JOB_STORE=sqlite")
+    manager = AnalysisJobManager(
+        store,
+        pitch_analysis_pipeline,
+        workers=int(os.environ.get("ANALYSIS_WORKERS", "4")),
+        spool_dir=os.environ.get("ANALYSIS_SPOOL_DIR"),
+        retention_seconds=float(os.environ.get("JOB_RETENTION_SECONDS", "86400")),
+    )
+    await manager.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await manager.stop()
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_run_standalone_workers())
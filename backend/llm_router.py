@@ -0,0 +1,375 @@
+"""
+Routing scoring requests across several chat backends
+
+LLMRouter holds the scoring chain of each configured backend in priority
+order. A request goes to the first backend whose circuit breaker admits it.
+If no answer has arrived by the configured percentile of that backend's recent
+latencies, one hedged copy goes to the next backend, and the first success
+wins. A failure moves the request to the next backend straight away.
+
+Hedging needs a second backend; with the default single backend it is off
+(the router warns at startup). SCORING_HEDGE_SAME_BACKEND=1 instead sends the
+hedge to the same backend when no other one is available, where a second
+request usually lands on a less loaded replica. Every hedge is a paid
+duplicate call, and before enough latencies are known the hedge waits
+SCORING_HEDGE_INITIAL_DELAY (10 s), which slow reasoning models often exceed.
+
+Each backend's CircuitBreaker tracks errors and slow calls over a rolling
+window. It opens when either rate crosses its threshold, sheds traffic for a
+cooldown, then admits a single probe request before closing again.
+
+Backends are configured with SCORING_LLM_BACKENDS, a comma-separated list of
+`provider:model` entries (providers: groq, openai), e.g.
+`groq:deepseek-r1-distill-llama-70b,groq:llama-3.3-70b-versatile,openai:gpt-4o-mini`.
+"""
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional, Callable, Tuple, NamedTuple
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+llm_requests = metrics.counter("llm_requests_total", "Scoring LLM calls by backend and outcome")
+llm_hedges = metrics.counter("llm_hedged_requests_total", "Hedged scoring requests by whether the hedge won")
+llm_circuit_open = metrics.gauge("llm_circuit_open", "1 while a backend's circuit breaker is open")
+
+DEFAULT_BACKENDS = "groq:deepseek-r1-distill-llama-70b"
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+
+class NoBackendAvailable(RuntimeError):
+    """Every backend's circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """Rolling error and slow-call rates that decide whether a backend gets traffic"""
+
+    def __init__(
+        self,
+        window_seconds: float = 60,
+        min_requests: int = 5,
+        error_threshold: float = 0.5,
+        slow_call_seconds: Optional[float] = None,
+        slow_call_threshold: float = 0.8,
+        cooldown_seconds: float = 30,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            window_seconds: How far back outcomes count
+            min_requests: Outcomes needed in the window before the breaker can open
+            error_threshold: Error rate that opens the breaker
+            slow_call_seconds: Calls slower than this count as slow (None disables)
+            slow_call_threshold: Slow-call rate that opens the breaker
+            cooldown_seconds: Time open before a probe request is let through
+            clock: Monotonic time source
+        """
+        self.window_seconds = window_seconds
+        self.min_requests = min_requests
+        self.error_threshold = error_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_threshold = slow_call_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.clock = clock
+
+        self.state = CIRCUIT_CLOSED
+        self._outcomes: deque = deque()  # (time, ok, slow)
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now; admitting a probe reserves it"""
+        if self.state == CIRCUIT_OPEN:
+            if self.clock() - self._opened_at < self.cooldown_seconds:
+                return False
+            self.state = CIRCUIT_HALF_OPEN
+        if self.state == CIRCUIT_HALF_OPEN:
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+        return True
+
+    def record(self, ok: bool, latency: float) -> None:
+        now = self.clock()
+        slow = self.slow_call_seconds is not None and latency > self.slow_call_seconds
+        if self.state == CIRCUIT_HALF_OPEN:
+            self._probe_in_flight = False
+            if ok and not slow:
+                self.state = CIRCUIT_CLOSED
+                self._outcomes.clear()
+            else:
+                self._open(now)
+            return
+
+        self._outcomes.append((now, ok, slow))
+        while self._outcomes and self._outcomes[0][0] < now - self.window_seconds:
+            self._outcomes.popleft()
+        count = len(self._outcomes)
+        if self.state == CIRCUIT_CLOSED and count >= self.min_requests:
+            errors = sum(1 for _, ok_, _ in self._outcomes if not ok_)
+            slow_calls = sum(1 for _, _, slow_ in self._outcomes if slow_)
+            if errors / count >= self.error_threshold or slow_calls / count >= self.slow_call_threshold:
+                self._open(now)
+
+    def release(self) -> None:
+        """Give back an admitted request that was cancelled before finishing"""
+        if self.state == CIRCUIT_HALF_OPEN:
+            self._probe_in_flight = False
+
+    def _open(self, now: float) -> None:
+        self.state = CIRCUIT_OPEN
+        self._opened_at = now
+        self._outcomes.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        count = len(self._outcomes)
+        return {
+            "state": self.state,
+            "window_requests": count,
+            "window_errors": sum(1 for _, ok, _ in self._outcomes if not ok),
+        }
+
+
+class LatencyWindow:
+    """Latencies of the most recent successful calls"""
+
+    def __init__(self, size: int = 200):
+        self._samples: deque = deque(maxlen=size)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        rank = max(0, math.ceil(percentile / 100 * len(ordered)) - 1)
+        return ordered[rank]
+
+
+class LLMBackend:
+    """One chat model with its compiled scoring chain and health tracking"""
+
+    def __init__(self, name: str, model, chain, breaker: Optional[CircuitBreaker] = None):
+        self.name = name
+        self.model = model
+        self.chain = chain
+        self.breaker = breaker or CircuitBreaker()
+        self.latencies = LatencyWindow()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.breaker.stats(),
+            "latency_p50": self.latencies.percentile(50),
+            "latency_p95": self.latencies.percentile(95),
+            "latency_samples": len(self.latencies),
+        }
+
+
+class RoutedResult(NamedTuple):
+    """A chain result and the backend that produced it"""
+    result: Any
+    backend: str
+    hedged: bool
+
+
+class LLMRouter:
+    """Sends each request to a healthy backend, hedging slow calls to the next one"""
+
+    def __init__(
+        self,
+        backends: List[LLMBackend],
+        hedge_percentile: float = 95,
+        min_hedge_delay: float = 1.0,
+        initial_hedge_delay: float = 10.0,
+        min_latency_samples: int = 20,
+        hedge_same_backend: bool = False,
+    ):
+        """
+        Args:
+            backends: Backends in priority order
+            hedge_percentile: Latency percentile of the first backend after which to hedge
+            min_hedge_delay: Lower bound on the hedge delay
+            initial_hedge_delay: Hedge delay until enough latencies are known
+            min_latency_samples: Latencies needed before the percentile is used
+            hedge_same_backend: Hedge to the first backend again when no other one is available
+        """
+        if not backends:
+            raise ValueError("LLMRouter needs at least one backend")
+        self.backends = backends
+        self.hedge_percentile = hedge_percentile
+        self.min_hedge_delay = min_hedge_delay
+        self.initial_hedge_delay = initial_hedge_delay
+        self.min_latency_samples = min_latency_samples
+        self.hedge_same_backend = hedge_same_backend
+        if len(backends) < 2 and not hedge_same_backend:
+            logger.warning(
+                "Scoring requests will not be hedged: hedging needs a second backend in "
+                "SCORING_LLM_BACKENDS or SCORING_HEDGE_SAME_BACKEND=1"
+            )
+
+    @property
+    def primary(self) -> LLMBackend:
+        return self.backends[0]
+
+    @property
+    def names(self) -> List[str]:
+        return [backend.name for backend in self.backends]
+
+    def hedge_delay(self, backend: LLMBackend) -> float:
+        if len(backend.latencies) < self.min_latency_samples:
+            return self.initial_hedge_delay
+        return max(self.min_hedge_delay, backend.latencies.percentile(self.hedge_percentile))
+
+    def acquire(self, exclude: Tuple[str, ...] = ()) -> Optional[LLMBackend]:
+        """Highest-priority backend that admits a request now"""
+        for backend in self.backends:
+            if backend.name not in exclude and backend.breaker.allow():
+                return backend
+        return None
+
+    def record(self, backend: LLMBackend, ok: bool, latency: float) -> None:
+        backend.breaker.record(ok, latency)
+        if ok:
+            backend.latencies.add(latency)
+        llm_requests.inc(backend=backend.name, outcome="success" if ok else "error")
+        llm_circuit_open.set(1 if backend.breaker.state == CIRCUIT_OPEN else 0, backend=backend.name)
+
+    async def _call(self, backend: LLMBackend, llm_input: Dict[str, Any]) -> Any:
+        start = time.perf_counter()
+        try:
+            result = await backend.chain.ainvoke(llm_input)
+        except asyncio.CancelledError:
+            backend.breaker.release()
+            llm_requests.inc(backend=backend.name, outcome="cancelled")
+            raise
+        except Exception:
+            self.record(backend, False, time.perf_counter() - start)
+            raise
+        self.record(backend, True, time.perf_counter() - start)
+        return result
+
+    async def ainvoke(self, llm_input: Dict[str, Any]) -> RoutedResult:
+        """
+        Run the scoring chain on the best available backend
+
+        Raises:
+            NoBackendAvailable: Every circuit breaker is open
+            Exception: The last backend error when every attempt failed
+        """
+        first = self.acquire()
+        if first is None:
+            raise NoBackendAvailable("All scoring LLM backends are unavailable")
+
+        tried = [first.name]
+        pending: Dict[asyncio.Task, LLMBackend] = {
+            asyncio.ensure_future(self._call(first, llm_input)): first
+        }
+        hedge_at = asyncio.get_running_loop().time() + self.hedge_delay(first)
+        hedge_due = False
+        hedged = False
+        hedge_tasks = set()
+        last_error: Optional[BaseException] = None
+        try:
+            while pending:
+                timeout = None
+                if not hedge_due:
+                    timeout = max(0.0, hedge_at - asyncio.get_running_loop().time())
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    # Slow tail: send one hedged copy to the next healthy backend
+                    hedge_due = True
+                    backend = self.acquire(tuple(tried))
+                    if backend is None and self.hedge_same_backend and first.breaker.allow():
+                        backend = first
+                    if backend is not None:
+                        hedged = True
+                        tried.append(backend.name)
+                        task = asyncio.ensure_future(self._call(backend, llm_input))
+                        hedge_tasks.add(task)
+                        pending[task] = backend
+                    continue
+
+                for task in done:
+                    backend = pending.pop(task)
+                    if task.exception() is None:
+                        if hedged:
+                            llm_hedges.inc(outcome="won" if task in hedge_tasks else "lost")
+                        return RoutedResult(task.result(), backend.name, hedged)
+                    last_error = task.exception()
+                    logger.warning(f"Scoring backend {backend.name} failed: {type(last_error).__name__}: {last_error}")
+
+                if not pending:
+                    # Fail over without waiting for the hedge timer
+                    backend = self.acquire(tuple(tried))
+                    if backend is not None:
+                        tried.append(backend.name)
+                        pending[asyncio.ensure_future(self._call(backend, llm_input))] = backend
+        finally:
+            for task in pending:
+                task.cancel()
+        raise last_error
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backends": {backend.name: backend.stats() for backend in self.backends},
+            "hedge_delay": self.hedge_delay(self.primary),
+        }
+
+
+def build_chat_model(spec: str, max_retries: int = 0, http_client=None):
+    """Chat model for a `provider:model` backend entry, optionally on a shared httpx.AsyncClient"""
+    provider, _, model = spec.partition(":")
+    timeout = float(os.environ.get("SCORING_LLM_REQUEST_TIMEOUT", "120"))
+    if provider == "groq":
+        from langchain_groq import ChatGroq
+        if not os.environ.get("GROQ_API_KEY"):
+            raise ValueError("GROQ_API_KEY environment variable is required")
+        extra = {"reasoning_format": "parsed"} if "deepseek-r1" in model or "qwen" in model else {}
+        return ChatGroq(
+            model=model, temperature=0, max_tokens=None, timeout=timeout, max_retries=max_retries,
+            http_async_client=http_client, **extra
+        )
+    if provider == "openai":
+        from langchain_openai import ChatOpenAI
+        if not os.environ.get("OPENAI_API_KEY"):
+            raise ValueError("OPENAI_API_KEY environment variable is required")
+        return ChatOpenAI(
+            model=model, temperature=0, timeout=timeout, max_retries=max_retries, http_async_client=http_client
+        )
+    raise ValueError(f"Unknown scoring LLM provider: {provider}")
+
+
+def breaker_from_env() -> CircuitBreaker:
+    slow = os.environ.get("SCORING_BREAKER_SLOW_SECONDS")
+    return CircuitBreaker(
+        window_seconds=float(os.environ.get("SCORING_BREAKER_WINDOW_SECONDS", "60")),
+        min_requests=int(os.environ.get("SCORING_BREAKER_MIN_REQUESTS", "5")),
+        error_threshold=float(os.environ.get("SCORING_BREAKER_ERROR_RATE", "0.5")),
+        slow_call_seconds=float(slow) if slow else None,
+        cooldown_seconds=float(os.environ.get("SCORING_BREAKER_COOLDOWN_SECONDS", "30")),
+    )
+
+
+def router_options_from_env() -> Dict[str, Any]:
+    return {
+        "hedge_percentile": float(os.environ.get("SCORING_HEDGE_PERCENTILE", "95")),
+        "min_hedge_delay": float(os.environ.get("SCORING_HEDGE_MIN_DELAY", "1")),
+        "initial_hedge_delay": float(os.environ.get("SCORING_HEDGE_INITIAL_DELAY", "10")),
+        "hedge_same_backend": os.environ.get("SCORING_HEDGE_SAME_BACKEND", "0") == "1",
+    }
+
+
+def backend_specs_from_env() -> List[str]:
+    return [spec.strip() for spec in os.environ.get("SCORING_LLM_BACKENDS", DEFAULT_BACKENDS).split(",") if spec.strip()]
@@ -0,0 +1,175 @@
+"""
+Deterministic pitch scoring from processed Hume results
+
+LocalPitchScorer turns the measurable parts of an analysis into the same
+PitchScores the LLM produces: transcription confidence, speaking rate (words
+per minute over the segment timeline), pauses between segments, filler words
+and the emotion profile. It runs in a few microseconds with no network call,
+so PitchScoringService uses it as the `local` scoring mode, as the fast path
+of `hybrid` mode and as the fallback when the LLM is unavailable.
+
+The weights are hand-set; `calibrate_local_scoring.py` fits a per-dimension
+linear correction against stored LLM scores, loaded from
+LOCAL_SCORING_CALIBRATION.
+"""
+import json
+import os
+import re
+from typing import Dict, Any, List, Optional, Tuple
+
+LOCAL_MODEL_NAME = "local-heuristic-v1"
+
+SCORE_DIMENSIONS = ("tone", "fluency", "clarity", "confidence")
+
+# Emotions that read as engaging vs. off-putting in a pitch
+POSITIVE_TONE = ("Determination", "Interest", "Joy", "Excitement", "Contentment",
+                 "Satisfaction", "Calmness", "Pride", "Triumph", "Amusement")
+NEGATIVE_TONE = ("Anxiety", "Awkwardness", "Boredom", "Distress", "Doubt", "Fear",
+                 "Sadness", "Tiredness", "Contempt", "Disappointment", "Anger")
+ASSERTIVE = ("Determination", "Calmness", "Concentration", "Pride", "Triumph", "Excitement")
+INSECURE = ("Anxiety", "Awkwardness", "Fear", "Doubt", "Embarrassment", "Distress", "Shame")
+UNCLEAR = ("Confusion", "Doubt", "Tiredness")
+
+# Comfortable presentation pace, words per minute
+TARGET_WPM = (120.0, 165.0)
+
+# Gaps shorter than this are ordinary breaths between phrases
+PAUSE_SECONDS = 0.3
+LONG_PAUSE_SECONDS = 2.0
+
+FILLER_PATTERN = re.compile(
+    r"\b(?:um+|uh+|erm+|er|ah+|hmm+|you know|i mean|kind of|sort of|basically)\b",
+    re.IGNORECASE,
+)
+WORD_PATTERN = re.compile(r"[\w']+")
+
+
+def _clamp(value: float) -> float:
+    return max(0.0, min(100.0, value))
+
+
+def _mean(emotions: Dict[str, float], names: Tuple[str, ...]) -> float:
+    return sum(emotions.get(name, 0.0) for name in names) / len(names)
+
+
+def extract_features(hume_results: Dict[str, Any]) -> Dict[str, Any]:
+    """Delivery measurements the local scores are computed from"""
+    analysis = hume_results.get("analysis", {})
+    transcription = analysis.get("transcription", {})
+    timestamps = analysis.get("timestamps", [])
+    statistics = analysis.get("statistics") or {}
+
+    text = transcription.get("full_text") or " ".join(s.get("text", "") for s in timestamps)
+    words = len(WORD_PATTERN.findall(text))
+    fillers = len(FILLER_PATTERN.findall(text))
+
+    speaking_time = 0.0
+    pauses: List[float] = []
+    first_begin = last_end = None
+    previous_end = None
+    for segment in sorted(timestamps, key=lambda s: s["timestamp"]["begin"]):
+        begin = segment["timestamp"]["begin"]
+        end = segment["timestamp"]["end"]
+        speaking_time += max(0.0, end - begin)
+        if first_begin is None:
+            first_begin = begin
+        if previous_end is not None and begin - previous_end >= PAUSE_SECONDS:
+            pauses.append(begin - previous_end)
+        previous_end = end if previous_end is None else max(previous_end, end)
+        last_end = previous_end
+    span = (last_end - first_begin) if timestamps else 0.0
+
+    # Duration-weighted emotions are more representative than top-5 averages
+    emotions = statistics.get("weighted_emotions") or analysis.get("overall_sentiment", {}).get("average_emotions", {})
+
+    return {
+        "words": words,
+        "words_per_minute": words / (span / 60) if span > 0 else None,
+        "speaking_time": speaking_time,
+        "span": span,
+        "pause_count": len(pauses),
+        "long_pause_count": sum(1 for pause in pauses if pause >= LONG_PAUSE_SECONDS),
+        "pause_ratio": sum(pauses) / span if span > 0 else 0.0,
+        "mean_pause": sum(pauses) / len(pauses) if pauses else 0.0,
+        "filler_count": fillers,
+        "fillers_per_100_words": 100 * fillers / words if words else 0.0,
+        "transcription_confidence": transcription.get("confidence", 0) or 0,
+        "emotions": emotions,
+    }
+
+
+class LocalPitchScorer:
+    """Rule-based tone, fluency, clarity and confidence scores"""
+
+    def __init__(self, calibration: Optional[Dict[str, Tuple[float, float]]] = None):
+        """
+        Args:
+            calibration: Per-dimension (slope, intercept) applied to the raw scores
+        """
+        self.calibration = calibration or {}
+
+    @classmethod
+    def from_env(cls) -> "LocalPitchScorer":
+        """Load the calibration written by calibrate_local_scoring.py, if configured"""
+        path = os.environ.get("LOCAL_SCORING_CALIBRATION")
+        if not path or not os.path.exists(path):
+            return cls()
+        with open(path, "r", encoding="utf-8") as f:
+            return cls({name: tuple(fit) for name, fit in json.load(f).items()})
+
+    def raw_scores(self, features: Dict[str, Any]) -> Dict[str, float]:
+        """Uncalibrated 0-100 scores for extracted features"""
+        emotions = features["emotions"]
+        asr_confidence = features["transcription_confidence"]
+        filler_penalty = min(30.0, 4.0 * features["fillers_per_100_words"])
+
+        wpm = features["words_per_minute"]
+        if wpm is None:
+            pace_penalty = 15.0
+        elif wpm < TARGET_WPM[0]:
+            pace_penalty = min(35.0, (TARGET_WPM[0] - wpm) * 0.5)
+        else:
+            pace_penalty = min(35.0, max(0.0, wpm - TARGET_WPM[1]) * 0.5)
+        pause_penalty = min(25.0, 40.0 * max(0.0, features["pause_ratio"] - 0.15)
+                            + 3.0 * features["long_pause_count"])
+
+        tone = 60 + 150 * (_mean(emotions, POSITIVE_TONE) - _mean(emotions, NEGATIVE_TONE))
+        fluency = 100 - pace_penalty - pause_penalty - filler_penalty - 20 * (1 - asr_confidence)
+        clarity = (40 + 60 * asr_confidence - 0.5 * pace_penalty
+                   - 120 * _mean(emotions, UNCLEAR) - 0.5 * filler_penalty)
+        confidence = (60 + 150 * (_mean(emotions, ASSERTIVE) - _mean(emotions, INSECURE))
+                      - 0.5 * filler_penalty - 0.5 * pause_penalty)
+        return {
+            "tone": _clamp(tone),
+            "fluency": _clamp(fluency),
+            "clarity": _clamp(clarity),
+            "confidence": _clamp(confidence),
+        }
+
+    def score(self, hume_results: Dict[str, Any]):
+        """PitchScores for processed Hume results"""
+        from scoring_service import PitchScores
+
+        features = extract_features(hume_results)
+        scores = self.raw_scores(features)
+        for name, (slope, intercept) in self.calibration.items():
+            if name in scores:
+                scores[name] = _clamp(slope * scores[name] + intercept)
+        return PitchScores(
+            **{name: round(value, 1) for name, value in scores.items()},
+            explanation=self.explain(features)
+        )
+
+    def explain(self, features: Dict[str, Any]) -> str:
+        """One-line rationale naming the measurements behind the scores"""
+        parts = []
+        wpm = features["words_per_minute"]
+        if wpm is not None:
+            parts.append(f"pace {wpm:.0f} words/min (target {TARGET_WPM[0]:.0f}-{TARGET_WPM[1]:.0f})")
+        parts.append(f"{features['pause_count']} pauses ({features['long_pause_count']} over {LONG_PAUSE_SECONDS:.0f}s)")
+        parts.append(f"{features['filler_count']} filler words")
+        parts.append(f"transcription confidence {features['transcription_confidence']:.2f}")
+        top = sorted(features["emotions"].items(), key=lambda x: x[1], reverse=True)[:3]
+        if top:
+            parts.append("leading emotions " + ", ".join(name for name, _ in top))
+        return "Measured delivery: " + "; ".join(parts) + "."
@@ -1,18 +1,76 @@
-from fastapi import FastAPI, Depends, UploadFile, File, Form, HTTPException, Request
-from auth import verify_supabase_jwt
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, WebSocket, status
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from auth import verify_supabase_jwt, optional_supabase_user, optional_websocket_user, token_verifier
 from fastapi.middleware.cors import CORSMiddleware
-from hume_service import hume_service
-from scoring_service import pitch_scoring_service
+from scoring_modes import SCORING_MODES
+from metrics import metrics, stage_seconds
+from result_cache import result_cache
+from audio_preprocess import audio_preprocessor
+from analysis_response import ResponseShape, encoded_response, response_shape
+from admission import AdmissionLease, AdmissionRejected, admission, client_key
+from uploads import receive_audio_upload, receive_audio_uploads, audio_upload_openapi, parse_audio_duration
+from streaming import serve_analysis_stream
+import services
+from services import (
+    hume_service_provider,
+    scoring_service_provider,
+    stream_backend_provider,
+    WARMUP_BACKGROUND,
+    WARMUP_STARTUP,
+)
+from practice_sessions import dashboard_view, decode_cursor, record_analysis, session_store
+from farcaster_events import InvalidWebhookBody, WebhookIngestQueue, parse_webhook
+from jobs import (
+    AnalysisJobManager,
+    create_job_store,
+    format_sse,
+    pitch_analysis_pipeline,
+    summarize_pitch_analysis,
+)
+from contextlib import asynccontextmanager
+import asyncio
 import logging
+import os
 from dotenv import load_dotenv
-from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Callable, Optional, Dict, Any
 import hmac
 import hashlib
-import os
 load_dotenv()
 
-app = FastAPI()
+analysis_jobs = AnalysisJobManager(
+    create_job_store(),
+    pitch_analysis_pipeline,
+    workers=int(os.environ.get("ANALYSIS_WORKERS", "4")),
+    spool_dir=os.environ.get("ANALYSIS_SPOOL_DIR"),
+    retention_seconds=float(os.environ.get("JOB_RETENTION_SECONDS", "86400")),
+)
+
+farcaster_events = WebhookIngestQueue.from_env()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Hume and the scoring LLM are built on first use unless SERVICE_WARMUP says otherwise
+    warmup = services.warmup_mode()
+    warmup_task = None
+    if warmup == WARMUP_STARTUP:
+        await services.warm_up(raise_errors=True)
+    elif warmup == WARMUP_BACKGROUND:
+        warmup_task = asyncio.create_task(services.warm_up(raise_errors=False))
+    # Set ANALYSIS_WORKERS=0 when jobs are processed by standalone `python jobs.py` workers
+    await analysis_jobs.start()
+    await farcaster_events.start()
+    yield
+    await farcaster_events.stop()
+    await analysis_jobs.stop()
+    if warmup_task is not None:
+        await warmup_task
+    http = services.loaded_outbound_http()
+    if http is not None:
+        await http.aclose()
+    if audio_preprocessor is not None:
+        audio_preprocessor.shutdown()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -22,124 +80,200 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Farcaster webhook models
-class FarcasterUser(BaseModel):
-    fid: int
-    username: Optional[str] = None
-    display_name: Optional[str] = None
-    pfp_url: Optional[str] = None
-
-class FarcasterFrameAction(BaseModel):
-    type: str  # "frame_added", "frame_removed", "button_pressed", etc.
-    frame_url: str
-    button_index: Optional[int] = None
-    input_text: Optional[str] = None
-    user: FarcasterUser
-    timestamp: str
-
-class FarcasterWebhookPayload(BaseModel):
-    action: FarcasterFrameAction
-    signature: Optional[str] = None
-
 @app.get("/")
 def read_root():
     return {"Hello": "World"}
 
+def requested_scoring_mode(request: Request) -> Optional[str]:
+    """Scoring mode from the `scoring` query parameter (local, llm or hybrid)"""
+    mode = request.query_params.get("scoring")
+    if mode is None:
+        return None
+    if mode.lower() not in SCORING_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown scoring mode '{mode}', expected one of: {', '.join(SCORING_MODES)}"
+        )
+    return mode.lower()
+
+def admitted_analysis(resolve_user):
+    """
+    Dependency holding an admission slot (see admission.py) while the endpoint runs
+
+    Keyed by the caller's JWT `sub`, or the client address for anonymous
+    uploads. Over the limit, the request is rejected with 429 before its upload
+    is read.
+    """
+    async def dependency(request: Request, user=Depends(resolve_user)):
+        key = client_key(user, request.client.host if request.client else None)
+        try:
+            lease = await admission.acquire(key)
+        except AdmissionRejected as e:
+            raise HTTPException(
+                status_code=429,
+                detail=str(e),
+                headers={"Retry-After": str(e.retry_after)}
+            )
+        try:
+            yield lease
+        finally:
+            lease.release()
+    return dependency
+
+class CleanupStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that runs `cleanup` once it is done, however it ends
+
+    A generator's own `finally` only runs if the body was iterated; a client
+    that disconnects before the first chunk would otherwise leak whatever the
+    body was handed (an admission slot, a spooled upload).
+    """
+
+    def __init__(self, content, cleanup: Callable[[], None], **kwargs):
+        super().__init__(content, **kwargs)
+        self.cleanup = cleanup
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            try:
+                aclose = getattr(self.body_iterator, "aclose", None)
+                if aclose is not None:
+                    await aclose()
+            finally:
+                self.cleanup()
+
 @app.get("/protected")
 def protected_route(user=Depends(verify_supabase_jwt)):
     return {"message": "You are authenticated!", "user": user}
 
-@app.get("/dashboard")
-def get_dashboard_data():
+@app.get("/stats")
+def get_service_stats():
+    """Service counters plus the Hume jobs currently being polled"""
+    # Services that haven't been built yet have nothing to report and are not built for this
+    hume_service = hume_service_provider.instance
+    pitch_scoring_service = scoring_service_provider.instance
+    http = services.loaded_outbound_http()
     return {
-        "user": {
-            "name": "Alexa Johnson",
-            "joinDate": "2024-01-01",
-            "currentStreak": 7,
-            "level": "Intermediate",
-        },
-        "quickStats": {
-            "totalSessions": 24,
-            "averageScore": 76,
-            "practiceTime": 14400,  # seconds
-            "improvement": 12,  # percentage
-        },
-        "recentSessions": [
-            {
-                "id": 1,
-                "date": "2024-01-15",
-                "persona": "Sarah Chen",
-                "score": 78,
-                "duration": 420,
-                "type": "VC Investor",
-            },
-            {
-                "id": 2,
-                "date": "2024-01-14",
-                "persona": "Michael Rodriguez",
-                "score": 72,
-                "duration": 380,
-                "type": "Angel Investor",
-            },
-            {
-                "id": 3,
-                "date": "2024-01-12",
-                "persona": "Jennifer Park",
-                "score": 81,
-                "duration": 450,
-                "type": "Corporate Customer",
-            },
-        ],
-        # Add other fields as needed from the mockDashboardData
+        "metrics": metrics.snapshot(),
+        "services": services.stats(),
+        "hume_polling": hume_service.poll_scheduler.stats() if hume_service is not None else None,
+        "hume_packing": (
+            hume_service.packer.stats()
+            if hume_service is not None and hume_service.packer is not None else None
+        ),
+        "result_cache": result_cache.stats(),
+        "audio_preprocess": audio_preprocessor.stats() if audio_preprocessor is not None else None,
+        "scoring_llm": pitch_scoring_service.router.stats() if pitch_scoring_service is not None else None,
+        "scoring_memo": (
+            pitch_scoring_service.memo.stats()
+            if pitch_scoring_service is not None and pitch_scoring_service.memo is not None else None
+        ),
+        "admission": admission.stats(),
+        "auth": token_verifier.stats(),
+        "outbound_http": http.stats() if http is not None else None,
+        "farcaster_events": farcaster_events.stats()
     }
 
-@app.post("/analyze-audio")
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_prometheus_metrics():
+    """Every service metric in the Prometheus text format, for scraping"""
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.post("/hume/callback")
+async def hume_job_callback(request: Request, hume_service=Depends(hume_service_provider)):
+    """
+    Completion callback posted by Hume when HUME_CALLBACK_URL is configured
+
+    Resolves the waiting analysis without another status check; include
+    `?token=<HUME_CALLBACK_TOKEN>` in the callback URL to authenticate it.
+    Without a configured token every callback is refused, since anyone could
+    otherwise post predictions for a job.
+    """
+    expected_token = os.getenv("HUME_CALLBACK_TOKEN")
+    if not expected_token:
+        raise HTTPException(status_code=403, detail="Hume callbacks require HUME_CALLBACK_TOKEN")
+    if not hmac.compare_digest(request.query_params.get("token", ""), expected_token):
+        raise HTTPException(status_code=401, detail="Invalid callback token")
+    
+    try:
+        payload = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON payload")
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="Invalid JSON payload")
+    
+    job_id = payload.get("job_id")
+    if not job_id:
+        raise HTTPException(status_code=400, detail="Missing job_id")
+    
+    try:
+        matched = hume_service.poll_scheduler.notify(
+            job_id,
+            payload.get("status", "COMPLETED"),
+            predictions=payload.get("predictions"),
+            message=payload.get("message") or payload.get("error")
+        )
+    except (ValueError, TypeError) as e:
+        # pydantic's ValidationError for predictions that don't match Hume's schema
+        raise HTTPException(status_code=400, detail=f"Invalid predictions: {str(e)}")
+    return {"success": True, "job_id": job_id, "matched": matched}
+
+@app.get("/dashboard")
+def get_dashboard_data(
+    limit: int = Query(5, ge=1, le=50),
+    cursor: Optional[str] = None,
+    user=Depends(verify_supabase_jwt)
+):
+    """
+    Practice stats and recent sessions of the signed-in user
+
+    Stats come from the user's running aggregate, so this costs the same for
+    the hundredth session as for the first. `recentSessions` holds `limit`
+    sessions, newest first; pass `nextCursor` as `cursor` for the next page.
+    """
+    try:
+        before = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return dashboard_view(session_store, user, limit, before)
+
+@app.post("/analyze-audio", openapi_extra=audio_upload_openapi(
+    "duration", "timestamp", "size", "type", "analysisType"
+))
 async def analyze_audio_expression(
-    audio: UploadFile = File(...),
-    duration: str = Form(None),
-    timestamp: str = Form(None),
-    size: str = Form(None),
-    type: str = Form(None),
-    analysisType: str = Form(None)
+    request: Request,
+    hume_service=Depends(hume_service_provider),
+    lease: AdmissionLease = Depends(admitted_analysis(optional_supabase_user))
 ):
     """
     Analyze audio file for emotional expression using Hume AI
     
     Accepts audio files and returns expression measurement data
     """
+    upload = None
     try:
-        # Validate file type
-        if not audio.content_type or not audio.content_type.startswith('audio/'):
-            raise HTTPException(
-                status_code=400, 
-                detail="Invalid file type. Please upload an audio file."
-            )
-        
-        # Check file size (limit to 50MB)
-        max_size = 50 * 1024 * 1024  # 50MB in bytes
-        content = await audio.read()
-        
-        if len(content) > max_size:
-            raise HTTPException(
-                status_code=413,
-                detail="File too large. Maximum size is 50MB."
-            )
-        
-        # Reset file pointer for processing
-        await audio.seek(0)
+        # Stream the upload to a spooled file, enforcing type and 50MB size limit
+        upload = await receive_audio_upload(request)
+        duration = upload.fields.get("duration")
         
         # Analyze audio with Hume service
-        analysis_result = await hume_service.analyze_audio_expression(audio.file)
+        analysis_result = await hume_service.analyze_audio_expression(
+            upload.file,
+            audio_duration=parse_audio_duration(duration),
+            content_hash=upload.sha256
+        )
         
         
         return {
             "success": True,
-            "filename": audio.filename,
-            "content_type": audio.content_type,
-            "file_size": len(content),
+            "filename": upload.filename,
+            "content_type": upload.content_type,
+            "file_size": upload.size,
             "duration": duration,
-            "timestamp": timestamp,
-            "analysisType": analysisType,
+            "timestamp": upload.fields.get("timestamp"),
+            "analysisType": upload.fields.get("analysisType"),
             "analysis": analysis_result
         }
         
@@ -151,35 +285,103 @@ async def analyze_audio_expression(
             status_code=500,
             detail=f"Failed to analyze audio: {str(e)}"
         )
+    finally:
+        if upload is not None:
+            upload.close()
 
 @app.get("/audio-analysis/{job_id}")
 async def get_audio_analysis_status(
+    job_id: str,
+    request: Request,
+    user=Depends(verify_supabase_jwt),
+    shape: ResponseShape = Depends(response_shape)
+):
+    """
+    Get the status, progress and (once completed) results of an analysis job
+    
+    `detail`, `fields` and `emotions` shape `result` as they do /analyze-pitch.
+    """
+    job = await analysis_jobs.get(job_id)
+    if job is None or job.user_id != user.get("sub"):
+        raise HTTPException(status_code=404, detail="Analysis job not found")
+    view = job.public_view()
+    if view.get("result"):
+        view["result"] = shape.apply(view["result"])
+    return encoded_response(request, view)
+
+@app.get("/audio-analysis/{job_id}/stream")
+async def stream_audio_analysis_status(
     job_id: str,
     user=Depends(verify_supabase_jwt)
 ):
     """
-    Get the status of an audio analysis job
+    Stream job status changes as server-sent events until the job finishes
     """
-    try:
-        # This could be extended to track job status in a database
-        return {
-            "job_id": job_id,
-            "status": "This endpoint can be extended for async job tracking",
-            "user_id": user.get("sub")
+    job = await analysis_jobs.get(job_id)
+    if job is None or job.user_id != user.get("sub"):
+        raise HTTPException(status_code=404, detail="Analysis job not found")
+
+    async def events():
+        async for update in analysis_jobs.watch(job_id):
+            yield format_sse(update.status, update.public_view())
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@app.post("/analyze-pitch/jobs", status_code=202, openapi_extra=audio_upload_openapi(
+    "duration", "timestamp", "size", "type"
+))
+async def submit_pitch_analysis_job(
+    request: Request,
+    user=Depends(verify_supabase_jwt),
+    lease: AdmissionLease = Depends(admitted_analysis(verify_supabase_jwt))
+):
+    """
+    Queue a pitch analysis and return its job id immediately
+
+    Poll /audio-analysis/{job_id} or subscribe to /audio-analysis/{job_id}/stream
+    for progress and results. `?scoring=local|llm|hybrid` picks the scoring mode.
+    """
+    scoring_mode = requested_scoring_mode(request)
+    
+    # Stream the upload straight into the spool directory the workers read from
+    upload = await receive_audio_upload(
+        request,
+        destination_path=analysis_jobs.new_spool_path()
+    )
+    upload.close()
+    
+    job = await analysis_jobs.submit(
+        upload.path,
+        user_id=user.get("sub"),
+        metadata={
+            "filename": upload.filename,
+            "content_type": upload.content_type,
+            "file_size": upload.size,
+            "content_hash": upload.sha256,
+            "duration": upload.fields.get("duration"),
+            "timestamp": upload.fields.get("timestamp"),
+            "scoring_mode": scoring_mode,
+            "persona": upload.fields.get("persona"),
+            "persona_type": upload.fields.get("personaType"),
         }
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to get analysis status: {str(e)}"
-        )
+    )
+    return {
+        "job_id": job.job_id,
+        "status": job.status,
+        "status_url": f"/audio-analysis/{job.job_id}",
+        "stream_url": f"/audio-analysis/{job.job_id}/stream"
+    }
 
-@app.post("/analyze-pitch")
+@app.post("/analyze-pitch", openapi_extra=audio_upload_openapi(
+    "duration", "timestamp", "size", "type"
+))
 async def analyze_pitch_performance(
-    audio: UploadFile = File(...),
-    duration: str = Form(None),
-    timestamp: str = Form(None),
-    size: str = Form(None),
-    type: str = Form(None)
+    request: Request,
+    hume_service=Depends(hume_service_provider),
+    pitch_scoring_service=Depends(scoring_service_provider),
+    user=Depends(optional_supabase_user),
+    shape: ResponseShape = Depends(response_shape),
+    lease: AdmissionLease = Depends(admitted_analysis(optional_supabase_user))
 ):
     """
     Comprehensive pitch analysis: emotion analysis + AI scoring
@@ -189,31 +391,30 @@ async def analyze_pitch_performance(
     - Speech fluency 
     - Clarity
     - Speaker confidence
+    
+    `?scoring=local` skips the LLM, `?scoring=llm` requires it and
+    `?scoring=hybrid` falls back to the local scores when it fails.
+    Signed-in users' results are recorded for /dashboard; send `persona` and
+    `personaType` form fields to label the session. `?detail=summary|standard`,
+    `?fields=` and `?emotions=columnar` trim the response, see analysis_response.py.
     """
+    scoring_mode = requested_scoring_mode(request)
+    upload = None
     try:
-        # Validate file type
-        if not audio.content_type or not audio.content_type.startswith('audio/'):
-            raise HTTPException(
-                status_code=400, 
-                detail="Invalid file type. Please upload an audio file."
-            )
-        
-        # Check file size (limit to 50MB)
-        max_size = 50 * 1024 * 1024  # 50MB in bytes
-        content = await audio.read()
-        
-        if len(content) > max_size:
-            raise HTTPException(
-                status_code=413,
-                detail="File too large. Maximum size is 50MB."
-            )
-        
-        # Reset file pointer for processing
-        await audio.seek(0)
+        # Stream the upload to a spooled file, enforcing type and 50MB size limit
+        with stage_seconds.time(stage="upload_read"):
+            upload = await receive_audio_upload(request)
+        duration = upload.fields.get("duration")
+        content_hash = upload.sha256
         
         # Step 1: Analyze audio with Hume service
         logging.info("Starting Hume audio expression analysis...")
-        hume_results = await hume_service.analyze_audio_expression(audio.file)
+        with stage_seconds.time(stage="hume_analysis"):
+            hume_results = await hume_service.analyze_audio_expression(
+                upload.file,
+                audio_duration=parse_audio_duration(duration),
+                content_hash=content_hash
+            )
         
         if not hume_results.get("success"):
             raise HTTPException(
@@ -223,25 +424,29 @@ async def analyze_pitch_performance(
         
         # Step 2: Generate pitch scores using LLM
         logging.info("Generating pitch performance scores...")
-        pitch_scores = await pitch_scoring_service.score_pitch_performance(hume_results)
+        pitch_scores = await pitch_scoring_service.score_pitch_performance(
+            hume_results,
+            content_hash=content_hash,
+            mode=scoring_mode
+        )
         logging.critical(f"Pitch scores generated: {pitch_scores}")
+        await record_analysis(
+            user.get("sub") if user else None,
+            pitch_scores,
+            duration=parse_audio_duration(duration),
+            persona=upload.fields.get("persona"),
+            persona_type=upload.fields.get("personaType")
+        )
         
-        return {
+        return encoded_response(request, shape.apply({
             "success": True,
-            "filename": audio.filename,
-            "content_type": audio.content_type,
-            "file_size": len(content),
+            "filename": upload.filename,
+            "content_type": upload.content_type,
+            "file_size": upload.size,
             "duration": duration,
-            "timestamp": timestamp,
-            "transcription": hume_results["analysis"]["transcription"]["full_text"],
-            "emotion_analysis": {
-                "dominant_emotion": hume_results["analysis"]["overall_sentiment"]["dominant_emotion"],
-                "total_segments": hume_results["analysis"]["overall_sentiment"]["total_segments_analyzed"],
-                "confidence": hume_results["analysis"]["transcription"]["confidence"]
-            },
-            "pitch_scores": pitch_scores,
-            "raw_analysis": hume_results  # Include full Hume results for detailed analysis
-        }
+            "timestamp": upload.fields.get("timestamp"),
+            **summarize_pitch_analysis(hume_results, pitch_scores)
+        }))
         
     except HTTPException:
         raise
@@ -251,118 +456,267 @@ async def analyze_pitch_performance(
             status_code=500,
             detail=f"Failed to analyze pitch: {str(e)}"
         )
+    finally:
+        if upload is not None:
+            upload.close()
 
-@app.post("/farcaster/webhook")
-async def farcaster_webhook(request: Request):
+@app.post("/analyze-pitch/batch", openapi_extra=audio_upload_openapi(
+    "durations", "timestamp", "persona", "personaType", multiple=True
+))
+async def analyze_pitch_batch(
+    request: Request,
+    hume_service=Depends(hume_service_provider),
+    pitch_scoring_service=Depends(scoring_service_provider),
+    user=Depends(optional_supabase_user),
+    shape: ResponseShape = Depends(response_shape),
+    lease: AdmissionLease = Depends(admitted_analysis(optional_supabase_user))
+):
     """
-    Webhook endpoint for Farcaster mini app notifications
+    /analyze-pitch for several recordings at once
     
-    Handles various Farcaster frame events like:
-    - Frame interactions (button clicks, text input)
-    - Frame additions/removals
-    - User engagement events
+    Send up to 10 files under `audio`; they are analyzed in one Hume job.
+    `durations` optionally lists each recording's length in seconds,
+    comma-separated in upload order. Each entry of `results` is what
+    /analyze-pitch returns for that file, or `{"success": false, "error": ...}`
+    when that file alone failed.
     """
+    scoring_mode = requested_scoring_mode(request)
+    uploads = []
     try:
-        # Get raw body for signature validation
-        body = await request.body()
+        with stage_seconds.time(stage="upload_read"):
+            uploads = await receive_audio_uploads(request)
+        if not uploads:
+            raise HTTPException(status_code=400, detail="No audio files provided")
+        fields = uploads[0].fields
+        durations = [d.strip() for d in (fields.get("durations") or "").split(",") if d.strip()]
+        durations += [None] * (len(uploads) - len(durations))
         
-        # Verify webhook signature if configured
-        farcaster_webhook_secret = os.getenv("FARCASTER_WEBHOOK_SECRET")
-        if farcaster_webhook_secret:
-            signature = request.headers.get("x-farcaster-signature")
-            if not signature or not verify_farcaster_signature(body, signature, farcaster_webhook_secret):
-                raise HTTPException(
-                    status_code=401,
-                    detail="Invalid webhook signature"
-                )
-        
-        # Parse the JSON payload
-        import json
-        try:
-            payload_data = json.loads(body.decode('utf-8'))
-        except json.JSONDecodeError:
-            raise HTTPException(
-                status_code=400,
-                detail="Invalid JSON payload"
+        logging.info(f"Starting Hume audio expression analysis of {len(uploads)} files...")
+        with stage_seconds.time(stage="hume_analysis"):
+            batch_results = await hume_service.analyze_audio_batch(
+                [upload.file for upload in uploads],
+                audio_durations=[parse_audio_duration(d) for d in durations],
+                content_hashes=[upload.sha256 for upload in uploads]
             )
         
-        # Validate payload structure
-        try:
-            payload = FarcasterWebhookPayload(**payload_data)
-        except Exception as validation_error:
-            logging.warning(f"Webhook payload validation failed: {validation_error}")
-            # Still process the webhook but log the validation issue
-            payload = None
-        
-        # Log the webhook event
-        logging.info(f"Farcaster webhook received: {payload_data.get('action', {}).get('type', 'unknown')}")
-        
-        # Process different types of webhook events
-        action_type = payload_data.get('action', {}).get('type', 'unknown')
-        user_fid = payload_data.get('action', {}).get('user', {}).get('fid')
-        
-        if action_type == "button_pressed":
-            # Handle button press events
-            button_index = payload_data.get('action', {}).get('button_index')
-            frame_url = payload_data.get('action', {}).get('frame_url')
-            input_text = payload_data.get('action', {}).get('input_text', '')
-            
-            logging.info(f"User {user_fid} pressed button {button_index} on frame {frame_url}")
-            
-            # Add custom logic here for button interactions
-            response_data = {
-                "status": "processed",
-                "action": "button_pressed",
-                "message": f"Button {button_index} interaction recorded"
-            }
-            
-        elif action_type == "frame_added":
-            # Handle when user adds the frame/app
-            logging.info(f"User {user_fid} added frame to their app")
-            
-            response_data = {
-                "status": "processed", 
-                "action": "frame_added",
-                "message": "Frame addition recorded"
-            }
-            
-        elif action_type == "frame_removed":
-            # Handle when user removes the frame/app
-            logging.info(f"User {user_fid} removed frame from their app")
-            
-            response_data = {
-                "status": "processed",
-                "action": "frame_removed", 
-                "message": "Frame removal recorded"
-            }
-            
-        else:
-            # Handle unknown or custom event types
-            logging.info(f"Unknown webhook action type: {action_type}")
-            
-            response_data = {
-                "status": "processed",
-                "action": action_type,
-                "message": "Event logged"
-            }
-        
-        # Store webhook data (add database integration as needed)
-        # await store_webhook_event(payload_data)
+        async def score(upload, duration, hume_results) -> Dict[str, Any]:
+            if isinstance(hume_results, Exception) or not hume_results.get("success"):
+                error = hume_results if isinstance(hume_results, Exception) else hume_results.get("error")
+                logging.error(f"Audio expression analysis failed for {upload.filename}: {error}")
+                return {"success": False, "filename": upload.filename, "error": "Audio expression analysis failed"}
+            try:
+                pitch_scores = await pitch_scoring_service.score_pitch_performance(
+                    hume_results,
+                    content_hash=upload.sha256,
+                    mode=scoring_mode
+                )
+            except Exception as e:
+                logging.error(f"Error scoring {upload.filename}: {str(e)}")
+                return {"success": False, "filename": upload.filename, "error": f"Failed to analyze pitch: {str(e)}"}
+            await record_analysis(
+                user.get("sub") if user else None,
+                pitch_scores,
+                duration=parse_audio_duration(duration),
+                persona=fields.get("persona"),
+                persona_type=fields.get("personaType")
+            )
+            return shape.apply({
+                "success": True,
+                "filename": upload.filename,
+                "content_type": upload.content_type,
+                "file_size": upload.size,
+                "duration": duration,
+                "timestamp": fields.get("timestamp"),
+                **summarize_pitch_analysis(hume_results, pitch_scores)
+            })
         
-        return {
-            "success": True,
-            "timestamp": payload_data.get('action', {}).get('timestamp'),
-            "processed": response_data
-        }
+        results = await asyncio.gather(*(
+            score(upload, duration, hume_results)
+            for upload, duration, hume_results in zip(uploads, durations, batch_results)
+        ))
+        return encoded_response(
+            request, {"success": any(result["success"] for result in results), "results": results}
+        )
         
     except HTTPException:
         raise
     except Exception as e:
-        logging.error(f"Error processing Farcaster webhook: {str(e)}")
+        logging.error(f"Error analyzing pitch batch: {str(e)}")
         raise HTTPException(
             status_code=500,
-            detail=f"Failed to process webhook: {str(e)}"
+            detail=f"Failed to analyze pitches: {str(e)}"
         )
+    finally:
+        for upload in uploads:
+            upload.close()
+
+@app.post("/analyze-pitch/stream", openapi_extra=audio_upload_openapi(
+    "duration", "timestamp", "size", "type"
+))
+async def stream_pitch_performance(
+    request: Request,
+    hume_service=Depends(hume_service_provider),
+    pitch_scoring_service=Depends(scoring_service_provider),
+    user=Depends(optional_supabase_user),
+    lease: AdmissionLease = Depends(admitted_analysis(optional_supabase_user))
+):
+    """
+    /analyze-pitch as server-sent events, streaming each score as it is decoded
+
+    Events: `analysis` (transcription and emotion summary once Hume finishes),
+    `local_scores` (hybrid mode), one `score` per dimension, `explanation`,
+    then `complete` with the same body /analyze-pitch returns, or `error`.
+    """
+    scoring_mode = requested_scoring_mode(request)
+    # Upload errors (type, size) are still reported as plain HTTP errors
+    upload = await receive_audio_upload(request)
+    # The body outlives this function; the response gives the admission slot back
+    stream_lease = lease.transfer()
+
+    def finish() -> None:
+        upload.close()
+        stream_lease.release()
+    
+    async def events():
+        try:
+            duration = upload.fields.get("duration")
+            hume_results = await hume_service.analyze_audio_expression(
+                upload.file,
+                audio_duration=parse_audio_duration(duration),
+                content_hash=upload.sha256
+            )
+            if not hume_results.get("success"):
+                yield format_sse("error", {"detail": "Audio expression analysis failed"})
+                return
+            
+            analysis = summarize_pitch_analysis(hume_results, {})
+            yield format_sse("analysis", {
+                "transcription": analysis["transcription"],
+                "emotion_analysis": analysis["emotion_analysis"]
+            })
+            
+            async for event in pitch_scoring_service.stream_pitch_scores(hume_results, mode=scoring_mode):
+                if event["type"] != "scores":
+                    yield format_sse(event["type"], event)
+                    continue
+                await record_analysis(
+                    user.get("sub") if user else None,
+                    event["scores"],
+                    duration=parse_audio_duration(duration),
+                    persona=upload.fields.get("persona"),
+                    persona_type=upload.fields.get("personaType")
+                )
+                yield format_sse("complete", {
+                    "success": True,
+                    "filename": upload.filename,
+                    "content_type": upload.content_type,
+                    "file_size": upload.size,
+                    "duration": duration,
+                    "timestamp": upload.fields.get("timestamp"),
+                    **summarize_pitch_analysis(hume_results, event["scores"])
+                })
+        except Exception as e:
+            logging.error(f"Error streaming pitch analysis: {str(e)}")
+            yield format_sse("error", {"detail": f"Failed to analyze pitch: {str(e)}"})
+    
+    return CleanupStreamingResponse(events(), cleanup=finish, media_type="text/event-stream")
+
+@app.websocket("/ws/analyze-stream")
+async def analyze_pitch_stream(
+    websocket: WebSocket,
+    hume_service=Depends(hume_service_provider),
+    pitch_scoring_service=Depends(scoring_service_provider),
+    stream_backend=Depends(stream_backend_provider),
+    user=Depends(optional_websocket_user)
+):
+    """
+    Real-time pitch analysis: send audio windows as they are recorded
+
+    Emits per-segment emotion records as each window is analyzed and the
+    /analyze-pitch result at end of stream; see streaming.py for the protocol.
+    A session holds an admission slot like an upload does; over the limit the
+    socket is closed with 1013 and an error message carrying `retry_after`.
+    Pass a Supabase token as `?token=` (or a Bearer header) to have the
+    session recorded on the user's dashboard.
+    """
+    await websocket.accept()
+    key = client_key(user, websocket.client.host if websocket.client else None)
+    try:
+        lease = await admission.acquire(key)
+    except AdmissionRejected as e:
+        await websocket.send_json({"type": "error", "detail": str(e), "retry_after": e.retry_after})
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        return
+    try:
+        await serve_analysis_stream(
+            websocket, stream_backend, hume_service, pitch_scoring_service,
+            user_id=user.get("sub") if user else None
+        )
+    finally:
+        lease.release()
+
+@app.post("/farcaster/webhook")
+async def farcaster_webhook(request: Request):
+    """
+    Webhook endpoint for Farcaster mini app notifications
+    
+    Handles various Farcaster frame events like:
+    - Frame interactions (button clicks, text input)
+    - Frame additions/removals
+    - User engagement events
+
+    Events are acknowledged once validated and written to the event store in
+    batches by a background writer (see farcaster_events.py). Redelivered
+    events are dropped by idempotency key; 503 means the queue is full and the
+    delivery should be retried.
+    """
+    # Get raw body for signature validation
+    body = await request.body()
+
+    # Verify webhook signature if configured
+    farcaster_webhook_secret = os.getenv("FARCASTER_WEBHOOK_SECRET")
+    if farcaster_webhook_secret:
+        signature = request.headers.get("x-farcaster-signature")
+        if not signature or not verify_farcaster_signature(body, signature, farcaster_webhook_secret):
+            raise HTTPException(
+                status_code=401,
+                detail="Invalid webhook signature"
+            )
+
+    try:
+        event = parse_webhook(body, request.headers.get("x-farcaster-delivery-id"))
+    except InvalidWebhookBody:
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid JSON payload"
+        )
+
+    if not farcaster_events.offer(event):
+        raise HTTPException(
+            status_code=503,
+            detail="Webhook queue is full, retry later",
+            headers={"Retry-After": "1"}
+        )
+
+    logging.debug(f"Farcaster webhook queued: {event.action_type} from user {event.fid}")
+    if event.action_type == "button_pressed":
+        message = f"Button {event.button_index} interaction recorded"
+    elif event.action_type == "frame_added":
+        message = "Frame addition recorded"
+    elif event.action_type == "frame_removed":
+        message = "Frame removal recorded"
+    else:
+        message = "Event logged"
+
+    return {
+        "success": True,
+        "timestamp": event.timestamp,
+        "processed": {
+            "status": "processed",
+            "action": event.action_type,
+            "message": message
+        }
+    }
 
 def verify_farcaster_signature(body: bytes, signature: str, secret: str) -> bool:
     """
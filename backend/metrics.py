@@ -0,0 +1,203 @@
+"""
+Process-wide metrics registry
+
+Lightweight labelled counters, gauges and histograms shared by the services;
+`snapshot()` returns every series as plain data for the /stats endpoint and
+`render_prometheus()` the text exposition format served on /metrics.
+"""
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional, Sequence, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Counter:
+    """Monotonically increasing value per label set"""
+    kind = "counter"
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+    def samples(self) -> Dict[LabelKey, float]:
+        with self._lock:
+            return dict(self._values)
+
+
+class Gauge(Counter):
+    """Value that can go up and down per label set"""
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+# Seconds, from a cached lookup up to a long Hume job
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+class Histogram:
+    """Distribution of observed values per label set, in cumulative buckets"""
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, buckets: Optional[Sequence[float]] = None):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets or DEFAULT_BUCKETS))
+        # Per label set: [count per bucket (non-cumulative, last is +Inf), sum]
+        self._values: Dict[LabelKey, Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(labels)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            entry[0][index] += 1
+            entry[1][0] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the wall time spent in the block, also when it raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        entry = self._values.get(_label_key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def sum(self, **labels) -> float:
+        entry = self._values.get(_label_key(labels))
+        return entry[1][0] if entry else 0.0
+
+    def samples(self) -> Dict[LabelKey, Dict[str, Any]]:
+        """Per label set: observation count, sum and cumulative counts by upper bound"""
+        with self._lock:
+            values = {key: (list(counts), total[0]) for key, (counts, total) in self._values.items()}
+        result = {}
+        for key, (counts, total) in values.items():
+            cumulative, running = [], 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                running += count
+                cumulative.append((bound, running))
+            result[key] = {"count": running, "sum": total, "buckets": cumulative}
+        return result
+
+
+def _prometheus_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    escaped = (
+        (k, v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for k, v in pairs
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+def _prometheus_number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class MetricsRegistry:
+    """Named collection of metrics; asking for an existing name returns the same metric"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Counter] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, description: str, **options):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, description, **options)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name: str, description: str = "") -> Counter:
+        return self._get_or_create(Counter, name, description)
+
+    def gauge(self, name: str, description: str = "") -> Gauge:
+        return self._get_or_create(Gauge, name, description)
+
+    def histogram(self, name: str, description: str = "", buckets: Optional[Sequence[float]] = None) -> Histogram:
+        return self._get_or_create(Histogram, name, description, buckets=buckets)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """All series keyed by metric name, with label sets rendered as `k=v,...`"""
+        result = {}
+        for name, metric in sorted(self._metrics.items()):
+            samples = metric.samples()
+            if isinstance(metric, Histogram):
+                # Buckets are for Prometheus; /stats keeps to count, sum and mean
+                samples = {
+                    key: {"count": s["count"], "sum": s["sum"], "mean": s["sum"] / s["count"] if s["count"] else 0}
+                    for key, s in samples.items()
+                }
+            result[name] = {
+                ",".join(f"{k}={v}" for k, v in key) or "": value
+                for key, value in samples.items()
+            }
+        return result
+
+    def render_prometheus(self) -> str:
+        """Every metric in the Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        with self._lock:
+            registered = sorted(self._metrics.items())
+        for name, metric in registered:
+            if metric.description:
+                lines.append(f"# HELP {name} {metric.description}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for key, value in sorted(metric.samples().items()):
+                if isinstance(metric, Histogram):
+                    for bound, count in value["buckets"]:
+                        le = (("le", _prometheus_number(bound)),)
+                        lines.append(f"{name}_bucket{_prometheus_labels(key, le)} {count}")
+                    lines.append(f"{name}_sum{_prometheus_labels(key)} {_prometheus_number(value['sum'])}")
+                    lines.append(f"{name}_count{_prometheus_labels(key)} {value['count']}")
+                else:
+                    lines.append(f"{name}{_prometheus_labels(key)} {_prometheus_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Singleton instance
+metrics = MetricsRegistry()
+
+# One histogram for every stage of /analyze-pitch, labelled by `stage`, so the stages compare side by side
+stage_seconds = metrics.histogram("pitch_analysis_stage_seconds", "Time spent in each stage of a pitch analysis")
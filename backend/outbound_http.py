@@ -0,0 +1,283 @@
+"""
+Process-wide pooled HTTP client for outbound API calls
+
+The Hume SDK, the Groq/OpenAI clients behind the scoring LLM and the JWKS
+fetch in auth.py all take an httpx client. OutboundHTTP hands them the same
+pooled one, so a poll of a Hume job reuses a warm keep-alive connection
+instead of paying a TCP and TLS handshake. Connection failures are retried by
+the transport; retries of HTTP errors (429, 5xx) stay with the SDKs, which
+already know which calls are safe to repeat.
+
+Every request goes through an instrumenting transport that caps the
+connections open to one host, and records per host the request count, status,
+time to response headers and whether the request opened a new connection or
+reused one from the pool (from httpcore's connection trace events).
+
+Configuration (OUTBOUND_HTTP_*):
+    MAX_CONNECTIONS            pool-wide connection limit (100)
+    MAX_CONNECTIONS_PER_HOST   concurrent requests per host (20)
+    MAX_KEEPALIVE              idle connections kept open (40)
+    KEEPALIVE_SECONDS          idle connection lifetime (60)
+    CONNECT_TIMEOUT            seconds to establish a connection (10)
+    READ_TIMEOUT               seconds between bytes received (120)
+    RETRIES                    retries of failed connection attempts (2)
+    HTTP2                      1 to negotiate HTTP/2 (needs the h2 package)
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+import httpx
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+http_requests = metrics.counter("outbound_http_requests_total", "Outbound HTTP requests by host and status")
+http_connections = metrics.counter("outbound_http_connections_total", "Outbound requests by host and whether they reused a pooled connection")
+http_seconds = metrics.counter("outbound_http_request_seconds_total", "Time to response headers of outbound requests, by host")
+http_in_flight = metrics.gauge("outbound_http_in_flight", "Outbound requests in flight by host")
+
+# httpcore trace events emitted only when a request has to open a connection
+_NEW_CONNECTION_EVENTS = ("connection.connect_tcp.complete", "connection.connect_unix_socket.complete")
+
+
+def _host_label(url: httpx.URL) -> str:
+    return url.host if url.port is None else f"{url.host}:{url.port}"
+
+
+class _RequestTrace:
+    """Collects the httpcore trace events of one request"""
+
+    def __init__(self, chained: Optional[Callable] = None):
+        self.new_connection = False
+        self.chained = chained
+
+    def observe(self, event_name: str) -> None:
+        if event_name in _NEW_CONNECTION_EVENTS:
+            self.new_connection = True
+
+    async def atrace(self, event_name: str, info: Dict[str, Any]) -> None:
+        self.observe(event_name)
+        if self.chained is not None:
+            await self.chained(event_name, info)
+
+    def trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        self.observe(event_name)
+        if self.chained is not None:
+            self.chained(event_name, info)
+
+
+def _record(host: str, status: str, trace: _RequestTrace, elapsed: float) -> None:
+    http_requests.inc(host=host, status=status)
+    http_seconds.inc(elapsed, host=host)
+    http_connections.inc(host=host, connection="new" if trace.new_connection else "reused")
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Response body that gives back its host slot once the body is closed"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, release: Callable[[], None]):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release()
+
+
+class InstrumentedAsyncTransport(httpx.AsyncBaseTransport):
+    """Per-host concurrency cap and metrics around a pooled async transport"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, max_per_host: int):
+        self.transport = transport
+        self.max_per_host = max_per_host
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+
+    def _slots(self, host: str) -> asyncio.Semaphore:
+        slots = self._host_slots.get(host)
+        if slots is None:
+            slots = self._host_slots[host] = asyncio.Semaphore(self.max_per_host)
+        return slots
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = _host_label(request.url)
+        slots = self._slots(host)
+        await slots.acquire()
+        http_in_flight.inc(host=host)
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                http_in_flight.dec(host=host)
+                slots.release()
+
+        trace = _RequestTrace(request.extensions.get("trace"))
+        request.extensions["trace"] = trace.atrace
+        start = time.perf_counter()
+        try:
+            response = await self.transport.handle_async_request(request)
+        except Exception as e:
+            release()
+            _record(host, type(e).__name__, trace, time.perf_counter() - start)
+            raise
+        _record(host, str(response.status_code), trace, time.perf_counter() - start)
+        # The connection stays busy until the body has been read, e.g. a streamed LLM answer
+        response.stream = _ReleasingStream(response.stream, release)
+        return response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+class InstrumentedTransport(httpx.BaseTransport):
+    """Metrics around a pooled sync transport, for the few blocking callers"""
+
+    def __init__(self, transport: httpx.BaseTransport):
+        self.transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        host = _host_label(request.url)
+        trace = _RequestTrace(request.extensions.get("trace"))
+        request.extensions["trace"] = trace.trace
+        start = time.perf_counter()
+        try:
+            response = self.transport.handle_request(request)
+        except Exception as e:
+            _record(host, type(e).__name__, trace, time.perf_counter() - start)
+            raise
+        _record(host, str(response.status_code), trace, time.perf_counter() - start)
+        return response
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+class OutboundHTTP:
+    """Lazily built shared httpx clients with one tuned connection pool each"""
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_connections_per_host: int = 20,
+        max_keepalive: int = 40,
+        keepalive_seconds: float = 60,
+        connect_timeout: float = 10,
+        read_timeout: float = 120,
+        retries: int = 2,
+        http2: bool = False,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        """
+        Args:
+            max_connections: Connections open at once across all hosts
+            max_connections_per_host: Requests in flight at once to one host
+            max_keepalive: Idle connections kept for reuse
+            keepalive_seconds: How long an idle connection is kept
+            connect_timeout: Seconds to establish a connection
+            read_timeout: Seconds to wait for the next bytes of a response
+            retries: Retries of failed connection attempts
+            http2: Negotiate HTTP/2 where the server supports it
+            transport: Inner async transport (defaults to a pooled httpx transport)
+        """
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_seconds,
+        )
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.max_connections_per_host = max_connections_per_host
+        self.retries = retries
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("OUTBOUND_HTTP2 is set but the h2 package is missing; using HTTP/1.1")
+                http2 = False
+        self.http2 = http2
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._sync_client: Optional[httpx.Client] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "OutboundHTTP":
+        """Configure from OUTBOUND_HTTP_* environment variables"""
+        env = os.environ.get
+        return cls(
+            max_connections=int(env("OUTBOUND_HTTP_MAX_CONNECTIONS", "100")),
+            max_connections_per_host=int(env("OUTBOUND_HTTP_MAX_CONNECTIONS_PER_HOST", "20")),
+            max_keepalive=int(env("OUTBOUND_HTTP_MAX_KEEPALIVE", "40")),
+            keepalive_seconds=float(env("OUTBOUND_HTTP_KEEPALIVE_SECONDS", "60")),
+            connect_timeout=float(env("OUTBOUND_HTTP_CONNECT_TIMEOUT", "10")),
+            read_timeout=float(env("OUTBOUND_HTTP_READ_TIMEOUT", "120")),
+            retries=int(env("OUTBOUND_HTTP_RETRIES", "2")),
+            http2=env("OUTBOUND_HTTP2", "0").lower() in ("1", "true", "yes"),
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The shared async client"""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    inner = self._transport or httpx.AsyncHTTPTransport(
+                        limits=self.limits, http2=self.http2, retries=self.retries
+                    )
+                    self._client = httpx.AsyncClient(
+                        transport=InstrumentedAsyncTransport(inner, self.max_connections_per_host),
+                        timeout=self.timeout,
+                        follow_redirects=True,
+                    )
+        return self._client
+
+    @property
+    def sync_client(self) -> httpx.Client:
+        """Shared blocking client for code running in worker threads"""
+        if self._sync_client is None:
+            with self._lock:
+                if self._sync_client is None:
+                    self._sync_client = httpx.Client(
+                        transport=InstrumentedTransport(httpx.HTTPTransport(
+                            limits=self.limits, http2=self.http2, retries=self.retries
+                        )),
+                        timeout=self.timeout,
+                        follow_redirects=True,
+                    )
+        return self._sync_client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._sync_client is not None:
+            self._sync_client.close()
+            self._sync_client = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-host request count, connection reuse rate and mean time to headers"""
+        hosts: Dict[str, Dict[str, Any]] = {}
+        for labels, count in http_connections.samples().items():
+            labels = dict(labels)
+            host = hosts.setdefault(labels["host"], {"requests": 0, "new_connections": 0})
+            host["requests"] += count
+            if labels["connection"] == "new":
+                host["new_connections"] += count
+        for name, host in hosts.items():
+            host["connection_reuse_rate"] = 1 - host["new_connections"] / host["requests"]
+            host["mean_seconds"] = http_seconds.value(host=name) / host["requests"]
+            host["in_flight"] = http_in_flight.value(host=name)
+        return {"http2": self.http2, "hosts": hosts}
+
+
+# Singleton instance; clients are created on first use
+outbound_http = OutboundHTTP.from_env()
@@ -0,0 +1,346 @@
+"""
+Central poll scheduler for outstanding Hume batch jobs
+
+Instead of every request polling its own job on a fixed 2 s timer, jobs
+register here and a single loop checks them: one `list_jobs` call covers every
+job that is due, intervals back off exponentially with jitter, the first check
+is delayed in proportion to the audio duration, and a Hume completion
+callback (when configured) resolves jobs without any polling at all.
+
+For each finished job the scheduler also splits the wait into Hume's own
+queue and inference time (from the job state timestamps), the delay until a
+status check noticed completion, and the predictions fetch.
+"""
+import asyncio
+import logging
+import random
+import time
+from typing import Dict, Any, Optional, List, Tuple
+from hume.core.pydantic_utilities import parse_obj_as
+from hume.expression_measurement.batch.types import UnionPredictResult
+from metrics import metrics, stage_seconds
+
+logger = logging.getLogger(__name__)
+
+status_checks = metrics.counter("hume_status_checks_total", "Hume job status requests by mode")
+job_polls = metrics.counter("hume_job_polls_total", "Status checks attributed to individual jobs")
+jobs_finished = metrics.counter("hume_jobs_finished_total", "Hume jobs resolved by the poll scheduler")
+outstanding_jobs = metrics.gauge("hume_outstanding_jobs", "Hume jobs waiting on the poll scheduler")
+polls_per_job = metrics.histogram(
+    "hume_polls_per_job", "Status checks spent on each finished Hume job", buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34)
+)
+
+# Leeway for clock skew between us and Hume when listing jobs by creation time
+_CREATED_AFTER_SLACK_MS = 60_000
+
+
+class _PendingJob:
+    def __init__(self, job_id: str, future: asyncio.Future, first_delay: float, interval: float):
+        self.job_id = job_id
+        self.future = future
+        self.created_ms = int(time.time() * 1000)
+        self.interval = interval
+        self.next_poll_at = time.monotonic() + first_delay
+        self.polls = 0
+        self.errors = 0
+        # Filled in once a status check sees the job completed
+        self.state = None
+        self.completed_ms: Optional[int] = None
+        self.fetch_seconds: Optional[float] = None
+
+    def timings(self) -> Dict[str, float]:
+        """Seconds spent in each part of the wait that could be measured"""
+        timings = {}
+        created = getattr(self.state, "created_timestamp_ms", None)
+        started = getattr(self.state, "started_timestamp_ms", None)
+        ended = getattr(self.state, "ended_timestamp_ms", None)
+        if isinstance(created, int) and isinstance(started, int) and isinstance(ended, int):
+            timings["hume_queue"] = max(0, started - created) / 1000
+            timings["hume_inference"] = max(0, ended - started) / 1000
+            # Our clock against Hume's, so clamp small negative skews
+            timings["hume_poll_delay"] = max(0, self.completed_ms - ended) / 1000
+        if self.fetch_seconds is not None:
+            timings["hume_fetch_predictions"] = self.fetch_seconds
+        return timings
+
+
+class HumePollScheduler:
+    """Shared, adaptive status polling for Hume batch jobs"""
+
+    def __init__(
+        self,
+        batch_client,
+        call=None,
+        min_interval: float = 1.0,
+        max_interval: float = 30.0,
+        backoff_factor: float = 1.6,
+        jitter: float = 0.2,
+        seconds_per_audio_second: float = 0.25,
+        callback_enabled: bool = False,
+        callback_interval_multiplier: float = 4.0,
+        list_limit: int = 100,
+        max_list_pages: int = 5,
+        max_consecutive_errors: int = 3,
+    ):
+        """
+        Args:
+            batch_client: `client.expression_measurement.batch` of an AsyncHumeClient
+            call: Coroutine wrapper applied to every SDK call (e.g. a concurrency limiter)
+            min_interval: Shortest delay between checks of the same job
+            max_interval: Backoff ceiling
+            backoff_factor: Interval multiplier after each unfinished check
+            jitter: Fractional +/- randomization applied to every delay
+            seconds_per_audio_second: First check delay per second of audio
+            callback_enabled: Hume posts completions to us, so polling is only a safety net
+            callback_interval_multiplier: Interval stretch applied when callbacks are enabled
+            list_limit: Page size for the batched `list_jobs` status check
+            max_list_pages: Pages listed per check before the remaining jobs are checked one by one
+            max_consecutive_errors: Failed checks tolerated before a job is given up on
+        """
+        self.batch = batch_client
+        self._call = call
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff_factor = backoff_factor
+        self.jitter = jitter
+        self.seconds_per_audio_second = seconds_per_audio_second
+        self.callback_enabled = callback_enabled
+        self.callback_interval_multiplier = callback_interval_multiplier
+        self.list_limit = list_limit
+        self.max_list_pages = max_list_pages
+        self.max_consecutive_errors = max_consecutive_errors
+
+        self._jobs: Dict[str, _PendingJob] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    async def wait_for(
+        self,
+        job_id: str,
+        timeout_seconds: float,
+        audio_duration: Optional[float] = None
+    ) -> Tuple[List[Any], int, Dict[str, float]]:
+        """
+        Wait until a Hume job completes
+
+        Args:
+            job_id: Hume batch job id
+            timeout_seconds: Maximum time to wait for results
+            audio_duration: Length of the submitted audio in seconds, if known
+
+        Returns:
+            Tuple of (job predictions, number of status checks spent on the job,
+            seconds per stage of the wait as far as they are known)
+        """
+        interval = self.min_interval
+        first_delay = self.min_interval
+        if audio_duration:
+            first_delay = min(self.max_interval, max(self.min_interval, audio_duration * self.seconds_per_audio_second))
+        if self.callback_enabled:
+            interval *= self.callback_interval_multiplier
+            first_delay *= self.callback_interval_multiplier
+
+        pending = _PendingJob(
+            job_id,
+            asyncio.get_running_loop().create_future(),
+            self._jittered(first_delay),
+            interval,
+        )
+        self._jobs[job_id] = pending
+        outstanding_jobs.set(len(self._jobs))
+        self._ensure_running()
+
+        try:
+            predictions = await asyncio.wait_for(asyncio.shield(pending.future), timeout_seconds)
+            jobs_finished.inc(status="completed")
+            timings = pending.timings()
+            for stage, seconds in timings.items():
+                stage_seconds.observe(seconds, stage=stage)
+            polls_per_job.observe(pending.polls)
+            return predictions, pending.polls, timings
+        except asyncio.TimeoutError:
+            jobs_finished.inc(status="timeout")
+            raise TimeoutError(f"Hume analysis timed out after {timeout_seconds} seconds")
+        except Exception:
+            jobs_finished.inc(status="failed")
+            raise
+        finally:
+            self._jobs.pop(job_id, None)
+            outstanding_jobs.set(len(self._jobs))
+            job_polls.inc(pending.polls)
+
+    def notify(
+        self,
+        job_id: str,
+        status: str,
+        predictions: Optional[List[Dict[str, Any]]] = None,
+        message: Optional[str] = None
+    ) -> bool:
+        """
+        Deliver a Hume completion callback
+
+        Predictions included in the callback resolve the job directly, saving the
+        `get_job_predictions` round trip; otherwise the job is checked right away.
+
+        Returns:
+            True if the job was waiting on this scheduler
+        """
+        pending = self._jobs.get(job_id)
+        if pending is None or pending.future.done():
+            return False
+
+        if status == "FAILED":
+            pending.future.set_exception(Exception(f"Hume job failed: {message or 'Unknown error'}"))
+        elif status == "COMPLETED" and predictions is not None:
+            pending.future.set_result(parse_obj_as(List[UnionPredictResult], predictions))
+        else:
+            pending.next_poll_at = 0
+            if self._wakeup is not None:
+                self._wakeup.set()
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Status checks spent so far on each outstanding job"""
+        return {
+            "outstanding_jobs": len(self._jobs),
+            "polls_by_job": {job_id: job.polls for job_id, job in self._jobs.items()},
+        }
+
+    def _jittered(self, delay: float) -> float:
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _ensure_running(self) -> None:
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        else:
+            self._wakeup.set()
+
+    async def _invoke(self, method, *args, **kwargs):
+        if self._call is not None:
+            return await self._call(method, *args, **kwargs)
+        return await method(*args, **kwargs)
+
+    async def _run(self) -> None:
+        while self._jobs:
+            now = time.monotonic()
+            due = [
+                job for job in self._jobs.values()
+                if job.next_poll_at <= now and not job.future.done()
+            ]
+            if due:
+                await self._check(due)
+
+            waiting = [job.next_poll_at for job in self._jobs.values() if not job.future.done()]
+            if not waiting:
+                # Everything left is resolved and about to be unregistered by its waiter
+                await asyncio.sleep(0)
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(0, min(waiting) - time.monotonic()))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _check(self, due: List[_PendingJob]) -> None:
+        try:
+            states = await self._fetch_states(due)
+        except Exception as e:
+            logger.warning(f"Hume status check failed for {len(due)} jobs: {str(e)}")
+            for job in due:
+                job.errors += 1
+                if job.future.done():
+                    # Resolved by a callback while the check was in flight
+                    continue
+                if job.errors >= self.max_consecutive_errors:
+                    job.future.set_exception(e)
+                else:
+                    self._reschedule(job)
+            return
+
+        completed = []
+        for job in due:
+            if job.future.done():
+                continue
+            job.polls += 1
+            job.errors = 0
+            state = states.get(job.job_id)
+            status = getattr(state, "status", None)
+            if status == "COMPLETED":
+                job.state = state
+                job.completed_ms = int(time.time() * 1000)
+                completed.append(job)
+            elif status == "FAILED":
+                error_msg = getattr(state, "message", "Unknown error")
+                job.future.set_exception(Exception(f"Hume job failed: {error_msg}"))
+            else:
+                self._reschedule(job)
+
+        if completed:
+            await asyncio.gather(*(self._fetch_predictions(job) for job in completed))
+
+    async def _fetch_states(self, due: List[_PendingJob]) -> Dict[str, Any]:
+        """Current state of each due job, using one list call when several are due"""
+        if len(due) == 1:
+            status_checks.inc(mode="single")
+            details = await self._invoke(self.batch.get_job_details, due[0].job_id)
+            return {due[0].job_id: details.state}
+
+        wanted = {job.job_id for job in due}
+        after_ms = min(job.created_ms for job in due) - _CREATED_AFTER_SLACK_MS
+        newest_ms = max(job.created_ms for job in due) + _CREATED_AFTER_SLACK_MS
+        states = {}
+        exhausted = False
+        # Other workers on the account fill pages with their own jobs; page on by creation time
+        for _ in range(self.max_list_pages):
+            status_checks.inc(mode="batch")
+            finished = await self._invoke(
+                self.batch.list_jobs,
+                status=["COMPLETED", "FAILED"],
+                when="created_after",
+                timestamp_ms=after_ms,
+                sort_by="created",
+                direction="asc",
+                limit=self.list_limit,
+            )
+            states.update((job.job_id, job.state) for job in finished if job.job_id in wanted)
+            last_ms = getattr(finished[-1].state, "created_timestamp_ms", None) if finished else None
+            if (
+                len(finished) < self.list_limit
+                or wanted <= states.keys()
+                or not isinstance(last_ms, int)
+                or last_ms > newest_ms
+            ):
+                exhausted = True
+                break
+            # Step back a millisecond so jobs created alongside the page's last one are not skipped
+            if last_ms - 1 <= after_ms:
+                break
+            after_ms = last_ms - 1
+
+        # Jobs the pages may have cut off are checked individually
+        missing = [] if exhausted else [job for job in due if job.job_id not in states]
+        if missing:
+            status_checks.inc(len(missing), mode="single")
+            details = await asyncio.gather(*(
+                self._invoke(self.batch.get_job_details, job.job_id) for job in missing
+            ))
+            states.update((job.job_id, detail.state) for job, detail in zip(missing, details))
+        return states
+
+    async def _fetch_predictions(self, job: _PendingJob) -> None:
+        start = time.perf_counter()
+        try:
+            predictions = await self._invoke(self.batch.get_job_predictions, job.job_id)
+            job.fetch_seconds = time.perf_counter() - start
+        except Exception as e:
+            logger.error(f"Error fetching predictions for job {job.job_id}: {str(e)}")
+            if not job.future.done():
+                job.future.set_exception(e)
+            return
+        if not job.future.done():
+            job.future.set_result(predictions)
+
+    def _reschedule(self, job: _PendingJob) -> None:
+        job.next_poll_at = time.monotonic() + self._jittered(job.interval)
+        job.interval = min(self.max_interval, job.interval * self.backoff_factor)
@@ -0,0 +1,401 @@
+"""
+Practice session history and per-user dashboard stats
+
+Every finished pitch analysis of a signed-in user is recorded as a
+PracticeSession. Alongside it the store keeps a UserStats row per user that
+is updated in O(1) as each session lands: counts and sums for the averages,
+the day streak, and short first/latest score windows for the improvement
+figure. `/dashboard` reads that row plus one page of the newest sessions,
+so its cost doesn't grow with the user's history.
+
+SESSION_STORE selects the store: sqlite (the default, at SESSION_DB, which
+defaults to practice_sessions.db next to this module) or memory. The memory store keeps every session for the life of the process and
+is not shared with standalone `python jobs.py` workers, so it is only meant
+for development and tests.
+"""
+import asyncio
+import bisect
+import datetime
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+
+SCORE_DIMENSIONS = ("tone", "fluency", "clarity", "confidence")
+
+# Sessions averaged at each end of a user's history for `improvement`
+IMPROVEMENT_WINDOW = 5
+
+SessionCursor = Tuple[float, str]
+
+
+def _day(timestamp: float) -> int:
+    """UTC calendar day of a timestamp, as a proleptic ordinal"""
+    return datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc).toordinal()
+
+
+def _iso_day(timestamp: float) -> str:
+    return datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc).date().isoformat()
+
+
+class PracticeSession(BaseModel):
+    """One scored pitch analysis"""
+    session_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    user_id: str
+    created_at: float = Field(default_factory=time.time)
+    score: float
+    scores: Dict[str, float] = Field(default_factory=dict)
+    duration: float = 0
+    persona: Optional[str] = None
+    persona_type: Optional[str] = None
+
+    @property
+    def cursor(self) -> SessionCursor:
+        return (self.created_at, self.session_id)
+
+    def public_view(self) -> Dict[str, Any]:
+        """The session as listed in the dashboard's `recentSessions`"""
+        return {
+            "id": self.session_id,
+            "date": _iso_day(self.created_at),
+            "persona": self.persona,
+            "score": round(self.score),
+            "duration": round(self.duration),
+            "type": self.persona_type,
+            "scores": self.scores,
+        }
+
+
+class UserStats(BaseModel):
+    """Running dashboard aggregate for one user"""
+    total_sessions: int = 0
+    score_sum: float = 0
+    practice_seconds: float = 0
+    first_session_at: Optional[float] = None
+    last_day: Optional[int] = None
+    current_streak: int = 0
+    longest_streak: int = 0
+    first_scores: List[float] = Field(default_factory=list)
+    latest_scores: List[float] = Field(default_factory=list)
+
+    def add(self, session: PracticeSession) -> None:
+        """Fold one more session into the aggregate"""
+        self.total_sessions += 1
+        self.score_sum += session.score
+        self.practice_seconds += session.duration
+        if self.first_session_at is None:
+            self.first_session_at = session.created_at
+
+        day = _day(session.created_at)
+        if self.last_day is None or day > self.last_day + 1:
+            self.current_streak = 1
+        elif day == self.last_day + 1:
+            self.current_streak += 1
+        # A session on an earlier day (clock skew) leaves the streak alone
+        self.last_day = day if self.last_day is None else max(self.last_day, day)
+        self.longest_streak = max(self.longest_streak, self.current_streak)
+
+        if len(self.first_scores) < IMPROVEMENT_WINDOW:
+            self.first_scores.append(session.score)
+        self.latest_scores = (self.latest_scores + [session.score])[-IMPROVEMENT_WINDOW:]
+
+    def streak_on(self, today: int) -> int:
+        """Current streak as of `today`; it lapses after a whole day without practice"""
+        if self.last_day is None or today > self.last_day + 1:
+            return 0
+        return self.current_streak
+
+    def quick_stats(self) -> Dict[str, Any]:
+        average = self.score_sum / self.total_sessions if self.total_sessions else 0
+        improvement = 0
+        if self.first_scores:
+            baseline = sum(self.first_scores) / len(self.first_scores)
+            latest = sum(self.latest_scores) / len(self.latest_scores)
+            improvement = round((latest - baseline) / baseline * 100) if baseline else 0
+        return {
+            "totalSessions": self.total_sessions,
+            "averageScore": round(average),
+            "practiceTime": round(self.practice_seconds),
+            "improvement": improvement,
+        }
+
+    @property
+    def level(self) -> str:
+        average = self.score_sum / self.total_sessions if self.total_sessions else 0
+        if self.total_sessions == 0 or average < 60:
+            return "Beginner"
+        return "Intermediate" if average < 80 else "Advanced"
+
+
+def session_from_analysis(
+    user_id: str,
+    pitch_scores: Dict[str, Any],
+    duration: Optional[float] = None,
+    persona: Optional[str] = None,
+    persona_type: Optional[str] = None,
+) -> Optional[PracticeSession]:
+    """
+    Practice session for a finished analysis, or None if it has no usable scores
+
+    Local scores standing in for a failed LLM call (`local_fallback`) are not
+    recorded: they would skew the user's averages and improvement.
+
+    Args:
+        user_id: JWT `sub` of the user
+        pitch_scores: Scores as returned by PitchScoringService
+        duration: Recording length in seconds
+        persona: Persona the user practised with
+        persona_type: Kind of audience the persona plays (e.g. "VC Investor")
+    """
+    if (pitch_scores.get("metadata") or {}).get("scoring_mode") == "local_fallback":
+        return None
+    scores = {name: pitch_scores.get(name) for name in SCORE_DIMENSIONS}
+    if not all(isinstance(value, (int, float)) for value in scores.values()):
+        return None
+    return PracticeSession(
+        user_id=user_id,
+        score=sum(scores.values()) / len(scores),
+        scores=scores,
+        duration=duration or 0,
+        persona=persona,
+        persona_type=persona_type,
+    )
+
+
+def encode_cursor(cursor: SessionCursor) -> str:
+    return f"{cursor[0]!r}_{cursor[1]}"
+
+
+def decode_cursor(value: str) -> SessionCursor:
+    """
+    Raises:
+        ValueError: Not a cursor returned by encode_cursor
+    """
+    created_at, _, session_id = value.partition("_")
+    if not session_id:
+        raise ValueError(f"Invalid cursor: {value}")
+    return (float(created_at), session_id)
+
+
+class SessionStore(ABC):
+    """Persistence for practice sessions and their per-user aggregate"""
+
+    @abstractmethod
+    def record(self, session: PracticeSession) -> UserStats:
+        """Store a session and update its user's stats; returns the updated stats"""
+
+    @abstractmethod
+    def stats(self, user_id: str) -> UserStats:
+        ...
+
+    @abstractmethod
+    def recent(
+        self,
+        user_id: str,
+        limit: int,
+        before: Optional[SessionCursor] = None,
+    ) -> List[PracticeSession]:
+        """Newest sessions first, starting after the `before` cursor"""
+
+
+class InMemorySessionStore(SessionStore):
+    """Session store for a single process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, UserStats] = {}
+        # Per user, sessions in cursor order plus their cursors for bisecting
+        self._sessions: Dict[str, List[PracticeSession]] = {}
+        self._cursors: Dict[str, List[SessionCursor]] = {}
+
+    def record(self, session: PracticeSession) -> UserStats:
+        with self._lock:
+            cursors = self._cursors.setdefault(session.user_id, [])
+            index = bisect.bisect(cursors, session.cursor)
+            cursors.insert(index, session.cursor)
+            self._sessions.setdefault(session.user_id, []).insert(index, session)
+            stats = self._stats.setdefault(session.user_id, UserStats())
+            stats.add(session)
+            return stats.model_copy(deep=True)
+
+    def stats(self, user_id: str) -> UserStats:
+        with self._lock:
+            stats = self._stats.get(user_id)
+            return stats.model_copy(deep=True) if stats is not None else UserStats()
+
+    def recent(
+        self,
+        user_id: str,
+        limit: int,
+        before: Optional[SessionCursor] = None,
+    ) -> List[PracticeSession]:
+        with self._lock:
+            cursors = self._cursors.get(user_id, [])
+            end = len(cursors) if before is None else bisect.bisect_left(cursors, before)
+            return self._sessions.get(user_id, [])[max(0, end - limit):end][::-1]
+
+
+class SQLiteSessionStore(SessionStore):
+    """Session store persisted in SQLite, shareable between processes on one host"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        # Opened on first use so importing the app doesn't create the file
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS practice_sessions (
+                    session_id TEXT PRIMARY KEY,
+                    user_id TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    data TEXT NOT NULL
+                )"""
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_practice_sessions_user "
+                "ON practice_sessions (user_id, created_at, session_id)"
+            )
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS user_stats (
+                    user_id TEXT PRIMARY KEY,
+                    data TEXT NOT NULL
+                )"""
+            )
+            self._conn = conn
+        return self._conn
+
+    def _read_stats(self, user_id: str) -> UserStats:
+        row = self._connection().execute("SELECT data FROM user_stats WHERE user_id = ?", (user_id,)).fetchone()
+        return UserStats.model_validate_json(row[0]) if row else UserStats()
+
+    def record(self, session: PracticeSession) -> UserStats:
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT INTO practice_sessions (session_id, user_id, created_at, data) VALUES (?, ?, ?, ?)",
+                    (session.session_id, session.user_id, session.created_at, session.model_dump_json()),
+                )
+                stats = self._read_stats(session.user_id)
+                stats.add(session)
+                conn.execute(
+                    "INSERT OR REPLACE INTO user_stats (user_id, data) VALUES (?, ?)",
+                    (session.user_id, stats.model_dump_json()),
+                )
+                conn.execute("COMMIT")
+                return stats
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def stats(self, user_id: str) -> UserStats:
+        with self._lock:
+            return self._read_stats(user_id)
+
+    def recent(
+        self,
+        user_id: str,
+        limit: int,
+        before: Optional[SessionCursor] = None,
+    ) -> List[PracticeSession]:
+        with self._lock:
+            conn = self._connection()
+            if before is None:
+                rows = conn.execute(
+                    "SELECT data FROM practice_sessions WHERE user_id = ? "
+                    "ORDER BY created_at DESC, session_id DESC LIMIT ?",
+                    (user_id, limit),
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT data FROM practice_sessions WHERE user_id = ? AND (created_at, session_id) < (?, ?) "
+                    "ORDER BY created_at DESC, session_id DESC LIMIT ?",
+                    (user_id, before[0], before[1], limit),
+                ).fetchall()
+        return [PracticeSession.model_validate_json(row[0]) for row in rows]
+
+
+# Next to this module rather than wherever the process was started
+DEFAULT_SESSION_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "practice_sessions.db")
+
+
+def create_session_store() -> SessionStore:
+    """Build the session store selected by SESSION_STORE (sqlite or memory)"""
+    backend = os.environ.get("SESSION_STORE", "sqlite").lower()
+    if backend == "sqlite":
+        return SQLiteSessionStore(os.environ.get("SESSION_DB", DEFAULT_SESSION_DB))
+    if backend == "memory":
+        return InMemorySessionStore()
+    raise ValueError(f"Unknown SESSION_STORE backend: {backend}")
+
+
+def dashboard_view(
+    store: SessionStore,
+    user: Dict[str, Any],
+    limit: int,
+    before: Optional[SessionCursor] = None,
+) -> Dict[str, Any]:
+    """
+    The `/dashboard` body for a user, from their stats row and one page of sessions
+
+    Args:
+        store: Session store
+        user: Verified JWT claims
+        limit: Sessions in the `recentSessions` page
+        before: Cursor of the last session on the previous page
+    """
+    user_id = user.get("sub")
+    stats = store.stats(user_id)
+    # One extra row tells whether there is a next page
+    sessions = store.recent(user_id, limit + 1, before)
+    page = sessions[:limit]
+    metadata = user.get("user_metadata") or {}
+    email = user.get("email") or ""
+    return {
+        "user": {
+            "name": metadata.get("full_name") or metadata.get("name") or email.split("@")[0] or None,
+            "joinDate": _iso_day(stats.first_session_at) if stats.first_session_at is not None else None,
+            "currentStreak": stats.streak_on(_day(time.time())),
+            "longestStreak": stats.longest_streak,
+            "level": stats.level,
+        },
+        "quickStats": stats.quick_stats(),
+        "recentSessions": [session.public_view() for session in page],
+        "nextCursor": encode_cursor(page[-1].cursor) if len(sessions) > limit else None,
+    }
+
+
+# Singleton instance
+session_store = create_session_store()
+
+
+async def record_analysis(user_id: Optional[str], pitch_scores: Dict[str, Any], **details) -> None:
+    """
+    Record a finished analysis for the dashboard; anonymous or unscored analyses are skipped
+
+    A failure is logged rather than raised, so it never costs the user their result.
+    """
+    if not user_id:
+        return
+    session = session_from_analysis(user_id, pitch_scores, **details)
+    if session is None:
+        return
+    try:
+        await asyncio.to_thread(session_store.record, session)
+    except sqlite3.Error as e:
+        logger.warning(f"Could not record practice session for {user_id}: {str(e)}")
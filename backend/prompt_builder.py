@@ -0,0 +1,210 @@
+"""
+Token-budgeted transcripts for the scoring prompt
+
+A long session's full transcription can dwarf the rest of the prompt, so
+PromptBuilder keeps the rendered prompt under a token budget. Short transcripts
+go in whole, with consecutive repeats collapsed. Longer ones become a
+chronological excerpt of representative segments: the opening and closing
+segments, the peaks of anxiety and enthusiasm, then segments spread evenly
+across the timeline until the budget is spent. Passages repeated verbatim are
+shown once with their count, and gaps are marked with how much was left out.
+
+Token counts come from a pluggable counter. The default approximates a BPE
+tokenizer from word and punctuation runs, which is close enough for budgeting
+and costs microseconds.
+"""
+import os
+import re
+from typing import Dict, Any, List, Callable, Optional, Tuple
+from metrics import metrics
+
+prompt_tokens = metrics.counter("scoring_prompt_tokens_total", "Estimated tokens in rendered scoring prompts")
+prompt_compactions = metrics.counter("scoring_prompt_compactions_total", "Prompts whose transcript was excerpted to fit the budget")
+
+DEFAULT_TOKEN_BUDGET = 2000
+
+# Segments scored high on these mark the moments worth showing the LLM
+ANXIETY_EMOTIONS = ("Anxiety", "Awkwardness", "Fear", "Distress")
+ENTHUSIASM_EMOTIONS = ("Enthusiasm", "Excitement", "Determination", "Triumph")
+
+EDGE_SEGMENTS = 2
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_NORMALIZE_PATTERN = re.compile(r"[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate BPE token count: words longer than 6 characters count as two"""
+    return sum(2 if len(token) > 6 else 1 for token in _TOKEN_PATTERN.findall(text))
+
+
+def _normalize(text: str) -> str:
+    return " ".join(_NORMALIZE_PATTERN.sub("", text.lower()).split())
+
+
+def _clock(seconds: float) -> str:
+    return f"{int(seconds // 60):02d}:{int(seconds % 60):02d}"
+
+
+def _peak_score(segment: Dict[str, Any], names: Tuple[str, ...]) -> float:
+    # A segment's top emotions are enough to find peaks, and far cheaper than all 48
+    return max((e["score"] for e in segment.get("emotions") or [] if e["name"] in names), default=0.0)
+
+
+def spread_order(count: int) -> List[int]:
+    """Indices 0..count-1 ordered so every prefix is spread evenly over the range"""
+    order = []
+    seen = set()
+    parts = 1
+    while len(order) < count:
+        # Midpoints of `parts` equal slices; once parts >= count every index is hit
+        for k in range(parts):
+            index = (2 * k + 1) * count // (2 * parts)
+            if index not in seen:
+                seen.add(index)
+                order.append(index)
+        parts *= 2
+    return order
+
+
+def representative_indices(timestamps: List[Dict[str, Any]], limit: int) -> List[int]:
+    """
+    Up to `limit` segment indices covering the pitch, in chronological order
+
+    Priority: opening and closing segments, the anxiety peak, the enthusiasm
+    peak, then evenly spread segments.
+    """
+    return sorted(_priority_order(timestamps)[:limit])
+
+
+def _priority_order(timestamps: List[Dict[str, Any]]) -> List[int]:
+    count = len(timestamps)
+    if not count:
+        return []
+    candidates = []
+    for offset in range(min(EDGE_SEGMENTS, count)):
+        candidates += [offset, count - 1 - offset]
+    candidates.append(max(range(count), key=lambda i: _peak_score(timestamps[i], ANXIETY_EMOTIONS)))
+    candidates.append(max(range(count), key=lambda i: _peak_score(timestamps[i], ENTHUSIASM_EMOTIONS)))
+    candidates += spread_order(count)
+    return list(dict.fromkeys(candidates))
+
+
+class PromptBuilder:
+    """Fits the transcription into the scoring prompt's token budget"""
+
+    def __init__(
+        self,
+        token_budget: Optional[int] = None,
+        count_tokens: Callable[[str], int] = estimate_tokens,
+    ):
+        """
+        Args:
+            token_budget: Upper bound on the rendered prompt (PROMPT_TOKEN_BUDGET, default 2000)
+            count_tokens: Token counter for rendered text
+        """
+        if token_budget is None:
+            token_budget = int(os.environ.get("PROMPT_TOKEN_BUDGET", str(DEFAULT_TOKEN_BUDGET)))
+        self.token_budget = token_budget
+        self.count_tokens = count_tokens
+
+    def build(
+        self,
+        render: Callable[[str], str],
+        transcription: str,
+        timestamps: List[Dict[str, Any]],
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Pick the transcription text for the prompt
+
+        Args:
+            render: Renders the full prompt around a transcription text
+            transcription: Full transcription
+            timestamps: Segments of the processed analysis, for excerpting
+
+        Returns:
+            (transcription text to use, stats with the token count of the rendered prompt)
+        """
+        fixed_tokens = self.count_tokens(render(""))
+        available = max(0, self.token_budget - fixed_tokens)
+
+        text = self._collapse_repeats(transcription)
+        compacted = False
+        used_segments = None
+        if self.count_tokens(text) > available and timestamps:
+            text, used_segments = self._excerpt(timestamps, available)
+            compacted = True
+
+        tokens = self.count_tokens(render(text))
+        prompt_tokens.inc(tokens)
+        if compacted:
+            prompt_compactions.inc()
+        return text, {
+            "prompt_tokens": tokens,
+            "token_budget": self.token_budget,
+            "transcript_compacted": compacted,
+            "transcript_segments_used": used_segments,
+            "transcript_segments_total": len(timestamps),
+        }
+
+    def _collapse_repeats(self, text: str) -> str:
+        """Collapse sentences repeated back to back into one with a count"""
+        sentences = re.split(r"(?<=[.!?])\s+", text.strip())
+        collapsed: List[List[Any]] = []
+        for sentence in sentences:
+            if collapsed and _normalize(sentence) == _normalize(collapsed[-1][0]) and sentence:
+                collapsed[-1][1] += 1
+            else:
+                collapsed.append([sentence, 1])
+        return " ".join(
+            sentence if count == 1 else f"{sentence} [repeated {count}x]"
+            for sentence, count in collapsed
+        )
+
+    def _excerpt(self, timestamps: List[Dict[str, Any]], available: int) -> Tuple[str, int]:
+        """Chronological excerpt of representative segments within `available` tokens"""
+        segments = sorted(
+            (s for s in timestamps if s.get("text")),
+            key=lambda s: s["timestamp"]["begin"]
+        )
+        repeats: Dict[str, int] = {}
+        for segment in segments:
+            key = _normalize(segment["text"])
+            repeats[key] = repeats.get(key, 0) + 1
+
+        header = f"[Excerpt of {len(segments)} segments; gaps marked]"
+        gap_cost = self.count_tokens(f"[... {len(segments)} segments omitted ...]")
+        spent = self.count_tokens(header) + gap_cost
+        chosen: Dict[int, str] = {}
+        shown = set()
+        for index in _priority_order(segments):
+            segment = segments[index]
+            key = _normalize(segment["text"])
+            if key in shown:
+                continue
+            line = f"[{_clock(segment['timestamp']['begin'])}] {segment['text']}"
+            if repeats[key] > 1:
+                line += f" [said {repeats[key]}x]"
+            # Every line can open one more gap
+            cost = self.count_tokens(line) + gap_cost
+            if spent + cost > available:
+                if available - spent < 2 * gap_cost:
+                    break
+                continue
+            spent += cost
+            chosen[index] = line
+            shown.add(key)
+
+        return self._render_excerpt(header, chosen, len(segments)), len(chosen)
+
+    def _render_excerpt(self, header: str, chosen: Dict[int, str], total: int) -> str:
+        lines = [header]
+        previous = -1
+        for index in sorted(chosen):
+            if index - previous > 1:
+                lines.append(f"[... {index - previous - 1} segments omitted ...]")
+            lines.append(chosen[index])
+            previous = index
+        if previous < total - 1:
+            lines.append(f"[... {total - 1 - previous} segments omitted ...]")
+        return "\n".join(lines)
@@ -0,0 +1,251 @@
+"""
+Content-addressed cache for analysis results
+
+Entries are keyed by the SHA-256 of the uploaded audio plus the model
+configuration that produced them, so resubmitting the same recording reuses
+the earlier Hume analysis and pitch scores. Lookups go through an in-memory
+LRU, then a size-bounded on-disk tier; both honour a TTL. Concurrent misses
+for one key share a single computation.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Awaitable, Callable
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+cache_lookups = metrics.counter("result_cache_lookups_total", "Result cache lookups by namespace and outcome")
+
+
+def sha256_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 hex digest of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_cache_key(namespace: str, content_hash: str, config: Dict[str, Any]) -> str:
+    """Key for a result derived from `content_hash` under the given model config"""
+    fingerprint = json.dumps(config, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{namespace}:{content_hash}:{fingerprint}".encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Two-tier (memory LRU + disk) TTL cache with single-flight computation"""
+
+    def __init__(
+        self,
+        memory_entries: int = 128,
+        disk_dir: Optional[str] = None,
+        disk_max_bytes: int = 512 * 1024 * 1024,
+        ttl_seconds: float = 7 * 24 * 3600,
+    ):
+        """
+        Args:
+            memory_entries: Entries kept in the in-memory LRU tier
+            disk_dir: Directory for the on-disk tier (None disables it)
+            disk_max_bytes: Disk tier size limit; least recently used files are evicted first
+            ttl_seconds: Lifetime of an entry in both tiers
+        """
+        self.memory_entries = memory_entries
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.ttl_seconds = ttl_seconds
+
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._disk_sizes: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._load_disk_index()
+
+    @classmethod
+    def from_env(cls) -> "ResultCache":
+        """Configure from RESULT_CACHE_* environment variables"""
+        disk_dir = os.environ.get("RESULT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "pitch-coach-cache"))
+        return cls(
+            memory_entries=int(os.environ.get("RESULT_CACHE_MEMORY_ENTRIES", "128")),
+            disk_dir=disk_dir or None,
+            disk_max_bytes=int(os.environ.get("RESULT_CACHE_DISK_MB", "512")) * 1024 * 1024,
+            ttl_seconds=float(os.environ.get("RESULT_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+        )
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        namespace: str = "default",
+        cache_if: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """
+        Return the cached value for `key`, computing and storing it on a miss
+
+        Concurrent calls for the same missing key await one shared computation.
+
+        Args:
+            key: Cache key from make_cache_key()
+            compute: Coroutine factory producing the value
+            namespace: Label for hit/miss counters
+            cache_if: Predicate deciding whether a computed value may be stored
+
+        Returns:
+            The cached or freshly computed value
+        """
+        value = self._get_memory(key)
+        if value is not None:
+            cache_lookups.inc(namespace=namespace, outcome="memory_hit")
+            return value
+
+        task = self._inflight.get(key)
+        if task is None:
+            # The fill runs as its own task so a disconnecting first caller can't cancel it for the others
+            task = asyncio.ensure_future(self._load_or_compute(key, compute, namespace, cache_if))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish_inflight(key, done))
+        else:
+            cache_lookups.inc(namespace=namespace, outcome="coalesced")
+        return await asyncio.shield(task)
+
+    async def _load_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        namespace: str,
+        cache_if: Optional[Callable[[Any], bool]],
+    ) -> Any:
+        value = await asyncio.to_thread(self._get_disk, key)
+        if value is not None:
+            cache_lookups.inc(namespace=namespace, outcome="disk_hit")
+            self._set_memory(key, value)
+            return value
+
+        cache_lookups.inc(namespace=namespace, outcome="miss")
+        value = await compute()
+        if cache_if is None or cache_if(value):
+            self._set_memory(key, value)
+            await asyncio.to_thread(self._set_disk, key, value)
+        return value
+
+    def _finish_inflight(self, key: str, task: asyncio.Future) -> None:
+        self._inflight.pop(key, None)
+        if not task.cancelled():
+            # Mark retrieved so a failure nobody is waiting for doesn't log a warning
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "memory_entries": len(self._memory),
+            "disk_entries": len(self._disk_sizes),
+            "disk_bytes": self._disk_bytes,
+            "inflight": len(self._inflight),
+        }
+
+    def _get_memory(self, key: str) -> Any:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            return value
+
+    def _set_memory(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._memory[key] = (time.time() + self.ttl_seconds, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _load_disk_index(self) -> None:
+        entries = []
+        for name in os.listdir(self.disk_dir):
+            if not name.endswith(".json"):
+                continue
+            stat = os.stat(os.path.join(self.disk_dir, name))
+            entries.append((stat.st_mtime, name[:-5], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk_sizes[key] = size
+            self._disk_bytes += size
+
+    def _get_disk(self, key: str) -> Any:
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Dropping unreadable cache entry {key}: {str(e)}")
+            self._delete_disk(key)
+            return None
+
+        if entry.get("expires_at", 0) < time.time():
+            self._delete_disk(key)
+            return None
+        # Touch the file so eviction order follows use, not creation
+        os.utime(path)
+        with self._lock:
+            if key in self._disk_sizes:
+                self._disk_sizes.move_to_end(key)
+        return entry["value"]
+
+    def _set_disk(self, key: str, value: Any) -> None:
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"expires_at": time.time() + self.ttl_seconds, "value": value}, f)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Could not write cache entry {key}: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        size = os.path.getsize(path)
+        with self._lock:
+            self._disk_bytes += size - self._disk_sizes.pop(key, 0)
+            self._disk_sizes[key] = size
+            evicted = []
+            while self._disk_bytes > self.disk_max_bytes and len(self._disk_sizes) > 1:
+                old_key, old_size = self._disk_sizes.popitem(last=False)
+                self._disk_bytes -= old_size
+                evicted.append(old_key)
+        for old_key in evicted:
+            try:
+                os.remove(self._disk_path(old_key))
+            except FileNotFoundError:
+                pass
+
+    def _delete_disk(self, key: str) -> None:
+        with self._lock:
+            self._disk_bytes -= self._disk_sizes.pop(key, 0)
+        try:
+            os.remove(self._disk_path(key))
+        except FileNotFoundError:
+            pass
+
+
+# Singleton instance
+result_cache = ResultCache.from_env()
@@ -0,0 +1,95 @@
+"""
+Incremental decoding of streamed PitchScores tool calls
+
+The LLM returns scores as the JSON arguments of a PitchScores tool call, which
+arrive in small fragments when the call is streamed. IncrementalScoreParser
+consumes the fragments and reports each top-level field the moment its value
+is complete. A number counts as complete once a delimiter after it has
+arrived, since "8" could still become "85" or "8.5". The explanation string
+comes last in the schema, so every score is decoded before it.
+"""
+import json
+from typing import Any, List, Tuple
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+_DELIMITERS = _WHITESPACE + ",}]"
+
+
+class IncrementalScoreParser:
+    """Decodes a JSON object fed in fragments, one completed field at a time"""
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._started = False
+        self._key = None
+        self.done = False
+
+    def feed(self, fragment: str) -> List[Tuple[str, Any]]:
+        """
+        Add a fragment of the arguments JSON
+
+        Returns:
+            (field, value) pairs completed by this fragment, in document order
+        """
+        self._buffer += fragment
+        fields = []
+        while not self.done:
+            field = self._next_field()
+            if field is None:
+                break
+            fields.append(field)
+        return fields
+
+    def _skip(self, chars: str) -> bool:
+        """Skip whitespace and any of `chars`; False if the buffer ran out"""
+        while self._pos < len(self._buffer):
+            char = self._buffer[self._pos]
+            if char in _WHITESPACE or char in chars:
+                self._pos += 1
+            else:
+                return True
+        return False
+
+    def _decode(self, need_terminator: bool):
+        """Decode the JSON value at the cursor, or None if it is not complete yet"""
+        try:
+            value, end = _decoder.raw_decode(self._buffer, self._pos)
+        except ValueError:
+            return None
+        # Numbers (and literals) may still be growing until a delimiter follows them
+        if need_terminator and (end >= len(self._buffer) or self._buffer[end] not in _DELIMITERS):
+            return None
+        self._pos = end
+        return (value,)
+
+    def _next_field(self):
+        if not self._started:
+            if not self._skip(""):
+                return None
+            if self._buffer[self._pos] != "{":
+                raise ValueError("Streamed scores are not a JSON object")
+            self._pos += 1
+            self._started = True
+
+        if self._key is None:
+            if not self._skip(","):
+                return None
+            if self._buffer[self._pos] == "}":
+                self._pos += 1
+                self.done = True
+                return None
+            key = self._decode(need_terminator=False)
+            if key is None:
+                return None
+            self._key = key[0]
+
+        if not self._skip(":"):
+            return None
+        first = self._buffer[self._pos]
+        value = self._decode(need_terminator=first not in "\"{[")
+        if value is None:
+            return None
+        field, self._key = self._key, None
+        return field, value[0]
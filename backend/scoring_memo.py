@@ -0,0 +1,150 @@
+"""
+Persistent memo of LLM scoring results
+
+At temperature 0 the scores depend only on the rendered prompt and the model,
+and different recordings often render identical prompts (same transcription,
+rounded emotion averages and segment count). ScoringMemo keys the parsed LLM
+answer by a hash of the rendered prompt plus the configured backends, so a
+reprocessed or A/B-rerun session skips the LLM call whenever its prompt has
+not changed.
+
+Entries live in SQLite (WAL mode), shared by every uvicorn worker and job
+worker on the host. Lookups refresh an entry's last use; writes evict the
+least recently used entries beyond `max_entries`, and entries older than the
+TTL are ignored and pruned. Hit counts are kept per process in metrics and per
+entry in the database, so the hit rate across all workers is visible too.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Dict, Any, Optional
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+memo_lookups = metrics.counter("scoring_memo_lookups_total", "Scoring memo lookups by outcome")
+
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600
+
+
+def memo_key(prompt: str, config: Dict[str, Any]) -> str:
+    """Key for the scores of a rendered prompt under the given model config"""
+    fingerprint = json.dumps(config, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{fingerprint}\n{prompt}".encode("utf-8")).hexdigest()
+
+
+class ScoringMemo:
+    """SQLite-backed LRU + TTL map from prompt keys to LLM scoring results"""
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+    ):
+        """
+        Args:
+            path: SQLite database file, shared by every process using the memo
+            max_entries: Entries kept; the least recently used are evicted first
+            ttl_seconds: Lifetime of an entry from when it was stored
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS scoring_memo (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_scoring_memo_last_used ON scoring_memo (last_used_at)"
+        )
+
+    @classmethod
+    def from_env(cls) -> Optional["ScoringMemo"]:
+        """Configure from SCORING_MEMO_* environment variables; an empty SCORING_MEMO_DB disables the memo"""
+        path = os.environ.get("SCORING_MEMO_DB", os.path.join(tempfile.gettempdir(), "pitch-coach-scoring-memo.db"))
+        if not path:
+            return None
+        return cls(
+            path,
+            max_entries=int(os.environ.get("SCORING_MEMO_MAX_ENTRIES", str(DEFAULT_MAX_ENTRIES))),
+            ttl_seconds=float(os.environ.get("SCORING_MEMO_TTL_SECONDS", str(DEFAULT_TTL_SECONDS))),
+        )
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """The stored result for `key`, or None when missing or expired"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM scoring_memo WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                memo_lookups.inc(outcome="miss")
+                return None
+            if row[1] < now - self.ttl_seconds:
+                self._conn.execute("DELETE FROM scoring_memo WHERE key = ?", (key,))
+                memo_lookups.inc(outcome="expired")
+                return None
+            self._conn.execute(
+                "UPDATE scoring_memo SET last_used_at = ?, hits = hits + 1 WHERE key = ?", (now, key)
+            )
+        memo_lookups.inc(outcome="hit")
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        """Store a result, evicting expired and least recently used entries"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO scoring_memo (key, value, created_at, last_used_at, hits) "
+                    "VALUES (?, ?, ?, ?, 0)",
+                    (key, json.dumps(value), now, now),
+                )
+                self._conn.execute("DELETE FROM scoring_memo WHERE created_at < ?", (now - self.ttl_seconds,))
+                # Deleting everything past the newest max_entries keeps the table bounded in one statement
+                self._conn.execute(
+                    "DELETE FROM scoring_memo WHERE key IN ("
+                    "SELECT key FROM scoring_memo ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def stats(self) -> Dict[str, Any]:
+        hits = memo_lookups.value(outcome="hit")
+        lookups = hits + memo_lookups.value(outcome="miss") + memo_lookups.value(outcome="expired")
+        with self._lock:
+            entries, stored_hits = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(hits), 0) FROM scoring_memo"
+            ).fetchone()
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hit_rate": hits / lookups if lookups else None,
+            # Hits on entries still stored, counted by every process sharing the database
+            "stored_entry_hits": stored_hits,
+        }
+
+
+# Singleton instance (None when disabled)
+scoring_memo = ScoringMemo.from_env()
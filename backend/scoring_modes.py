@@ -0,0 +1,9 @@
+"""
+Scoring modes, selectable per request
+
+Kept apart from scoring_service so request validation doesn't import LangChain.
+"""
+SCORING_LOCAL = "local"    # rule-based scores only, no LLM call
+SCORING_LLM = "llm"        # LLM scores only; LLM failures fail the request
+SCORING_HYBRID = "hybrid"  # local scores first, refined by the LLM when it answers in time
+SCORING_MODES = (SCORING_LOCAL, SCORING_LLM, SCORING_HYBRID)
@@ -1,14 +1,69 @@
 import os
 import json
-from typing import Dict, Any, Optional
-from langchain_groq import ChatGroq
+from typing import Dict, Any, Optional, List, Union, AsyncIterator, Tuple
 from langchain.prompts import ChatPromptTemplate
 from langchain.schema import BaseOutputParser
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models import BaseChatModel
+from langchain_core.runnables import RunnableLambda
 from pydantic import BaseModel, Field
+from result_cache import ResultCache, result_cache, make_cache_key
+from scoring_memo import ScoringMemo, scoring_memo, memo_key
+from outbound_http import OutboundHTTP, outbound_http
+from sentiment_stats import describe_statistics
+from local_scoring import LocalPitchScorer, LOCAL_MODEL_NAME, SCORE_DIMENSIONS
+from scoring_modes import SCORING_LOCAL, SCORING_LLM, SCORING_HYBRID, SCORING_MODES
+from score_stream import IncrementalScoreParser
+from prompt_builder import PromptBuilder, representative_indices
+from llm_router import (
+    LLMBackend,
+    LLMRouter,
+    NoBackendAvailable,
+    RoutedResult,
+    backend_specs_from_env,
+    breaker_from_env,
+    build_chat_model,
+    router_options_from_env,
+)
+from metrics import metrics, stage_seconds
+import asyncio
 import logging
+import sqlite3
+import time
 
 logger = logging.getLogger(__name__)
 
+score_streams = metrics.counter("scoring_streams_total", "Streamed scorings by mode and outcome")
+first_score_seconds = metrics.counter(
+    "scoring_time_to_first_score_seconds_total",
+    "Summed time from request to first LLM score in streamed scorings; divide by scoring_streams_total"
+)
+llm_tokens = metrics.histogram(
+    "llm_tokens_per_request", "Prompt and completion tokens of each scoring LLM call, by backend",
+    buckets=(100, 250, 500, 1000, 1500, 2000, 3000, 4000, 6000, 8000, 16000)
+)
+
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """Records the token usage each LLM call reports"""
+
+    def __init__(self, backend: str):
+        self.backend = backend
+
+    def on_llm_end(self, response, **kwargs) -> None:
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    llm_tokens.observe(usage.get("input_tokens", 0), backend=self.backend, kind="prompt")
+                    llm_tokens.observe(usage.get("output_tokens", 0), backend=self.backend, kind="completion")
+                    return
+        # Providers that report usage only in llm_output (OpenAI-style `token_usage`)
+        usage = (response.llm_output or {}).get("token_usage")
+        if usage:
+            llm_tokens.observe(usage.get("prompt_tokens", 0), backend=self.backend, kind="prompt")
+            llm_tokens.observe(usage.get("completion_tokens", 0), backend=self.backend, kind="completion")
+
 class PitchScores(BaseModel):
     """Structured output model for pitch scoring"""
     tone: float = Field(
@@ -32,22 +87,61 @@ class PitchScores(BaseModel):
     )
 from dotenv import load_dotenv
 load_dotenv()
+# Bump whenever the prompt or score post-processing changes so cached scores are not reused
+PROMPT_VERSION = 3
+
 class PitchScoringService:
     """Service for scoring pitch performance using LLM analysis of audio expression data"""
     
-    def __init__(self):
-        self.api_key = os.environ.get("GROQ_API_KEY")
-        if not self.api_key:
-            raise ValueError("GROQ_API_KEY environment variable is required")
-        
-        self.llm = ChatGroq(
-            model="deepseek-r1-distill-llama-70b",
-            temperature=0,
-            max_tokens=None,
-            reasoning_format="parsed",
-            timeout=None,
-            max_retries=2
-        )
+    def __init__(
+        self,
+        cache: Optional[ResultCache] = result_cache,
+        memo: Optional[ScoringMemo] = scoring_memo,
+        llm: Optional[BaseChatModel] = None,
+        backends: Optional[List[Tuple[str, BaseChatModel]]] = None,
+        router_options: Optional[Dict[str, Any]] = None,
+        batch_concurrency: Optional[int] = None,
+        local_scorer: Optional[LocalPitchScorer] = None,
+        default_mode: Optional[str] = None,
+        llm_timeout_seconds: Optional[float] = None,
+        prompt_builder: Optional[PromptBuilder] = None,
+        http: Optional[OutboundHTTP] = outbound_http
+    ):
+        """
+        Args:
+            cache: Result cache for repeated uploads (None disables caching)
+            memo: Rendered-prompt memo of LLM answers, shared across processes (None disables it)
+            llm: Pre-configured chat model, used as the only backend
+            backends: (name, chat model) pairs in priority order (defaults to SCORING_LLM_BACKENDS)
+            router_options: LLMRouter hedging options (defaults to SCORING_HEDGE_* variables)
+            batch_concurrency: Default limit on LLM calls in flight for score_pitch_batch
+            local_scorer: Rule-based scorer for the local and hybrid modes
+            default_mode: Scoring mode when a request doesn't pick one (SCORING_MODE, default llm)
+            llm_timeout_seconds: How long hybrid mode waits for the LLM before keeping the local scores
+            prompt_builder: Fits the transcription into the prompt's token budget
+            http: Shared connection pool for the backends built from SCORING_LLM_BACKENDS (None gives each its own)
+        """
+        self.cache = cache
+        self.memo = memo
+        self.prompt_builder = prompt_builder or PromptBuilder()
+        self.local_scorer = local_scorer or LocalPitchScorer.from_env()
+        self.default_mode = self.resolve_mode(default_mode or os.environ.get("SCORING_MODE", SCORING_LLM))
+        if llm_timeout_seconds is None:
+            llm_timeout_seconds = float(os.environ.get("SCORING_LLM_TIMEOUT_SECONDS", "60"))
+        self.llm_timeout_seconds = llm_timeout_seconds
+        if llm is not None:
+            backends = [(getattr(llm, "model_name", None) or type(llm).__name__, llm)]
+        elif backends is None:
+            specs = backend_specs_from_env()
+            # With a single backend, retrying in the client is the only recovery left
+            http_client = http.client if http is not None else None
+            backends = [
+                (spec, build_chat_model(spec, max_retries=2 if len(specs) == 1 else 0, http_client=http_client))
+                for spec in specs
+            ]
+        if batch_concurrency is None:
+            batch_concurrency = int(os.environ.get("SCORING_BATCH_CONCURRENCY", "8"))
+        self.batch_concurrency = batch_concurrency
         
         self.prompt_template = ChatPromptTemplate.from_messages([
             ("system", """You are an expert pitch coach analyzing audio expression data to score pitch performance.
@@ -85,71 +179,402 @@ Language Detected: {detected_language}
 
 Please provide structured scores and explanation.""")
         ])
+        
+        # Converting PitchScores to a tool schema and composing the runnable is
+        # not free, so it happens once per backend here rather than on every request
+        self.router = LLMRouter(
+            [
+                LLMBackend(
+                    name,
+                    model,
+                    (self.prompt_template | model.with_structured_output(PitchScores)).with_config(
+                        callbacks=[TokenUsageCallback(name)]
+                    ),
+                    breaker_from_env()
+                )
+                for name, model in backends
+            ],
+            **(router_options if router_options is not None else router_options_from_env())
+        )
+        # Same tool call, but emitting raw argument fragments for stream_pitch_scores
+        self.streaming_chains = {
+            name: (self.prompt_template | model.bind_tools([PitchScores], tool_choice="PitchScores")).with_config(
+                callbacks=[TokenUsageCallback(name)]
+            )
+            for name, model in backends
+        }
+        self.llm = self.router.primary.model
+        self.chain = self.router.primary.chain
+        self.model_name = self.router.primary.name
 
-    async def score_pitch_performance(self, hume_results: Dict[str, Any]) -> Dict[str, Any]:
+    async def score_pitch_performance(
+        self,
+        hume_results: Dict[str, Any],
+        content_hash: Optional[str] = None,
+        mode: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         Score pitch performance based on Hume audio expression analysis results
         
         Args:
             hume_results: Results from HumeAudioService.analyze_audio_expression()
+            content_hash: SHA-256 of the analyzed audio; enables the result cache
+            mode: local, llm or hybrid (defaults to default_mode)
             
         Returns:
             Dict containing scores for tone, fluency, clarity, confidence and explanation
         """
+        mode = self.resolve_mode(mode) if mode else self.default_mode
+        with stage_seconds.time(stage=f"scoring_{mode}"):
+            return await self._score_in_mode(hume_results, content_hash, mode)
+
+    async def _score_in_mode(
+        self,
+        hume_results: Dict[str, Any],
+        content_hash: Optional[str],
+        mode: str
+    ) -> Dict[str, Any]:
+        if mode == SCORING_LOCAL:
+            return self.score_locally(hume_results)
+        if mode == SCORING_LLM:
+            return await self._score_with_llm(hume_results, content_hash)
+        
+        local_scores = self.score_locally(hume_results)
         try:
-            # Extract relevant data from Hume results
-            analysis = hume_results.get("analysis", {})
-            transcription = analysis.get("transcription", {})
-            overall_sentiment = analysis.get("overall_sentiment", {})
-            timestamps = analysis.get("timestamps", [])
-            
-            # Prepare emotion details summary
-            emotion_summary = self._prepare_emotion_summary(timestamps, overall_sentiment)
-            
-            # Format the input for the LLM
-            llm_input = {
-                "transcription": transcription.get("full_text", "No transcription available"),
-                "dominant_emotion": overall_sentiment.get("dominant_emotion", {}).get("name", "Unknown"),
-                "dominant_score": overall_sentiment.get("dominant_emotion", {}).get("score", 0),
-                "total_segments": overall_sentiment.get("total_segments_analyzed", 0),
-                "emotion_details": emotion_summary,
-                "avg_confidence": transcription.get("confidence", 0),
-                "detected_language": transcription.get("detected_language", "Unknown")
-            }
-            
-            # Create the chain with structured output
-            chain = self.prompt_template | self.llm.with_structured_output(PitchScores)
-            
-            # Get structured response
-            result = await chain.ainvoke(llm_input)
-            
-            # Convert to dict format
-            scores = {
-                "tone": result.tone,
-                "fluency": result.fluency, 
-                "clarity": result.clarity,
-                "confidence": result.confidence,
-                "explanation": result.explanation,
-                "metadata": {
-                    "model_used": "gpt-4",
-                    "transcription_confidence": transcription.get("confidence", 0),
-                    "dominant_emotion": overall_sentiment.get("dominant_emotion", {}),
-                    "total_segments": overall_sentiment.get("total_segments_analyzed", 0)
-                }
-            }
+            scores = await asyncio.wait_for(
+                self._score_with_llm(hume_results, content_hash),
+                self.llm_timeout_seconds
+            )
+        except Exception as e:
+            logger.warning(f"LLM scoring unavailable, keeping local scores: {type(e).__name__}: {str(e)}")
+            local_scores["metadata"]["scoring_mode"] = "local_fallback"
+            local_scores["metadata"]["llm_error"] = str(e) or type(e).__name__
+            return local_scores
+        
+        scores = {**scores, "metadata": {
+            **scores["metadata"],
+            "scoring_mode": SCORING_HYBRID,
+            "local_scores": {name: local_scores[name] for name in SCORE_DIMENSIONS}
+        }}
+        return scores
+    
+    async def stream_pitch_scores(
+        self,
+        hume_results: Dict[str, Any],
+        mode: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Score like score_pitch_performance, yielding each field as soon as it is known
+        
+        The final `scores` event carries the same dict score_pitch_performance
+        returns; in hybrid mode it holds the local scores if the LLM failed,
+        even when some LLM fields were already emitted.
+        
+        Args:
+            hume_results: Results from HumeAudioService.analyze_audio_expression()
+            mode: local, llm or hybrid (defaults to default_mode)
             
+        Yields:
+            {"type": "local_scores", "scores": {...}}           hybrid mode, before the LLM call
+            {"type": "score", "field": "tone", "value": 82.0, "elapsed": 0.9}
+            {"type": "explanation", "value": "...", "elapsed": 1.4}
+            {"type": "scores", "scores": {...}, "time_to_first_score": 0.9}
+        """
+        mode = self.resolve_mode(mode) if mode else self.default_mode
+        start = time.perf_counter()
+        
+        if mode == SCORING_LOCAL:
+            scores = self.score_locally(hume_results)
+            for name in SCORE_DIMENSIONS:
+                yield {"type": "score", "field": name, "value": scores[name], "elapsed": time.perf_counter() - start}
+            yield {"type": "explanation", "value": scores["explanation"], "elapsed": time.perf_counter() - start}
+            yield {"type": "scores", "scores": scores, "time_to_first_score": None}
+            score_streams.inc(mode=mode, outcome="completed")
+            return
+        
+        local_scores = None
+        if mode == SCORING_HYBRID:
+            local_scores = self.score_locally(hume_results)
+            yield {"type": "local_scores", "scores": local_scores}
+        
+        fields: Dict[str, Any] = {}
+        time_to_first_score = None
+        try:
+            llm_input, prompt_stats = self._prepare_prompt(hume_results)
+            # Streaming is not hedged: fragments from two backends cannot be merged
+            backend = self.router.acquire()
+            if backend is None:
+                raise NoBackendAvailable("All scoring LLM backends are unavailable")
+            async for field, value in self._astream_llm_fields(backend, llm_input, mode == SCORING_HYBRID):
+                fields[field] = value
+                elapsed = time.perf_counter() - start
+                if field == "explanation":
+                    yield {"type": "explanation", "value": value, "elapsed": elapsed}
+                    continue
+                if time_to_first_score is None:
+                    time_to_first_score = elapsed
+                    first_score_seconds.inc(elapsed, mode=mode)
+                yield {"type": "score", "field": field, "value": value, "elapsed": elapsed}
+            scores = self._format_scores(PitchScores(**fields), hume_results, backend.name, prompt_stats=prompt_stats)
+        except Exception as e:
+            if local_scores is None:
+                score_streams.inc(mode=mode, outcome="failed")
+                logger.error(f"Error streaming pitch scores: {str(e)}")
+                raise
+            logger.warning(f"LLM scoring unavailable, keeping local scores: {type(e).__name__}: {str(e)}")
+            score_streams.inc(mode=mode, outcome="local_fallback")
+            fallback = {**local_scores, "metadata": {
+                **local_scores["metadata"],
+                "scoring_mode": "local_fallback",
+                "llm_error": str(e) or type(e).__name__
+            }}
+            yield {"type": "scores", "scores": fallback, "time_to_first_score": time_to_first_score}
+            return
+        
+        scores["metadata"]["time_to_first_score"] = time_to_first_score
+        scores["metadata"]["llm_seconds"] = time.perf_counter() - start
+        if local_scores is not None:
+            scores["metadata"]["scoring_mode"] = SCORING_HYBRID
+            scores["metadata"]["local_scores"] = {name: local_scores[name] for name in SCORE_DIMENSIONS}
+        score_streams.inc(mode=mode, outcome="completed")
+        yield {"type": "scores", "scores": scores, "time_to_first_score": time_to_first_score}
+    
+    async def _astream_llm_fields(self, backend: LLMBackend, llm_input: Dict[str, Any], enforce_timeout: bool):
+        """(field, value) pairs of the PitchScores tool call as they are decoded"""
+        parser = IncrementalScoreParser()
+        chunks = self.streaming_chains[backend.name].astream(llm_input).__aiter__()
+        started = time.perf_counter()
+        deadline = asyncio.get_running_loop().time() + self.llm_timeout_seconds
+        try:
+            while not parser.done:
+                try:
+                    if enforce_timeout:
+                        remaining = deadline - asyncio.get_running_loop().time()
+                        chunk = await asyncio.wait_for(chunks.__anext__(), max(remaining, 0))
+                    else:
+                        chunk = await chunks.__anext__()
+                except StopAsyncIteration:
+                    break
+                # DeepSeek's reasoning arrives as content before the tool call and is skipped
+                for tool_chunk in getattr(chunk, "tool_call_chunks", None) or []:
+                    if tool_chunk.get("index", 0) in (0, None) and tool_chunk.get("args"):
+                        for field in parser.feed(tool_chunk["args"]):
+                            yield field
+        except (asyncio.CancelledError, GeneratorExit):
+            backend.breaker.release()
+            raise
+        except Exception:
+            self.router.record(backend, False, time.perf_counter() - started)
+            raise
+        else:
+            self.router.record(backend, True, time.perf_counter() - started)
+        finally:
+            await chunks.aclose()
+    
+    @staticmethod
+    def resolve_mode(mode: str) -> str:
+        """Validate a scoring mode name"""
+        mode = mode.lower()
+        if mode not in SCORING_MODES:
+            raise ValueError(f"Unknown scoring mode: {mode} (expected one of {', '.join(SCORING_MODES)})")
+        return mode
+    
+    def score_locally(self, hume_results: Dict[str, Any]) -> Dict[str, Any]:
+        """Rule-based scores, computed in-process without an LLM call"""
+        return self._format_scores(
+            self.local_scorer.score(hume_results), hume_results, LOCAL_MODEL_NAME, SCORING_LOCAL
+        )
+    
+    async def _score_with_llm(self, hume_results: Dict[str, Any], content_hash: Optional[str]) -> Dict[str, Any]:
+        if content_hash and self.cache is not None:
+            return await self.cache.get_or_compute(
+                make_cache_key("pitch_scores", content_hash, self.cache_config()),
+                lambda: self._score(hume_results),
+                namespace="pitch_scores"
+            )
+        return await self._score(hume_results)
+    
+    def cache_config(self) -> Dict[str, Any]:
+        """Everything besides the audio that determines the scores"""
+        return {
+            # Any configured backend may answer, so the whole set keys the cache
+            "model": ",".join(self.router.names),
+            "temperature": 0,
+            "prompt_version": PROMPT_VERSION,
+            "token_budget": self.prompt_builder.token_budget
+        }
+    
+    async def _score(self, hume_results: Dict[str, Any]) -> Dict[str, Any]:
+        """Run the LLM scoring chain over processed Hume results"""
+        try:
+            llm_input, prompt_stats = self._prepare_prompt(hume_results)
+            routed, memoized = await self._invoke_llm(llm_input)
+            scores = self._format_routed(routed, memoized, hume_results, prompt_stats)
             logger.info(f"Generated pitch scores: {scores}")
             return scores
             
         except Exception as e:
             logger.error(f"Error scoring pitch performance: {str(e)}")
             raise
+    
+    async def score_pitch_batch(
+        self,
+        hume_results_list: List[Dict[str, Any]],
+        max_concurrency: Optional[int] = None,
+        return_exceptions: bool = False
+    ) -> List[Union[Dict[str, Any], Exception]]:
+        """
+        Score many analyses at once, e.g. when re-scoring stored sessions
+        
+        Results bypass the upload cache but not the prompt memo: only analyses
+        whose rendered prompt or model changed are sent to the LLM again.
+        
+        Args:
+            hume_results_list: Results from HumeAudioService.analyze_audio_expression()
+            max_concurrency: LLM calls in flight at once (defaults to batch_concurrency)
+            return_exceptions: Put failures in the returned list instead of raising
+            
+        Returns:
+            Scores for each input, in input order
+        """
+        if not hume_results_list:
+            return []
+        
+        prompts = [self._prepare_prompt(hume_results) for hume_results in hume_results_list]
+        results = await RunnableLambda(self._invoke_llm).abatch(
+            [llm_input for llm_input, _ in prompts],
+            config={"max_concurrency": max_concurrency or self.batch_concurrency},
+            return_exceptions=return_exceptions
+        )
+        return [
+            result if isinstance(result, Exception)
+            else self._format_routed(*result, hume_results, prompt_stats)
+            for result, hume_results, (_, prompt_stats) in zip(results, hume_results_list, prompts)
+        ]
+    
+    async def _invoke_llm(self, llm_input: Dict[str, Any]) -> Tuple[RoutedResult, bool]:
+        """Scores for prompt variables from the memo, or from the routed LLM call; True when memoized"""
+        key = self.memo_key(llm_input) if self.memo is not None else None
+        if key is not None:
+            try:
+                stored = await asyncio.to_thread(self.memo.get, key)
+            except sqlite3.Error as e:
+                logger.warning(f"Scoring memo lookup failed: {str(e)}")
+                stored = None
+            if stored is not None:
+                return RoutedResult(PitchScores(**stored["scores"]), stored["backend"], False), True
+        
+        with stage_seconds.time(stage="llm"):
+            routed = await self.router.ainvoke(llm_input)
+        if key is not None:
+            try:
+                await asyncio.to_thread(
+                    self.memo.put, key, {"scores": routed.result.model_dump(), "backend": routed.backend}
+                )
+            except sqlite3.Error as e:
+                logger.warning(f"Could not store scores in the memo: {str(e)}")
+        return routed, False
+    
+    def memo_key(self, llm_input: Dict[str, Any]) -> str:
+        """Memo key: the fully rendered prompt plus the backends that may answer it"""
+        return memo_key(
+            self.prompt_template.format(**llm_input),
+            {"model": ",".join(self.router.names), "temperature": 0}
+        )
+    
+    def _format_routed(
+        self,
+        routed: RoutedResult,
+        memoized: bool,
+        hume_results: Dict[str, Any],
+        prompt_stats: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        scores = self._format_scores(routed.result, hume_results, routed.backend, prompt_stats=prompt_stats)
+        scores["metadata"]["llm_hedged"] = routed.hedged
+        scores["metadata"]["llm_memoized"] = memoized
+        return scores
+    
+    def _prepare_prompt(self, hume_results: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Prompt variables for one analysis, with the transcription fitted to the token budget"""
+        with stage_seconds.time(stage="prompt_build"):
+            return self._build_prompt(hume_results)
 
-    def _prepare_emotion_summary(self, timestamps: list, overall_sentiment: dict) -> str:
+    def _build_prompt(self, hume_results: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        llm_input = self._llm_input(hume_results)
+        analysis = hume_results.get("analysis", {})
+        llm_input["transcription"], prompt_stats = self.prompt_builder.build(
+            lambda text: self.prompt_template.format(**{**llm_input, "transcription": text}),
+            llm_input["transcription"],
+            analysis.get("timestamps", [])
+        )
+        return llm_input, prompt_stats
+    
+    def _llm_input(self, hume_results: Dict[str, Any]) -> Dict[str, Any]:
+        """Prompt variables for one analysis"""
+        analysis = hume_results.get("analysis", {})
+        transcription = analysis.get("transcription", {})
+        overall_sentiment = analysis.get("overall_sentiment", {})
+        timestamps = analysis.get("timestamps", [])
+        
+        # Prepare emotion details summary
+        emotion_summary = self._prepare_emotion_summary(
+            timestamps, overall_sentiment, analysis.get("statistics")
+        )
+        
+        return {
+            "transcription": transcription.get("full_text", "No transcription available"),
+            "dominant_emotion": overall_sentiment.get("dominant_emotion", {}).get("name", "Unknown"),
+            "dominant_score": overall_sentiment.get("dominant_emotion", {}).get("score", 0),
+            "total_segments": overall_sentiment.get("total_segments_analyzed", 0),
+            "emotion_details": emotion_summary,
+            "avg_confidence": transcription.get("confidence", 0),
+            "detected_language": transcription.get("detected_language", "Unknown")
+        }
+    
+    def _format_scores(
+        self,
+        result: PitchScores,
+        hume_results: Dict[str, Any],
+        model_used: Optional[str] = None,
+        mode: str = SCORING_LLM,
+        prompt_stats: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Convert structured scores to the response dict"""
+        analysis = hume_results.get("analysis", {})
+        transcription = analysis.get("transcription", {})
+        overall_sentiment = analysis.get("overall_sentiment", {})
+        scores = {
+            "tone": result.tone,
+            "fluency": result.fluency, 
+            "clarity": result.clarity,
+            "confidence": result.confidence,
+            "explanation": result.explanation,
+            "metadata": {
+                "model_used": model_used or self.model_name,
+                "scoring_mode": mode,
+                "transcription_confidence": transcription.get("confidence", 0),
+                "dominant_emotion": overall_sentiment.get("dominant_emotion", {}),
+                "total_segments": overall_sentiment.get("total_segments_analyzed", 0)
+            }
+        }
+        if prompt_stats is not None:
+            scores["metadata"]["prompt"] = prompt_stats
+        return scores
+
+    def _prepare_emotion_summary(
+        self,
+        timestamps: list,
+        overall_sentiment: dict,
+        statistics: Optional[dict] = None
+    ) -> str:
         """Prepare a concise summary of emotion analysis for the LLM"""
         if not timestamps:
             return "No emotion data available"
         
+        # Speaking-time weighting and the arc over time say more than a few sample segments
+        if statistics:
+            return "\n".join(describe_statistics(statistics))
+        
         # Get average emotions from overall sentiment
         avg_emotions = overall_sentiment.get("average_emotions", {})
         
@@ -165,7 +590,9 @@ Please provide structured scores and explanation.""")
         # Add segment-level variability info
         if len(timestamps) > 1:
             emotion_lines.append(f"\nEmotion patterns across {len(timestamps)} segments:")
-            for i, segment in enumerate(timestamps[:3]):  # Show first 3 segments
+            # Opening, closing and emotional peaks rather than just the first few
+            for i in representative_indices(timestamps, 3):
+                segment = timestamps[i]
                 top_segment_emotions = segment.get("emotions", [])[:3]
                 emotions_str = ", ".join([f"{e['name']} ({e['score']:.2f})" for e in top_segment_emotions])
                 emotion_lines.append(f"Segment {i+1}: {emotions_str}")
@@ -0,0 +1,178 @@
+"""
+Time-aware sentiment statistics over a recording's segments
+
+The overall sentiment averages each segment's top 5 emotions with every
+segment counting once, so a 0.3 s fragment weighs as much as a 10 s sentence
+and emotions just outside a top 5 vanish. These statistics weight every
+emotion by speaking time instead, and add the shape of the pitch over time:
+rolling windows with their dominant emotion, per-emotion trend slopes and
+volatility. Everything comes from one pass over the (time-ordered) segments
+using prefix sums, so windows cost O(segments + windows).
+"""
+from typing import Dict, Any, List
+import numpy as np
+from emotion_matrix import EmotionMatrix
+
+DEFAULT_WINDOW_SECONDS = 15.0
+DEFAULT_STEP_SECONDS = 5.0
+
+# Emotions reported with trend and volatility, by weighted average
+TOP_EMOTIONS = 8
+
+
+def compute_sentiment_statistics(
+    matrix: EmotionMatrix,
+    window_seconds: float = DEFAULT_WINDOW_SECONDS,
+    step_seconds: float = DEFAULT_STEP_SECONDS,
+    top_emotions: int = TOP_EMOTIONS,
+) -> Dict[str, Any]:
+    """
+    Duration-weighted and windowed emotion statistics
+
+    Args:
+        matrix: Segment x emotion scores of the recording
+        window_seconds: Length of each rolling window
+        step_seconds: Distance between consecutive window starts
+        top_emotions: Emotions to report trends and volatility for
+
+    Returns:
+        Dict with weighted averages, the dominant emotion by speaking time,
+        rolling windows, trends (score change per minute) and volatility
+    """
+    reported = matrix.reported()
+    if not len(matrix) or not reported.any():
+        return {}
+
+    order = np.argsort(matrix.begins, kind="stable")
+    scores = matrix.scores[order]
+    begins = matrix.begins[order]
+    durations = np.clip(matrix.ends[order] - begins, 0, None)
+    names = matrix.emotion_names
+    total_time = float(durations.sum())
+
+    if total_time > 0:
+        weights = durations / total_time
+    else:
+        # No usable timing; fall back to counting segments
+        weights = np.full(len(matrix), 1 / len(matrix))
+    weighted = weights @ scores
+    volatility = np.sqrt(np.clip(weights @ (scores - weighted) ** 2, 0, None))
+    slopes = _trend_slopes(scores, begins + durations / 2, weights)
+
+    # Emotions no segment reported are left out rather than listed at zero
+    ranked = [i for i in np.argsort(-weighted, kind="stable").tolist() if reported[i]]
+    top = ranked[:top_emotions]
+    dominant = ranked[0]
+
+    windows = _rolling_windows(scores, begins, durations, names, reported, window_seconds, step_seconds)
+    return {
+        "weighted_emotions": {names[i]: float(weighted[i]) for i in ranked},
+        "dominant_emotion": {"name": names[dominant], "score": float(weighted[dominant])},
+        "speaking_time": total_time,
+        "trends": {names[i]: float(slopes[i]) for i in top},
+        "volatility": {names[i]: float(volatility[i]) for i in top},
+        "windows": windows,
+        "dominant_emotion_changes": sum(
+            1 for previous, current in zip(windows, windows[1:])
+            if previous["dominant_emotion"]["name"] != current["dominant_emotion"]["name"]
+        ),
+        "window_seconds": window_seconds,
+        "step_seconds": step_seconds,
+    }
+
+
+def _trend_slopes(scores: np.ndarray, midpoints: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """Weighted least-squares slope of every emotion against time, per minute"""
+    center = weights @ midpoints
+    offsets = midpoints - center
+    spread = weights @ offsets ** 2
+    if spread <= 0:
+        return np.zeros(scores.shape[1])
+    return (weights * offsets) @ scores / spread * 60
+
+
+def _rolling_windows(
+    scores: np.ndarray,
+    begins: np.ndarray,
+    durations: np.ndarray,
+    names: List[str],
+    reported: np.ndarray,
+    window_seconds: float,
+    step_seconds: float,
+) -> List[Dict[str, Any]]:
+    """Speaking-time-weighted average emotions of each window, from prefix sums"""
+    if durations.sum() <= 0 or window_seconds <= 0 or step_seconds <= 0:
+        return []
+    # Integral of each emotion's score over time up to the start of every segment
+    area = np.vstack([np.zeros(scores.shape[1]), np.cumsum(scores * durations[:, None], axis=0)])
+    covered = np.concatenate([[0.0], np.cumsum(durations)])
+
+    first = float(begins[0])
+    last = float((begins + durations).max())
+    starts = np.arange(first, max(first + step_seconds, last - window_seconds + step_seconds), step_seconds)
+    edges = np.concatenate([starts, starts + window_seconds])
+
+    # Segments are sequential, so everything before the containing segment is complete
+    containing = np.clip(np.searchsorted(begins, edges, side="right") - 1, 0, None)
+    partial = np.clip(edges - begins[containing], 0, durations[containing])
+    area_at = area[containing] + scores[containing] * partial[:, None]
+    covered_at = covered[containing] + partial
+    # Edges before the first segment have nothing behind them
+    before = edges < begins[0]
+    area_at[before] = 0
+    covered_at[before] = 0
+
+    count = len(starts)
+    window_area = area_at[count:] - area_at[:count]
+    window_covered = covered_at[count:] - covered_at[:count]
+
+    windows = []
+    for i in range(count):
+        if window_covered[i] <= 0:
+            continue
+        means = window_area[i] / window_covered[i]
+        top = int(np.argmax(np.where(reported, means, -np.inf)))
+        windows.append({
+            "start": round(float(starts[i]), 3),
+            "end": round(float(starts[i] + window_seconds), 3),
+            "speaking_time": round(float(window_covered[i]), 3),
+            "dominant_emotion": {"name": names[top], "score": float(means[top])},
+        })
+    return windows
+
+
+def describe_statistics(statistics: Dict[str, Any], top_n: int = 5) -> List[str]:
+    """Compact text lines of the statistics for an LLM prompt"""
+    if not statistics:
+        return []
+    weighted = list(statistics["weighted_emotions"].items())[:top_n]
+    lines = ["Emotions weighted by speaking time:"]
+    lines.extend(f"- {name}: {score:.2f}" for name, score in weighted)
+
+    trends = sorted(statistics["trends"].items(), key=lambda x: abs(x[1]), reverse=True)[:3]
+    if trends:
+        lines.append("Strongest trends (change per minute): " + ", ".join(
+            f"{name} {slope:+.2f}" for name, slope in trends
+        ))
+    volatility = sorted(statistics["volatility"].items(), key=lambda x: x[1], reverse=True)[:3]
+    if volatility:
+        lines.append("Most volatile: " + ", ".join(f"{name} ({value:.2f})" for name, value in volatility))
+
+    windows = statistics["windows"]
+    if windows:
+        # Collapse consecutive windows with the same dominant emotion into runs
+        runs = []
+        for window in windows:
+            name = window["dominant_emotion"]["name"]
+            if runs and runs[-1][0] == name:
+                runs[-1][2] = window["end"]
+            else:
+                runs.append([name, window["start"], window["end"]])
+        # Sample long recordings evenly so the line covers the whole pitch
+        runs = runs[::-(-len(runs) // 8)]
+        lines.append(
+            f"Dominant emotion over time ({statistics['window_seconds']:.0f}s windows, "
+            f"{statistics['dominant_emotion_changes']} changes): "
+            + ", ".join(f"{name} {start:.0f}-{end:.0f}s" for name, start, end in runs)
+        )
+    return lines
@@ -0,0 +1,138 @@
+"""
+Lazily built service singletons for the API
+
+HumeAudioService pulls in the Hume SDK and PitchScoringService pulls in
+LangChain and the provider clients, and both refuse to start without their
+API keys. A worker that only serves the dashboard or the Farcaster webhook
+needs neither, so main.py reaches them through ServiceProviders instead of
+importing them. A provider builds its service on first use, off the event
+loop, and endpoints take it as a FastAPI dependency
+(`hume=Depends(hume_service_provider)`), which tests swap out with
+`app.dependency_overrides`.
+
+SERVICE_WARMUP decides when the services get built:
+    lazy        on first use (default)
+    background  right after startup, without holding back readiness
+    startup     before the app accepts requests, so a missing key fails the pod
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Generic, Optional, TypeVar
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+service_init_seconds = metrics.gauge("service_init_seconds", "Time taken to build each lazily created service")
+
+WARMUP_LAZY = "lazy"
+WARMUP_BACKGROUND = "background"
+WARMUP_STARTUP = "startup"
+WARMUP_MODES = (WARMUP_LAZY, WARMUP_BACKGROUND, WARMUP_STARTUP)
+
+T = TypeVar("T")
+
+
+class ServiceProvider(Generic[T]):
+    """Builds a service once, on first use, and hands out the same instance after"""
+
+    def __init__(self, name: str, factory: Callable[[], T]):
+        """
+        Args:
+            name: Label for metrics and /stats
+            factory: Builds the service; may import heavy modules
+        """
+        self.name = name
+        self.factory = factory
+        self._instance: Optional[T] = None
+        self._lock = threading.Lock()
+
+    @property
+    def initialized(self) -> bool:
+        return self._instance is not None
+
+    @property
+    def instance(self) -> Optional[T]:
+        """The service if it has been built, without building it"""
+        return self._instance
+
+    def get(self) -> T:
+        """The service, building it in this thread if needed"""
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    start = time.perf_counter()
+                    instance = self.factory()
+                    elapsed = time.perf_counter() - start
+                    service_init_seconds.set(elapsed, service=self.name)
+                    logger.info(f"Initialized {self.name} service in {elapsed:.2f}s")
+                    self._instance = instance
+        return self._instance
+
+    async def __call__(self) -> T:
+        """FastAPI dependency: the service, built in a worker thread on first use"""
+        if self._instance is not None:
+            return self._instance
+        return await asyncio.to_thread(self.get)
+
+
+def _build_hume_service():
+    from hume_service import hume_service
+    return hume_service
+
+
+def _build_scoring_service():
+    from scoring_service import pitch_scoring_service
+    return pitch_scoring_service
+
+
+def _build_stream_backend():
+    from streaming import create_stream_backend
+    # Set HUME_STREAM_BACKEND=local to serve /ws/analyze-stream without Hume
+    return create_stream_backend(lambda: hume_service_provider.get().client)
+
+
+hume_service_provider: ServiceProvider = ServiceProvider("hume", _build_hume_service)
+scoring_service_provider: ServiceProvider = ServiceProvider("scoring", _build_scoring_service)
+stream_backend_provider: ServiceProvider = ServiceProvider("stream_backend", _build_stream_backend)
+
+WARMUP_PROVIDERS = (hume_service_provider, scoring_service_provider)
+
+
+def warmup_mode() -> str:
+    mode = os.environ.get("SERVICE_WARMUP", WARMUP_LAZY).lower()
+    if mode not in WARMUP_MODES:
+        raise ValueError(f"Unknown SERVICE_WARMUP: {mode} (expected one of {', '.join(WARMUP_MODES)})")
+    return mode
+
+
+async def warm_up(raise_errors: bool) -> None:
+    """Build the heavy services in worker threads, concurrently"""
+    results = await asyncio.gather(
+        *(asyncio.to_thread(provider.get) for provider in WARMUP_PROVIDERS),
+        return_exceptions=True
+    )
+    for provider, result in zip(WARMUP_PROVIDERS, results):
+        if isinstance(result, Exception):
+            if raise_errors:
+                raise result
+            logger.error(f"Warm-up of the {provider.name} service failed: {str(result)}")
+
+
+def loaded_outbound_http():
+    """The shared OutboundHTTP pool if a service has imported it, without importing httpx otherwise"""
+    module = sys.modules.get("outbound_http")
+    return module.outbound_http if module is not None else None
+
+
+def stats() -> Dict[str, Any]:
+    return {
+        provider.name: {
+            "initialized": provider.initialized,
+            "init_seconds": service_init_seconds.value(service=provider.name) if provider.initialized else None,
+        }
+        for provider in (hume_service_provider, scoring_service_provider, stream_backend_provider)
+    }
@@ -0,0 +1,340 @@
+"""
+Real-time pitch analysis over a WebSocket
+
+The client sends its recording while it is still talking, one self-contained
+audio window per binary message (Hume's expression stream accepts up to 5 s of
+audio per payload). Each window goes to the stream as soon as it arrives and
+its prosody segments are pushed straight back, moved onto the recording's
+timeline and shaped like the `timestamps` entries of a batch analysis. When the
+client sends `{"type": "end"}` the segments are summarized and scored, so the
+final result lands one scoring call after the user stops instead of after an
+upload plus a batch job.
+
+Each window's segments are shifted by the audio length of the windows before
+it, measured by decoding them (WAV from its header; other formats need
+ffmpeg). A window that cannot be measured counts as the nominal window length,
+or as far as its last segment runs if that is longer.
+
+Like the HTTP analysis routes, the socket accepts an optional Supabase token,
+as a `token` query parameter (browsers cannot set headers on a WebSocket) or
+an `Authorization: Bearer` header. A signed-in user's finished stream is
+recorded as a practice session.
+
+A session is bounded like an upload: a window may hold at most
+MAX_WINDOW_BYTES, the whole stream MAX_STREAM_BYTES (the upload limit) and the
+session may stay open for MAX_STREAM_SECONDS. Past a limit the server sends
+an error message and closes the socket (1009 for size, 1008 for time).
+
+Client messages:
+    binary                                  one audio window
+    {"type": "start", "window_seconds": 5,  optional: nominal window length,
+     "persona": ..., "personaType": ...}    and the persona practised with
+    {"type": "end"}                         no more audio; summarize and score
+
+Server messages:
+    {"type": "segments", "window": n, "offset": s, "segments": [...]}
+    {"type": "final", ...}                  same fields as /analyze-pitch
+    {"type": "error", "detail": "..."}
+"""
+import asyncio
+import base64
+import json
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Dict, Any, List, AsyncIterator, Callable, Optional
+from fastapi import WebSocket, WebSocketDisconnect, status
+from audio_preprocess import UnsupportedAudio, audio_duration
+from metrics import metrics
+from practice_sessions import record_analysis
+from uploads import MAX_AUDIO_BYTES
+
+if TYPE_CHECKING:
+    from hume import AsyncHumeClient
+
+logger = logging.getLogger(__name__)
+
+stream_windows = metrics.counter("hume_stream_windows_total", "Audio windows analyzed over the expression stream")
+stream_sessions = metrics.counter("analysis_stream_sessions_total", "Streaming analysis sessions by outcome")
+
+# Longest audio Hume accepts in one streaming payload
+DEFAULT_WINDOW_SECONDS = 5.0
+
+# Windows received but not yet analyzed before the socket stops reading
+MAX_PENDING_WINDOWS = 8
+
+# A 5 s window is under 2 MB even as 48 kHz stereo 24-bit WAV
+MAX_WINDOW_BYTES = 4 * 1024 * 1024
+MAX_STREAM_BYTES = MAX_AUDIO_BYTES
+MAX_STREAM_SECONDS = 30 * 60
+
+
+class StreamAnalysisError(Exception):
+    """The expression stream rejected a window"""
+
+
+class StreamLimitExceeded(Exception):
+    """The client sent more audio, or stayed longer, than a session allows"""
+
+    def __init__(self, detail: str, code: int = status.WS_1009_MESSAGE_TOO_BIG):
+        super().__init__(detail)
+        self.code = code
+
+
+class HumeStreamBackend:
+    """Windows analyzed by Hume's streaming expression-measurement API"""
+
+    def __init__(self, client: "AsyncHumeClient"):
+        self.client = client
+
+    @asynccontextmanager
+    async def connect(self) -> AsyncIterator["_HumeStreamConnection"]:
+        from hume.expression_measurement.stream import Config
+        options = {"config": Config(prosody={})}
+        async with self.client.expression_measurement.stream.connect(options=options) as socket:
+            yield _HumeStreamConnection(socket)
+
+
+class _HumeStreamConnection:
+    def __init__(self, socket):
+        self.socket = socket
+
+    async def analyze(self, audio: bytes) -> List[Dict[str, Any]]:
+        """Prosody segments for one window, timed relative to its start"""
+        # send_file also accepts the payload as a base64 string
+        result = await self.socket.send_file(base64.b64encode(audio).decode("ascii"))
+        error = getattr(result, "error", None)
+        if error:
+            raise StreamAnalysisError(f"Hume stream error: {error}")
+        warning = getattr(result, "warning", None)
+        if warning:
+            # e.g. no speech detected in this window
+            logger.info(f"Hume stream warning: {warning}")
+
+        prosody = getattr(result, "prosody", None)
+        segments = []
+        for pred in (getattr(prosody, "predictions", None) or []):
+            time_range = getattr(pred, "time", None)
+            segments.append({
+                "text": getattr(pred, "text", ""),
+                "confidence": getattr(pred, "confidence", 0),
+                "time": {
+                    "begin": time_range.begin if time_range else 0,
+                    "end": time_range.end if time_range else 0,
+                },
+                "emotions": [
+                    {"name": emotion.name, "score": emotion.score}
+                    for emotion in (pred.emotions or [])
+                ],
+            })
+        return segments
+
+
+def create_stream_backend(get_client: Callable[[], "AsyncHumeClient"]):
+    """Stream backend selected by HUME_STREAM_BACKEND (hume|local); the Hume client is only built for hume"""
+    kind = os.environ.get("HUME_STREAM_BACKEND", "hume").lower()
+    if kind == "local":
+        from fake_hume import FakeHumeStreamBackend
+        return FakeHumeStreamBackend()
+    if kind != "hume":
+        raise ValueError(f"Unknown HUME_STREAM_BACKEND: {kind}")
+    return HumeStreamBackend(get_client())
+
+
+class StreamingAnalysisSession:
+    """Segments accumulated from the windows of one recording"""
+
+    def __init__(self, stream, hume, window_seconds: float = DEFAULT_WINDOW_SECONDS):
+        """
+        Args:
+            stream: Open connection from a stream backend's connect()
+            hume: HumeAudioService used to shape segments and results
+            window_seconds: Nominal audio length of one window
+        """
+        self.stream = stream
+        self.hume = hume
+        self.window_seconds = window_seconds
+        self.timestamps: List[Dict[str, Any]] = []
+        self.offset = 0.0
+        self.windows = 0
+        self.audio_bytes = 0
+
+    async def process_window(self, audio: bytes) -> Dict[str, Any]:
+        """Analyze one window and return the message announcing its segments"""
+        raw_segments, audio_seconds = await asyncio.gather(
+            self.stream.analyze(audio), self._audio_seconds(audio)
+        )
+        stream_windows.inc()
+
+        offset = self.offset
+        segments = [
+            self.hume.segment_record(
+                segment["text"],
+                segment["confidence"],
+                round(segment["time"]["begin"] + offset, 3),
+                round(segment["time"]["end"] + offset, 3),
+                segment["emotions"],
+            )
+            for segment in raw_segments
+        ]
+        self.timestamps.extend(segments)
+
+        # Never let a window's segments overlap the next one, even if they run past its audio
+        window_length = max([audio_seconds or self.window_seconds] + [s["time"]["end"] for s in raw_segments])
+        self.offset += window_length
+        self.windows += 1
+        self.audio_bytes += len(audio)
+        return {
+            "type": "segments",
+            "window": self.windows - 1,
+            "offset": round(offset, 3),
+            "segments": segments,
+        }
+
+    async def _audio_seconds(self, audio: bytes) -> Optional[float]:
+        """Decoded length of a window, None if it cannot be decoded here"""
+        try:
+            return await asyncio.to_thread(audio_duration, audio)
+        except UnsupportedAudio as e:
+            logger.debug(f"Could not measure stream window, assuming {self.window_seconds}s: {str(e)}")
+            return None
+
+    def results(self) -> Dict[str, Any]:
+        """Everything analyzed so far, in the shape of a batch analysis"""
+        results = self.hume.summarize_segments(self.timestamps)
+        results["metadata"]["stream_windows"] = self.windows
+        results["metadata"]["audio_bytes"] = self.audio_bytes
+        return results
+
+
+async def serve_analysis_stream(
+    websocket: WebSocket,
+    backend,
+    hume,
+    scorer,
+    max_pending_windows: int = MAX_PENDING_WINDOWS,
+    user_id: Optional[str] = None,
+    max_window_bytes: int = MAX_WINDOW_BYTES,
+    max_stream_bytes: int = MAX_STREAM_BYTES,
+    max_session_seconds: float = MAX_STREAM_SECONDS,
+) -> None:
+    """
+    Run the streaming analysis protocol on an accepted WebSocket
+
+    Args:
+        websocket: Accepted client connection
+        backend: Stream backend (HumeStreamBackend or a local stand-in)
+        hume: HumeAudioService used to shape segments and results
+        scorer: PitchScoringService producing the final scores
+        max_pending_windows: Windows buffered while the stream catches up
+        user_id: JWT `sub` of a signed-in caller, whose session is recorded
+        max_window_bytes: Largest binary message accepted
+        max_stream_bytes: Audio accepted over the whole session
+        max_session_seconds: How long the client may keep sending
+    """
+    from jobs import summarize_pitch_analysis
+
+    pending: asyncio.Queue = asyncio.Queue(maxsize=max_pending_windows)
+    start: Dict[str, Any] = {}
+
+    async def analyze_windows(session: StreamingAnalysisSession) -> None:
+        while True:
+            audio = await pending.get()
+            if audio is None:
+                return
+            await websocket.send_json(await session.process_window(audio))
+
+    async def enqueue(item: Optional[bytes], analyzer: asyncio.Task) -> None:
+        """Queue a window, unless the analyzer fails while the queue is full"""
+        put = asyncio.ensure_future(pending.put(item))
+        await asyncio.wait({put, analyzer}, return_when=asyncio.FIRST_COMPLETED)
+        if not put.done():
+            put.cancel()
+            # Nothing will take from the queue again; surface the analyzer's error
+            await analyzer
+
+    deadline = asyncio.get_running_loop().time() + max_session_seconds
+    received_bytes = 0
+    try:
+        async with backend.connect() as stream:
+            session = StreamingAnalysisSession(stream, hume)
+            analyzer = asyncio.create_task(analyze_windows(session))
+            try:
+                while True:
+                    try:
+                        message = await asyncio.wait_for(
+                            websocket.receive(), deadline - asyncio.get_running_loop().time()
+                        )
+                    except asyncio.TimeoutError:
+                        raise StreamLimitExceeded(
+                            f"Stream exceeds {max_session_seconds:g} seconds", status.WS_1008_POLICY_VIOLATION
+                        )
+                    if message["type"] == "websocket.disconnect":
+                        raise WebSocketDisconnect(message.get("code", status.WS_1000_NORMAL_CLOSURE))
+                    if analyzer.done():
+                        # Surface a failed window instead of queueing more audio behind it
+                        await analyzer
+                    audio = message.get("bytes")
+                    if audio:
+                        if len(audio) > max_window_bytes:
+                            raise StreamLimitExceeded(f"Audio window exceeds {max_window_bytes} bytes")
+                        received_bytes += len(audio)
+                        if received_bytes > max_stream_bytes:
+                            raise StreamLimitExceeded(f"Stream exceeds {max_stream_bytes} bytes of audio")
+                        await enqueue(audio, analyzer)
+                        continue
+
+                    control = json.loads(message.get("text") or "{}")
+                    if control.get("type") == "start" and session.windows == 0:
+                        start = control
+                        session.window_seconds = float(control.get("window_seconds", DEFAULT_WINDOW_SECONDS))
+                    elif control.get("type") == "end":
+                        break
+
+                await enqueue(None, analyzer)
+                await analyzer
+            finally:
+                analyzer.cancel()
+
+        hume_results = session.results()
+        if not session.timestamps:
+            stream_sessions.inc(outcome="no_speech")
+            await websocket.send_json({"type": "error", "detail": "No speech detected in the stream"})
+            await websocket.close()
+            return
+
+        pitch_scores = await scorer.score_pitch_performance(hume_results)
+        stream_sessions.inc(outcome="completed")
+        await record_analysis(
+            user_id,
+            pitch_scores,
+            duration=round(session.offset, 3),
+            persona=start.get("persona"),
+            persona_type=start.get("personaType")
+        )
+        await websocket.send_json({
+            "type": "final",
+            "success": True,
+            **summarize_pitch_analysis(hume_results, pitch_scores)
+        })
+        await websocket.close()
+
+    except WebSocketDisconnect:
+        stream_sessions.inc(outcome="disconnected")
+        logger.info("Streaming analysis client disconnected")
+    except StreamLimitExceeded as e:
+        stream_sessions.inc(outcome="limit_exceeded")
+        logger.info(f"Streaming analysis closed: {str(e)}")
+        try:
+            await websocket.send_json({"type": "error", "detail": str(e)})
+            await websocket.close(code=e.code)
+        except (RuntimeError, WebSocketDisconnect):
+            pass
+    except Exception as e:
+        stream_sessions.inc(outcome="failed")
+        logger.error(f"Error in streaming analysis: {str(e)}")
+        try:
+            await websocket.send_json({"type": "error", "detail": f"Failed to analyze stream: {str(e)}"})
+            await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+        except (RuntimeError, WebSocketDisconnect):
+            pass
@@ -0,0 +1,166 @@
+"""
+Tests for admission control of analysis requests
+"""
+import asyncio
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from admission import AdmissionController, AdmissionRejected, TokenBucket, client_key
+
+
+def test_token_bucket_allows_a_burst_then_the_sustained_rate():
+    bucket = TokenBucket(rate=1.0, burst=2, now=0.0)
+
+    assert bucket.reserve(0.0, max_wait=0) == 0
+    assert bucket.reserve(0.0, max_wait=0) == 0
+    assert bucket.reserve(0.0, max_wait=0) == -1.0
+    # A token that is close enough is reserved and waited for
+    assert bucket.reserve(0.5, max_wait=1) == pytest.approx(0.5)
+    assert bucket.reserve(1.0, max_wait=0) == -1.0
+
+
+def test_rate_limit_rejects_with_retry_after():
+    async def run():
+        controller = AdmissionController(user_rate_per_minute=6, user_burst=1, queue_timeout=0)
+        (await controller.acquire("user:a")).release()
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("user:a")
+        # Other clients have buckets of their own
+        (await controller.acquire("user:b")).release()
+        return rejected.value
+
+    rejected = asyncio.run(run())
+    assert rejected.reason == "user_rate"
+    assert rejected.retry_after == 10
+
+
+def test_queued_request_gets_the_released_slot():
+    async def run():
+        controller = AdmissionController(max_in_flight=1, user_burst=10, queue_timeout=1)
+        first = await controller.acquire("user:a")
+        waiting = asyncio.create_task(controller.acquire("user:b"))
+        await asyncio.sleep(0.01)
+        depth = controller.stats()["queue_depth"]
+        first.release()
+        second = await waiting
+        second.release()
+        second.release()
+        return depth, controller.stats()
+
+    depth, stats = asyncio.run(run())
+    assert depth == 1
+    assert stats["queue_depth"] == 0 and stats["in_flight"] == 0
+
+
+def test_queue_timeout_rejects_and_leaves_the_queue():
+    async def run():
+        controller = AdmissionController(max_in_flight=1, user_burst=10, queue_timeout=0.05)
+        held = await controller.acquire("user:a")
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("user:b")
+        stats = controller.stats()
+        held.release()
+        return rejected.value, stats
+
+    rejected, stats = asyncio.run(run())
+    assert rejected.reason == "global" and rejected.retry_after >= 1
+    assert stats["queue_depth"] == 0
+
+
+def test_per_client_cap_does_not_block_other_clients():
+    async def run():
+        controller = AdmissionController(max_in_flight=4, user_max_in_flight=1, user_burst=10, queue_timeout=0.05)
+        held = await controller.acquire("user:a")
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("user:a")
+        other = await controller.acquire("user:b")
+        other.release()
+        held.release()
+        return rejected.value
+
+    assert asyncio.run(run()).reason == "user_concurrency"
+
+
+def test_client_waiting_on_its_own_cap_does_not_queue_others():
+    async def run():
+        controller = AdmissionController(max_in_flight=32, user_max_in_flight=1, user_burst=10, queue_timeout=0.5)
+        held = await controller.acquire("user:a")
+        waiting = asyncio.create_task(controller.acquire("user:a"))
+        await asyncio.sleep(0.01)
+        other = await asyncio.wait_for(controller.acquire("user:b"), 0.1)
+        stats = controller.stats()
+        other.release()
+        held.release()
+        (await waiting).release()
+        return stats
+
+    stats = asyncio.run(run())
+    assert stats["in_flight"] == 2 and stats["queue_depth"] == 1
+
+
+def test_transferred_lease_releases_once():
+    async def run():
+        controller = AdmissionController(max_in_flight=1, user_burst=10)
+        lease = await controller.acquire("user:a")
+        moved = lease.transfer()
+        lease.release()
+        held = controller.stats()["in_flight"]
+        moved.release()
+        return held, controller.stats()["in_flight"]
+
+    assert asyncio.run(run()) == (1, 0)
+
+
+def test_client_key_prefers_the_jwt_subject():
+    assert client_key({"sub": "abc"}, "10.0.0.1") == "user:abc"
+    assert client_key(None, "10.0.0.1") == "ip:10.0.0.1"
+
+
+def test_endpoint_returns_429_with_retry_after(monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "admission", AdmissionController(user_rate_per_minute=60, user_burst=1, queue_timeout=0))
+    app = FastAPI()
+
+    @app.post("/analyze")
+    def analyze(lease=Depends(main.admitted_analysis(lambda: None))):
+        return {"ok": True}
+
+    client = TestClient(app)
+    assert client.post("/analyze").status_code == 200
+    rejected = client.post("/analyze")
+
+    assert rejected.status_code == 429
+    assert rejected.headers["retry-after"] == "1"
+
+
+@pytest.mark.parametrize("spec_version", ["2.0", "2.4"])
+def test_streamed_body_releases_its_slot_when_the_client_leaves_before_it_starts(spec_version):
+    import main
+
+    async def run():
+        controller = AdmissionController(max_in_flight=1, user_burst=10)
+        lease = (await controller.acquire("user:a")).transfer()
+        started = []
+
+        async def body():
+            started.append(True)
+            yield "event: complete\n\n"
+
+        async def receive():
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            # The connection is already gone when the response starts
+            raise OSError("connection reset")
+
+        response = main.CleanupStreamingResponse(body(), cleanup=lease.release, media_type="text/event-stream")
+        scope = {"type": "http", "asgi": {"version": "3.0", "spec_version": spec_version}}
+        try:
+            await response(scope, receive, send)
+        except Exception:
+            pass
+        return started, controller.stats()["in_flight"]
+
+    started, in_flight = asyncio.run(run())
+    assert started == [] and in_flight == 0
@@ -0,0 +1,93 @@
+"""
+Tests for analysis response projection, serialization and compression
+"""
+import json
+from fastapi import FastAPI, Depends, Request
+from fastapi.testclient import TestClient
+from analysis_response import ResponseShape, dumps, encoded_response, negotiate_encoding, project, response_shape
+from fake_hume import build_segments
+from hume_service import hume_service
+from jobs import summarize_pitch_analysis
+
+SCORES = {"tone": 80, "fluency": 70, "clarity": 90, "confidence": 60, "explanation": "ok"}
+
+
+def pitch_body(segment_count: int = 20) -> dict:
+    hume_results = hume_service.summarize_segments([
+        hume_service.segment_record(s["text"], s["confidence"], s["time"]["begin"], s["time"]["end"], s["emotions"])
+        for s in build_segments("response", segment_count)
+    ])
+    return {"success": True, "filename": "pitch.webm", **summarize_pitch_analysis(hume_results, SCORES)}
+
+
+app = FastAPI()
+
+
+@app.get("/pitch")
+def pitch(request: Request, shape: ResponseShape = Depends(response_shape)):
+    return encoded_response(request, shape.apply(pitch_body()))
+
+
+client = TestClient(app)
+
+
+def test_full_detail_serializes_like_the_default_encoder():
+    body = pitch_body()
+
+    assert json.loads(dumps(body)) == json.loads(json.dumps(body))
+    assert len(json.loads(dumps(body))["raw_analysis"]["analysis"]["timestamps"][0]["all_emotions"]) == 48
+
+
+def test_detail_levels_drop_duplicated_emotions():
+    body = pitch_body()
+    standard = ResponseShape("standard").apply(body)
+    summary = ResponseShape("summary").apply(body)
+
+    segment = standard["raw_analysis"]["analysis"]["timestamps"][0]
+    assert "all_emotions" not in segment and len(segment["emotions"]) == 5
+    assert "raw_analysis" not in summary and summary["pitch_scores"] == SCORES
+    # The original body is untouched
+    assert "all_emotions" in body["raw_analysis"]["analysis"]["timestamps"][0]
+
+
+def test_columnar_timeline_lists_emotion_names_once():
+    body = pitch_body(segment_count=3)
+    timeline = ResponseShape(columnar=True).apply(body)["raw_analysis"]["analysis"]["timeline"]
+    records = body["raw_analysis"]["analysis"]["timestamps"]
+
+    assert len(timeline["emotion_names"]) == 48
+    assert timeline["text"] == [segment["text"] for segment in records]
+    joy = timeline["emotion_names"].index("Joy")
+    assert timeline["scores"][1][joy] == next(e["score"] for e in records[1]["all_emotions"] if e["name"] == "Joy")
+    assert [timeline["emotion_names"][i] for i in timeline["top_emotions"][0]] == [
+        e["name"] for e in records[0]["emotions"]
+    ]
+
+
+def test_fields_keep_only_the_requested_paths():
+    body = pitch_body()
+
+    assert project(body, ["pitch_scores.tone", "raw_analysis.analysis.overall_sentiment.dominant_emotion", "nope.x"]) == {
+        "pitch_scores": {"tone": 80},
+        "raw_analysis": {"analysis": {"overall_sentiment": {
+            "dominant_emotion": body["raw_analysis"]["analysis"]["overall_sentiment"]["dominant_emotion"],
+        }}},
+    }
+
+
+def test_endpoint_negotiates_compression():
+    plain = client.get("/pitch?detail=summary", headers={"accept-encoding": "identity"})
+    compressed = client.get("/pitch", headers={"accept-encoding": "gzip"})
+    projected = client.get("/pitch?fields=pitch_scores", headers={"accept-encoding": "gzip"})
+
+    assert "content-encoding" not in plain.headers
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.json()["raw_analysis"]["analysis"]["timestamps"]
+    assert projected.json() == {"success": True, "pitch_scores": SCORES}
+    assert client.get("/pitch?detail=everything").status_code == 422
+
+
+def test_encoding_preference_follows_quality_values():
+    assert negotiate_encoding("gzip;q=0, *;q=0") is None
+    assert negotiate_encoding("deflate, gzip;q=0.5") == "gzip"
+    assert negotiate_encoding("") is None
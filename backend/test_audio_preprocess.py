@@ -0,0 +1,136 @@
+"""
+Tests for audio preprocessing before the Hume upload
+"""
+import asyncio
+import io
+import wave
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+import pytest
+from audio_preprocess import (
+    AudioPreprocessor,
+    OffsetMap,
+    decode_audio,
+    preprocess_audio,
+    remap_timestamps,
+    speech_spans,
+)
+from fake_hume import FakeHumeBackend
+from test_hume_service import make_service
+
+RATE = 44100
+
+
+def recording(layout, rate: int = RATE, channels: int = 2) -> bytes:
+    """Stereo 16-bit WAV of alternating silence and noise bursts: [(seconds, is_speech), ...]"""
+    rng = np.random.default_rng(0)
+    parts = []
+    for seconds, speech in layout:
+        count = int(seconds * rate)
+        level = 0.3 if speech else 0.001
+        parts.append(rng.normal(0, level, count))
+    mono = np.clip(np.concatenate(parts), -1, 1)
+    frames = np.repeat(mono[:, None], channels, axis=1)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(channels)
+        writer.setsampwidth(2)
+        writer.setframerate(rate)
+        writer.writeframes((frames * 32767).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+PITCH = [(2.0, False), (1.5, True), (1.5, False), (1.0, True), (2.0, False)]
+
+
+def test_decode_downmixes_and_resamples():
+    samples = decode_audio(recording([(1.0, True)]), sample_rate=16000)
+
+    assert samples.ndim == 1
+    assert len(samples) == 16000
+
+
+def test_speech_spans_find_bursts_and_keep_continuous_speech_whole():
+    samples = decode_audio(recording(PITCH), sample_rate=16000)
+    spans = speech_spans(samples, 16000, max_gap_seconds=0.6, pad_seconds=0.15)
+
+    # Each burst padded by 0.15 s either side
+    assert np.array(spans) / 16000 == pytest.approx(np.array([(1.85, 3.65), (4.85, 6.15)]), abs=0.05)
+
+    continuous = decode_audio(recording([(3.0, True)]), sample_rate=16000)
+    assert speech_spans(continuous, 16000) == [(0, len(continuous))]
+
+
+def test_preprocess_trims_and_maps_times_back():
+    original = recording(PITCH)
+    prepared = preprocess_audio(original)
+
+    assert prepared.processed_seconds == pytest.approx(2.5 + 4 * 0.15, abs=0.1)
+    assert prepared.original_seconds == pytest.approx(8.0, abs=0.01)
+    assert len(prepared.data) < len(original) / 10
+    if prepared.content_type == "audio/wav":
+        with wave.open(io.BytesIO(prepared.data)) as reader:
+            assert (reader.getnchannels(), reader.getframerate()) == (1, 16000)
+
+    # The start of the second kept stretch lands at the start of the second burst
+    second = prepared.offsets.spans[1]
+    assert prepared.offsets.to_original(second[0] + 0.15) == pytest.approx(5.0, abs=0.05)
+
+
+def test_remap_timestamps_shifts_segments():
+    offsets = OffsetMap([(0.0, 2.0, 1.0), (1.0, 5.0, 1.0)])
+    results = {"analysis": {"timestamps": [
+        {"timestamp": {"begin": 0.5, "end": 0.9}},
+        {"timestamp": {"begin": 1.2, "end": 1.8}},
+    ]}}
+
+    remap_timestamps(results, offsets)
+
+    assert [s["timestamp"] for s in results["analysis"]["timestamps"]] == [
+        {"begin": 2.5, "end": 2.9}, {"begin": 5.2, "end": 5.8},
+    ]
+
+
+def test_service_uploads_processed_audio_and_reports_original_times():
+    backend = FakeHumeBackend(processing_seconds=0.0, segments_per_file=3)
+    preprocessor = AudioPreprocessor(max_workers=1)
+    service = make_service(backend, cache=None, preprocessor=preprocessor)
+
+    async def scenario():
+        processed = await service.analyze_audio_expression(io.BytesIO(recording(PITCH)))
+        unsupported = await service.analyze_audio_expression(io.BytesIO(b"webm bytes"))
+        return processed, unsupported
+
+    try:
+        processed, unsupported = asyncio.run(scenario())
+    finally:
+        preprocessor.shutdown()
+
+    summary = processed["metadata"]["preprocessing"]
+    assert summary["processed_bytes"] < summary["original_bytes"]
+    # Fake segments start at 0 s of what was uploaded, just before the first burst
+    assert processed["analysis"]["timestamps"][0]["timestamp"]["begin"] == pytest.approx(1.85, abs=0.05)
+    # Statistics windows are on the original timeline too
+    assert processed["analysis"]["statistics"]["windows"][0]["start"] == pytest.approx(
+        processed["analysis"]["timestamps"][0]["timestamp"]["begin"], abs=0.001
+    )
+    assert unsupported["success"] and "preprocessing" not in unsupported["metadata"]
+
+
+def test_broken_pool_is_replaced():
+    class BrokenPool:
+        shut_down = False
+
+        def submit(self, *args):
+            raise BrokenProcessPool("worker killed")
+
+        def shutdown(self, **kwargs):
+            self.shut_down = True
+
+    preprocessor = AudioPreprocessor(max_workers=1)
+    broken = preprocessor._pool = BrokenPool()
+
+    result = asyncio.run(preprocessor.run(io.BytesIO(recording(PITCH))))
+
+    assert result is None
+    assert broken.shut_down and preprocessor._pool is None
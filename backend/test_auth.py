@@ -0,0 +1,128 @@
+"""
+Tests for Supabase token verification with a local JWKS file
+"""
+import json
+import time
+import ecdsa
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from jose import jwk, jwt, JWTError
+import auth
+from auth import JWKSCache, TokenVerifier
+
+SECRET = "test-secret"
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_signing_key(kid: str):
+    """(private PEM, public JWK) for a fresh ES256 key"""
+    pem = ecdsa.SigningKey.generate(curve=ecdsa.NIST256p).to_pem().decode()
+    public = jwk.construct(pem, "ES256").public_key().to_dict()
+    return pem, {**public, "kid": kid, "use": "sig"}
+
+
+def write_jwks(path, *public_keys) -> None:
+    path.write_text(json.dumps({"keys": list(public_keys)}))
+
+
+def es256_token(pem: str, kid: str, exp_in: float = 3600, **claims) -> str:
+    payload = {"sub": "user-1", "aud": "authenticated", "exp": int(time.time() + exp_in), **claims}
+    return jwt.encode(payload, pem, algorithm="ES256", headers={"kid": kid})
+
+
+def test_hs256_tokens_use_the_secret():
+    verifier = TokenVerifier(SECRET)
+    token = jwt.encode({"sub": "user-1", "aud": "authenticated", "exp": int(time.time()) + 60}, SECRET)
+
+    assert verifier.verify(token)["sub"] == "user-1"
+    with pytest.raises(JWTError):
+        verifier.verify(jwt.encode({"sub": "user-1"}, "wrong-secret"))
+
+
+def test_es256_tokens_use_the_jwks(tmp_path):
+    pem, public = make_signing_key("key-1")
+    write_jwks(tmp_path / "jwks.json", public)
+    verifier = TokenVerifier(SECRET, jwks=JWKSCache(str(tmp_path / "jwks.json")))
+
+    assert verifier.verify(es256_token(pem, "key-1"))["sub"] == "user-1"
+    with pytest.raises(JWTError):
+        verifier.verify(es256_token(pem, "key-1", aud="someone-else"))
+    other_pem, _ = make_signing_key("key-1")
+    with pytest.raises(JWTError):
+        verifier.verify(es256_token(other_pem, "key-1"))
+
+
+def test_unknown_kid_refetches_rotated_keys(tmp_path):
+    clock = FakeClock()
+    old_pem, old_public = make_signing_key("old")
+    new_pem, new_public = make_signing_key("new")
+    path = tmp_path / "jwks.json"
+    write_jwks(path, old_public)
+    jwks = JWKSCache(str(path), min_refresh_interval=30, clock=clock)
+    verifier = TokenVerifier(SECRET, jwks=jwks, cache_entries=0)
+    verifier.verify(es256_token(old_pem, "old"))
+
+    write_jwks(path, old_public, new_public)
+    # Refetches for unknown kids are rate limited
+    with pytest.raises(JWTError, match="Unknown signing key"):
+        verifier.verify(es256_token(new_pem, "new"))
+    clock.now += 31
+    assert verifier.verify(es256_token(new_pem, "new"))["sub"] == "user-1"
+
+
+def test_jwks_keeps_old_keys_when_refresh_fails(tmp_path):
+    clock = FakeClock()
+    pem, public = make_signing_key("key-1")
+    path = tmp_path / "jwks.json"
+    write_jwks(path, public)
+    jwks = JWKSCache(str(path), ttl_seconds=60, clock=clock)
+    verifier = TokenVerifier(SECRET, jwks=jwks, cache_entries=0)
+    verifier.verify(es256_token(pem, "key-1"))
+
+    path.unlink()
+    clock.now += 120
+    assert verifier.verify(es256_token(pem, "key-1"))["sub"] == "user-1"
+
+
+def test_verified_tokens_are_cached_until_exp(monkeypatch):
+    clock = FakeClock(now=time.time())
+    verifier = TokenVerifier(SECRET, clock=clock)
+    token = jwt.encode({"sub": "user-1", "exp": int(clock.now) + 60}, SECRET)
+    decodes = []
+    original = verifier._decode
+    monkeypatch.setattr(verifier, "_decode", lambda t: decodes.append(t) or original(t))
+
+    for _ in range(5):
+        verifier.verify(token)
+    assert len(decodes) == 1
+
+    # Past exp the entry is dropped and the token goes back through full verification
+    clock.now += 61
+    verifier.verify(token)
+    assert len(decodes) == 2
+
+
+def test_token_cache_is_bounded():
+    verifier = TokenVerifier(SECRET, cache_entries=2)
+    exp = int(time.time()) + 60
+    for user in ("a", "b", "c"):
+        verifier.verify(jwt.encode({"sub": user, "exp": exp}, SECRET))
+
+    assert verifier.stats()["cached_tokens"] == 2
+
+
+def test_dependency_rejects_invalid_tokens(monkeypatch):
+    monkeypatch.setattr(auth, "token_verifier", TokenVerifier(SECRET))
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials="not-a-jwt")
+
+    with pytest.raises(HTTPException) as error:
+        auth.verify_supabase_jwt(credentials)
+    assert error.value.status_code == 401
@@ -0,0 +1,175 @@
+"""
+Tests for the segment x emotion matrix
+"""
+import copy
+import json
+import numpy as np
+import orjson
+import pytest
+from fastapi.encoders import jsonable_encoder
+from emotion_matrix import EmotionMatrix, EmotionMatrixBuilder, HUME_EMOTIONS
+from fake_hume import build_segments
+from jobs import AnalysisJob
+
+
+def matrix_for(segments):
+    builder = EmotionMatrixBuilder()
+    for segment in segments:
+        builder.add(
+            segment["text"],
+            segment["confidence"],
+            segment["time"]["begin"],
+            segment["time"]["end"],
+            [e["name"] for e in segment["emotions"]],
+            [e["score"] for e in segment["emotions"]],
+        )
+    return builder.build()
+
+
+def test_top_k_matches_a_full_sort_including_ties():
+    segments = build_segments("seed", 50)
+    # Tie at the top-5 cut: a stable sort keeps the earlier emotion
+    for emotion in segments[0]["emotions"]:
+        emotion["score"] = 0.1
+    segments[0]["emotions"][10]["score"] = 0.9
+    matrix = matrix_for(segments)
+
+    indices, scores = matrix.top_k(5)
+
+    for row, segment in enumerate(segments):
+        expected = sorted(segment["emotions"], key=lambda e: e["score"], reverse=True)[:5]
+        assert [HUME_EMOTIONS[i] for i in indices[row]] == [e["name"] for e in expected]
+        assert scores[row].tolist() == [e["score"] for e in expected]
+
+
+def test_aggregates_and_duration_weighting():
+    segments = build_segments("seed", 20)
+    matrix = matrix_for(segments)
+    scores = np.array([[e["score"] for e in s["emotions"]] for s in segments])
+    durations = np.array([s["time"]["end"] - s["time"]["begin"] for s in segments])
+
+    assert np.allclose(matrix.mean(), scores.mean(axis=0))
+    assert np.allclose(matrix.variance(), scores.var(axis=0))
+    assert np.allclose(matrix.weighted_mean(), np.average(scores, axis=0, weights=durations))
+
+    totals = {}
+    for segment in segments:
+        for e in sorted(segment["emotions"], key=lambda e: e["score"], reverse=True)[:5]:
+            totals[e["name"]] = totals.get(e["name"], 0) + e["score"]
+    averages = matrix.top_k_mean(5)
+    assert averages.keys() == totals.keys()
+    assert all(averages[name] == pytest.approx(total / 20) for name, total in totals.items())
+
+
+def test_builder_handles_missing_and_unknown_emotions():
+    builder = EmotionMatrixBuilder()
+    builder.add("a", 0.9, 0.0, 1.0, ["Joy", "Anger"], [0.5, 0.2])
+    builder.add("b", 0.8, 1.0, 3.0, ["Joy", "Sparkle"], [0.1, 0.7])
+    matrix = builder.build()
+
+    assert matrix.emotion_names[-1] == "Sparkle"
+    assert matrix.scores.shape == (2, len(HUME_EMOTIONS) + 1)
+    assert matrix.scores[0, HUME_EMOTIONS.index("Anger")] == 0.2
+    assert matrix.scores[0, -1] == 0.0
+    assert matrix.top_k(1)[0][:, 0].tolist() == [HUME_EMOTIONS.index("Joy"), len(HUME_EMOTIONS)]
+
+
+def test_all_emotions_are_plain_lists():
+    segments = build_segments("seed", 3)
+    matrix = matrix_for(segments)
+    expected = [
+        {
+            "text": s["text"],
+            "confidence": s["confidence"],
+            "timestamp": s["time"],
+            "emotions": sorted(s["emotions"], key=lambda e: e["score"], reverse=True)[:5],
+            "all_emotions": s["emotions"],
+        }
+        for s in segments
+    ]
+    emotions = expected[0]["all_emotions"]
+
+    # Each check gets fresh segments, so none of them sees a list another one already read
+    assert json.loads(json.dumps(matrix.to_timestamps())) == expected
+    assert json.loads(orjson.dumps(matrix.to_timestamps())) == expected
+    assert jsonable_encoder(matrix.to_timestamps()) == expected
+    job = AnalysisJob(result={"timestamps": matrix.to_timestamps()})
+    assert json.loads(job.model_dump_json())["result"]["timestamps"] == expected
+    assert copy.deepcopy(matrix.to_timestamps()) == expected
+    assert matrix.to_timestamps()[0]["all_emotions"].copy() == emotions
+    assert matrix.to_timestamps()[0]["all_emotions"] + [] == emotions
+    assert matrix.to_timestamps()[0]["all_emotions"] * 2 == emotions * 2
+    assert EmotionMatrix.from_timestamps(matrix.to_timestamps()).scores.tolist() == matrix.scores.tolist()
+
+
+def legacy_prosody(results) -> dict:
+    """timestamps and overall_sentiment as _process_results built them before the matrix"""
+    timestamps = []
+    for result in results:
+        for prediction in result.results.predictions:
+            for group in prediction.models.prosody.grouped_predictions:
+                for pred in group.predictions:
+                    emotions = [{"name": e.name, "score": e.score} for e in pred.emotions]
+                    timestamps.append({
+                        "text": pred.text,
+                        "confidence": pred.confidence,
+                        "timestamp": {"begin": pred.time.begin, "end": pred.time.end},
+                        "emotions": sorted(emotions, key=lambda x: x["score"], reverse=True)[:5],
+                        "all_emotions": emotions,
+                    })
+    totals = {}
+    for segment in timestamps:
+        for emotion in segment["emotions"]:
+            totals[emotion["name"]] = totals.get(emotion["name"], 0) + emotion["score"]
+    averages = {name: total / len(timestamps) for name, total in totals.items()}
+    dominant = max(averages.items(), key=lambda x: x[1]) if averages else ("neutral", 0)
+    return {
+        "timestamps": timestamps,
+        "overall_sentiment": {
+            "dominant_emotion": {"name": dominant[0], "score": dominant[1]},
+            "average_emotions": averages,
+            "total_segments_analyzed": len(timestamps),
+        },
+    }
+
+
+def parsed_results(segments):
+    from typing import List
+    from hume.core.pydantic_utilities import parse_obj_as
+    from hume.expression_measurement.batch.types import UnionPredictResult
+    from fake_hume import FakeHumeBackend
+
+    backend = FakeHumeBackend(segments_per_file=len(segments))
+    raw = backend._source_result({"filename": "pitch.webm", "content_type": "audio/webm", "md5sum": "golden"})
+    raw["results"]["predictions"][0]["models"]["prosody"]["grouped_predictions"][0]["predictions"] = segments
+    return parse_obj_as(List[UnionPredictResult], [raw])
+
+
+@pytest.mark.parametrize("case", ["complete", "irregular", "no_emotions"])
+def test_process_results_matches_the_pre_matrix_output(case):
+    from hume_service import HumeAudioService
+
+    segments = build_segments("golden", 8)
+    if case == "irregular":
+        # Partial, empty, reordered (with ties) and unknown-emotion segments
+        segments[1]["emotions"] = segments[1]["emotions"][:3]
+        segments[2]["emotions"] = []
+        segments[3]["emotions"] = list(reversed(segments[3]["emotions"]))
+        for emotion in segments[4]["emotions"]:
+            emotion["score"] = 0.25
+        segments[4]["emotions"] = segments[4]["emotions"][::-2]
+        segments[5]["emotions"] = segments[5]["emotions"][:4] + [{"name": "Sparkle", "score": 0.99}]
+    elif case == "no_emotions":
+        for segment in segments:
+            segment["emotions"] = []
+    results = parsed_results(segments)
+
+    expected = legacy_prosody(results)
+    analysis = HumeAudioService(cache=None)._process_results(results)["analysis"]
+
+    assert json.dumps(analysis["timestamps"]) == json.dumps(expected["timestamps"])
+    overall, expected_overall = analysis["overall_sentiment"], expected["overall_sentiment"]
+    assert overall["dominant_emotion"]["name"] == expected_overall["dominant_emotion"]["name"]
+    assert overall["dominant_emotion"]["score"] == pytest.approx(expected_overall["dominant_emotion"]["score"])
+    assert overall["average_emotions"] == pytest.approx(expected_overall["average_emotions"])
+    assert overall["total_segments_analyzed"] == expected_overall["total_segments_analyzed"]
@@ -0,0 +1,157 @@
+"""
+Tests for Farcaster webhook ingestion
+"""
+import asyncio
+import json
+import sqlite3
+import pytest
+from fastapi.testclient import TestClient
+import main
+from farcaster_events import (
+    InvalidWebhookBody,
+    JSONLWebhookSink,
+    SQLiteWebhookSink,
+    WebhookIngestQueue,
+    parse_webhook,
+)
+
+
+def webhook_body(fid: int = 42, action_type: str = "button_pressed", **action) -> bytes:
+    return json.dumps({
+        "action": {
+            "type": action_type,
+            "frame_url": "https://frames.example/pitch",
+            "button_index": 1,
+            "user": {"fid": fid},
+            "timestamp": "2025-01-01T00:00:00Z",
+            **action,
+        }
+    }).encode()
+
+
+class RecordingSink(SQLiteWebhookSink):
+    """SQLite sink that remembers the size of each batch written"""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.batches = []
+
+    def write_batch(self, events):
+        self.batches.append(len(events))
+        return super().write_batch(events)
+
+
+def test_parse_validates_once_and_keys_on_body():
+    body = webhook_body()
+    event = parse_webhook(body)
+
+    assert event.valid
+    assert (event.action_type, event.fid, event.button_index) == ("button_pressed", 42, 1)
+    assert event.idempotency_key == parse_webhook(body).idempotency_key
+    assert parse_webhook(body, delivery_id="d-1").idempotency_key == "d-1"
+
+
+def test_parse_keeps_unexpected_shapes_and_rejects_non_json():
+    event = parse_webhook(json.dumps({"action": {"type": "cast_liked", "user": {"fid": 7}}}).encode())
+    assert not event.valid
+    assert (event.action_type, event.fid) == ("cast_liked", 7)
+
+    with pytest.raises(InvalidWebhookBody):
+        parse_webhook(b"{not json")
+
+
+def test_sqlite_sink_drops_duplicate_deliveries(tmp_path):
+    sink = SQLiteWebhookSink(str(tmp_path / "events.db"))
+    first, second = parse_webhook(webhook_body(fid=1)), parse_webhook(webhook_body(fid=2))
+
+    assert sink.write_batch([first, second, first]) == 2
+    assert sink.write_batch([second]) == 0
+    assert sink.count() == 2
+
+
+def test_jsonl_sink_remembers_keys_across_restarts(tmp_path):
+    path = str(tmp_path / "events.jsonl")
+    event = parse_webhook(webhook_body())
+
+    assert JSONLWebhookSink(path).write_batch([event, event]) == 1
+    assert JSONLWebhookSink(path).write_batch([event]) == 0
+    with open(path) as f:
+        assert len(f.readlines()) == 1
+
+
+def test_writer_batches_a_burst_and_flushes_on_stop(tmp_path):
+    sink = RecordingSink(str(tmp_path / "events.db"))
+    queue = WebhookIngestQueue(sink, batch_size=50, flush_interval=0.05)
+
+    async def burst():
+        await queue.start()
+        for fid in range(120):
+            assert queue.offer(parse_webhook(webhook_body(fid=fid)))
+        await asyncio.sleep(0.2)
+        for fid in range(120, 130):
+            queue.offer(parse_webhook(webhook_body(fid=fid)))
+        await queue.stop()
+
+    asyncio.run(burst())
+
+    assert sum(sink.batches) == 130
+    assert sink.batches[:3] == [50, 50, 20]
+    assert SQLiteWebhookSink(sink.path).count() == 130
+
+
+class FlakySink(SQLiteWebhookSink):
+    """SQLite sink that fails its first writes and always refuses one event"""
+
+    def __init__(self, path: str, failures: int = 0, poison_fid: int = -1):
+        super().__init__(path)
+        self.failures = failures
+        self.poison_fid = poison_fid
+
+    def write_batch(self, events):
+        if self.failures:
+            self.failures -= 1
+            raise sqlite3.OperationalError("database is locked")
+        if any(event.fid == self.poison_fid for event in events):
+            raise ValueError("unstorable event")
+        return super().write_batch(events)
+
+
+@pytest.mark.parametrize("failures,poison_fid,stored", [(4, -1, 20), (0, 7, 19)])
+def test_writer_retries_failed_batches_and_drops_only_poison(tmp_path, failures, poison_fid, stored):
+    sink = FlakySink(str(tmp_path / "events.db"), failures=failures, poison_fid=poison_fid)
+    queue = WebhookIngestQueue(sink, flush_interval=0.01, retry_seconds=0.01, max_write_attempts=2)
+
+    async def deliver():
+        await queue.start()
+        for fid in range(20):
+            queue.offer(parse_webhook(webhook_body(fid=fid)))
+        for _ in range(100):
+            await asyncio.sleep(0.02)
+            if not queue._pending and queue.queue.empty():
+                break
+        await queue.stop()
+
+    asyncio.run(deliver())
+
+    assert SQLiteWebhookSink(sink.path).count() == stored
+
+
+def test_webhook_endpoint_acknowledges_and_refuses_when_full(tmp_path, monkeypatch):
+    queue = WebhookIngestQueue(SQLiteWebhookSink(str(tmp_path / "events.db")), max_size=1)
+    monkeypatch.setattr(main, "farcaster_events", queue)
+    client = TestClient(main.app)
+
+    response = client.post("/farcaster/webhook", content=webhook_body(action_type="frame_added"))
+    assert response.status_code == 200
+    assert response.json() == {
+        "success": True,
+        "timestamp": "2025-01-01T00:00:00Z",
+        "processed": {"status": "processed", "action": "frame_added", "message": "Frame addition recorded"},
+    }
+
+    # Nothing drains the queue without the lifespan, so the next delivery is refused
+    response = client.post("/farcaster/webhook", content=webhook_body(fid=2))
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+    assert client.post("/farcaster/webhook", content=b"{not json").status_code == 400
@@ -0,0 +1,123 @@
+"""
+Tests for chunked analysis of long recordings
+"""
+import asyncio
+import io
+import pytest
+from audio_preprocess import decode_audio
+from fake_hume import FakeHumeBackend
+from hume_chunking import AudioChunk, plan_cuts, split_recording, stitch_timestamps
+from test_audio_preprocess import recording
+from test_hume_service import make_service
+
+RATE = 16000
+# 90 s of speech with pauses at 24-25 s, 49-50 s and 70-71 s
+LONG_PITCH = [(24, True), (1, False), (24, True), (1, False), (20, True), (1, False), (19, True)]
+
+
+def chunking_service(backend: FakeHumeBackend, **kwargs):
+    service = make_service(backend, cache=None, chunk_seconds=30, **kwargs)
+    # Chunks are tens of seconds long; don't hold the first status check back for them
+    service.poll_scheduler.seconds_per_audio_second = 0
+    return service
+
+
+def long_recording() -> bytes:
+    return recording(LONG_PITCH, rate=RATE, channels=1)
+
+
+def processed(*segments, language: str = "en") -> dict:
+    return {
+        "success": True,
+        "analysis": {
+            "transcription": {"detected_language": language},
+            "timestamps": [
+                {"text": text, "confidence": 1.0, "timestamp": {"begin": begin, "end": end},
+                 "emotions": [], "all_emotions": [{"name": "Joy", "score": 0.5}]}
+                for text, begin, end in segments
+            ],
+        },
+    }
+
+
+def test_cuts_land_in_pauses_near_the_chunk_length():
+    samples = decode_audio(long_recording(), RATE)
+    cuts = [cut / RATE for cut in plan_cuts(samples, RATE, chunk_seconds=30)]
+
+    # The 40.5 s left after the second cut is short enough to stay one chunk
+    assert cuts == [pytest.approx(24.5, abs=0.1), pytest.approx(49.5, abs=0.1)]
+    assert plan_cuts(samples[:40 * RATE], RATE, chunk_seconds=30) == []
+
+
+def test_chunks_overlap_and_own_the_stretch_between_cuts():
+    chunks = split_recording(long_recording(), chunk_seconds=30, overlap_seconds=1.0)
+
+    assert len(chunks) == 3
+    assert chunks[0].start == 0 and chunks[-1].end == pytest.approx(90)
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert previous.own_end == chunk.own_start
+        assert chunk.start == pytest.approx(chunk.own_start - 1.0)
+        assert previous.end == pytest.approx(previous.own_end + 1.0)
+
+
+def test_stitching_offsets_segments_and_drops_overlap_duplicates():
+    first = AudioChunk(b"", 0.0, 11.0, 0.0, 10.0)
+    second = AudioChunk(b"", 9.0, 20.0, 10.0, 20.0)
+    results = [
+        (first, processed(("opening", 0.5, 4.0), ("cut word", 9.2, 10.4), ("echo", 10.3, 11.0))),
+        (second, processed(("cut word", 0.2, 1.4), ("echo", 1.3, 2.0), ("closing", 5.0, 9.0))),
+    ]
+
+    timeline, language = stitch_timestamps(results)
+
+    assert [(s["text"], s["timestamp"]["begin"]) for s in timeline] == [
+        ("opening", 0.5), ("cut word", 9.2), ("echo", 10.3), ("closing", 14.0),
+    ]
+    assert language == "en"
+
+
+def test_long_recording_runs_as_parallel_chunks_and_retries_failures():
+    # The first job submitted fails; only that chunk is resubmitted
+    backend = FakeHumeBackend(processing_seconds=0.05, segments_per_file=6, failing_jobs=1)
+    service = chunking_service(backend, max_parallel_chunks=4)
+
+    result = asyncio.run(service.analyze_audio_expression(io.BytesIO(long_recording())))
+
+    assert result["success"]
+    chunks = result["metadata"]["chunks"]
+    assert len(chunks) == 3
+    assert sorted(chunk["attempts"] for chunk in chunks) == [1, 1, 2]
+    assert backend.request_counts["submit"] == 4
+
+    timestamps = result["analysis"]["timestamps"]
+    begins = [segment["timestamp"]["begin"] for segment in timestamps]
+    assert begins == sorted(begins)
+    assert 0 <= begins[0] and timestamps[-1]["timestamp"]["end"] <= 90
+    assert result["analysis"]["overall_sentiment"]["total_segments_analyzed"] == len(timestamps)
+
+
+def test_chunked_analysis_fails_once_retries_run_out():
+    backend = FakeHumeBackend(processing_seconds=0.0, segments_per_file=2, failing_jobs=10)
+    service = chunking_service(backend, chunk_retries=1)
+
+    result = asyncio.run(service.analyze_audio_expression(io.BytesIO(long_recording())))
+
+    assert not result["success"]
+    assert "Injected failure" in result["error"]
+    assert [chunk["attempts"] for chunk in result["metadata"]["chunks"]] == [2, 2, 2]
+
+
+def test_short_or_undecodable_audio_is_analyzed_whole():
+    backend = FakeHumeBackend(processing_seconds=0.0, segments_per_file=2)
+    service = chunking_service(backend)
+
+    async def scenario():
+        short = await service.analyze_audio_expression(io.BytesIO(recording([(5, True)], rate=RATE, channels=1)))
+        opaque = await service.analyze_audio_expression(io.BytesIO(b"webm bytes"))
+        return short, opaque
+
+    short, opaque = asyncio.run(scenario())
+
+    assert short["success"] and opaque["success"]
+    assert "chunks" not in short["metadata"] and "chunks" not in opaque["metadata"]
+    assert backend.request_counts["submit"] == 2
@@ -0,0 +1,298 @@
+"""
+Tests for HumeAudioService against the local fake Hume API
+"""
+import asyncio
+import io
+import time
+import httpx
+import pytest
+from hume import AsyncHumeClient
+from fake_hume import create_fake_hume_app, FakeHumeBackend
+from hume_service import HumeAudioService
+
+
+def make_service(backend: FakeHumeBackend, **kwargs) -> HumeAudioService:
+    transport = httpx.ASGITransport(app=create_fake_hume_app(backend))
+    client = AsyncHumeClient(
+        api_key="test-hume-key",
+        base_url="http://fake-hume",
+        httpx_client=httpx.AsyncClient(transport=transport),
+    )
+    return HumeAudioService(client=client, poll_interval_seconds=0.01, **kwargs)
+
+
+def test_analyze_audio_expression_returns_processed_results():
+    backend = FakeHumeBackend(processing_seconds=0.05, segments_per_file=5)
+    service = make_service(backend)
+
+    result = asyncio.run(service.analyze_audio_expression(io.BytesIO(b"fake audio")))
+
+    assert result["success"]
+    analysis = result["analysis"]
+    assert len(analysis["timestamps"]) == 5
+    assert len(analysis["timestamps"][0]["emotions"]) == 5
+    assert analysis["transcription"]["full_text"]
+    assert analysis["overall_sentiment"]["total_segments_analyzed"] == 5
+
+    metadata = result["metadata"]
+    stages = metadata["stage_seconds"]
+    assert {"hume_submit", "hume_wait", "hume_queue", "hume_inference", "hume_poll_delay",
+            "hume_fetch_predictions", "process_results"} <= set(stages)
+    assert stages["hume_inference"] >= 0.04
+    assert metadata["processing_time"] == pytest.approx(
+        stages["hume_submit"] + stages["hume_wait"] + stages["process_results"]
+    )
+
+
+def test_concurrent_analyses_share_one_event_loop():
+    backend = FakeHumeBackend(processing_seconds=0.2, segments_per_file=2)
+    service = make_service(backend, max_concurrent_requests=4)
+
+    async def run_all():
+        return await asyncio.gather(*(
+            service.analyze_audio_expression(io.BytesIO(f"clip {i}".encode()))
+            for i in range(10)
+        ))
+
+    start = time.perf_counter()
+    results = asyncio.run(run_all())
+    elapsed = time.perf_counter() - start
+
+    assert all(r["success"] for r in results)
+    assert backend.request_counts["submit"] == 10
+    # Ten 0.2 s jobs run back to back would take at least 2 s
+    assert elapsed < 1.5
+
+
+def test_poll_scheduler_batches_status_checks():
+    backend = FakeHumeBackend(processing_seconds=0.2, segments_per_file=2)
+    service = make_service(backend)
+
+    async def run_all():
+        return await asyncio.gather(*(
+            service.analyze_audio_expression(io.BytesIO(f"clip {i}".encode()))
+            for i in range(20)
+        ))
+
+    results = asyncio.run(run_all())
+
+    assert all(r["success"] for r in results)
+    status_requests = backend.request_counts["list"] + backend.request_counts["details"]
+    attributed_polls = sum(r["metadata"]["status_checks"] for r in results)
+    # One list call covers every due job, so requests are far fewer than per-job checks
+    assert backend.request_counts["list"] > 0
+    assert status_requests < attributed_polls / 2
+    assert service.poll_scheduler.stats()["outstanding_jobs"] == 0
+
+
+def test_poll_scheduler_pages_past_other_finished_jobs():
+    from poll_scheduler import _PendingJob
+
+    backend = FakeHumeBackend(processing_seconds=0.0)
+    # Another worker's finished jobs fill the first pages of list_jobs
+    now_ms = int(time.time() * 1000)
+    for i in range(30):
+        job_id = backend.submit([{"filename": f"other-{i}.webm", "content_type": "audio/webm", "md5sum": str(i)}])
+        backend.jobs[job_id]["created_ms"] = now_ms - 5000 + i
+    ours = [
+        backend.submit([{"filename": f"pitch-{i}.webm", "content_type": "audio/webm", "md5sum": f"p{i}"}])
+        for i in range(4)
+    ]
+    scheduler = make_service(backend).poll_scheduler
+    scheduler.list_limit = 10
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        due = [_PendingJob(job_id, loop.create_future(), 0, 1) for job_id in ours]
+        return await scheduler._fetch_states(due)
+
+    states = asyncio.run(scenario())
+
+    assert {job_id: state.status for job_id, state in states.items()} == {job_id: "COMPLETED" for job_id in ours}
+    assert backend.request_counts["list"] > 1
+    assert backend.request_counts["details"] == 0
+
+
+def test_status_check_tolerates_jobs_resolved_while_in_flight():
+    from poll_scheduler import HumePollScheduler, _PendingJob
+
+    class Batch:
+        def __init__(self, jobs):
+            self.jobs = jobs
+
+        async def get_job_details(self, job_id):
+            # A callback resolves the job while the status request is out
+            self.jobs[0].future.set_result([])
+            raise RuntimeError("connection reset")
+
+        async def list_jobs(self, **kwargs):
+            for job in self.jobs:
+                if not job.future.done():
+                    job.future.set_result([])
+            failed = type("State", (), {"status": "FAILED", "message": "late", "created_timestamp_ms": 0})
+            return [type("Job", (), {"job_id": job.job_id, "state": failed}) for job in self.jobs]
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        jobs = [_PendingJob(f"job-{i}", loop.create_future(), 0, 1) for i in range(2)]
+        scheduler = HumePollScheduler(Batch(jobs), max_consecutive_errors=1)
+        await scheduler._check(jobs[:1])
+        await scheduler._check(jobs)
+        return [job.future.result() for job in jobs]
+
+    assert asyncio.run(scenario()) == [[], []]
+
+
+def test_callback_endpoint_requires_a_token_and_valid_predictions(monkeypatch):
+    from fastapi.testclient import TestClient
+    import main
+    from services import hume_service_provider
+
+    service = make_service(FakeHumeBackend())
+    main.app.dependency_overrides[hume_service_provider] = lambda: service
+    client = TestClient(main.app)
+    try:
+        monkeypatch.delenv("HUME_CALLBACK_TOKEN", raising=False)
+        unconfigured = client.post("/hume/callback", json={"job_id": "job-1"})
+
+        monkeypatch.setenv("HUME_CALLBACK_TOKEN", "secret")
+        wrong_token = client.post("/hume/callback?token=guess", json={"job_id": "job-1"})
+
+        async def scenario():
+            waiter = asyncio.create_task(service.poll_scheduler.wait_for("job-1", 5))
+            await asyncio.sleep(0.01)
+            response = await asyncio.to_thread(
+                client.post, "/hume/callback?token=secret",
+                json={"job_id": "job-1", "status": "COMPLETED", "predictions": [{"source": 42}]},
+            )
+            waiter.cancel()
+            return response
+
+        malformed = asyncio.run(scenario())
+    finally:
+        main.app.dependency_overrides.clear()
+
+    assert unconfigured.status_code == 403
+    assert wrong_token.status_code == 401
+    assert malformed.status_code == 400
+
+
+def test_poll_scheduler_delays_first_check_for_long_audio():
+    backend = FakeHumeBackend(processing_seconds=0.0, segments_per_file=1)
+    service = make_service(backend)
+    service.poll_scheduler.seconds_per_audio_second = 0.01
+
+    start = time.perf_counter()
+    result = asyncio.run(service.analyze_audio_expression(io.BytesIO(b"long"), audio_duration=30))
+
+    assert time.perf_counter() - start >= 0.3 * (1 - service.poll_scheduler.jitter)
+    assert result["metadata"]["status_checks"] == 1
+
+
+def test_callback_predictions_skip_polling():
+    backend = FakeHumeBackend(processing_seconds=0.0, segments_per_file=3)
+    service = make_service(backend)
+    service.poll_scheduler.min_interval = 60
+
+    async def scenario():
+        task = asyncio.create_task(service.analyze_audio_expression(io.BytesIO(b"clip")))
+        while not service.poll_scheduler.stats()["polls_by_job"]:
+            await asyncio.sleep(0.01)
+        [job_id] = service.poll_scheduler.stats()["polls_by_job"]
+        predictions = backend.predictions(job_id)
+        assert service.poll_scheduler.notify(job_id, "COMPLETED", predictions=predictions)
+        return await task
+
+    result = asyncio.run(scenario())
+
+    assert result["success"]
+    assert len(result["analysis"]["timestamps"]) == 3
+    assert result["metadata"]["status_checks"] == 0
+    assert backend.request_counts["details"] == 0
+
+
+def test_packer_shares_one_job_and_splits_results_per_file():
+    backend = FakeHumeBackend(processing_seconds=0.05, segments_per_file=4)
+    packed = make_service(backend, batch_window_seconds=0.05)
+    solo = make_service(FakeHumeBackend(processing_seconds=0.0, segments_per_file=4))
+    clips = [f"clip {i}".encode() for i in range(6)]
+
+    async def run_all(service):
+        return await asyncio.gather(*(
+            service.analyze_audio_expression(io.BytesIO(clip)) for clip in clips
+        ))
+
+    results = asyncio.run(run_all(packed))
+    expected = asyncio.run(run_all(solo))
+
+    assert backend.request_counts["submit"] == 1
+    segments = lambda r: [(t["text"], t["timestamp"]) for t in r["analysis"]["timestamps"]]
+    assert [segments(r) for r in results] == [segments(r) for r in expected]
+    assert {r["metadata"]["job_files"] for r in results} == {6}
+    assert len({r["metadata"]["hume_job_id"] for r in results}) == 1
+
+
+def test_analyze_audio_batch_submits_only_uncached_files():
+    from result_cache import ResultCache
+    backend = FakeHumeBackend(processing_seconds=0.0, segments_per_file=2)
+    service = make_service(backend, cache=ResultCache())
+    clips = [b"first", b"second", b"third"]
+
+    async def scenario():
+        await service.analyze_audio_expression(io.BytesIO(clips[0]), content_hash="h0")
+        return await service.analyze_audio_batch(
+            [io.BytesIO(clip) for clip in clips], content_hashes=["h0", "h1", "h2"]
+        )
+
+    results = asyncio.run(scenario())
+
+    assert all(r["success"] for r in results)
+    assert backend.request_counts["submit"] == 2
+    assert [r["metadata"]["job_files"] for r in results] == [1, 2, 2]
+
+
+def test_split_by_source_reports_missing_files():
+    backend = FakeHumeBackend(processing_seconds=0.0, segments_per_file=2)
+    service = make_service(backend)
+    job_id = backend.submit([
+        {"filename": "recording-0", "content_type": "audio/webm", "md5sum": "a"},
+    ])
+
+    async def scenario():
+        predictions = await service.client.expression_measurement.batch.get_job_predictions(job_id)
+        return service._split_by_source(predictions, ["recording-0", "recording-1"])
+
+    first, missing = asyncio.run(scenario())
+
+    assert len(first) == 1 and missing == []
+    assert not service._process_source(missing)["success"]
+
+
+def test_batch_endpoint_answers_per_file():
+    from fastapi.testclient import TestClient
+    import main
+    from services import hume_service_provider, scoring_service_provider
+    from test_practice_sessions import StubScorer
+
+    backend = FakeHumeBackend(processing_seconds=0.0, segments_per_file=3)
+    service = make_service(backend, cache=None)
+    service.poll_scheduler.seconds_per_audio_second = 0
+    main.app.dependency_overrides.update({
+        hume_service_provider: lambda: service,
+        scoring_service_provider: lambda: StubScorer(),
+    })
+    try:
+        response = TestClient(main.app).post(
+            "/analyze-pitch/batch",
+            files=[("audio", (f"pitch-{i}.webm", f"audio {i}".encode(), "audio/webm")) for i in range(3)],
+            data={"durations": "30,45"},
+        )
+    finally:
+        main.app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["filename"] for r in results] == ["pitch-0.webm", "pitch-1.webm", "pitch-2.webm"]
+    assert [r["duration"] for r in results] == ["30", "45", None]
+    assert all(r["success"] for r in results)
+    assert backend.request_counts["submit"] == 1
@@ -0,0 +1,259 @@
+"""
+Tests for the background analysis job subsystem
+"""
+import asyncio
+import os
+import sqlite3
+import time
+import pytest
+from fastapi.testclient import TestClient
+from jobs import (
+    AnalysisJob,
+    AnalysisJobManager,
+    InMemoryJobStore,
+    SQLiteJobStore,
+    JOB_COMPLETED,
+    JOB_FAILED,
+    JOB_PROCESSING,
+    JOB_QUEUED,
+)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteJobStore(str(tmp_path / "jobs.db"))
+    return InMemoryJobStore()
+
+
+def test_claim_next_hands_out_each_job_once(store):
+    first = store.create(AnalysisJob(user_id="u1"))
+    second = store.create(AnalysisJob(user_id="u1"))
+
+    claimed = [store.claim_next(), store.claim_next(), store.claim_next()]
+
+    assert [job.job_id for job in claimed[:2]] == [first.job_id, second.job_id]
+    assert claimed[2] is None
+    assert store.get(first.job_id).status == JOB_PROCESSING
+
+
+def test_update_round_trips_results(store):
+    job = store.create(AnalysisJob(user_id="u1", metadata={"filename": "pitch.webm"}))
+
+    store.update(job.job_id, status=JOB_COMPLETED, progress=100, result={"score": 80})
+
+    saved = store.get(job.job_id)
+    assert saved.status == JOB_COMPLETED
+    assert saved.result == {"score": 80}
+    assert saved.metadata == {"filename": "pitch.webm"}
+
+
+def test_finished_jobs_are_deleted_after_retention(store):
+    old = store.create(AnalysisJob())
+    store.update(old.job_id, status=JOB_COMPLETED, result={"score": 80})
+    failed = store.create(AnalysisJob())
+    store.update(failed.job_id, status=JOB_FAILED, error="boom")
+    queued = store.create(AnalysisJob(created_at=0, updated_at=0))
+    cutoff = time.time()
+    recent = store.create(AnalysisJob())
+    store.update(recent.job_id, status=JOB_COMPLETED)
+
+    assert store.delete_finished(older_than=cutoff) == 2
+
+    assert store.get(old.job_id) is None and store.get(failed.job_id) is None
+    assert store.get(queued.job_id).status == JOB_QUEUED
+    assert store.get(recent.job_id) is not None
+
+
+def test_manager_deletes_expired_jobs_as_it_runs(tmp_path):
+    async def pipeline(job, report_progress):
+        return {"success": True}
+
+    store = InMemoryJobStore()
+    manager = AnalysisJobManager(
+        store, pipeline, workers=1, spool_dir=str(tmp_path),
+        idle_poll_seconds=0.02, requeue_interval_seconds=0.05, retention_seconds=0.1,
+    )
+    finished = store.create(AnalysisJob())
+    store.update(finished.job_id, status=JOB_COMPLETED, result={"score": 80})
+
+    async def scenario():
+        await manager.start()
+        try:
+            kept = await manager.get(finished.job_id)
+            await asyncio.sleep(0.3)
+            return kept, await manager.get(finished.job_id)
+        finally:
+            await manager.stop()
+
+    kept, expired = asyncio.run(scenario())
+    assert kept is not None and expired is None
+
+
+def test_sqlite_store_requeues_interrupted_jobs(tmp_path):
+    audio_path = tmp_path / "audio.webm"
+    audio_path.write_bytes(b"audio")
+    store = SQLiteJobStore(str(tmp_path / "jobs.db"))
+    kept = store.create(AnalysisJob(audio_path=str(audio_path)))
+    lost = store.create(AnalysisJob(audio_path=str(tmp_path / "missing.webm")))
+    store.claim_next()
+    store.claim_next()
+
+    # A fresh store on the same file simulates a restarted process
+    restarted = SQLiteJobStore(str(tmp_path / "jobs.db"))
+    assert restarted.requeue_stale(older_than=float("inf")) == 1
+    assert restarted.get(kept.job_id).status == JOB_QUEUED
+    assert restarted.get(lost.job_id).status == JOB_FAILED
+
+
+def run_manager_jobs(manager, paths):
+    async def scenario():
+        await manager.start()
+        try:
+            jobs = [await manager.submit(path, user_id="u1") for path in paths]
+            finished = []
+            for job in jobs:
+                async for update in manager.watch(job.job_id):
+                    pass
+                finished.append(update)
+            return finished
+        finally:
+            await manager.stop()
+
+    return asyncio.run(scenario())
+
+
+def test_manager_runs_pipeline_and_reports_progress(tmp_path):
+    stages = []
+
+    async def pipeline(job, report_progress):
+        await report_progress("analyzing_audio", 10)
+        stages.append(job.job_id)
+        return {"size": len(open(job.audio_path, "rb").read())}
+
+    manager = AnalysisJobManager(InMemoryJobStore(), pipeline, workers=2, spool_dir=str(tmp_path))
+    path = manager.new_spool_path()
+    with open(path, "wb") as f:
+        f.write(b"12345")
+
+    [job] = run_manager_jobs(manager, [path])
+
+    assert job.status == JOB_COMPLETED
+    assert job.progress == 100
+    assert job.result == {"size": 5}
+    assert stages == [job.job_id]
+
+
+def test_manager_records_pipeline_failures(tmp_path):
+    async def pipeline(job, report_progress):
+        raise RuntimeError("Hume job failed")
+
+    manager = AnalysisJobManager(InMemoryJobStore(), pipeline, workers=1, spool_dir=str(tmp_path))
+    path = manager.new_spool_path()
+    open(path, "wb").close()
+
+    [job] = run_manager_jobs(manager, [path])
+
+    assert job.status == JOB_FAILED
+    assert job.error == "Hume job failed"
+
+
+def test_failed_submit_removes_the_spooled_upload(tmp_path):
+    class BrokenStore(InMemoryJobStore):
+        def create(self, job):
+            raise sqlite3.OperationalError("database is locked")
+
+    async def pipeline(job, report_progress):
+        return {"success": True}
+
+    manager = AnalysisJobManager(BrokenStore(), pipeline, workers=0, spool_dir=str(tmp_path))
+    path = manager.new_spool_path()
+    open(path, "wb").close()
+
+    with pytest.raises(sqlite3.OperationalError):
+        asyncio.run(manager.submit(path))
+    assert not os.path.exists(path)
+
+
+def test_job_endpoints_submit_and_poll(tmp_path, monkeypatch):
+    import main
+    from auth import verify_supabase_jwt
+
+    async def pipeline(job, report_progress):
+        return {"success": True, "filename": job.metadata["filename"]}
+
+    manager = AnalysisJobManager(InMemoryJobStore(), pipeline, workers=1, spool_dir=str(tmp_path))
+    monkeypatch.setattr(main, "analysis_jobs", manager)
+    main.app.dependency_overrides[verify_supabase_jwt] = lambda: {"sub": "user-1"}
+    try:
+        with TestClient(main.app) as client:
+            response = client.post(
+                "/analyze-pitch/jobs",
+                files={"audio": ("pitch.webm", b"audio bytes", "audio/webm")},
+            )
+            assert response.status_code == 202
+            job_id = response.json()["job_id"]
+
+            with client.stream("GET", f"/audio-analysis/{job_id}/stream") as stream:
+                events = [line for line in stream.iter_lines() if line.startswith("event:")]
+            assert events[-1] == "event: completed"
+
+            status = client.get(f"/audio-analysis/{job_id}").json()
+            assert status["status"] == JOB_COMPLETED
+            assert status["result"] == {"success": True, "filename": "pitch.webm"}
+            assert "audio_path" not in status
+
+            main.app.dependency_overrides[verify_supabase_jwt] = lambda: {"sub": "someone-else"}
+            assert client.get(f"/audio-analysis/{job_id}").status_code == 404
+    finally:
+        main.app.dependency_overrides.clear()
+
+
+def test_manager_requeues_jobs_orphaned_while_running(tmp_path):
+    async def pipeline(job, report_progress):
+        return {"success": True}
+
+    store = SQLiteJobStore(str(tmp_path / "jobs.db"))
+    manager = AnalysisJobManager(
+        store, pipeline, workers=1, spool_dir=str(tmp_path),
+        idle_poll_seconds=0.02, stale_after_seconds=0.2, requeue_interval_seconds=0.05,
+    )
+    path = manager.new_spool_path()
+    open(path, "wb").close()
+    # Claimed by a standalone worker that then crashed
+    orphan = store.create(AnalysisJob(audio_path=path))
+    store.claim_next()
+
+    async def scenario():
+        await manager.start()
+        try:
+            async for update in manager.watch(orphan.job_id):
+                pass
+            return update
+        finally:
+            await manager.stop()
+
+    assert asyncio.run(scenario()).status == JOB_COMPLETED
+
+
+def test_pipeline_result_has_the_analyze_pitch_fields(monkeypatch, tmp_path):
+    from jobs import pitch_analysis_pipeline
+    from services import hume_service_provider, scoring_service_provider
+    from test_practice_sessions import StubHume, StubScorer
+
+    monkeypatch.setattr(hume_service_provider, "_instance", StubHume())
+    monkeypatch.setattr(scoring_service_provider, "_instance", StubScorer())
+    path = tmp_path / "audio.webm"
+    path.write_bytes(b"audio")
+    job = AnalysisJob(audio_path=str(path), metadata={
+        "filename": "pitch.webm", "content_type": "audio/webm", "file_size": 5, "duration": "30",
+        "timestamp": "t", "content_hash": "abc", "scoring_mode": "local", "persona": "VC", "persona_type": "x",
+    })
+
+    async def report_progress(stage, progress):
+        pass
+
+    result = asyncio.run(pitch_analysis_pipeline(job, report_progress))
+
+    assert list(result)[:6] == ["success", "filename", "content_type", "file_size", "duration", "timestamp"]
+    assert not {"content_hash", "scoring_mode", "persona", "persona_type"} & result.keys()
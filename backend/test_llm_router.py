@@ -0,0 +1,192 @@
+"""
+Tests for LLMRouter hedging, failover and circuit breaking
+"""
+import asyncio
+import pytest
+from fake_llm import FakePitchChatModel
+from llm_router import (
+    CircuitBreaker,
+    CIRCUIT_CLOSED,
+    CIRCUIT_HALF_OPEN,
+    CIRCUIT_OPEN,
+    NoBackendAvailable,
+    router_options_from_env,
+)
+from scoring_service import PitchScoringService
+from test_scoring import mock_hume_results
+
+FAST_HEDGE = {"initial_hedge_delay": 0.05, "min_hedge_delay": 0.01}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_scorer(backends, **router_options) -> PitchScoringService:
+    return PitchScoringService(
+        cache=None,
+        backends=backends,
+        router_options={**FAST_HEDGE, **router_options},
+        default_mode="llm",
+        llm_timeout_seconds=5,
+    )
+
+
+def test_hedge_goes_to_next_backend_when_primary_is_slow():
+    slow = FakePitchChatModel(latency_seconds=0.5)
+    fast = FakePitchChatModel()
+    scorer = make_scorer([("slow", slow), ("fast", fast)])
+
+    scores = asyncio.run(scorer.score_pitch_performance(mock_hume_results))
+
+    assert scores["metadata"]["model_used"] == "fast"
+    assert scores["metadata"]["llm_hedged"] is True
+    assert fast.calls == 1
+
+
+class SlowFirstCallModel(FakePitchChatModel):
+    """Fake model whose first call stalls, like one slow replica behind an endpoint"""
+
+    started: int = 0
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.started += 1
+        if self.started == 1:
+            await asyncio.sleep(self.latency_seconds)
+        return self._respond(messages)
+
+
+@pytest.mark.parametrize("hedge_same_backend", [True, False])
+def test_single_backend_hedges_to_itself(hedge_same_backend):
+    model = SlowFirstCallModel(latency_seconds=0.5)
+    scorer = make_scorer([("only", model)], hedge_same_backend=hedge_same_backend)
+
+    scores = asyncio.run(scorer.score_pitch_performance(mock_hume_results))
+
+    assert scores["metadata"]["model_used"] == "only"
+    assert scores["metadata"]["llm_hedged"] is hedge_same_backend
+    assert model.started == (2 if hedge_same_backend else 1)
+
+
+def test_same_backend_hedging_is_opt_in(monkeypatch):
+    monkeypatch.delenv("SCORING_HEDGE_SAME_BACKEND", raising=False)
+    assert router_options_from_env()["hedge_same_backend"] is False
+
+    monkeypatch.setenv("SCORING_HEDGE_SAME_BACKEND", "1")
+    assert router_options_from_env()["hedge_same_backend"] is True
+
+
+def test_fast_primary_is_not_hedged():
+    fallback = FakePitchChatModel()
+    scorer = make_scorer([("primary", FakePitchChatModel()), ("fallback", fallback)])
+
+    scores = asyncio.run(scorer.score_pitch_performance(mock_hume_results))
+
+    assert scores["metadata"]["model_used"] == "primary"
+    assert scores["metadata"]["llm_hedged"] is False
+    assert fallback.calls == 0
+
+
+def test_error_fails_over_without_waiting_for_hedge():
+    scorer = make_scorer(
+        [("broken", FakePitchChatModel(error="rate limited")), ("backup", FakePitchChatModel())],
+        initial_hedge_delay=10,
+    )
+
+    scores = asyncio.run(asyncio.wait_for(scorer.score_pitch_performance(mock_hume_results), 1))
+
+    assert scores["metadata"]["model_used"] == "backup"
+
+
+def test_all_backends_failing_raises_last_error():
+    scorer = make_scorer([("a", FakePitchChatModel(error="a down")), ("b", FakePitchChatModel(error="b down"))])
+
+    with pytest.raises(RuntimeError, match="b down"):
+        asyncio.run(scorer.score_pitch_performance(mock_hume_results))
+
+
+def test_open_breaker_skips_backend():
+    broken = FakePitchChatModel(error="down")
+    scorer = make_scorer([("broken", broken), ("backup", FakePitchChatModel())])
+    scorer.router.primary.breaker = CircuitBreaker(min_requests=2, cooldown_seconds=60)
+
+    for _ in range(3):
+        asyncio.run(scorer.score_pitch_performance(mock_hume_results))
+
+    assert scorer.router.primary.breaker.state == CIRCUIT_OPEN
+    assert broken.calls == 2
+    assert scorer.router.stats()["backends"]["broken"]["state"] == CIRCUIT_OPEN
+
+
+def test_no_backend_available():
+    scorer = make_scorer([("only", FakePitchChatModel())])
+    scorer.router.primary.breaker = CircuitBreaker(min_requests=1, cooldown_seconds=60)
+    scorer.router.record(scorer.router.primary, False, 0.1)
+
+    with pytest.raises(NoBackendAvailable):
+        asyncio.run(scorer.score_pitch_performance(mock_hume_results))
+
+
+def test_breaker_half_open_admits_one_probe():
+    clock = FakeClock()
+    breaker = CircuitBreaker(min_requests=2, error_threshold=0.5, cooldown_seconds=30, clock=clock)
+    breaker.record(True, 0.1)
+    breaker.record(False, 0.1)
+    assert breaker.state == CIRCUIT_OPEN
+    assert not breaker.allow()
+
+    clock.now = 31
+    assert breaker.allow()
+    assert breaker.state == CIRCUIT_HALF_OPEN
+    assert not breaker.allow()
+
+    # A failed probe reopens for another cooldown
+    breaker.record(False, 0.1)
+    assert breaker.state == CIRCUIT_OPEN
+    clock.now = 45
+    assert not breaker.allow()
+
+    clock.now = 62
+    assert breaker.allow()
+    breaker.record(True, 0.1)
+    assert breaker.state == CIRCUIT_CLOSED
+    assert breaker.allow() and breaker.allow()
+
+
+def test_breaker_opens_on_slow_calls():
+    breaker = CircuitBreaker(min_requests=4, slow_call_seconds=1.0, slow_call_threshold=0.75, clock=FakeClock())
+    for latency in (2.0, 2.0, 0.1, 2.0):
+        breaker.record(True, latency)
+
+    assert breaker.state == CIRCUIT_OPEN
+
+
+def test_breaker_forgets_outcomes_outside_window():
+    clock = FakeClock()
+    breaker = CircuitBreaker(window_seconds=10, min_requests=3, clock=clock)
+    breaker.record(False, 0.1)
+    breaker.record(False, 0.1)
+    clock.now = 20
+    breaker.record(True, 0.1)
+
+    assert breaker.state == CIRCUIT_CLOSED
+    assert breaker.stats()["window_requests"] == 1
+
+
+def test_streaming_uses_one_backend_and_records_outcome():
+    scorer = make_scorer([("broken", FakePitchChatModel(error="down")), ("backup", FakePitchChatModel())])
+    scorer.router.primary.breaker = CircuitBreaker(min_requests=1, cooldown_seconds=60)
+
+    async def collect():
+        return [event async for event in scorer.stream_pitch_scores(mock_hume_results, "llm")]
+
+    with pytest.raises(RuntimeError, match="down"):
+        asyncio.run(collect())
+    events = asyncio.run(collect())
+
+    assert events[-1]["scores"]["metadata"]["model_used"] == "backup"
+    assert scorer.router.backends[1].latencies.percentile(50) is not None
@@ -0,0 +1,84 @@
+"""
+Tests for the deterministic local pitch scorer
+"""
+import copy
+import time
+from fake_hume import build_segments
+from hume_service import hume_service
+from local_scoring import LocalPitchScorer, extract_features
+from test_scoring import mock_hume_results
+
+
+def results_for(segments, full_text=None, confidence=0.9):
+    timestamps = [
+        {"text": text, "confidence": confidence, "timestamp": {"begin": begin, "end": end}, "emotions": []}
+        for text, begin, end in segments
+    ]
+    return {"analysis": {
+        "timestamps": timestamps,
+        "transcription": {
+            "full_text": full_text if full_text is not None else " ".join(s[0] for s in segments),
+            "confidence": confidence,
+        },
+        "overall_sentiment": {"average_emotions": {}},
+    }}
+
+
+def test_features_measure_pace_pauses_and_fillers():
+    features = extract_features(results_for([
+        ("um so our product is great", 0.0, 3.0),
+        ("uh you know customers love it", 4.0, 6.0),
+        ("and revenue grows", 9.0, 12.0),
+    ]))
+
+    assert features["words"] == 15
+    assert features["words_per_minute"] == 15 / (12 / 60)
+    assert features["pause_count"] == 2
+    assert features["long_pause_count"] == 1
+    assert features["pause_ratio"] == 4 / 12
+    assert features["filler_count"] == 3
+
+
+def test_fillers_and_pauses_lower_fluency():
+    scorer = LocalPitchScorer()
+    smooth = results_for([("our platform helps teams ship faster every single quarter", 0.0, 4.0)])
+    halting = results_for([
+        ("um our platform uh", 0.0, 2.0),
+        ("helps teams you know", 5.0, 6.5),
+        ("ship faster um", 10.0, 11.5),
+    ])
+
+    assert scorer.score(halting).fluency < scorer.score(smooth).fluency
+
+
+def test_emotions_move_confidence():
+    scorer = LocalPitchScorer()
+    assured = copy.deepcopy(mock_hume_results)
+    assured["analysis"]["overall_sentiment"]["average_emotions"] = {"Determination": 0.6, "Calmness": 0.5}
+    nervous = copy.deepcopy(mock_hume_results)
+    nervous["analysis"]["overall_sentiment"]["average_emotions"] = {"Anxiety": 0.6, "Awkwardness": 0.5}
+
+    assert scorer.score(assured).confidence > scorer.score(nervous).confidence
+
+
+def test_calibration_is_applied_and_clamped():
+    raw = LocalPitchScorer().score(mock_hume_results)
+    calibrated = LocalPitchScorer({"tone": (0.0, 42.0), "clarity": (10.0, 0.0)}).score(mock_hume_results)
+
+    assert calibrated.tone == 42.0
+    assert calibrated.clarity == 100.0
+    assert calibrated.fluency == raw.fluency
+
+
+def test_scores_a_typical_pitch_well_under_a_millisecond():
+    results = hume_service.summarize_segments([
+        hume_service.segment_record(s["text"], s["confidence"], s["time"]["begin"], s["time"]["end"], s["emotions"])
+        for s in build_segments("timing", 40)
+    ])
+    scorer = LocalPitchScorer()
+    scorer.score(results)
+
+    start = time.perf_counter()
+    for _ in range(100):
+        scorer.score(results)
+    assert (time.perf_counter() - start) / 100 < 0.001
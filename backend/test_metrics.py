@@ -0,0 +1,50 @@
+"""
+Tests for the metrics registry and its Prometheus rendering
+"""
+import pytest
+from metrics import MetricsRegistry
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.7, 3):
+        histogram.observe(value, stage="llm")
+
+    [sample] = histogram.samples().values()
+    assert sample["buckets"] == [(0.1, 1), (1, 3), (float("inf"), 4)]
+    assert histogram.count(stage="llm") == 4
+    assert histogram.sum(stage="llm") == pytest.approx(4.25)
+    assert registry.snapshot()["latency_seconds"]["stage=llm"]["mean"] == pytest.approx(4.25 / 4)
+
+
+def test_histogram_times_blocks_that_raise():
+    histogram = MetricsRegistry().histogram("stage_seconds")
+    with pytest.raises(RuntimeError):
+        with histogram.time(stage="hume_submit"):
+            raise RuntimeError("boom")
+
+    assert histogram.count(stage="hume_submit") == 1
+
+
+def test_prometheus_text_format():
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "Requests").inc(3, path='/say "hi"')
+    registry.gauge("in_flight").set(2)
+    registry.histogram("tokens", "Tokens", buckets=(100,)).observe(40, kind="prompt")
+
+    text = registry.render_prometheus()
+
+    assert "# HELP requests_total Requests\n# TYPE requests_total counter\n" in text
+    assert 'requests_total{path="/say \\"hi\\""} 3\n' in text
+    assert "# TYPE in_flight gauge\nin_flight 2\n" in text
+    assert 'tokens_bucket{kind="prompt",le="100"} 1\n' in text
+    assert 'tokens_bucket{kind="prompt",le="+Inf"} 1\n' in text
+    assert 'tokens_sum{kind="prompt"} 40\ntokens_count{kind="prompt"} 1\n' in text
+
+
+def test_re_registering_with_another_kind_fails():
+    registry = MetricsRegistry()
+    registry.counter("shared")
+    with pytest.raises(ValueError):
+        registry.histogram("shared")
@@ -0,0 +1,99 @@
+"""
+Tests for the shared outbound HTTP pool against a local keep-alive server
+"""
+import asyncio
+import socket
+import httpx
+import pytest
+from outbound_http import OutboundHTTP
+
+
+class KeepAliveServer:
+    """Minimal HTTP/1.1 server answering every request with `ok` after a delay"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.connections = 0
+        self.active = 0
+        self.max_active = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            while await reader.readuntil(b"\r\n\r\n"):
+                self.active += 1
+                self.max_active = max(self.max_active, self.active)
+                await asyncio.sleep(self.delay)
+                self.active -= 1
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\nConnection: keep-alive\r\n\r\nok")
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    async def __aenter__(self) -> str:
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        port = self.server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}/"
+
+    async def __aexit__(self, *exc) -> None:
+        self.server.close()
+
+
+def test_sequential_requests_reuse_one_connection():
+    server = KeepAliveServer()
+    http = OutboundHTTP()
+
+    async def run():
+        async with server as url:
+            for _ in range(3):
+                response = await http.client.get(url)
+                assert response.text == "ok"
+            await http.aclose()
+            return url
+
+    url = asyncio.run(run())
+
+    host = http.stats()["hosts"][url.split("//")[1].rstrip("/")]
+    assert server.connections == 1
+    assert host["requests"] == 3
+    assert host["new_connections"] == 1
+    assert host["connection_reuse_rate"] == pytest.approx(2 / 3)
+    assert host["in_flight"] == 0
+
+
+def test_requests_per_host_are_capped():
+    server = KeepAliveServer(delay=0.05)
+    http = OutboundHTTP(max_connections_per_host=2)
+
+    async def run():
+        async with server as url:
+            responses = await asyncio.gather(*(http.client.get(url) for _ in range(6)))
+            await http.aclose()
+            return responses
+
+    responses = asyncio.run(run())
+
+    assert all(response.status_code == 200 for response in responses)
+    assert server.max_active == 2
+    assert server.connections == 2
+
+
+def test_connection_failures_are_recorded_per_host():
+    http = OutboundHTTP(retries=0, connect_timeout=1)
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+
+    async def run():
+        # The port was just released, so nothing listens on it
+        with pytest.raises(httpx.ConnectError):
+            await http.client.get(f"http://127.0.0.1:{port}/")
+        await http.aclose()
+
+    asyncio.run(run())
+
+    host = http.stats()["hosts"][f"127.0.0.1:{port}"]
+    assert host["new_connections"] == 0
+    assert host["in_flight"] == 0
@@ -0,0 +1,152 @@
+"""
+Tests for practice session history and the dashboard aggregate
+"""
+import datetime
+import os
+import pytest
+from fastapi.testclient import TestClient
+import practice_sessions
+from practice_sessions import (
+    InMemorySessionStore,
+    PracticeSession,
+    SQLiteSessionStore,
+    UserStats,
+    create_session_store,
+    decode_cursor,
+    session_from_analysis,
+)
+from test_scoring import mock_hume_results
+
+DAY = 86400
+START = datetime.datetime(2025, 3, 1, 12, tzinfo=datetime.timezone.utc).timestamp()
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteSessionStore(str(tmp_path / "sessions.db"))
+    return InMemorySessionStore()
+
+
+def session(created_at: float, score: float = 70, user_id: str = "u1", duration: float = 60) -> PracticeSession:
+    return PracticeSession(user_id=user_id, created_at=created_at, score=score, duration=duration)
+
+
+def test_stats_track_totals_streaks_and_improvement():
+    stats = UserStats()
+    # Days 0, 1, 2 (twice), then a gap, then days 5 and 6
+    for offset, score in [(0, 50), (1, 60), (2, 60), (2.1, 70), (5, 80), (6, 90), (6.2, 90)]:
+        stats.add(session(START + offset * DAY, score=score))
+
+    quick = stats.quick_stats()
+    assert quick["totalSessions"] == 7
+    assert quick["averageScore"] == round(500 / 7)
+    assert quick["practiceTime"] == 420
+    # First five average 64, latest five average 78
+    assert quick["improvement"] == round((78 - 64) / 64 * 100)
+    assert (stats.current_streak, stats.longest_streak) == (2, 3)
+
+    last_day = stats.last_day
+    assert stats.streak_on(last_day + 1) == 2
+    assert stats.streak_on(last_day + 2) == 0
+
+
+def test_store_pages_recent_sessions_newest_first(store):
+    for i in range(7):
+        store.record(session(START + i * 60, score=60 + i))
+    store.record(session(START, user_id="u2"))
+
+    first = store.recent("u1", 3)
+    second = store.recent("u1", 3, before=first[-1].cursor)
+    last = store.recent("u1", 3, before=second[-1].cursor)
+
+    assert [s.score for s in first + second + last] == [66, 65, 64, 63, 62, 61, 60]
+    assert store.stats("u1").total_sessions == 7
+    assert store.stats("missing").total_sessions == 0
+
+
+def test_sqlite_stats_survive_reopen(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    SQLiteSessionStore(path).record(session(START, score=80))
+
+    assert SQLiteSessionStore(path).stats("u1").quick_stats()["averageScore"] == 80
+
+
+def test_sessions_persist_to_sqlite_by_default(tmp_path, monkeypatch):
+    monkeypatch.delenv("SESSION_STORE", raising=False)
+    monkeypatch.setenv("SESSION_DB", str(tmp_path / "sessions.db"))
+
+    store = create_session_store()
+    assert isinstance(store, SQLiteSessionStore)
+    # Nothing is written until the store is used
+    assert not (tmp_path / "sessions.db").exists()
+    store.record(session(START))
+    assert (tmp_path / "sessions.db").exists()
+
+    monkeypatch.delenv("SESSION_DB")
+    assert os.path.isabs(create_session_store().path)
+
+
+def test_session_from_analysis_skips_unscored_results():
+    scores = {"tone": 80, "fluency": 70, "clarity": 90, "confidence": 60, "explanation": "ok"}
+
+    recorded = session_from_analysis("u1", scores, duration=42.5, persona="Sarah Chen")
+    assert recorded.score == 75
+    assert (recorded.duration, recorded.persona) == (42.5, "Sarah Chen")
+    assert session_from_analysis("u1", {"error": "scoring failed"}) is None
+    fallback = {**scores, "metadata": {"scoring_mode": "local_fallback"}}
+    assert session_from_analysis("u1", fallback) is None
+    assert session_from_analysis("u1", {**scores, "metadata": {"scoring_mode": "hybrid"}}) is not None
+
+
+class StubHume:
+    async def analyze_audio_expression(self, audio_file, **kwargs):
+        return mock_hume_results
+
+
+class StubScorer:
+    async def score_pitch_performance(self, hume_results, **kwargs):
+        return {"tone": 80, "fluency": 70, "clarity": 90, "confidence": 60, "explanation": "ok"}
+
+
+def test_analyze_pitch_feeds_the_dashboard(monkeypatch):
+    import main
+    from auth import optional_supabase_user, verify_supabase_jwt
+    from services import hume_service_provider, scoring_service_provider
+
+    store = InMemorySessionStore()
+    monkeypatch.setattr(practice_sessions, "session_store", store)
+    monkeypatch.setattr(main, "session_store", store)
+    claims = {"sub": "user-1", "email": "alexa@example.com"}
+    main.app.dependency_overrides.update({
+        hume_service_provider: lambda: StubHume(),
+        scoring_service_provider: lambda: StubScorer(),
+        optional_supabase_user: lambda: claims,
+        verify_supabase_jwt: lambda: claims,
+    })
+    try:
+        client = TestClient(main.app)
+        for persona in ("Sarah Chen", "Michael Rodriguez", "Jennifer Park"):
+            response = client.post(
+                "/analyze-pitch",
+                files={"audio": ("pitch.webm", b"audio", "audio/webm")},
+                data={"duration": "120", "persona": persona, "personaType": "VC Investor"},
+            )
+            assert response.status_code == 200
+
+        dashboard = client.get("/dashboard?limit=2").json()
+        assert dashboard["user"]["name"] == "alexa"
+        assert dashboard["user"]["currentStreak"] == 1
+        assert dashboard["quickStats"] == {
+            "totalSessions": 3, "averageScore": 75, "practiceTime": 360, "improvement": 0,
+        }
+        assert [s["persona"] for s in dashboard["recentSessions"]] == ["Jennifer Park", "Michael Rodriguez"]
+
+        page = client.get("/dashboard", params={"limit": 2, "cursor": dashboard["nextCursor"]}).json()
+        assert [s["persona"] for s in page["recentSessions"]] == ["Sarah Chen"]
+        assert page["nextCursor"] is None
+        assert decode_cursor(dashboard["nextCursor"])[1] == dashboard["recentSessions"][-1]["id"]
+
+        assert client.get("/dashboard?cursor=bogus").status_code == 400
+    finally:
+        main.app.dependency_overrides.clear()
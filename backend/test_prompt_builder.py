@@ -0,0 +1,90 @@
+"""
+Tests for token-budgeted prompt construction
+"""
+import asyncio
+from fake_hume import build_segments
+from fake_llm import FakePitchChatModel
+from hume_service import hume_service
+from prompt_builder import PromptBuilder, estimate_tokens, spread_order, ANXIETY_EMOTIONS, ENTHUSIASM_EMOTIONS
+from scoring_service import PitchScoringService
+
+
+def long_pitch(segment_count: int, peaks=None) -> dict:
+    timestamps = []
+    for i, s in enumerate(build_segments("long-pitch", segment_count)):
+        emotions = [dict(e) for e in s["emotions"]]
+        for e in emotions:
+            if peaks and e["name"] in peaks.get(i, {}):
+                e["score"] = peaks[i][e["name"]]
+            elif e["name"] in ANXIETY_EMOTIONS + ENTHUSIASM_EMOTIONS:
+                e["score"] = 0.1
+        text = f"Segment {i} says {s['text']}."
+        timestamps.append(hume_service.segment_record(text, s["confidence"], s["time"]["begin"], s["time"]["end"], emotions))
+    return hume_service.summarize_segments(timestamps)
+
+
+def render(text: str) -> str:
+    return f"Score this pitch.\nTRANSCRIPTION:\n{text}\nThanks."
+
+
+def test_spread_order_covers_every_index_evenly():
+    order = spread_order(9)
+
+    assert sorted(order) == list(range(9))
+    assert order[0] == 4
+
+
+def test_short_transcripts_are_kept_whole():
+    builder = PromptBuilder(token_budget=500)
+
+    text, stats = builder.build(render, "We grow fast. Customers love us.", [])
+
+    assert text == "We grow fast. Customers love us."
+    assert not stats["transcript_compacted"]
+    assert stats["prompt_tokens"] == estimate_tokens(render(text))
+
+
+def test_back_to_back_repeats_are_collapsed():
+    text, _ = PromptBuilder(token_budget=500).build(render, "Thank you. Thank you! Thank you. Questions?", [])
+
+    assert text == "Thank you. [repeated 3x] Questions?"
+
+
+def test_long_transcripts_are_excerpted_within_budget():
+    results = long_pitch(300, peaks={120: {"Anxiety": 0.99}, 200: {"Excitement": 0.98}})
+    timestamps = results["analysis"]["timestamps"]
+    full_text = results["analysis"]["transcription"]["full_text"]
+    builder = PromptBuilder(token_budget=600)
+
+    text, stats = builder.build(render, full_text, timestamps)
+
+    assert estimate_tokens(render(full_text)) > 600
+    assert stats["transcript_compacted"]
+    assert stats["prompt_tokens"] <= 600
+    for index in (0, 1, 120, 200, 298, 299):
+        assert f"Segment {index} says" in text
+    assert "segments omitted" in text
+    assert 6 < stats["transcript_segments_used"] < 300
+
+
+def test_repeated_passages_are_shown_once_with_a_count():
+    results = long_pitch(200)
+    timestamps = results["analysis"]["timestamps"]
+    for segment in timestamps[::10]:
+        segment["text"] = "Let me say that again."
+
+    text, _ = PromptBuilder(token_budget=800).build(render, "x " * 5000, timestamps)
+
+    assert text.count("Let me say that again.") == 1
+    assert "[said 20x]" in text
+
+
+def test_scores_record_prompt_tokens():
+    scorer = PitchScoringService(cache=None, llm=FakePitchChatModel(), default_mode="llm",
+                                 prompt_builder=PromptBuilder(token_budget=900))
+
+    scores = asyncio.run(scorer.score_pitch_performance(long_pitch(400)))
+
+    prompt = scores["metadata"]["prompt"]
+    assert prompt["transcript_compacted"]
+    assert 0 < prompt["prompt_tokens"] <= 900
@@ -0,0 +1,105 @@
+"""
+Tests for the content-addressed result cache
+"""
+import asyncio
+import io
+import pytest
+from result_cache import ResultCache, make_cache_key
+from fake_hume import FakeHumeBackend
+from test_hume_service import make_service
+
+
+def counting_compute(calls, value, delay=0.0):
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return value
+    return compute
+
+
+def test_cache_key_depends_on_content_and_config():
+    base = make_cache_key("hume", "abc", {"models": ["prosody"]})
+
+    assert base == make_cache_key("hume", "abc", {"models": ["prosody"]})
+    assert base != make_cache_key("hume", "abd", {"models": ["prosody"]})
+    assert base != make_cache_key("hume", "abc", {"models": ["prosody", "language"]})
+    assert base != make_cache_key("pitch_scores", "abc", {"models": ["prosody"]})
+
+
+def test_memory_and_disk_tiers(tmp_path):
+    calls = []
+    cache = ResultCache(disk_dir=str(tmp_path))
+
+    first = asyncio.run(cache.get_or_compute("k", counting_compute(calls, {"score": 1})))
+    second = asyncio.run(cache.get_or_compute("k", counting_compute(calls, {"score": 2})))
+    # A new instance on the same directory only has the disk tier to go on
+    reloaded = ResultCache(disk_dir=str(tmp_path))
+    third = asyncio.run(reloaded.get_or_compute("k", counting_compute(calls, {"score": 3})))
+
+    assert first == second == third == {"score": 1}
+    assert len(calls) == 1
+
+
+def test_expired_entries_are_recomputed(tmp_path):
+    calls = []
+    cache = ResultCache(disk_dir=str(tmp_path), ttl_seconds=-1)
+
+    asyncio.run(cache.get_or_compute("k", counting_compute(calls, 1)))
+    asyncio.run(cache.get_or_compute("k", counting_compute(calls, 2)))
+
+    assert len(calls) == 2
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(memory_entries=1, disk_dir=str(tmp_path), disk_max_bytes=250)
+    blob = "x" * 100
+
+    for key in ("a", "b", "c"):
+        asyncio.run(cache.get_or_compute(key, counting_compute([], blob)))
+
+    stats = cache.stats()
+    assert stats["disk_bytes"] <= 250
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["c.json"]
+
+
+def test_concurrent_misses_share_one_computation():
+    calls = []
+    cache = ResultCache()
+
+    async def run_all():
+        compute = counting_compute(calls, "result", delay=0.05)
+        return await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(10)))
+
+    assert asyncio.run(run_all()) == ["result"] * 10
+    assert len(calls) == 1
+
+
+def test_failures_are_not_cached():
+    cache = ResultCache()
+    attempts = []
+
+    async def failing():
+        attempts.append(1)
+        raise RuntimeError("provider down")
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            asyncio.run(cache.get_or_compute("k", failing))
+
+    assert len(attempts) == 2
+
+
+def test_resubmitted_audio_reuses_hume_analysis():
+    backend = FakeHumeBackend(processing_seconds=0.0, segments_per_file=2)
+    service = make_service(backend)
+    service.cache = ResultCache()
+
+    async def submit_twice():
+        first = await service.analyze_audio_expression(io.BytesIO(b"same"), content_hash="h1")
+        second = await service.analyze_audio_expression(io.BytesIO(b"same"), content_hash="h1")
+        return first, second
+
+    first, second = asyncio.run(submit_twice())
+
+    assert first == second
+    assert backend.request_counts["submit"] == 1
@@ -0,0 +1,46 @@
+"""
+Tests for incremental decoding of streamed PitchScores arguments
+"""
+import json
+import pytest
+from score_stream import IncrementalScoreParser
+
+ARGUMENTS = json.dumps({
+    "tone": 85, "fluency": 72.5, "clarity": 6e1, "confidence": 9,
+    "explanation": 'Clear "story", steady pace',
+})
+
+
+@pytest.mark.parametrize("fragment_size", [1, 2, 5, 13, len(ARGUMENTS)])
+def test_fields_decode_identically_for_any_fragmentation(fragment_size):
+    parser = IncrementalScoreParser()
+    fields = []
+    for start in range(0, len(ARGUMENTS), fragment_size):
+        fields.extend(parser.feed(ARGUMENTS[start:start + fragment_size]))
+
+    assert fields == list(json.loads(ARGUMENTS).items())
+    assert parser.done
+
+
+def test_numbers_wait_for_a_delimiter():
+    parser = IncrementalScoreParser()
+
+    assert parser.feed('{"tone": 8') == []
+    assert parser.feed('5') == []
+    assert parser.feed('.') == []
+    assert parser.feed('5, "flu') == [("tone", 85.5)]
+
+
+def test_each_score_is_reported_before_the_explanation_completes():
+    parser = IncrementalScoreParser()
+    cut = ARGUMENTS.index("steady")
+
+    fields = parser.feed(ARGUMENTS[:cut])
+
+    assert [name for name, _ in fields] == ["tone", "fluency", "clarity", "confidence"]
+    assert parser.feed(ARGUMENTS[cut:]) == [("explanation", 'Clear "story", steady pace')]
+
+
+def test_rejects_non_object_arguments():
+    with pytest.raises(ValueError):
+        IncrementalScoreParser().feed("[1, 2]")
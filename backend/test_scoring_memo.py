@@ -0,0 +1,96 @@
+"""
+Tests for the persistent scoring memo
+"""
+import asyncio
+import copy
+from fake_llm import FakePitchChatModel
+from scoring_memo import ScoringMemo, memo_key
+from scoring_service import PitchScoringService
+from test_scoring import mock_hume_results
+
+
+def make_scorer(memo, **kwargs) -> PitchScoringService:
+    return PitchScoringService(cache=None, memo=memo, llm=FakePitchChatModel(**kwargs), default_mode="llm")
+
+
+def test_key_depends_on_prompt_and_config():
+    base = memo_key("prompt", {"model": "a", "temperature": 0})
+
+    assert base == memo_key("prompt", {"temperature": 0, "model": "a"})
+    assert base != memo_key("prompt!", {"model": "a", "temperature": 0})
+    assert base != memo_key("prompt", {"model": "b", "temperature": 0})
+
+
+def test_entries_are_shared_between_instances(tmp_path):
+    path = str(tmp_path / "memo.db")
+    ScoringMemo(path).put("k", {"scores": {"tone": 1}})
+
+    assert ScoringMemo(path).get("k") == {"scores": {"tone": 1}}
+    assert ScoringMemo(path).get("missing") is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    memo = ScoringMemo(str(tmp_path / "memo.db"), max_entries=2)
+    memo.put("a", {"v": "a"})
+    memo.put("b", {"v": "b"})
+    memo.get("a")
+    memo.put("c", {"v": "c"})
+
+    assert memo.get("b") is None
+    assert memo.get("a") == {"v": "a"}
+    assert memo.get("c") == {"v": "c"}
+    assert memo.stats()["entries"] == 2
+
+
+def test_expired_entries_are_ignored(tmp_path):
+    memo = ScoringMemo(str(tmp_path / "memo.db"), ttl_seconds=-1)
+    memo.put("k", {"v": 1})
+
+    assert memo.get("k") is None
+    assert memo.stats()["entries"] == 0
+
+
+def test_identical_prompts_skip_the_llm(tmp_path):
+    scorer = make_scorer(ScoringMemo(str(tmp_path / "memo.db")))
+    # Different uploads, same processed input
+    first = asyncio.run(scorer.score_pitch_performance(mock_hume_results, content_hash="upload-1"))
+    second = asyncio.run(scorer.score_pitch_performance(copy.deepcopy(mock_hume_results), content_hash="upload-2"))
+
+    assert scorer.llm.calls == 1
+    assert {k: second[k] for k in ("tone", "fluency", "clarity", "confidence")} == \
+        {k: first[k] for k in ("tone", "fluency", "clarity", "confidence")}
+    assert first["metadata"]["llm_memoized"] is False
+    assert second["metadata"]["llm_memoized"] is True
+    assert second["metadata"]["model_used"] == first["metadata"]["model_used"]
+    assert scorer.memo.stats()["stored_entry_hits"] == 1
+
+
+def test_changed_prompt_or_model_calls_the_llm(tmp_path):
+    memo = ScoringMemo(str(tmp_path / "memo.db"))
+    scorer = make_scorer(memo)
+    asyncio.run(scorer.score_pitch_performance(mock_hume_results))
+
+    changed = copy.deepcopy(mock_hume_results)
+    changed["analysis"]["transcription"]["full_text"] += " One more thing."
+    asyncio.run(scorer.score_pitch_performance(changed))
+    other_model = make_scorer(memo, model_name="other-model")
+    asyncio.run(other_model.score_pitch_performance(mock_hume_results))
+
+    assert scorer.llm.calls == 2
+    assert other_model.llm.calls == 1
+
+
+def test_batch_rescoring_only_calls_llm_for_misses(tmp_path):
+    scorer = make_scorer(ScoringMemo(str(tmp_path / "memo.db")))
+    inputs = []
+    for i in range(4):
+        results = copy.deepcopy(mock_hume_results)
+        results["analysis"]["transcription"]["full_text"] += f" Take {i}."
+        inputs.append(results)
+
+    first = asyncio.run(scorer.score_pitch_batch(inputs[:2]))
+    second = asyncio.run(scorer.score_pitch_batch(inputs))
+
+    assert scorer.llm.calls == 4
+    assert [s["metadata"]["llm_memoized"] for s in second] == [True, True, False, False]
+    assert [s["tone"] for s in second[:2]] == [s["tone"] for s in first]
@@ -0,0 +1,203 @@
+"""
+Tests for PitchScoringService with a local fake chat model
+"""
+import asyncio
+import copy
+import time
+import pytest
+from fake_llm import FakePitchChatModel
+from scoring_service import PitchScoringService
+from test_scoring import mock_hume_results
+
+
+def make_scorer(mode="llm", llm_timeout_seconds=None, **kwargs) -> PitchScoringService:
+    return PitchScoringService(
+        cache=None,
+        llm=FakePitchChatModel(**kwargs),
+        default_mode=mode,
+        llm_timeout_seconds=llm_timeout_seconds,
+    )
+
+
+def hume_results_with_text(text: str) -> dict:
+    results = copy.deepcopy(mock_hume_results)
+    results["analysis"]["transcription"]["full_text"] = text
+    return results
+
+
+def test_chain_is_built_once_and_reused(monkeypatch):
+    scorer = make_scorer()
+    chain = scorer.chain
+    monkeypatch.setattr(type(scorer.llm), "with_structured_output", lambda *a, **k: pytest.fail("chain rebuilt"))
+
+    scores = asyncio.run(scorer.score_pitch_performance(mock_hume_results))
+    asyncio.run(scorer.score_pitch_performance(mock_hume_results))
+
+    assert scorer.chain is chain
+    assert scorer.llm.calls == 2
+    assert 0 <= scores["tone"] <= 100
+    assert scores["explanation"]
+    assert scores["metadata"]["total_segments"] == 3
+
+
+def test_batch_scores_keep_input_order():
+    scorer = make_scorer()
+    inputs = [hume_results_with_text(f"pitch number {i}") for i in range(6)]
+
+    batch = asyncio.run(scorer.score_pitch_batch(inputs))
+    single = [asyncio.run(scorer.score_pitch_performance(results)) for results in inputs]
+
+    assert batch == single
+
+
+def test_batch_respects_max_concurrency():
+    scorer = make_scorer(latency_seconds=0.1)
+    inputs = [hume_results_with_text(f"pitch {i}") for i in range(8)]
+
+    start = time.perf_counter()
+    asyncio.run(scorer.score_pitch_batch(inputs, max_concurrency=8))
+    parallel = time.perf_counter() - start
+
+    start = time.perf_counter()
+    asyncio.run(scorer.score_pitch_batch(inputs, max_concurrency=2))
+    limited = time.perf_counter() - start
+
+    assert parallel < 0.35
+    assert limited >= 0.4
+
+
+def test_batch_can_return_failures_in_place():
+    scorer = make_scorer(scores={"tone": 150, "fluency": 1, "clarity": 1, "confidence": 1, "explanation": "x"})
+
+    results = asyncio.run(scorer.score_pitch_batch([mock_hume_results], return_exceptions=True))
+
+    assert len(results) == 1 and isinstance(results[0], Exception)
+
+
+def test_local_mode_skips_the_llm():
+    scorer = make_scorer()
+
+    scores = asyncio.run(scorer.score_pitch_performance(mock_hume_results, mode="local"))
+
+    assert scorer.llm.calls == 0
+    assert scores["metadata"]["scoring_mode"] == "local"
+    assert all(0 <= scores[name] <= 100 for name in ("tone", "fluency", "clarity", "confidence"))
+
+
+def test_hybrid_mode_refines_local_scores_with_the_llm():
+    scorer = make_scorer(mode="hybrid", scores={"tone": 90, "fluency": 80, "clarity": 70, "confidence": 60, "explanation": "ok"})
+
+    scores = asyncio.run(scorer.score_pitch_performance(mock_hume_results))
+
+    assert scores["tone"] == 90
+    assert scores["metadata"]["scoring_mode"] == "hybrid"
+    assert set(scores["metadata"]["local_scores"]) == {"tone", "fluency", "clarity", "confidence"}
+
+
+@pytest.mark.parametrize("llm_kwargs", [
+    {"scores": {"tone": 150, "fluency": 1, "clarity": 1, "confidence": 1, "explanation": "invalid"}},
+    {"latency_seconds": 1.0},
+])
+def test_hybrid_mode_falls_back_to_local_scores(llm_kwargs):
+    scorer = make_scorer(mode="hybrid", llm_timeout_seconds=0.05, **llm_kwargs)
+
+    scores = asyncio.run(scorer.score_pitch_performance(mock_hume_results))
+
+    assert scores["metadata"]["scoring_mode"] == "local_fallback"
+    assert scores == {**scorer.score_locally(mock_hume_results), "metadata": scores["metadata"]}
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        asyncio.run(make_scorer().score_pitch_performance(mock_hume_results, mode="oracle"))
+
+
+def collect_stream(scorer, hume_results, mode=None):
+    async def collect():
+        return [event async for event in scorer.stream_pitch_scores(hume_results, mode=mode)]
+    return asyncio.run(collect())
+
+
+def test_stream_emits_each_score_before_the_explanation():
+    scorer = make_scorer(latency_seconds=0.05, chunk_delay_seconds=0.01, chunk_chars=4)
+
+    events = collect_stream(scorer, mock_hume_results)
+
+    assert [e["type"] for e in events] == ["score"] * 4 + ["explanation", "scores"]
+    assert [e["field"] for e in events[:4]] == ["tone", "fluency", "clarity", "confidence"]
+    final = events[-1]
+    assert final["time_to_first_score"] == events[0]["elapsed"]
+    assert final["time_to_first_score"] < events[4]["elapsed"]
+    expected = asyncio.run(scorer.score_pitch_performance(mock_hume_results))
+    assert {k: final["scores"][k] for k in expected if k != "metadata"} == {
+        k: v for k, v in expected.items() if k != "metadata"
+    }
+    assert final["scores"]["metadata"]["time_to_first_score"] == final["time_to_first_score"]
+
+
+def test_stream_in_hybrid_mode_falls_back_when_the_llm_stalls():
+    scorer = make_scorer(mode="hybrid", llm_timeout_seconds=0.1, latency_seconds=0.01, chunk_delay_seconds=0.5)
+
+    events = collect_stream(scorer, mock_hume_results)
+
+    assert events[0]["type"] == "local_scores"
+    final = events[-1]
+    assert final["type"] == "scores"
+    assert final["scores"]["metadata"]["scoring_mode"] == "local_fallback"
+    assert final["scores"]["tone"] == events[0]["scores"]["tone"]
+
+
+def test_stream_in_llm_mode_raises_invalid_scores():
+    scorer = make_scorer(scores={"tone": 150, "fluency": 1, "clarity": 1, "confidence": 1, "explanation": "x"})
+
+    with pytest.raises(Exception):
+        collect_stream(scorer, mock_hume_results)
+
+
+def test_analyze_pitch_stream_endpoint_emits_sse(monkeypatch):
+    from fastapi.testclient import TestClient
+    import main
+
+    async def analyze_audio_expression(audio_file, **kwargs):
+        return mock_hume_results
+
+    from services import hume_service_provider, scoring_service_provider
+
+    monkeypatch.setattr(hume_service_provider.get(), "analyze_audio_expression", analyze_audio_expression)
+    scorer = make_scorer()
+    main.app.dependency_overrides[scoring_service_provider] = lambda: scorer
+    try:
+        with TestClient(main.app) as client:
+            response = client.post(
+                "/analyze-pitch/stream?scoring=llm",
+                files={"audio": ("pitch.webm", b"audio", "audio/webm")},
+            )
+    finally:
+        main.app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    events = [block.split("\n")[0][len("event: "):] for block in response.text.strip().split("\n\n")]
+    assert events == ["analysis", "score", "score", "score", "score", "explanation", "complete"]
+    assert '"pitch_scores"' in response.text.split("event: complete")[1]
+
+
+def test_stage_timings_and_token_usage_reach_metrics_endpoint():
+    from fastapi.testclient import TestClient
+    import main
+    from scoring_service import llm_tokens
+    from metrics import stage_seconds
+
+    scorer = make_scorer()
+    prompts_before = llm_tokens.count(backend=scorer.model_name, kind="prompt")
+    llm_calls_before = stage_seconds.count(stage="llm")
+
+    asyncio.run(scorer.score_pitch_performance(mock_hume_results))
+
+    assert llm_tokens.count(backend=scorer.model_name, kind="prompt") == prompts_before + 1
+    assert stage_seconds.count(stage="llm") == llm_calls_before + 1
+
+    response = TestClient(main.app).get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'pitch_analysis_stage_seconds_bucket{stage="prompt_build",le="+Inf"}' in response.text
+    assert f'llm_tokens_per_request_count{{backend="{scorer.model_name}",kind="completion"}}' in response.text
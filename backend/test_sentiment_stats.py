@@ -0,0 +1,72 @@
+"""
+Tests for duration-weighted and windowed sentiment statistics
+"""
+import numpy as np
+import pytest
+from emotion_matrix import EmotionMatrixBuilder
+from fake_hume import build_segments
+from sentiment_stats import compute_sentiment_statistics, describe_statistics
+
+
+def matrix_for(rows):
+    """rows: (begin, end, {emotion: score})"""
+    builder = EmotionMatrixBuilder()
+    for begin, end, emotions in rows:
+        builder.add("", 0.9, begin, end, list(emotions), list(emotions.values()))
+    return builder.build()
+
+
+def test_long_segments_outweigh_short_ones():
+    matrix = matrix_for([
+        (0.0, 0.3, {"Anxiety": 0.9, "Calmness": 0.1}),
+        (0.3, 10.3, {"Anxiety": 0.1, "Calmness": 0.6}),
+    ])
+
+    stats = compute_sentiment_statistics(matrix)
+
+    assert stats["dominant_emotion"]["name"] == "Calmness"
+    assert stats["weighted_emotions"]["Anxiety"] == pytest.approx((0.3 * 0.9 + 10 * 0.1) / 10.3)
+    assert stats["speaking_time"] == pytest.approx(10.3)
+
+
+def test_windows_match_brute_force_overlap_weighting():
+    segments = build_segments("windows", 40)
+    builder = EmotionMatrixBuilder()
+    for s in segments:
+        builder.add(s["text"], s["confidence"], s["time"]["begin"], s["time"]["end"],
+                    [e["name"] for e in s["emotions"]], [e["score"] for e in s["emotions"]])
+    matrix = builder.build()
+
+    stats = compute_sentiment_statistics(matrix, window_seconds=15, step_seconds=5)
+
+    assert stats["windows"][0]["start"] == segments[0]["time"]["begin"]
+    assert stats["windows"][-1]["end"] >= segments[-1]["time"]["end"]
+    for window in stats["windows"]:
+        overlap = np.clip(
+            np.minimum(matrix.ends, window["end"]) - np.maximum(matrix.begins, window["start"]), 0, None
+        )
+        means = overlap @ matrix.scores / overlap.sum()
+        assert window["speaking_time"] == pytest.approx(overlap.sum(), abs=1e-3)
+        assert window["dominant_emotion"]["name"] == matrix.emotion_names[int(np.argmax(means))]
+        assert window["dominant_emotion"]["score"] == pytest.approx(means.max())
+
+
+def test_trend_and_volatility():
+    matrix = matrix_for([
+        (i * 6.0, i * 6.0 + 6, {"Determination": 0.1 * i, "Calmness": 0.5})
+        for i in range(10)
+    ])
+
+    stats = compute_sentiment_statistics(matrix)
+
+    # Determination rises 0.1 every 6 s, i.e. 1.0 per minute
+    assert stats["trends"]["Determination"] == pytest.approx(1.0)
+    assert stats["trends"]["Calmness"] == pytest.approx(0.0)
+    assert stats["volatility"]["Calmness"] == pytest.approx(0.0)
+    assert stats["volatility"]["Determination"] > 0.2
+    assert "Determination +1.00" in "\n".join(describe_statistics(stats))
+
+
+def test_empty_matrix():
+    assert compute_sentiment_statistics(matrix_for([])) == {}
+    assert describe_statistics({}) == []
@@ -0,0 +1,47 @@
+"""
+Tests for lazily built service providers
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from services import ServiceProvider
+
+
+def test_provider_builds_once_under_concurrent_first_use():
+    builds = []
+
+    def factory():
+        builds.append(1)
+        time.sleep(0.05)
+        return object()
+
+    provider = ServiceProvider("test", factory)
+    assert not provider.initialized and provider.instance is None
+
+    async def first_use():
+        return await asyncio.gather(*(provider() for _ in range(5)))
+
+    instances = asyncio.run(first_use())
+
+    assert len(builds) == 1
+    assert all(instance is provider.get() for instance in instances)
+    assert provider.initialized
+
+
+def test_importing_main_leaves_heavy_services_unbuilt():
+    # A fresh interpreter without API keys: importing main must neither fail nor load the SDKs
+    env = {k: v for k, v in os.environ.items() if k not in ("HUME_API_KEY", "GROQ_API_KEY")}
+    code = (
+        "import sys, main; "
+        "heavy = [m for m in ('hume', 'langchain_core', 'langchain_groq', 'scoring_service') if m in sys.modules]; "
+        "print(','.join(heavy))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=env, capture_output=True, text=True,
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ""
@@ -0,0 +1,155 @@
+"""
+Tests for the real-time streaming analysis WebSocket
+"""
+import asyncio
+import io
+import wave
+import pytest
+from starlette.websockets import WebSocketDisconnect
+from fastapi.testclient import TestClient
+import practice_sessions
+from fake_hume import FakeHumeStreamBackend
+from practice_sessions import InMemorySessionStore
+from services import scoring_service_provider, stream_backend_provider
+
+
+def wav_window(seconds: float, rate: int = 16000) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(rate)
+        writer.writeframes(b"\0\0" * int(seconds * rate))
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def stream_client(monkeypatch):
+    import main
+
+    scored = []
+
+    async def score_pitch_performance(hume_results, content_hash=None):
+        scored.append(hume_results)
+        return {"tone": 80, "fluency": 75, "clarity": 70, "confidence": 85, "overall_score": 77.5}
+
+    backend = FakeHumeStreamBackend(window_seconds=4)
+    main.app.dependency_overrides[stream_backend_provider] = lambda: backend
+    monkeypatch.setattr(scoring_service_provider.get(), "score_pitch_performance", score_pitch_performance)
+    try:
+        with TestClient(main.app) as client:
+            yield client, backend, scored
+    finally:
+        main.app.dependency_overrides.clear()
+
+
+def test_stream_emits_segments_per_window_then_final_scores(stream_client):
+    client, backend, scored = stream_client
+
+    with client.websocket_connect("/ws/analyze-stream") as ws:
+        ws.send_json({"type": "start", "window_seconds": 4})
+        windows = []
+        for chunk in (b"window-0", b"window-1", b"window-2"):
+            ws.send_bytes(chunk)
+            windows.append(ws.receive_json())
+        ws.send_json({"type": "end"})
+        final = ws.receive_json()
+
+    assert [w["window"] for w in windows] == [0, 1, 2]
+    assert [w["offset"] for w in windows] == [0, 4, 8]
+    segment = windows[1]["segments"][0]
+    assert set(segment) == {"text", "confidence", "timestamp", "emotions", "all_emotions"}
+    assert len(segment["emotions"]) == 5
+    assert 4 <= segment["timestamp"]["begin"] < segment["timestamp"]["end"] <= 8
+
+    assert final["type"] == "final"
+    assert final["pitch_scores"]["overall_score"] == 77.5
+    assert final["emotion_analysis"]["total_segments"] == 6
+    analysis = final["raw_analysis"]["analysis"]
+    assert analysis["timestamps"] == [s for w in windows for s in w["segments"]]
+    assert analysis["overall_sentiment"]["dominant_emotion"]["name"]
+    assert final["raw_analysis"]["metadata"]["stream_windows"] == 3
+    assert len(scored) == 1 and backend.connections == 1
+
+
+def test_stream_without_audio_reports_error(stream_client):
+    client, _, scored = stream_client
+
+    with client.websocket_connect("/ws/analyze-stream") as ws:
+        ws.send_json({"type": "end"})
+        message = ws.receive_json()
+
+    assert message["type"] == "error"
+    assert scored == []
+
+
+def test_stream_offsets_follow_window_audio_and_signed_in_sessions_are_recorded(stream_client, monkeypatch):
+    import main
+    from auth import token_verifier
+
+    client, _, _ = stream_client
+    main.app.dependency_overrides[stream_backend_provider] = lambda: FakeHumeStreamBackend(window_seconds=1.5)
+    store = InMemorySessionStore()
+    monkeypatch.setattr(practice_sessions, "session_store", store)
+    monkeypatch.setattr(token_verifier, "verify", lambda token: {"sub": "user-1"} if token == "good" else None)
+
+    for token in ("good", None):
+        url = "/ws/analyze-stream" + (f"?token={token}" if token else "")
+        with client.websocket_connect(url) as ws:
+            ws.send_json({"type": "start", "window_seconds": 5, "persona": "Sarah Chen", "personaType": "VC Investor"})
+            offsets = []
+            for seconds in (2, 2, 2):
+                ws.send_bytes(wav_window(seconds))
+                offsets.append(ws.receive_json()["offset"])
+            ws.send_json({"type": "end"})
+            assert ws.receive_json()["type"] == "final"
+        # Windows shorter than the nominal 5 s move the timeline by their own length
+        assert offsets == [0, 2, 4]
+
+    sessions = store.recent("user-1", limit=10)
+    assert len(sessions) == 1
+    assert (sessions[0].duration, sessions[0].persona, sessions[0].persona_type) == (6, "Sarah Chen", "VC Investor")
+
+
+class FailingStreamBackend(FakeHumeStreamBackend):
+    """Stream backend that rejects its first window after a delay"""
+
+    async def analyze(self, audio: bytes):
+        await asyncio.sleep(0.2)
+        raise RuntimeError("stream closed by provider")
+
+
+def test_analyzer_failure_with_a_full_queue_closes_the_stream(stream_client):
+    import main
+    import streaming
+
+    client, _, scored = stream_client
+    main.app.dependency_overrides[stream_backend_provider] = lambda: FailingStreamBackend()
+
+    with client.websocket_connect("/ws/analyze-stream") as ws:
+        # One window in analysis, a full queue behind it, and one more waiting for room
+        for window in range(streaming.MAX_PENDING_WINDOWS + 2):
+            ws.send_bytes(b"window-%d" % window)
+        message = ws.receive_json()
+        with pytest.raises(WebSocketDisconnect) as closed:
+            ws.receive_json()
+
+    assert message["type"] == "error" and "stream closed by provider" in message["detail"]
+    assert closed.value.code == 1011
+    assert scored == []
+
+
+def test_oversized_window_closes_with_1009(stream_client):
+    import streaming
+
+    client, backend, _ = stream_client
+
+    with client.websocket_connect("/ws/analyze-stream") as ws:
+        ws.send_bytes(b"\0" * (streaming.MAX_WINDOW_BYTES + 1))
+        message = ws.receive_json()
+        with pytest.raises(WebSocketDisconnect) as closed:
+            ws.receive_json()
+
+    assert message["type"] == "error" and "exceeds" in message["detail"]
+    assert closed.value.code == 1009
+    assert backend.windows == 0
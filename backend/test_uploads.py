@@ -0,0 +1,100 @@
+"""
+Tests for streaming audio upload ingestion
+"""
+import hashlib
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from uploads import receive_audio_upload, receive_audio_uploads
+
+app = FastAPI()
+
+
+@app.post("/upload")
+async def upload_endpoint(request: Request, max_bytes: int = 1024):
+    upload = await receive_audio_upload(request, max_bytes=max_bytes)
+    try:
+        return {
+            "filename": upload.filename,
+            "content_type": upload.content_type,
+            "size": upload.size,
+            "sha256": upload.sha256,
+            "fields": upload.fields,
+            "echo": upload.file.read().decode(),
+        }
+    finally:
+        upload.close()
+
+
+@app.post("/upload-many")
+async def upload_many_endpoint(request: Request):
+    uploads = await receive_audio_uploads(request, max_files=2, max_bytes=1024)
+    try:
+        return [
+            {"filename": upload.filename, "sha256": upload.sha256, "fields": upload.fields}
+            for upload in uploads
+        ]
+    finally:
+        for upload in uploads:
+            upload.close()
+
+
+client = TestClient(app)
+
+
+def test_streams_audio_and_hashes_in_one_pass():
+    audio = b"RIFF" + b"a" * 500
+    response = client.post(
+        "/upload",
+        files={"audio": ("pitch.webm", audio, "audio/webm")},
+        data={"duration": "42", "timestamp": "2024-01-15T10:00:00Z"},
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["filename"] == "pitch.webm"
+    assert body["content_type"] == "audio/webm"
+    assert body["size"] == len(audio)
+    assert body["sha256"] == hashlib.sha256(audio).hexdigest()
+    assert body["fields"] == {"duration": "42", "timestamp": "2024-01-15T10:00:00Z"}
+    assert body["echo"] == audio.decode()
+
+
+def test_rejects_oversized_content_length_before_reading():
+    response = client.post(
+        "/upload?max_bytes=10",
+        content=b"x" * (70 * 1024),
+        headers={"content-type": "multipart/form-data; boundary=abc"},
+    )
+
+    assert response.status_code == 413
+
+
+def test_rejects_oversized_audio_mid_stream():
+    response = client.post(
+        "/upload?max_bytes=100",
+        files={"audio": ("pitch.webm", b"a" * 101, "audio/webm")},
+    )
+
+    assert response.status_code == 413
+
+
+def test_rejects_non_audio_and_missing_files():
+    wrong_type = client.post("/upload", files={"audio": ("notes.txt", b"hi", "text/plain")})
+    missing = client.post("/upload", files={"other": ("pitch.webm", b"hi", "audio/webm")})
+
+    assert wrong_type.status_code == 400
+    assert missing.status_code == 422
+
+
+def test_receives_several_files_sharing_the_form_fields():
+    files = [("audio", ("one.webm", b"first", "audio/webm")), ("audio", ("two.webm", b"second", "audio/webm"))]
+    response = client.post("/upload-many", files=files, data={"durations": "3,4"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [u["filename"] for u in body] == ["one.webm", "two.webm"]
+    assert body[1]["sha256"] == hashlib.sha256(b"second").hexdigest()
+    assert all(u["fields"] == {"durations": "3,4"} for u in body)
+
+    too_many = client.post("/upload-many", files=files + [("audio", ("three.webm", b"x", "audio/webm"))])
+    assert too_many.status_code == 400
@@ -0,0 +1,292 @@
+"""
+Streaming ingestion of multipart audio uploads
+
+Parses the request body as it arrives instead of letting Starlette buffer the
+form and then reading the whole file into memory. The audio part is written
+chunk by chunk to a spooled temp file (or straight to a destination path),
+hashed in the same pass, and cut off with 413 as soon as it exceeds the size
+limit, whether that is announced by Content-Length or discovered mid-stream.
+receive_audio_uploads does the same for forms carrying several recordings.
+"""
+import hashlib
+import os
+import tempfile
+from typing import Callable, Dict, List, Optional, BinaryIO
+from fastapi import HTTPException, Request
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+# Limit on uploaded audio (50MB)
+MAX_AUDIO_BYTES = 50 * 1024 * 1024
+
+# Audio up to this size stays in memory; larger uploads roll over to disk
+SPOOL_MEMORY_BYTES = 1024 * 1024
+
+# Allowance for multipart boundaries, headers and the small form fields
+FORM_OVERHEAD_BYTES = 64 * 1024
+MAX_FIELD_BYTES = 16 * 1024
+
+
+class AudioUpload:
+    """An ingested audio upload plus the form fields sent with it"""
+
+    def __init__(self, file: BinaryIO, filename: Optional[str], content_type: Optional[str],
+                 size: int, sha256: str, fields: Dict[str, str], path: Optional[str] = None):
+        self.file = file
+        self.filename = filename
+        self.content_type = content_type
+        self.size = size
+        self.sha256 = sha256
+        self.fields = fields
+        self.path = path
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def parse_audio_duration(value: Optional[str]) -> Optional[float]:
+    """Parse the client-reported recording length (seconds) from a form field"""
+    try:
+        duration = float(value)
+    except (TypeError, ValueError):
+        return None
+    return duration if duration > 0 else None
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(status_code=413, detail="File too large. Maximum size is 50MB.")
+
+
+class _ReceivedAudio:
+    """One audio part as it streams in"""
+
+    def __init__(self, sink: BinaryIO, filename: Optional[str], content_type: Optional[str]):
+        self.sink = sink
+        self.filename = filename
+        self.content_type = content_type
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+
+class _AudioFormReceiver:
+    """Multipart parser callbacks routing audio parts to files and hashers"""
+
+    def __init__(
+        self,
+        file_field: str,
+        open_sink: Callable[[int], BinaryIO],
+        max_bytes: int,
+        max_files: Optional[int] = 1,
+    ):
+        self.file_field = file_field
+        self.open_sink = open_sink
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.files: List[_ReceivedAudio] = []
+        self.fields: Dict[str, str] = {}
+
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._part_name: Optional[str] = None
+        self._audio: Optional[_ReceivedAudio] = None
+        self._field_buffer = bytearray()
+
+    def callbacks(self):
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def on_part_begin(self) -> None:
+        self._headers = {}
+        self._part_name = None
+        self._audio = None
+        self._field_buffer = bytearray()
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition"))
+        name = options.get(b"name", b"").decode("utf-8", "replace")
+        self._part_name = name
+        if name != self.file_field or b"filename" not in options:
+            return
+        if self.max_files is not None and len(self.files) >= self.max_files:
+            if self.max_files == 1:
+                # Single-file uploads keep the first file and treat extra ones as plain fields
+                return
+            raise HTTPException(status_code=400, detail=f"Too many files. At most {self.max_files} per upload.")
+        content_type = self._headers.get(b"content-type")
+        content_type = content_type.decode("latin-1") if content_type else None
+        # Reject before any audio bytes are stored
+        if not content_type or not content_type.startswith("audio/"):
+            raise HTTPException(
+                status_code=400,
+                detail="Invalid file type. Please upload an audio file."
+            )
+        self._audio = _ReceivedAudio(
+            self.open_sink(len(self.files)),
+            options[b"filename"].decode("utf-8", "replace"),
+            content_type,
+        )
+        self.files.append(self._audio)
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        chunk = data[start:end]
+        audio = self._audio
+        if audio is not None:
+            audio.size += len(chunk)
+            if audio.size > self.max_bytes:
+                raise _too_large()
+            audio.digest.update(chunk)
+            audio.sink.write(chunk)
+        else:
+            self._field_buffer += chunk
+            if len(self._field_buffer) > MAX_FIELD_BYTES:
+                raise HTTPException(status_code=400, detail=f"Form field '{self._part_name}' is too large")
+
+    def on_part_end(self) -> None:
+        if self._audio is None and self._part_name:
+            self.fields[self._part_name] = self._field_buffer.decode("utf-8", "replace")
+
+
+async def _receive(
+    request: Request,
+    file_field: str,
+    max_bytes: int,
+    max_files: int,
+    open_sink: Callable[[int], BinaryIO],
+    discard_paths: Callable[[], None],
+) -> _AudioFormReceiver:
+    """Run the multipart parser over the request body; on failure closes every sink and raises"""
+    content_type, params = parse_options_header(request.headers.get("content-type"))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload.")
+
+    content_length = request.headers.get("content-length")
+    if (content_length and content_length.isdigit()
+            and int(content_length) > max_bytes * max_files + FORM_OVERHEAD_BYTES):
+        raise _too_large()
+
+    receiver = _AudioFormReceiver(file_field, open_sink, max_bytes, max_files)
+    parser = MultipartParser(boundary, receiver.callbacks())
+
+    def discard() -> None:
+        for audio in receiver.files:
+            audio.sink.close()
+        discard_paths()
+
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+        parser.finalize()
+    except HTTPException:
+        discard()
+        raise
+    except Exception:
+        discard()
+        raise HTTPException(status_code=400, detail="Malformed multipart upload.")
+
+    if not receiver.files:
+        discard()
+        raise HTTPException(status_code=422, detail=f"Missing '{file_field}' file in upload.")
+    return receiver
+
+
+def _upload(audio: _ReceivedAudio, fields: Dict[str, str], path: Optional[str] = None) -> AudioUpload:
+    audio.sink.seek(0)
+    return AudioUpload(
+        file=audio.sink,
+        filename=audio.filename,
+        content_type=audio.content_type,
+        size=audio.size,
+        sha256=audio.digest.hexdigest(),
+        fields=fields,
+        path=path,
+    )
+
+
+async def receive_audio_upload(
+    request: Request,
+    file_field: str = "audio",
+    max_bytes: int = MAX_AUDIO_BYTES,
+    destination_path: Optional[str] = None,
+) -> AudioUpload:
+    """
+    Stream a multipart audio upload off the request
+
+    Args:
+        request: Incoming request with a multipart/form-data body
+        file_field: Form field carrying the audio file
+        max_bytes: Size limit for the audio part
+        destination_path: Write the audio to this path instead of a spooled temp file
+
+    Returns:
+        AudioUpload whose file is positioned at the start, ready to hand to Hume
+    """
+    def open_sink(index: int) -> BinaryIO:
+        if destination_path:
+            return open(destination_path, "w+b")
+        return tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+
+    def discard_paths() -> None:
+        if destination_path and os.path.exists(destination_path):
+            os.remove(destination_path)
+
+    receiver = await _receive(request, file_field, max_bytes, 1, open_sink, discard_paths)
+    return _upload(receiver.files[0], receiver.fields, destination_path)
+
+
+async def receive_audio_uploads(
+    request: Request,
+    file_field: str = "audio",
+    max_files: int = 10,
+    max_bytes: int = MAX_AUDIO_BYTES,
+) -> List[AudioUpload]:
+    """
+    Stream a multipart upload carrying several recordings under the same field
+
+    Every upload shares the form's other fields. Each file is held to
+    `max_bytes` and spooled like receive_audio_upload does.
+
+    Returns:
+        One AudioUpload per file, in the order they were sent
+    """
+    receiver = await _receive(
+        request, file_field, max_bytes, max_files,
+        lambda index: tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES),
+        lambda: None,
+    )
+    return [_upload(audio, receiver.fields) for audio in receiver.files]
+
+
+def audio_upload_openapi(*fields: str, multiple: bool = False) -> Dict:
+    """OpenAPI request body for endpoints that read uploads with receive_audio_upload(s)"""
+    audio = {"type": "string", "format": "binary"}
+    properties = {"audio": {"type": "array", "items": audio} if multiple else audio}
+    properties.update({name: {"type": "string"} for name in fields})
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {"type": "object", "required": ["audio"], "properties": properties}
+                }
+            },
+        }
+    }